@@ -0,0 +1,175 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' Counter-based random numbers using the Philox4x32-10 generator of Salmon
+et al. (2011). Each block of four 32-bit random integers is a pure function
+of a key made from the seed and a counter made from the path, the time step
+and a draw index. There is no state to carry so any path can be simulated
+independently of all of the others. This means that the random numbers can
+be drawn inside the parallel loops of the Numba Monte Carlo kernels and the
+results do not depend on the number of threads or the order in which the
+paths are processed. No large matrices of pre-generated randoms are needed.
+'''
+
+import numpy as np
+from numba import njit, prange, float64, int64, uint64
+
+###############################################################################
+
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+MASK32 = np.uint64(0xFFFFFFFF)
+SHIFT32 = np.uint64(32)
+
+# Maps a 32-bit integer onto the open interval (0, 1)
+TWO_POW_M32 = 1.0 / 4294967296.0
+
+TWO_PI = 2.0 * np.pi
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def philox4x32(c0, c1, c2, c3, k0, k1):
+    ''' Apply the ten rounds of the Philox4x32 bijection to the counter
+    (c0, c1, c2, c3) using the key (k0, k1). All inputs and outputs are
+    uint64 values holding 32-bit words. '''
+
+    for _ in range(0, 10):
+
+        p0 = PHILOX_M0 * c0
+        p1 = PHILOX_M1 * c2
+
+        hi0 = p0 >> SHIFT32
+        lo0 = p0 & MASK32
+        hi1 = p1 >> SHIFT32
+        lo1 = p1 & MASK32
+
+        c0 = hi1 ^ c1 ^ k0
+        c1 = lo1
+        c2 = hi0 ^ c3 ^ k1
+        c3 = lo0
+
+        k0 = (k0 + PHILOX_W0) & MASK32
+        k1 = (k1 + PHILOX_W1) & MASK32
+
+    return c0, c1, c2, c3
+
+###############################################################################
+
+
+@njit(float64[:](int64, int64, int64, float64[:]), cache=True, fastmath=True)
+def counterUniforms(seed, path, step, u):
+    ''' Fill the array u with uniform random numbers on (0, 1) which are
+    determined by the seed, the path number and the time step. The same
+    inputs always give the same numbers in the same order. '''
+
+    n = len(u)
+    s = uint64(seed)
+    k0 = s & MASK32
+    k1 = (s >> SHIFT32) & MASK32
+    p = uint64(path)
+    c2 = p & MASK32
+    c3 = (p >> SHIFT32) & MASK32
+    c1 = uint64(step) & MASK32
+
+    for i in range(0, (n + 3) // 4):
+
+        r0, r1, r2, r3 = philox4x32(uint64(i), c1, c2, c3, k0, k1)
+
+        j = 4 * i
+        u[j] = (float64(r0) + 0.5) * TWO_POW_M32
+        if j + 1 < n:
+            u[j+1] = (float64(r1) + 0.5) * TWO_POW_M32
+        if j + 2 < n:
+            u[j+2] = (float64(r2) + 0.5) * TWO_POW_M32
+        if j + 3 < n:
+            u[j+3] = (float64(r3) + 0.5) * TWO_POW_M32
+
+    return u
+
+###############################################################################
+
+
+@njit(float64[:](int64, int64, int64, float64[:]), cache=True, fastmath=True)
+def counterNormals(seed, path, step, g):
+    ''' Fill the array g with standard normal random numbers which are
+    determined by the seed, the path number and the time step. These are
+    generated from pairs of counter-based uniforms using Box-Muller. Each
+    block of four uniforms is turned into four normals directly so no work
+    array is allocated. '''
+
+    n = len(g)
+    s = uint64(seed)
+    k0 = s & MASK32
+    k1 = (s >> SHIFT32) & MASK32
+    p = uint64(path)
+    c2 = p & MASK32
+    c3 = (p >> SHIFT32) & MASK32
+    c1 = uint64(step) & MASK32
+
+    for i in range(0, (n + 3) // 4):
+
+        r0, r1, r2, r3 = philox4x32(uint64(i), c1, c2, c3, k0, k1)
+
+        j = 4 * i
+        u0 = (float64(r0) + 0.5) * TWO_POW_M32
+        u1 = (float64(r1) + 0.5) * TWO_POW_M32
+        r = np.sqrt(-2.0 * np.log(u0))
+        g[j] = r * np.cos(TWO_PI * u1)
+        if j + 1 < n:
+            g[j+1] = r * np.sin(TWO_PI * u1)
+
+        if j + 2 < n:
+            u2 = (float64(r2) + 0.5) * TWO_POW_M32
+            u3 = (float64(r3) + 0.5) * TWO_POW_M32
+            r = np.sqrt(-2.0 * np.log(u2))
+            g[j+2] = r * np.cos(TWO_PI * u3)
+            if j + 3 < n:
+                g[j+3] = r * np.sin(TWO_PI * u3)
+
+    return g
+
+###############################################################################
+
+
+@njit(float64(int64, int64, int64), cache=True, fastmath=True)
+def counterNormal(seed, path, step):
+    ''' Return a single standard normal random number determined by the
+    seed, the path number and the time step. This is the first number that
+    counterNormals would return but it avoids any array allocation. '''
+
+    s = uint64(seed)
+    p = uint64(path)
+    r0, r1, _, _ = philox4x32(uint64(0),
+                              uint64(step) & MASK32,
+                              p & MASK32,
+                              (p >> SHIFT32) & MASK32,
+                              s & MASK32,
+                              (s >> SHIFT32) & MASK32)
+
+    u0 = (float64(r0) + 0.5) * TWO_POW_M32
+    u1 = (float64(r1) + 0.5) * TWO_POW_M32
+    return np.sqrt(-2.0 * np.log(u0)) * np.cos(TWO_PI * u1)
+
+###############################################################################
+
+
+@njit(float64[:, :](int64, int64, int64), cache=True, fastmath=True,
+      parallel=True)
+def getCounterNormals(seed, numPaths, numDraws):
+    ''' Return a matrix of numPaths x numDraws standard normal random numbers
+    in which each row is the set of draws for one path. The rows are filled
+    in parallel and each depends only on the seed and the path number. '''
+
+    g = np.empty((numPaths, numDraws))
+
+    for iPath in prange(0, numPaths):
+        counterNormals(seed, iPath, 0, g[iPath])
+
+    return g
+
+###############################################################################
@@ -32,9 +32,12 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
 import numpy as np
-from numba import njit
+from numba import njit, prange
+from enum import Enum
 
 from financepy.finutils.FinMath import norminvcdf
+from financepy.finutils.FinError import FinError
+from financepy.finutils.FinRandom import counterUniforms
 
 ###############################################################################
 # This code loads sobol coefficients from binary numpy file and allocates
@@ -49,6 +52,22 @@ with np.load(path, mmap_mode='r') as f:
     aArr = np.array(f['sa'][1])
     m_i = f['c']
 
+# The maximum dimension supported by the direction number file
+SOBOL_MAX_DIMENSION = len(sArr) + 1
+
+SOBOL_NUM_BITS = 32
+TWO_POW_32 = 4294967296.0
+
+###############################################################################
+
+
+class FinSobolPathTypes(Enum):
+    ''' The order in which Sobol dimensions are assigned to the Brownian
+    increments of a multi-step path. '''
+    STANDARD = 1
+    BROWNIAN_BRIDGE = 2
+    PCA = 3
+
 ###############################################################################
 
 
@@ -135,3 +154,320 @@ def getUniformSobol(numPoints, dimension):
     return points
 
 ###############################################################################
+
+
+@njit(cache=True)
+def getSobolDirections(dimension):
+    ''' Return the Sobol direction numbers v[j, i] for i = 1 to 32 scaled by
+    2**32 for each of the dimensions. These are calculated in integer
+    arithmetic from the primitive polynomials and initial direction numbers
+    loaded at import so only the dimensions needed are built. '''
+
+    if dimension > SOBOL_MAX_DIMENSION:
+        raise FinError("Sobol dimension exceeds maximum supported.")
+
+    v = np.zeros((dimension, SOBOL_NUM_BITS + 1), dtype=np.int64)
+
+    for i in range(1, SOBOL_NUM_BITS + 1):
+        v[0, i] = 1 << (SOBOL_NUM_BITS - i)
+
+    for j in range(1, dimension):
+
+        s = int(sArr[j-1])
+        a = int(aArr[j-1])
+
+        for i in range(1, min(s, SOBOL_NUM_BITS) + 1):
+            v[j, i] = int(m_i[j-1, i-1]) << (SOBOL_NUM_BITS - i)
+
+        for i in range(s + 1, SOBOL_NUM_BITS + 1):
+            x = v[j, i-s] ^ (v[j, i-s] >> s)
+            for k in range(1, s):
+                x ^= ((a >> (s - 1 - k)) & 1) * v[j, i-k]
+            v[j, i] = x
+
+    return v
+
+###############################################################################
+
+
+@njit(cache=True)
+def _parity(x):
+    ''' Return 1 if the number of set bits in x is odd and 0 otherwise. '''
+
+    p = 0
+    while x != 0:
+        x &= x - 1
+        p ^= 1
+    return p
+
+###############################################################################
+
+
+@njit(cache=True)
+def scrambleSobolDirections(v, seed):
+    ''' Apply a random linear matrix scrambling (Matousek) to the direction
+    numbers of each dimension. Each dimension has its own random lower
+    triangular binary matrix with a unit diagonal and a random digital shift.
+    As the scrambling is linear in the digits it can be applied to the
+    direction numbers once rather than to every point. The random bits come
+    from the counter-based generator keyed by the seed and the dimension.
+    Returns the scrambled direction numbers and the digital shifts. '''
+
+    dimension = v.shape[0]
+    sv = np.zeros_like(v)
+    shifts = np.zeros(dimension, dtype=np.int64)
+    rowMasks = np.zeros(SOBOL_NUM_BITS + 1, dtype=np.int64)
+    u = np.empty(SOBOL_NUM_BITS + 1)
+
+    for j in range(0, dimension):
+
+        counterUniforms(seed, j, 0, u)
+
+        shifts[j] = int(u[0] * TWO_POW_32)
+
+        # Row k of the matrix sets digit k from digits 1 to k
+        for k in range(1, SOBOL_NUM_BITS + 1):
+            randomBits = int(u[k] * TWO_POW_32)
+            higherDigits = (0xFFFFFFFF << (SOBOL_NUM_BITS + 1 - k)) \
+                & 0xFFFFFFFF
+            rowMasks[k] = (1 << (SOBOL_NUM_BITS - k)) \
+                | (randomBits & higherDigits)
+
+        for i in range(1, SOBOL_NUM_BITS + 1):
+            x = 0
+            for k in range(1, SOBOL_NUM_BITS + 1):
+                if _parity(v[j, i] & rowMasks[k]) == 1:
+                    x |= 1 << (SOBOL_NUM_BITS - k)
+            sv[j, i] = x
+
+    return sv, shifts
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def getUniformSobolScrambled(numPoints, dimension, seed, skip=0):
+    ''' Scrambled Sobol uniform quasi random points. These are the points of
+    the Sobol sequence with index skip to skip+numPoints-1 after a random
+    linear scrambling and digital shift determined by the seed. Unlike
+    getUniformSobol the point with index zero is used as it is no longer at
+    the origin, so any 2**m points starting at a multiple of 2**m form a
+    scrambled net. The first point of a block is found directly from the
+    Gray code of its index so blocks of the same sequence can be generated
+    independently and in parallel. All points lie strictly inside the unit
+    hypercube. '''
+
+    if skip + numPoints >= 2**SOBOL_NUM_BITS:
+        raise FinError("Too many Sobol points.")
+
+    v = getSobolDirections(dimension)
+    sv, shifts = scrambleSobolDirections(v, seed)
+
+    points = np.empty((numPoints, dimension))
+
+    for j in prange(0, dimension):
+
+        # Gray code of the index of the first point
+        n = skip
+        gray = n ^ (n >> 1)
+        x = 0
+        bit = 1
+        while gray != 0:
+            if gray & 1:
+                x ^= sv[j, bit]
+            gray >>= 1
+            bit += 1
+
+        for i in range(0, numPoints):
+
+            points[i, j] = ((x ^ shifts[j]) + 0.5) / TWO_POW_32
+
+            # The next point flips the direction number of the lowest zero
+            # bit of the current index
+            c = 1
+            value = n
+            while value & 1:
+                value >>= 1
+                c += 1
+
+            x ^= sv[j, c]
+            n += 1
+
+    return points
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def getGaussianSobolScrambled(numPoints, dimension, seed, skip=0):
+    ''' Scrambled Sobol quasi random points mapped to a standard normal
+    distribution. See getUniformSobolScrambled. '''
+
+    points = getUniformSobolScrambled(numPoints, dimension, seed, skip)
+
+    for i in prange(0, numPoints):
+        for j in range(0, dimension):
+            points[i, j] = norminvcdf(points[i, j])
+
+    return points
+
+###############################################################################
+
+
+@njit(cache=True)
+def getBrownianBridgeWeights(stepTimes):
+    ''' Set up the Brownian bridge construction of a Brownian motion that
+    starts at zero and is observed at the increasing stepTimes. The first
+    normal sets the terminal value and the remaining ones fill in the
+    mid-points of the intervals level by level. Returns the index of the
+    point set by each normal, the indices of its left and right neighbours
+    and the weights and standard deviation of its conditional distribution.
+    Indices refer to an array of the motion in which element 0 is time 0.
+    '''
+
+    n = len(stepTimes)
+    T = np.zeros(n + 1)
+    T[1:] = stepTimes
+
+    bridgeIndex = np.zeros(n, dtype=np.int64)
+    leftIndex = np.zeros(n, dtype=np.int64)
+    rightIndex = np.zeros(n, dtype=np.int64)
+    leftWeight = np.zeros(n)
+    rightWeight = np.zeros(n)
+    stdDev = np.zeros(n)
+
+    bridgeIndex[0] = n
+    stdDev[0] = np.sqrt(T[n])
+
+    queueLeft = np.zeros(2 * n + 1, dtype=np.int64)
+    queueRight = np.zeros(2 * n + 1, dtype=np.int64)
+    queueLeft[0] = 0
+    queueRight[0] = n
+    head = 0
+    tail = 1
+    k = 1
+
+    while head < tail:
+
+        l = queueLeft[head]
+        r = queueRight[head]
+        head += 1
+
+        if r - l > 1:
+            m = (l + r) // 2
+            dT = T[r] - T[l]
+            bridgeIndex[k] = m
+            leftIndex[k] = l
+            rightIndex[k] = r
+            leftWeight[k] = (T[r] - T[m]) / dT
+            rightWeight[k] = (T[m] - T[l]) / dT
+            stdDev[k] = np.sqrt((T[m] - T[l]) * (T[r] - T[m]) / dT)
+            k += 1
+
+            queueLeft[tail] = l
+            queueRight[tail] = m
+            tail += 1
+            queueLeft[tail] = m
+            queueRight[tail] = r
+            tail += 1
+
+    return bridgeIndex, leftIndex, rightIndex, leftWeight, rightWeight, stdDev
+
+###############################################################################
+
+
+@njit(cache=True)
+def getPCAWeights(stepTimes):
+    ''' Return the matrix A such that A z is a Brownian motion observed at
+    the stepTimes when z is a vector of independent standard normals. The
+    columns are the eigenvectors of the covariance matrix min(ti, tj) scaled
+    by the square roots of their eigenvalues, largest first. '''
+
+    n = len(stepTimes)
+    cov = np.zeros((n, n))
+    for i in range(0, n):
+        for j in range(0, n):
+            cov[i, j] = min(stepTimes[i], stepTimes[j])
+
+    eigenValues, eigenVectors = np.linalg.eigh(cov)
+
+    A = np.zeros((n, n))
+    for k in range(0, n):
+        kk = n - 1 - k
+        lam = np.sqrt(max(eigenValues[kk], 0.0))
+        for i in range(0, n):
+            A[i, k] = eigenVectors[i, kk] * lam
+
+    return A
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def getSobolGaussianPaths(numPaths, stepTimes, numFactors, pathType, seed,
+                          skip=0):
+    ''' Return a numPaths x numSteps x numFactors array of scrambled Sobol
+    standard normals to be used as the normalised Brownian increments of a
+    multi-step simulation, one for each step and factor, in place of
+    pseudo-random normals. The increments are built by the Brownian bridge
+    or by PCA so that the first Sobol dimensions, which are the most evenly
+    distributed, drive the largest scale moves of each factor. The pathType
+    is the value of a FinSobolPathTypes. The skip is the number of points of
+    the sequence to skip which allows paths to be generated in blocks. '''
+
+    numSteps = len(stepTimes)
+    numDimensions = numSteps * numFactors
+
+    T = np.zeros(numSteps + 1)
+    T[1:] = stepTimes
+
+    for k in range(0, numSteps):
+        if T[k+1] <= T[k]:
+            raise FinError("Step times must be positive and increasing.")
+
+    u = getUniformSobolScrambled(numPaths, numDimensions, seed, skip)
+
+    if pathType == FinSobolPathTypes.BROWNIAN_BRIDGE.value:
+        bIdx, lIdx, rIdx, lWt, rWt, sd = getBrownianBridgeWeights(stepTimes)
+    elif pathType == FinSobolPathTypes.PCA.value:
+        A = getPCAWeights(stepTimes)
+    elif pathType != FinSobolPathTypes.STANDARD.value:
+        raise FinError("Unknown Sobol path type.")
+
+    g = np.empty((numPaths, numSteps, numFactors))
+
+    for iPath in prange(0, numPaths):
+
+        z = np.empty(numSteps)
+        W = np.zeros(numSteps + 1)
+
+        for q in range(0, numFactors):
+
+            # The k-th most important normal of each factor
+            for k in range(0, numSteps):
+                z[k] = norminvcdf(u[iPath, k * numFactors + q])
+
+            if pathType == FinSobolPathTypes.STANDARD.value:
+
+                for k in range(0, numSteps):
+                    g[iPath, k, q] = z[k]
+
+            else:
+
+                if pathType == FinSobolPathTypes.BROWNIAN_BRIDGE.value:
+                    for k in range(0, numSteps):
+                        W[bIdx[k]] = lWt[k] * W[lIdx[k]] \
+                            + rWt[k] * W[rIdx[k]] + sd[k] * z[k]
+                else:
+                    for i in range(0, numSteps):
+                        w = 0.0
+                        for k in range(0, numSteps):
+                            w += A[i, k] * z[k]
+                        W[i+1] = w
+
+                for k in range(0, numSteps):
+                    g[iPath, k, q] = (W[k+1] - W[k]) / np.sqrt(T[k+1] - T[k])
+
+    return g
+
+###############################################################################
@@ -0,0 +1,572 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+import numpy as np
+from enum import Enum
+from numba import njit, prange
+from scipy.optimize import minimize
+
+from ...finutils.FinDate import FinDate
+from ...finutils.FinError import FinError
+from ...finutils.FinGlobalVariables import gDaysInYear
+from ...finutils.FinHelperFunctions import labelToString
+from ...market.curves.FinDiscountCurve import FinDiscountCurve
+
+###############################################################################
+# Each expiry slice is held as the five raw SVI parameters (a, b, rho, m,
+# sigma) of Gatheral so that the total implied variance in log forward
+# moneyness k = log(K/F) is
+#
+#   w(k) = a + b * (rho * (k - m) + sqrt((k - m)^2 + sigma^2))
+#
+# An SSVI slice is a special case of raw SVI so both share the same kernels.
+###############################################################################
+
+
+class FinVolFunctionTypes(Enum):
+    SVI = 1
+    SSVI = 2
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _sviTotalVariance(params, k):
+    ''' Total variance of a raw SVI slice at log forward moneyness k. '''
+
+    a = params[0]
+    b = params[1]
+    rho = params[2]
+    m = params[3]
+    sigma = params[4]
+    x = k - m
+    return a + b * (rho * x + np.sqrt(x * x + sigma * sigma))
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _sviDerivatives(params, k):
+    ''' The first and second derivatives of the total variance of a raw SVI
+    slice with respect to the log forward moneyness. '''
+
+    b = params[1]
+    rho = params[2]
+    m = params[3]
+    sigma = params[4]
+    x = k - m
+    r = np.sqrt(x * x + sigma * sigma)
+    return b * (rho + x / r), b * sigma * sigma / (r * r * r)
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _logForward(t, sliceTimes, sliceLogFwds, logSpot):
+    ''' Log forward at time t linearly interpolated between the expiries and
+    extrapolated at the last carry rate beyond the last expiry. '''
+
+    n = len(sliceTimes)
+    i = np.searchsorted(sliceTimes, t)
+
+    if i == 0:
+        return logSpot + (sliceLogFwds[0] - logSpot) * t / sliceTimes[0]
+    elif i == n:
+        if n == 1:
+            return logSpot + (sliceLogFwds[0] - logSpot) * t / sliceTimes[0]
+        dt = sliceTimes[n-1] - sliceTimes[n-2]
+        slope = (sliceLogFwds[n-1] - sliceLogFwds[n-2]) / dt
+        return sliceLogFwds[n-1] + slope * (t - sliceTimes[n-1])
+    else:
+        dt = sliceTimes[i] - sliceTimes[i-1]
+        u = (t - sliceTimes[i-1]) / dt
+        return sliceLogFwds[i-1] + u * (sliceLogFwds[i] - sliceLogFwds[i-1])
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _totalVariance(k, t, sliceTimes, sliceParams):
+    ''' Total variance at log forward moneyness k and time t. This is linear
+    in time between expiries at the same moneyness, which preserves the
+    absence of calendar arbitrage between the slices, and proportional to
+    time before the first and after the last expiry. '''
+
+    n = len(sliceTimes)
+    i = np.searchsorted(sliceTimes, t)
+
+    if i == 0:
+        return _sviTotalVariance(sliceParams[0], k) * t / sliceTimes[0]
+    elif i == n:
+        return _sviTotalVariance(sliceParams[n-1], k) * t / sliceTimes[n-1]
+    else:
+        w0 = _sviTotalVariance(sliceParams[i-1], k)
+        w1 = _sviTotalVariance(sliceParams[i], k)
+        u = (t - sliceTimes[i-1]) / (sliceTimes[i] - sliceTimes[i-1])
+        return w0 + u * (w1 - w0)
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True, parallel=True)
+def _surfaceVolatilities(strikes, times, sliceTimes, sliceLogFwds, logSpot,
+                         sliceParams):
+    ''' Implied volatility at each pair of strike and time to expiry. '''
+
+    numPoints = len(strikes)
+    vols = np.empty(numPoints)
+
+    for j in prange(numPoints):
+        t = max(times[j], 1e-10)
+        logF = _logForward(t, sliceTimes, sliceLogFwds, logSpot)
+        k = np.log(strikes[j]) - logF
+        w = _totalVariance(k, t, sliceTimes, sliceParams)
+        vols[j] = np.sqrt(max(w, 0.0) / t)
+
+    return vols
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _totalVarianceDerivatives(k, t, sliceTimes, sliceParams):
+    ''' Total variance at log forward moneyness k and time t and its first
+    and second derivatives in k and its derivative in t at fixed k. These
+    follow the same interpolation in time as the total variance. '''
+
+    n = len(sliceTimes)
+    i = np.searchsorted(sliceTimes, t)
+
+    if i == 0 or i == n:
+        j = min(i, n - 1)
+        w = _sviTotalVariance(sliceParams[j], k)
+        dw, d2w = _sviDerivatives(sliceParams[j], k)
+        u = t / sliceTimes[j]
+        return w * u, dw * u, d2w * u, w / sliceTimes[j]
+    else:
+        w0 = _sviTotalVariance(sliceParams[i-1], k)
+        w1 = _sviTotalVariance(sliceParams[i], k)
+        dw0, d2w0 = _sviDerivatives(sliceParams[i-1], k)
+        dw1, d2w1 = _sviDerivatives(sliceParams[i], k)
+        tau = sliceTimes[i] - sliceTimes[i-1]
+        u = (t - sliceTimes[i-1]) / tau
+        return w0 + u * (w1 - w0), dw0 + u * (dw1 - dw0), \
+            d2w0 + u * (d2w1 - d2w0), (w1 - w0) / tau
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True, parallel=True)
+def _surfaceLocalVolatilities(spots, times, sliceTimes, sliceLogFwds,
+                              logSpot, sliceParams, minVol, maxVol):
+    ''' Dupire local volatility at each pair of asset level and time from
+    the implied total variance w(k, t) using the formula of Gatheral
+
+        sigma_loc^2 = dw/dt / g(k)
+
+    where g(k) is the butterfly density function of the slice. Points where
+    the surface has arbitrage are capped at the volatility bounds. '''
+
+    numPoints = len(spots)
+    vols = np.empty(numPoints)
+
+    for j in prange(numPoints):
+        t = max(times[j], 1e-10)
+        logF = _logForward(t, sliceTimes, sliceLogFwds, logSpot)
+        k = np.log(spots[j]) - logF
+        w, dw, d2w, dwdt = _totalVarianceDerivatives(k, t, sliceTimes,
+                                                     sliceParams)
+        w = max(w, 1e-12)
+        g = (1.0 - 0.5 * k * dw / w)**2 \
+            - 0.25 * dw * dw * (1.0 / w + 0.25) + 0.5 * d2w
+
+        if g <= 0.0 or dwdt <= 0.0:
+            vol = minVol if dwdt <= 0.0 else maxVol
+        else:
+            vol = min(max(np.sqrt(dwdt / g), minVol), maxVol)
+
+        vols[j] = vol
+
+    return vols
+
+###############################################################################
+
+
+def _fitSVISlices(k, w, numGridPoints=21, numRefinements=4):
+    ''' Fit a raw SVI slice to the total variances w at log moneyness k of
+    every expiry at once. For fixed m and sigma the SVI total variance is
+    linear in (a, b*rho*sigma, b*sigma) so the fit is a least squares problem
+    which is solved for a grid of (m, sigma) points for all slices together.
+    The grid is then zoomed around the best point of each slice. The
+    parameters are projected onto b >= 0, |rho| <= 1, b(1+|rho|) <= 2 and a
+    non-negative minimum variance so each slice satisfies Roger Lee's moment
+    bound on the wings. '''
+
+    numSlices = k.shape[0]
+    kMin = np.min(k, axis=1)
+    kMax = np.max(k, axis=1)
+    kWidth = np.maximum(kMax - kMin, 1e-4)
+
+    mLow = kMin - 0.5 * kWidth
+    mHigh = kMax + 0.5 * kWidth
+    logSLow = np.full(numSlices, np.log(1e-3))
+    logSHigh = np.log(2.0 * kWidth)
+
+    u = np.linspace(0.0, 1.0, numGridPoints)
+
+    for _ in range(0, numRefinements):
+
+        # Grid of candidate m and sigma for each slice, shape (N, G)
+        mGrid = mLow[:, None] + (mHigh - mLow)[:, None] * u[None, :]
+        sGrid = np.exp(logSLow[:, None] + (logSHigh - logSLow)[:, None] *
+                       u[None, :])
+        mGrid = np.repeat(mGrid, numGridPoints, axis=1)
+        sGrid = np.tile(sGrid, (1, numGridPoints))
+
+        y = (k[:, None, :] - mGrid[:, :, None]) / sGrid[:, :, None]
+        z = np.sqrt(y * y + 1.0)
+        ones = np.ones_like(y)
+        X = np.stack((ones, y, z), axis=-1)
+        XtX = np.einsum('ngmi,ngmj->ngij', X, X)
+        Xtw = np.einsum('ngmi,nm->ngi', X, w)
+        XtX += 1e-12 * np.trace(XtX, axis1=2, axis2=3)[..., None, None] * \
+            np.eye(3)
+        coeffs = np.linalg.solve(XtX, Xtw[..., None])[..., 0]
+
+        # Project on to the SVI constraints and refit the level
+        c = np.clip(coeffs[..., 2], 0.0, 2.0 * sGrid)
+        d = np.clip(coeffs[..., 1], -c, c)
+        excess = np.maximum(c + np.abs(d) - 2.0 * sGrid, 0.0)
+        c = c - 0.5 * excess
+        d = np.sign(d) * np.minimum(np.abs(d), c)
+        a = np.mean(w[:, None, :] - d[..., None] * y - c[..., None] * z,
+                    axis=2)
+        a = np.maximum(a, -np.sqrt(np.maximum(c * c - d * d, 0.0)))
+
+        fit = a[..., None] + d[..., None] * y + c[..., None] * z
+        sse = np.sum((fit - w[:, None, :])**2, axis=2)
+        best = np.argmin(sse, axis=1)
+
+        rows = np.arange(numSlices)
+        bestM = mGrid[rows, best]
+        bestLogS = np.log(sGrid[rows, best])
+        bestA = a[rows, best]
+        bestC = c[rows, best]
+        bestD = d[rows, best]
+
+        mStep = (mHigh - mLow) / (numGridPoints - 1)
+        sStep = (logSHigh - logSLow) / (numGridPoints - 1)
+        mLow = bestM - 2.0 * mStep
+        mHigh = bestM + 2.0 * mStep
+        logSLow = bestLogS - 2.0 * sStep
+        logSHigh = bestLogS + 2.0 * sStep
+
+    sigma = np.exp(bestLogS)
+    b = bestC / sigma
+    rho = np.where(bestC > 0.0, bestD / np.maximum(bestC, 1e-300), 0.0)
+    return np.column_stack((bestA, b, rho, bestM, sigma))
+
+###############################################################################
+
+
+def _ssviSliceParameters(thetas, rho, eta, gamma):
+    ''' Convert the SSVI surface with ATM total variances theta and a power
+    law curvature phi(theta) = eta / (theta^gamma (1+theta)^(1-gamma)) into
+    the equivalent raw SVI parameters of each slice. '''
+
+    phi = eta / (thetas**gamma * (1.0 + thetas)**(1.0 - gamma))
+    rhos = np.full(len(thetas), rho)
+    a = 0.5 * thetas * (1.0 - rho * rho)
+    b = 0.5 * thetas * phi
+    m = -rho / phi
+    sigma = np.sqrt(1.0 - rho * rho) / phi
+    return np.column_stack((a, b, rhos, m, sigma))
+
+###############################################################################
+
+
+def _fitSSVISurface(k, w):
+    ''' Fit an SSVI surface with a power law curvature to the total variances
+    w at log moneyness k of every expiry relative to the ATM total variance
+    of each expiry. The ATM total variances are taken
+    from the market and made non-decreasing in expiry. The three global
+    parameters are mapped so that eta(1+|rho|) <= 2 and 0 < gamma <= 1/2
+    which are sufficient for the surface to be free of static arbitrage. '''
+
+    numSlices = k.shape[0]
+    thetas = np.empty(numSlices)
+
+    for i in range(0, numSlices):
+        thetas[i] = np.interp(0.0, k[i], w[i])
+
+    thetas = np.maximum.accumulate(np.maximum(thetas, 1e-8))
+
+    # Errors are relative to the ATM variance so short expiries also count
+    scale = thetas[:, None]
+
+    def ssviTotalVariance(rho, eta, gamma):
+        phi = eta / (thetas**gamma * (1.0 + thetas)**(1.0 - gamma))
+        pk = phi[..., None] * k
+        rho = np.expand_dims(rho, -1)
+        return 0.5 * thetas[..., None] * \
+            (1.0 + rho * pk + np.sqrt((pk + rho)**2 + 1.0 - rho * rho))
+
+    def params(x):
+        rho = np.tanh(x[0])
+        eta = 2.0 / (1.0 + abs(rho)) / (1.0 + np.exp(-x[1]))
+        gamma = 0.5 / (1.0 + np.exp(-x[2]))
+        return rho, eta, gamma
+
+    def objective(x):
+        return np.sum(((ssviTotalVariance(*params(x)) - w) / scale)**2)
+
+    # Start the search from the best point of a coarse grid which is
+    # evaluated for all grid points and expiries at once
+    u = np.linspace(-2.5, 2.5, 11)
+    x0 = np.array(np.meshgrid(u, u, u, indexing='ij')).reshape(3, -1, 1)
+    rhos = np.tanh(x0[0])
+    etas = 2.0 / (1.0 + np.abs(rhos)) / (1.0 + np.exp(-x0[1]))
+    gammas = 0.5 / (1.0 + np.exp(-x0[2]))
+    sse = np.sum(((ssviTotalVariance(rhos, etas, gammas) - w) / scale)**2,
+                 axis=(1, 2))
+    x0 = x0[:, np.argmin(sse), 0]
+
+    res = minimize(objective, x0, method='Nelder-Mead',
+                   options={'xatol': 1e-8, 'fatol': 1e-14, 'maxiter': 4000})
+
+    return _ssviSliceParameters(thetas, *params(res.x))
+
+###############################################################################
+
+
+class FinEquityVolSurface():
+    ''' Class to hold an equity implied volatility surface as a function of
+    strike and expiry. Each expiry of a grid of market volatilities is fitted
+    with an SVI smile, either independently or as a slice of a single SSVI
+    surface, in total variance and log forward moneyness. Between expiries
+    the total variance is interpolated linearly in time at fixed moneyness.
+    The SSVI surface is free of static arbitrage by construction. The slice
+    parameters are stored so that the volatility of any set of strikes and
+    expiries is computed in one compiled parallel loop. '''
+
+    def __init__(self,
+                 valueDate: FinDate,
+                 stockPrice: float,
+                 discountCurve: FinDiscountCurve,
+                 dividendYield: float,
+                 expiryDates: list,
+                 strikes: (list, np.ndarray),
+                 volatilities: (list, np.ndarray),
+                 volatilityFunctionType=FinVolFunctionTypes.SVI):
+        ''' Create the surface from a grid of market volatilities which has
+        one row per expiry date and one column per strike. '''
+
+        strikes = np.array(strikes, dtype=np.float64)
+        volatilities = np.atleast_2d(np.array(volatilities, dtype=np.float64))
+
+        numExpiries = len(expiryDates)
+
+        if numExpiries < 1:
+            raise FinError("Volatility surface needs at least one expiry.")
+
+        if volatilities.shape != (numExpiries, len(strikes)):
+            raise FinError("Volatility grid must be expiries x strikes.")
+
+        if np.any(np.diff(strikes) <= 0.0):
+            raise FinError("Strikes must be in increasing order.")
+
+        if strikes[0] <= 0.0:
+            raise FinError("Strikes must be positive.")
+
+        if not np.all(volatilities > 0.0):
+            raise FinError("Volatilities must be positive.")
+
+        if stockPrice <= 0.0:
+            raise FinError("Stock price must be positive.")
+
+        times = np.array([(dt - valueDate) / gDaysInYear
+                          for dt in expiryDates])
+
+        if np.any(np.diff(times) <= 0.0):
+            raise FinError("Expiry dates must be in increasing order.")
+
+        if times[0] <= 0.0:
+            raise FinError("Expiry date before value date.")
+
+        dfs = np.atleast_1d(discountCurve.df(expiryDates))
+        logFwds = np.log(stockPrice) - dividendYield * times - np.log(dfs)
+
+        self._valueDate = valueDate
+        self._stockPrice = stockPrice
+        self._discountCurve = discountCurve
+        self._dividendYield = dividendYield
+        self._expiryDates = list(expiryDates)
+        self._strikes = strikes
+        self._volatilities = volatilities
+        self._volatilityFunctionType = volatilityFunctionType
+        self._times = times
+        self._logForwards = logFwds
+
+        k = np.log(strikes)[None, :] - logFwds[:, None]
+        w = volatilities**2 * times[:, None]
+
+        if volatilityFunctionType == FinVolFunctionTypes.SVI:
+            self._parameters = _fitSVISlices(k, w)
+        elif volatilityFunctionType == FinVolFunctionTypes.SSVI:
+            self._parameters = _fitSSVISurface(k, w)
+        else:
+            raise FinError("Unknown volatility function type.")
+
+###############################################################################
+
+    def _timesFromExpiries(self, expiries):
+        ''' Expiries can be dates or year fractions from the value date. '''
+
+        if isinstance(expiries, FinDate):
+            return (expiries - self._valueDate) / gDaysInYear
+
+        if isinstance(expiries, list) and len(expiries) > 0 and \
+           isinstance(expiries[0], FinDate):
+            return np.array([(dt - self._valueDate) / gDaysInYear
+                             for dt in expiries])
+
+        return expiries
+
+###############################################################################
+
+    def volatility(self,
+                   strikes: (float, list, np.ndarray),
+                   expiries: (FinDate, list, float, np.ndarray)):
+        ''' Return the implied volatility at the strikes and expiries. These
+        can be numbers or arrays which are broadcast against each other and
+        the expiries can be dates or times in years from the value date. '''
+
+        times = self._timesFromExpiries(expiries)
+        k, t = np.broadcast_arrays(np.array(strikes, dtype=np.float64),
+                                   np.array(times, dtype=np.float64))
+
+        if np.any(k <= 0.0):
+            raise FinError("Strikes must be positive.")
+
+        vols = _surfaceVolatilities(np.ascontiguousarray(k).ravel(),
+                                    np.ascontiguousarray(t).ravel(),
+                                    self._times,
+                                    self._logForwards,
+                                    np.log(self._stockPrice),
+                                    self._parameters)
+
+        if k.ndim == 0:
+            return vols[0]
+
+        return vols.reshape(k.shape)
+
+###############################################################################
+
+    def localVolatility(self,
+                        spots: (float, list, np.ndarray),
+                        expiries: (FinDate, list, float, np.ndarray),
+                        minVolatility: float = 0.01,
+                        maxVolatility: float = 5.0):
+        ''' Return the Dupire local volatility at the asset levels and times.
+        These broadcast against each other as in volatility(). The local
+        volatility is computed from the analytical derivatives of the fitted
+        slices so no numerical differencing of the surface is needed. It is
+        bounded by the minimum and maximum volatility. '''
+
+        times = self._timesFromExpiries(expiries)
+        s, t = np.broadcast_arrays(np.array(spots, dtype=np.float64),
+                                   np.array(times, dtype=np.float64))
+
+        if np.any(s <= 0.0):
+            raise FinError("Asset levels must be positive.")
+
+        vols = _surfaceLocalVolatilities(np.ascontiguousarray(s).ravel(),
+                                         np.ascontiguousarray(t).ravel(),
+                                         self._times,
+                                         self._logForwards,
+                                         np.log(self._stockPrice),
+                                         self._parameters,
+                                         minVolatility,
+                                         maxVolatility)
+
+        if s.ndim == 0:
+            return vols[0]
+
+        return vols.reshape(s.shape)
+
+###############################################################################
+
+    def checkCalibration(self, verbose: bool = False):
+        ''' Return the largest absolute difference between the fitted and
+        the market volatilities and optionally print the fit of each
+        expiry. '''
+
+        fitted = self.volatility(self._strikes[None, :], self._times[:, None])
+        errors = fitted - self._volatilities
+
+        if verbose:
+            for i in range(0, len(self._times)):
+                print("EXPIRY:", self._expiryDates[i],
+                      "PARAMS:", self._parameters[i],
+                      "MAX ERROR:", np.max(np.abs(errors[i])))
+
+        return np.max(np.abs(errors))
+
+###############################################################################
+
+    def checkArbitrage(self,
+                       numStdDevs: float = 3.0,
+                       numPoints: int = 201):
+        ''' Check the fitted slices for static arbitrage on a grid of log
+        moneyness spanning a number of ATM standard deviations. Returns the
+        smallest value of Gatheral's butterfly density function g(k), which
+        must be non-negative, and the largest decrease in total variance
+        between consecutive expiries, which must be zero or less. '''
+
+        maxW = _sviTotalVariance(self._parameters[-1], 0.0)
+        kMax = numStdDevs * np.sqrt(maxW)
+        ks = np.linspace(-kMax, kMax, numPoints)
+
+        minG = np.inf
+        maxCalendar = -np.inf
+        wPrev = None
+
+        for params in self._parameters:
+            w = np.array([_sviTotalVariance(params, k) for k in ks])
+            derivs = np.array([_sviDerivatives(params, k) for k in ks])
+            dw = derivs[:, 0]
+            d2w = derivs[:, 1]
+            g = (1.0 - 0.5 * ks * dw / w)**2 \
+                - 0.25 * dw * dw * (1.0 / w + 0.25) + 0.5 * d2w
+            minG = min(minG, np.min(g))
+
+            if wPrev is not None:
+                maxCalendar = max(maxCalendar, np.max(wPrev - w))
+
+            wPrev = w
+
+        return minG, maxCalendar
+
+###############################################################################
+
+    def __repr__(self):
+        s = labelToString("OBJECT TYPE", type(self).__name__)
+        s += labelToString("VALUE DATE", self._valueDate)
+        s += labelToString("STOCK PRICE", self._stockPrice)
+        s += labelToString("DIVIDEND YIELD", self._dividendYield)
+        s += labelToString("VOL FUNCTION", self._volatilityFunctionType)
+        s += labelToString("NUM EXPIRIES", len(self._expiryDates))
+        s += labelToString("FIRST EXPIRY", self._expiryDates[0])
+        s += labelToString("LAST EXPIRY", self._expiryDates[-1])
+        s += labelToString("MIN STRIKE", self._strikes[0])
+        s += labelToString("MAX STRIKE", self._strikes[-1], "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        ''' Simple print function for backward compatibility. '''
+        print(self)
+
+###############################################################################
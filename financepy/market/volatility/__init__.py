@@ -1,4 +1,5 @@
 from .FinEquityVolCurve import *
+from .FinEquityVolSurface import *
 from .FinFXVolSurface import *
 from .FinLiborCapVolCurve import *
 
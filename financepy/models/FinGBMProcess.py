@@ -3,13 +3,17 @@
 ##############################################################################
 
 import numpy as np
-from numba import jit, njit, float64, int64
+from numba import jit, njit, prange, float64, int64
 from ..finutils.FinMath import cholesky
+from ..finutils.FinRandom import counterUniforms, counterNormals
+from ..finutils.FinRandom import getCounterNormals
+from ..finutils.FinSobol import getGaussianSobolScrambled
+from ..finutils.FinSobol import getSobolGaussianPaths, FinSobolPathTypes
 
 ###############################################################################
 
 @njit(float64[:, :](int64, int64, float64, float64, float64, float64, int64),
-      cache=True, fastmath=True)
+      cache=True, fastmath=True, parallel=True)
 def getPaths(numPaths,
              numTimeSteps,
              t,
@@ -19,20 +23,25 @@ def getPaths(numPaths,
              seed):
     ''' Get the simulated GBM process for a single asset with many paths and
     time steps. Inputs include the number of time steps, paths, the drift mu,
-    stock price, volatility and a seed. '''
+    stock price, volatility and a seed. The normals for each path come from
+    a counter-based generator so the paths are simulated in parallel and do
+    not depend on the number of threads. Antithetic paths are appended. '''
 
-    np.random.seed(seed)
     dt = t / numTimeSteps
     vsqrtdt = volatility * np.sqrt(dt)
     m = np.exp((mu - volatility * volatility / 2.0) * dt)
     Sall = np.empty((2 * numPaths, numTimeSteps + 1))
 
-    # This should be less memory intensive as we only generate randoms per step
-    Sall[:, 0] = stockPrice
-    for it in range(1, numTimeSteps + 1):
-        g1D = np.random.standard_normal((numPaths))
-        for ip in range(0, numPaths):
-            w = np.exp(g1D[ip] * vsqrtdt)
+    for ip in prange(0, numPaths):
+
+        g = np.empty(numTimeSteps)
+        counterNormals(seed, ip, 0, g)
+
+        Sall[ip, 0] = stockPrice
+        Sall[ip + numPaths, 0] = stockPrice
+
+        for it in range(1, numTimeSteps + 1):
+            w = np.exp(g[it - 1] * vsqrtdt)
             Sall[ip, it] = Sall[ip, it - 1] * m * w
             Sall[ip + numPaths, it] = Sall[ip + numPaths, it - 1] * m / w
 
@@ -41,30 +50,160 @@ def getPaths(numPaths,
 ###############################################################################
 
 
+@njit(float64[:](float64[:, :], float64, int64, float64, float64),
+      cache=True, fastmath=True, parallel=True)
+def barrierSurvivalProbabilities(paths, barrier, isDown, volatility, dt):
+    ''' Return for each GBM path the probability that it does not touch the
+    barrier at any time given the simulated prices. It is zero if any price
+    is on or beyond the barrier. Between two prices on the same side the log
+    price is a Brownian bridge which touches the barrier with probability
+    exp(-2 a b / (sigma^2 dt)) where a and b are the log distances of the
+    two prices from the barrier. A zero volatility turns off the bridge so
+    the barrier is only observed at the simulated times. '''
+
+    numPaths, numTimes = paths.shape
+    survival = np.zeros(numPaths)
+    logH = np.log(barrier)
+    v2dt = volatility * volatility * dt
+
+    if isDown == 1:
+        sign = 1.0
+    else:
+        sign = -1.0
+
+    for ip in prange(0, numPaths):
+
+        prob = 1.0
+        a = sign * (np.log(paths[ip, 0]) - logH)
+
+        if a <= 0.0:
+            prob = 0.0
+
+        for it in range(1, numTimes):
+
+            if prob == 0.0:
+                break
+
+            b = sign * (np.log(paths[ip, it]) - logH)
+
+            if b <= 0.0:
+                prob = 0.0
+            elif v2dt > 0.0:
+                prob *= 1.0 - np.exp(-2.0 * a * b / v2dt)
+
+            a = b
+
+        survival[ip] = prob
+
+    return survival
+
+###############################################################################
+
+
+@njit(float64[:](float64[:, :], float64, int64, float64, float64, float64,
+                 int64), cache=True, fastmath=True, parallel=True)
+def barrierHitDiscountFactors(paths, barrier, isDown, volatility, dt, r,
+                              seed):
+    ''' Return for each GBM path the expected discount factor exp(-r tau) at
+    the first time tau that the path touches the barrier, and zero if it is
+    never touched. Each time step adds the probability that the path
+    survives to the start of the step and then touches the barrier inside
+    it, using the Brownian bridge, times the discount factor at a hit time
+    drawn from its exact distribution. Given a touch in a step of length dt
+    that starts and ends at log distances a and b from the barrier, the hit
+    time is dt y / (1 + y) where y is inverse Gaussian with mean a / |b| and
+    shape a^2 / (sigma^2 dt). This is sampled by the method of Michael,
+    Schucany and Haas with counter-based random numbers. '''
+
+    numPaths, numTimes = paths.shape
+    values = np.zeros(numPaths)
+    logH = np.log(barrier)
+    v2dt = volatility * volatility * dt
+
+    if isDown == 1:
+        sign = 1.0
+    else:
+        sign = -1.0
+
+    for ip in prange(0, numPaths):
+
+        u = np.empty(3)
+        survival = 1.0
+        pv = 0.0
+        a = sign * (np.log(paths[ip, 0]) - logH)
+
+        if a <= 0.0:
+            survival = 0.0
+            pv = 1.0
+
+        for it in range(1, numTimes):
+
+            if survival <= 0.0:
+                break
+
+            b = sign * (np.log(paths[ip, it]) - logH)
+
+            if b <= 0.0:
+                probHit = 1.0
+            elif v2dt > 0.0:
+                probHit = np.exp(-2.0 * a * b / v2dt)
+            else:
+                probHit = 0.0
+
+            if probHit > 1e-12:
+
+                if v2dt > 0.0 and abs(b) > 1e-12:
+                    counterUniforms(seed, ip, it, u)
+                    g = np.sqrt(-2.0 * np.log(u[0])) * \
+                        np.cos(2.0 * np.pi * u[1])
+                    mu = a / abs(b)
+                    lam = a * a / v2dt
+                    y = g * g
+                    x = mu + mu * mu * y / 2.0 / lam \
+                        - mu / 2.0 / lam * np.sqrt(4.0 * mu * lam * y
+                                                   + mu * mu * y * y)
+                    if u[2] > mu / (mu + x):
+                        x = mu * mu / x
+                    tau = dt * x / (1.0 + x)
+                else:
+                    tau = dt
+
+                hitTime = (it - 1) * dt + tau
+                pv += survival * probHit * np.exp(-r * hitTime)
+                survival *= 1.0 - probHit
+
+            a = b
+
+        values[ip] = pv
+
+    return values
+
+###############################################################################
+
+
 @njit(float64[:, :, :](int64, int64, int64, float64, float64[:], float64[:],
-                       float64[:], float64[:, :], int64),
+                       float64[:], float64[:, :], float64[:, :, :]),
       cache=True, fastmath=True)
-def getPathsAssets(numAssets,
-                   numPaths,
-                   numTimeSteps,
-                   t,
-                   mus,
-                   stockPrices,
-                   volatilities,
-                   corrMatrix,
-                   seed):
+def getPathsAssetsFromNormals(numAssets,
+                              numPaths,
+                              numTimeSteps,
+                              t,
+                              mus,
+                              stockPrices,
+                              volatilities,
+                              corrMatrix,
+                              g):
     ''' Get the simulated GBM process for a number of assets and paths and num
-    time steps. Inputs include the number of assets, paths, the vector of mus,
-    stock prices, volatilities, a correlation matrix and a seed. '''
+    time steps given the independent standard normals g by path, time step
+    and asset. The normals for time step zero are not used. Antithetic paths
+    are appended. '''
 
-    np.random.seed(seed)
     dt = t / numTimeSteps
     vsqrtdts = volatilities * np.sqrt(dt)
     m = np.exp((mus - volatilities * volatilities / 2.0) * dt)
 
     Sall = np.empty((2 * numPaths, numTimeSteps + 1, numAssets))
 
-    g = np.random.standard_normal((numPaths, numTimeSteps + 1, numAssets))
     c = cholesky(corrMatrix)
     gCorr = np.empty((numPaths, numTimeSteps + 1, numAssets))
 
@@ -96,6 +235,33 @@ def getPathsAssets(numAssets,
 ###############################################################################
 
 
+@njit(float64[:, :, :](int64, int64, int64, float64, float64[:], float64[:],
+                       float64[:], float64[:, :], int64),
+      cache=True, fastmath=True)
+def getPathsAssets(numAssets,
+                   numPaths,
+                   numTimeSteps,
+                   t,
+                   mus,
+                   stockPrices,
+                   volatilities,
+                   corrMatrix,
+                   seed):
+    ''' Get the simulated GBM process for a number of assets and paths and num
+    time steps. Inputs include the number of assets, paths, the vector of mus,
+    stock prices, volatilities, a correlation matrix and a seed. '''
+
+    numDraws = (numTimeSteps + 1) * numAssets
+    g = np.ascontiguousarray(getCounterNormals(seed, numPaths, numDraws))
+    g = g.reshape((numPaths, numTimeSteps + 1, numAssets))
+
+    return getPathsAssetsFromNormals(numAssets, numPaths, numTimeSteps, t,
+                                     mus, stockPrices, volatilities,
+                                     corrMatrix, g)
+
+###############################################################################
+
+
 #@njit(float64[:, :](int64, int64, float64, float64[:], float64[:], float64[:],
 #                   float64[:, :], int64),
 #                   cache=True, fastmath=True)
@@ -113,11 +279,30 @@ def getAssets(numAssets,
     time step. Inputs include the number of assets, paths, the vector of mus,
     stock prices, volatilities, a correlation matrix and a seed. '''
 
-    np.random.seed(seed)
+    g = getCounterNormals(seed, numPaths, numAssets)
+
+    return getAssetsFromNormals(numAssets, numPaths, t, mus, stockPrices,
+                                volatilities, corrMatrix, g)
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def getAssetsFromNormals(numAssets,
+                         numPaths,
+                         t,
+                         mus,
+                         stockPrices,
+                         volatilities,
+                         corrMatrix,
+                         g):
+    ''' Get the simulated GBM process for a number of assets and paths for one
+    time step given the independent standard normals g by path and asset.
+    Antithetic paths are appended. '''
+
     vsqrtdts = volatilities * np.sqrt(t)
     m = np.exp((mus - volatilities * volatilities / 2.0) * t)
     Sall = np.empty((2 * numPaths, numAssets))
-    g = np.random.standard_normal((numPaths, numAssets))
     c = cholesky(corrMatrix)
     gCorr = np.empty((numPaths, numAssets))
 
@@ -170,19 +355,43 @@ class FinGBMProcess():
                        stockPrices,
                        volatilities,
                        corrMatrix,
-                       seed):
+                       seed,
+                       useSobol=False):
         ''' Get a matrix of simulated GBM asset values by asset, path and time
         step. Inputs are the number of assets, paths and time steps, the time-
-        horizon and the initial asset values, volatilities and betas. '''
+        horizon and the initial asset values, volatilities and betas. If
+        useSobol is True the normals are scrambled Sobol numbers, using one
+        dimension per asset and a Brownian bridge over the time steps, and
+        the seed sets the scrambling. '''
 
         if numTimeSteps == 2:
-            paths = getAssets(numAssets, numPaths,
-                              t, mus, stockPrices,
-                              volatilities, corrMatrix, seed)
+
+            if useSobol:
+                g = getGaussianSobolScrambled(numPaths, numAssets, seed)
+                paths = getAssetsFromNormals(numAssets, numPaths,
+                                             t, mus, stockPrices,
+                                             volatilities, corrMatrix, g)
+            else:
+                paths = getAssets(numAssets, numPaths,
+                                  t, mus, stockPrices,
+                                  volatilities, corrMatrix, seed)
         else:
-            paths = getPathsAssets(numAssets, numPaths, numTimeSteps,
-                                   t, mus, stockPrices,
-                                   volatilities, corrMatrix, seed)
+
+            if useSobol:
+                dt = t / numTimeSteps
+                stepTimes = dt * np.arange(1, numTimeSteps + 1)
+                pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+                g = np.zeros((numPaths, numTimeSteps + 1, numAssets))
+                g[:, 1:, :] = getSobolGaussianPaths(numPaths, stepTimes,
+                                                    numAssets, pathType, seed)
+                paths = getPathsAssetsFromNormals(numAssets, numPaths,
+                                                  numTimeSteps, t, mus,
+                                                  stockPrices, volatilities,
+                                                  corrMatrix, g)
+            else:
+                paths = getPathsAssets(numAssets, numPaths, numTimeSteps,
+                                       t, mus, stockPrices,
+                                       volatilities, corrMatrix, seed)
         return paths
 
 ###############################################################################
@@ -0,0 +1,171 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' Monte-Carlo Greeks under correlated GBM computed in the same pass as the
+price. There are two families of estimator. The pathwise estimator
+differentiates the payoff along each path and needs the gradient of the
+payoff with respect to the simulated asset prices. It has low variance but
+requires a payoff that is continuous in the asset prices. The likelihood
+ratio estimator multiplies the payoff by the derivative of the log of the
+path density and works for any payoff, including digitals and barriers, at
+the cost of a higher variance. Gamma is computed by differentiating the
+pathwise delta using the likelihood ratio (the mixed estimator) or by the
+second order likelihood ratio weight. All sensitivities are returned per
+asset and vega is per unit of volatility. '''
+
+import numpy as np
+from enum import Enum
+
+from ..finutils.FinError import FinError
+from .FinPathEngine import FinPathEngine, FinPathModelTypes
+
+###############################################################################
+
+
+class FinMCGreekMethods(Enum):
+    PATHWISE = 1
+    LIKELIHOOD_RATIO = 2
+
+###############################################################################
+
+
+def gbmGreekEstimators(method,
+                       gridTimes,
+                       paths,
+                       mus,
+                       volatilities,
+                       corrInverse,
+                       payoff,
+                       payoffGradient=None):
+    ''' Return the per-path estimators of the value and of the delta, gamma
+    and vega of each asset as an array with columns [value, deltas, gammas,
+    vegas]. The paths have shape numPaths x numTimes x numAssets and start at
+    time zero. The payoff is the discounted payoff per path and the payoff
+    gradient is its derivative with respect to each simulated price, with
+    the same shape as the paths. The normals driving the paths are recovered
+    from the log returns so any GBM path generator can be used. '''
+
+    numAssets = paths.shape[2]
+    s0 = paths[0, 0, :]
+    sigmas = volatilities
+    t = gridTimes
+    dt = np.diff(gridTimes)
+    sdt = np.sqrt(dt)
+
+    # Correlated unit normals of each step and their whitened counterparts
+    logReturns = np.diff(np.log(paths), axis=1)
+    drifts = np.outer(dt, mus - 0.5 * sigmas * sigmas)
+    W = (logReturns - drifts) / np.outer(sdt, sigmas)
+    xi = W @ corrInverse
+
+    # Only the first step of the path density depends on the initial price
+    h1 = s0 * sigmas * sdt[0]
+    score1 = xi[:, 0, :] / h1
+
+    if method == FinMCGreekMethods.PATHWISE:
+
+        if payoffGradient is None:
+            raise FinError("Pathwise Greeks need the payoff gradient.")
+
+        g = np.sum(payoffGradient * paths, axis=1) / s0
+
+        logS = np.log(paths / s0)
+        drifts = np.outer(t, mus + 0.5 * sigmas * sigmas)
+        dSdSigma = paths * (logS - drifts) / sigmas
+        vega = np.sum(payoffGradient * dSdSigma, axis=1)
+
+        delta = g
+        gamma = g * score1 - g / s0
+
+    elif method == FinMCGreekMethods.LIKELIHOOD_RATIO:
+
+        f = payoff[:, np.newaxis]
+        xi1 = xi[:, 0, :]
+        cInvDiag = np.diag(corrInverse)
+
+        delta = f * score1
+        gamma = f * ((xi1 * xi1 - cInvDiag) / h1 / h1 - xi1 / (s0 * h1))
+
+        sigmaScore = xi * (W / sigmas - sdt[np.newaxis, :, np.newaxis])
+        sigmaScore = np.sum(sigmaScore, axis=1) - len(dt) / sigmas
+        vega = f * sigmaScore
+
+    else:
+        raise FinError("Unknown Monte Carlo Greek method.")
+
+    estimators = np.empty((paths.shape[0], 1 + 3 * numAssets))
+    estimators[:, 0] = payoff
+    estimators[:, 1:1+numAssets] = delta
+    estimators[:, 1+numAssets:1+2*numAssets] = gamma
+    estimators[:, 1+2*numAssets:] = vega
+    return estimators
+
+###############################################################################
+
+
+def valueGreeksGBM(gridTimes,
+                   stockPrices,
+                   mus,
+                   volatilities,
+                   corrMatrix,
+                   payoffFunction,
+                   method=FinMCGreekMethods.PATHWISE,
+                   numPaths=10000,
+                   seed=4242,
+                   numPathsPerBlock=10000):
+    ''' Value a payoff on correlated GBM paths and compute the delta, gamma
+    and vega of each asset in a single simulation. The payoff function is
+    called with the block of paths, of shape numPaths x (numTimes + 1) x
+    numAssets, and must return a tuple of the discounted payoff per path
+    and its gradient with respect to the paths. The gradient can be None if
+    only the likelihood ratio method is used. Returns a dictionary of the
+    value, delta, gamma and vega, and of their standard errors. '''
+
+    stockPrices = np.atleast_1d(np.array(stockPrices, dtype=np.float64))
+    numAssets = len(stockPrices)
+    mus = np.array(mus, dtype=np.float64) * np.ones(numAssets)
+    volatilities = np.array(volatilities, dtype=np.float64) * \
+        np.ones(numAssets)
+
+    if corrMatrix is None:
+        corrMatrix = np.eye(numAssets)
+
+    corrMatrix = np.array(corrMatrix, dtype=np.float64)
+
+    if np.any(volatilities <= 0.0):
+        raise FinError("Volatilities must be positive for MC Greeks.")
+
+    modelParams = np.column_stack((stockPrices, mus, volatilities))
+
+    engine = FinPathEngine(gridTimes,
+                           FinPathModelTypes.GBM,
+                           modelParams,
+                           corrMatrix)
+
+    corrInverse = np.linalg.inv(corrMatrix)
+
+    def estimators(times, paths):
+        payoff, payoffGradient = payoffFunction(paths)
+        return gbmGreekEstimators(method, times, paths, mus, volatilities,
+                                  corrInverse, payoff, payoffGradient)
+
+    results = engine.valueMC([estimators], numPaths, seed, numPathsPerBlock)
+
+    value = results['value'][0]
+    stdErr = results['stderr'][0]
+    n = numAssets
+
+    greeks = {'value': value[0],
+              'delta': value[1:1+n],
+              'gamma': value[1+n:1+2*n],
+              'vega': value[1+2*n:]}
+
+    greeks['stderr'] = {'value': stdErr[0],
+                        'delta': stdErr[1:1+n],
+                        'gamma': stdErr[1+n:1+2*n],
+                        'vega': stdErr[1+2*n:]}
+
+    return greeks
+
+###############################################################################
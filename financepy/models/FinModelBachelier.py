@@ -5,11 +5,19 @@
 # TODO Fix this
 
 import numpy as np
+from math import erfc, exp, log, sqrt
+from numba import njit, prange, float64
 from scipy.stats import norm
 
 from ..finutils.FinHelperFunctions import labelToString
 from ..finutils.FinOptionTypes import FinOptionTypes
 
+###############################################################################
+
+INV_ROOT_2 = 0.7071067811865476
+INV_ROOT_2_PI = 0.3989422804014327
+ROOT_2_PI = 2.5066282746310002
+
 ###############################################################################
 # NOTE: Need to convert option types to use enums.
 # NOTE: Perhaps just turn this into a function rather than a class.
@@ -58,3 +66,94 @@ class FinModelBachelier():
         return s
 
 ###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def bachelierImpliedVolatility(price, f, k, t, df, phi):
+    ''' Return the normal (Bachelier) volatility implied by the price of a
+    European option with forward f, strike k, time to expiry t and discount
+    factor df where phi is 1 for a call and -1 for a put. This uses the
+    rational approximation of Jaeckel's "Implied Normal Volatility" (2017)
+    for the time value followed by a Newton step to polish the result. NaN
+    is returned if the price is below intrinsic value. '''
+
+    if t <= 0.0 or df <= 0.0:
+        return np.nan
+
+    p = price / df
+    x = f - k
+    ax = abs(x)
+    intrinsic = max(phi * x, 0.0)
+    timeValue = p - intrinsic
+    sqrtT = sqrt(t)
+
+    if timeValue < 0.0:
+        # A price within rounding of intrinsic has no time value
+        if timeValue > -1e-12 * max(intrinsic, 1.0):
+            return 0.0
+        return np.nan
+
+    if timeValue == 0.0:
+        return 0.0
+
+    if ax < 1e-14 * max(abs(f), abs(k), 1.0):
+        return p * ROOT_2_PI / sqrtT
+
+    # Time value as a function of the normalised moneyness
+    phiTilde = -timeValue / ax
+
+    if phiTilde < -0.001882039271:
+        g = 1.0 / (phiTilde - 0.5)
+        g2 = g * g
+        num = 0.032114372355 - g2 * (0.016969777977 - g2 *
+                                     (0.002620733246 - 0.000096066952861 * g2))
+        den = 1.0 - g2 * (0.6635646938 - g2 *
+                          (0.14528712196 - 0.010472855461 * g2))
+        xiBar = num / den
+        xi = g * (INV_ROOT_2_PI + xiBar * g2)
+    else:
+        h = sqrt(-log(-phiTilde))
+        num = 9.4883409779 - h * (9.6320903635 - h *
+                                  (0.58556997323 + 2.1464093351 * h))
+        den = 1.0 - h * (0.65174820867 + h *
+                         (1.5120247828 + 0.000066437847132 * h))
+        xi = num / den
+
+    sigma = ax / (abs(xi) * sqrtT)
+
+    # Newton steps on the out-of-the-money price to remove any residual error
+    for _ in range(0, 2):
+        sd = sigma * sqrtT
+        d = ax / sd
+        nd = INV_ROOT_2_PI * exp(-0.5 * d * d)
+        otm = sd * nd - ax * 0.5 * erfc(d * INV_ROOT_2)
+        vega = sqrtT * nd
+        if vega <= 0.0:
+            break
+        sigma = sigma + (timeValue - otm) / vega
+
+    return sigma
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:]), fastmath=True, cache=True, parallel=True)
+def bachelierImpliedVolatilityVectorised(prices, forwards, strikes, times,
+                                         dfs, phis):
+    ''' Return the Bachelier implied volatilities of arrays of option prices.
+    All of the inputs are arrays of the same length. The options are inverted
+    in parallel with no Python overhead per option. '''
+
+    n = len(prices)
+    vols = np.empty(n)
+
+    for i in prange(0, n):
+        vols[i] = bachelierImpliedVolatility(prices[i], forwards[i],
+                                             strikes[i], times[i], dfs[i],
+                                             phis[i])
+
+    return vols
+
+###############################################################################
@@ -5,8 +5,10 @@
 # TODO Fix this
 
 import numpy as np
+from math import erfc, exp, log, sqrt
+from numba import njit, prange, float64
 
-from ..finutils.FinMath import N
+from ..finutils.FinMath import N, norminvcdf
 from ..finutils.FinGlobalVariables import gSmall
 from ..finutils.FinHelperFunctions import labelToString
 from ..finutils.FinOptionTypes import FinOptionTypes
@@ -16,6 +18,11 @@ from ..finutils.FinError import FinError
 # TODO: Use Numba ?
 ###############################################################################
 
+INV_ROOT_2 = 0.7071067811865476
+INV_ROOT_2_PI = 0.3989422804014327
+
+###############################################################################
+
 
 class FinModelBlack():
     ''' Black's Model which prices call and put options in the forward
@@ -84,3 +91,277 @@ class FinModelBlack():
         return s
 
 ###############################################################################
+
+
+@njit(float64(float64), fastmath=True, cache=True)
+def _ncdf(x):
+    ''' Normal CDF using the complementary error function so that it keeps
+    full relative accuracy far into the lower tail. '''
+    return 0.5 * erfc(-x * INV_ROOT_2)
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64), fastmath=True, cache=True)
+def _normalisedBlack(x, s, theta):
+    ''' Black price divided by sqrt(FK) as a function of the log-moneyness
+    x = ln(F/K) and the total volatility s = vol * sqrt(T). Theta is 1 for a
+    call and -1 for a put. '''
+
+    if s <= 0.0:
+        return max(theta * (exp(x / 2.0) - exp(-x / 2.0)), 0.0)
+
+    h = x / s
+    t = s / 2.0
+    return theta * (exp(x / 2.0) * _ncdf(theta * (h + t)) -
+                    exp(-x / 2.0) * _ncdf(theta * (h - t)))
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64), fastmath=True, cache=True)
+def _impliedTotalVolOTM(beta, x, theta):
+    ''' Return the total volatility s which reprices the normalised price
+    beta of an out-of-the-money option, i.e. theta * x <= 0. The initial
+    guess uses the lower and upper asymptotic forms of Jaeckel's "By
+    Implication" either side of the point of inflexion in s. It is refined
+    by Halley iterations, on the log of the price below the inflexion point
+    and on the price above it, which are kept inside a bisection bracket.
+    This normally converges to machine precision in a few iterations. '''
+
+    bMax = exp(theta * x / 2.0)
+
+    if beta <= 0.0:
+        return 0.0
+
+    if beta >= bMax:
+        return np.nan
+
+    ax = abs(x)
+    sc = sqrt(2.0 * ax)
+    bc = _normalisedBlack(x, sc, theta)
+    lowerBranch = beta < bc
+
+    if lowerBranch:
+        s = sqrt(2.0 * x * x / (ax - 4.0 * log(beta / bc)))
+    else:
+        p = (bMax - beta) / (bMax - bc) * _ncdf(-sc / 2.0)
+        s = -2.0 * norminvcdf(p)
+
+    lnBeta = log(beta)
+
+    # The price is increasing in s so the inflexion point and each of the
+    # evaluations tighten a bracket around the root
+    if lowerBranch:
+        sLo = 0.0
+        sHi = sc
+        haveUpper = True
+    else:
+        sLo = sc
+        sHi = 0.0
+        haveUpper = False
+
+    for _ in range(0, 50):
+
+        b = _normalisedBlack(x, s, theta)
+
+        if b < beta:
+            sLo = s
+        else:
+            sHi = s
+            haveUpper = True
+
+        vega = INV_ROOT_2_PI * exp(-0.5 * (x * x / s / s + s * s / 4.0))
+
+        if vega > 0.0 and b > 0.0:
+
+            curvature = x * x / s / s / s - s / 4.0
+
+            if lowerBranch:
+                g = log(b) - lnBeta
+                g1 = vega / b
+                g2 = g1 * curvature - g1 * g1
+            else:
+                g = b - beta
+                g1 = vega
+                g2 = vega * curvature
+
+            nu = -g / g1
+            halley = 1.0 + 0.5 * nu * g2 / g1
+
+            # Only use the Halley correction when it is a small one
+            if halley > 0.5 and halley < 2.0:
+                sNew = s + nu / halley
+            else:
+                sNew = s + nu
+
+        else:
+            sNew = -1.0
+
+        # Fall back to bisection if the step leaves the bracket
+        if sNew <= sLo or (haveUpper and sNew >= sHi):
+            if haveUpper:
+                sNew = 0.5 * (sLo + sHi)
+            else:
+                sNew = 2.0 * s
+
+        ds = sNew - s
+        s = sNew
+
+        if abs(ds) <= 1e-15 * s:
+            break
+
+    return s
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def blackImpliedVolatility(price, f, k, t, df, phi):
+    ''' Return the Black volatility implied by the price of a European option
+    with forward f, strike k, time to expiry t and discount factor df where
+    phi is 1 for a call and -1 for a put. In-the-money options are first
+    converted to the out-of-the-money option with the same time value. NaN
+    is returned if the price is outside the no-arbitrage bounds and zero if
+    the price has no time value. '''
+
+    if f <= 0.0 or k <= 0.0 or t <= 0.0 or df <= 0.0:
+        return np.nan
+
+    x = log(f / k)
+    sqrtFK = sqrt(f * k)
+    beta = price / df / sqrtFK
+    theta = phi
+
+    if theta * x > 0.0:
+        intrinsic = theta * (exp(x / 2.0) - exp(-x / 2.0))
+        beta = beta - intrinsic
+        theta = -theta
+
+        # A price within rounding of intrinsic has no time value
+        if beta < 0.0 and beta > -1e-12 * intrinsic:
+            beta = 0.0
+
+    if beta < 0.0:
+        return np.nan
+
+    s = _impliedTotalVolOTM(beta, x, theta)
+    return s / sqrt(t)
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:]), fastmath=True, cache=True, parallel=True)
+def blackImpliedVolatilityVectorised(prices, forwards, strikes, times, dfs,
+                                     phis):
+    ''' Return the Black implied volatilities of arrays of option prices. All
+    of the inputs are arrays of the same length. The options are inverted in
+    parallel with no Python overhead per option. '''
+
+    n = len(prices)
+    vols = np.empty(n)
+
+    for i in prange(0, n):
+        vols[i] = blackImpliedVolatility(prices[i], forwards[i], strikes[i],
+                                         times[i], dfs[i], phis[i])
+
+    return vols
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:, :], float64[:, :]),
+      fastmath=True, cache=True, parallel=True)
+def blackVarianceSwapStrikesVectorised(times, logMoneyness, vols):
+    ''' Return the fair variance strike of a variance swap for each row of a
+    grid of log strikes relative to the forward by integrating the payoff of
+    the log contract over out-of-the-money options as in Carr and Madan. The
+    fair variance is (2/T) times the integral of the undiscounted option
+    price over K^2 which becomes, with x = log(K/F), the integral of the
+    price divided by the forward times exp(-x). Each row must be uniform with
+    an odd number of points and is integrated by Simpson's rule. '''
+
+    numTimes = logMoneyness.shape[0]
+    numStrikes = logMoneyness.shape[1]
+    fairVars = np.empty(numTimes)
+
+    for i in prange(0, numTimes):
+
+        t = max(times[i], gSmall)
+        sqrtT = sqrt(t)
+        dx = (logMoneyness[i, -1] - logMoneyness[i, 0]) / (numStrikes - 1)
+        total = 0.0
+
+        for j in range(0, numStrikes):
+
+            x = logMoneyness[i, j]
+            sd = max(vols[i, j], gSmall) * sqrtT
+            d1 = (-x + sd * sd / 2.0) / sd
+            d2 = d1 - sd
+
+            # The out-of-the-money option price divided by the forward
+            if x < 0.0:
+                p = exp(x) * 0.5 * erfc(d2 * INV_ROOT_2) - \
+                    0.5 * erfc(d1 * INV_ROOT_2)
+            else:
+                p = 0.5 * erfc(-d1 * INV_ROOT_2) - \
+                    exp(x) * 0.5 * erfc(-d2 * INV_ROOT_2)
+
+            if j == 0 or j == numStrikes - 1:
+                w = 1.0
+            elif j % 2 == 1:
+                w = 4.0
+            else:
+                w = 2.0
+
+            total += w * p * exp(-x)
+
+        fairVars[i] = 2.0 * total * dx / 3.0 / t
+
+    return fairVars
+
+###############################################################################
+
+
+def blackVarianceSwapStrikes(forwards,
+                             times,
+                             volatilityFunction,
+                             numStrikes=201,
+                             numStdDevs=8.0):
+    ''' Return the fair variance strikes of variance swaps with the forwards
+    and times to expiry given in arrays. The volatility function is called
+    once with a matrix of strikes that has one row per expiry and a column of
+    times and returns the matrix of volatilities. The strikes of each row are
+    uniform in log strike and cover a number of ATM standard deviations on
+    each side of the forward. '''
+
+    forwards = np.atleast_1d(np.array(forwards, dtype=np.float64))
+    times = np.atleast_1d(np.array(times, dtype=np.float64))
+
+    if len(forwards) != len(times):
+        raise FinError("Forwards and times must have the same length.")
+
+    if np.any(times <= 0.0) or np.any(forwards <= 0.0):
+        raise FinError("Forwards and times to expiry must be positive.")
+
+    if numStrikes < 3 or numStrikes % 2 == 0:
+        raise FinError("Number of strikes must be odd and at least three.")
+
+    atmVols = np.array(volatilityFunction(forwards[:, np.newaxis],
+                                          times[:, np.newaxis]),
+                       dtype=np.float64).reshape(len(times), -1)[:, 0]
+
+    widths = numStdDevs * np.maximum(atmVols, gSmall) * np.sqrt(times)
+    u = np.linspace(-1.0, 1.0, numStrikes)
+    logMoneyness = widths[:, np.newaxis] * u[np.newaxis, :]
+    strikes = forwards[:, np.newaxis] * np.exp(logMoneyness)
+
+    vols = volatilityFunction(strikes, times[:, np.newaxis])
+    vols = np.array(np.broadcast_to(np.array(vols, dtype=np.float64),
+                                    strikes.shape))
+
+    return blackVarianceSwapStrikesVectorised(times, logMoneyness, vols)
+
+###############################################################################
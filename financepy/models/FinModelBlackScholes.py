@@ -5,11 +5,27 @@
 # TODO Fix this
 
 import numpy as np
+from math import erfc, exp, log, sqrt
+from numba import njit, prange, float64
 
 from scipy.stats import norm
 from ..finutils.FinGlobalVariables import gSmall
 N = norm.cdf
 
+INV_ROOT_2 = 0.7071067811865476
+INV_ROOT_2_PI = 0.3989422804014327
+
+# Columns of the matrix returned by bsValueGreeksVectorised
+BS_VALUE = 0
+BS_DELTA = 1
+BS_GAMMA = 2
+BS_VEGA = 3
+BS_THETA = 4
+BS_RHO = 5
+BS_VANNA = 6
+BS_VOLGA = 7
+BS_NUM_OUTPUTS = 8
+
 ###############################################################################
 # This is intended to be a fast calculator and validation is left to calling
 # functions.
@@ -32,3 +48,59 @@ def bsValue(s, t, k, r, q, v, phi):
     return v
 
 ###############################################################################
+
+
+@njit(float64[:, :](float64[:], float64[:], float64[:], float64[:],
+                    float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True, parallel=True)
+def bsValueGreeksVectorised(s, t, k, r, q, v, phi):
+    ''' Price a portfolio of European options using Black-Scholes and return
+    a matrix with one row per option and columns for the value, delta, gamma,
+    vega, theta, rho, vanna and volga. All inputs are arrays of the same
+    length and phi is 1 for a call and -1 for a put. The terms d1 and d2 and
+    the normal density and distribution are computed once per option and
+    shared by all of the outputs. Theta is the derivative with respect to
+    calendar time and all sensitivities are per unit change. '''
+
+    n = len(s)
+    out = np.empty((n, BS_NUM_OUTPUTS))
+
+    for i in prange(0, n):
+
+        ti = max(t[i], gSmall)
+        ki = max(k[i], gSmall)
+        vi = max(v[i], gSmall)
+        si = s[i]
+        ri = r[i]
+        qi = q[i]
+        p = phi[i]
+
+        sqrtT = sqrt(ti)
+        sd = vi * sqrtT
+        dq = exp(-qi * ti)
+        dr = exp(-ri * ti)
+        ss = si * dq
+        kk = ki * dr
+
+        d1 = log(ss / kk) / sd + sd / 2.0
+        d2 = d1 - sd
+
+        nd1 = INV_ROOT_2_PI * exp(-d1 * d1 / 2.0)
+        Nd1 = 0.5 * erfc(-p * d1 * INV_ROOT_2)
+        Nd2 = 0.5 * erfc(-p * d2 * INV_ROOT_2)
+
+        vega = ss * nd1 * sqrtT
+
+        out[i, BS_VALUE] = p * (ss * Nd1 - kk * Nd2)
+        out[i, BS_DELTA] = p * dq * Nd1
+        out[i, BS_GAMMA] = dq * nd1 / (si * sd)
+        out[i, BS_VEGA] = vega
+        out[i, BS_THETA] = - ss * nd1 * vi / 2.0 / sqrtT \
+            - p * ri * kk * Nd2 + p * qi * ss * Nd1
+        out[i, BS_RHO] = p * kk * ti * Nd2
+        out[i, BS_VANNA] = - dq * nd1 * d2 / vi
+        out[i, BS_VOLGA] = vega * d1 * d2 / vi
+
+    return out
+
+###############################################################################
@@ -0,0 +1,528 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' Analytical and semi-analytical approximations for the value of American
+calls and puts under Black-Scholes. These are much faster than a tree and are
+intended for pricing whole chains of listed options. Barone-Adesi-Whaley and
+Bjerksund-Stensland (2002) are closed form approximations. The QD+ fixed
+point method of Andersen, Lake and Offengenden (2016) starts from the QD+
+exercise boundary of Li (2010), refines it by fixed point iteration on the
+integral equation for the boundary and then integrates the early exercise
+premium. With the default settings it is accurate to about 1e-6 of the
+strike. '''
+
+import numpy as np
+from enum import Enum
+from math import erfc, exp, log, sqrt, cos, pi
+from numba import njit, prange, float64, int64
+
+from ..finutils.FinError import FinError
+from ..finutils.FinMath import M
+from .FinModelBlackScholes import INV_ROOT_2, INV_ROOT_2_PI
+
+###############################################################################
+
+
+class FinAmericanApproxMethods(Enum):
+    BARONE_ADESI_WHALEY = 1
+    BJERKSUND_STENSLAND = 2
+    QD_PLUS_FP = 3
+
+###############################################################################
+
+
+@njit(float64(float64), fastmath=True, cache=True)
+def _ncdf(x):
+    return 0.5 * erfc(-x * INV_ROOT_2)
+
+###############################################################################
+
+
+@njit(float64(float64), fastmath=True, cache=True)
+def _npdf(x):
+    return INV_ROOT_2_PI * exp(-0.5 * x * x)
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def _europeanValue(s, t, k, r, q, v, phi):
+    ''' Black-Scholes value of a European call (phi = 1) or put (phi = -1).
+    '''
+
+    sd = v * sqrt(t)
+    d1 = (log(s / k) + (r - q) * t) / sd + 0.5 * sd
+    d2 = d1 - sd
+    return phi * (s * exp(-q * t) * _ncdf(phi * d1) -
+                  k * exp(-r * t) * _ncdf(phi * d2))
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def bawValue(s, t, k, r, q, v, phi):
+    ''' Barone-Adesi and Whaley (1987) quadratic approximation for the value
+    of an American call (phi = 1) or put (phi = -1). The critical stock price
+    is found by Newton iteration. '''
+
+    european = _europeanValue(s, t, k, r, q, v, phi)
+
+    # Calls without dividends and puts without interest are held to expiry
+    if (phi > 0.0 and q <= 0.0) or (phi < 0.0 and r <= 0.0):
+        return european
+
+    v2 = v * v
+    sd = v * sqrt(t)
+    n = 2.0 * (r - q) / v2
+
+    if abs(r * t) < 1e-12:
+        mOverK = 2.0 / (v2 * t)
+    else:
+        mOverK = 2.0 * r / v2 / (1.0 - exp(-r * t))
+
+    qq = 0.5 * (-(n - 1.0) + phi * sqrt((n - 1.0)**2 + 4.0 * mOverK))
+    qInf = 0.5 * (-(n - 1.0) + phi * sqrt((n - 1.0)**2 + 4.0 * r * 2.0 / v2))
+    sInf = k / (1.0 - 1.0 / qInf)
+
+    # The initial guess for the critical price is that of the original paper
+    if phi > 0.0:
+        h = -((r - q) * t + 2.0 * sd) * k / (sInf - k)
+        sStar = k + (sInf - k) * (1.0 - exp(h))
+    else:
+        h = ((r - q) * t - 2.0 * sd) * k / (k - sInf)
+        sStar = sInf + (k - sInf) * exp(h)
+
+    dq = exp(-q * t)
+
+    for _ in range(0, 100):
+        d1 = (log(sStar / k) + (r - q + 0.5 * v2) * t) / sd
+        nd1 = _ncdf(phi * d1)
+        g = phi * (sStar - k) - _europeanValue(sStar, t, k, r, q, v, phi) \
+            - phi * (1.0 - dq * nd1) * sStar / qq
+        dg = phi * (1.0 - dq * nd1) * (1.0 - 1.0 / qq) + \
+            dq * _npdf(d1) / (sd * qq)
+        step = g / dg
+        sStar = max(sStar - step, 1e-10 * k)
+        if abs(step) < 1e-12 * sStar:
+            break
+
+    d1 = (log(sStar / k) + (r - q + 0.5 * v2) * t) / sd
+    a = phi * (sStar / qq) * (1.0 - dq * _ncdf(phi * d1))
+
+    if phi * (s - sStar) < 0.0:
+        return european + a * (s / sStar)**qq
+    else:
+        return phi * (s - k)
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64,
+              float64), fastmath=True, cache=True)
+def _bsPhi(s, t, gamma, h, i, r, b, v):
+    ''' The function phi of Bjerksund and Stensland. '''
+
+    v2 = v * v
+    sd = v * sqrt(t)
+    lam = (-r + gamma * b + 0.5 * gamma * (gamma - 1.0) * v2) * t
+    d = -(log(s / h) + (b + (gamma - 0.5) * v2) * t) / sd
+    kappa = 2.0 * b / v2 + (2.0 * gamma - 1.0)
+    return exp(lam) * s**gamma * (_ncdf(d) - (i / s)**kappa *
+                                  _ncdf(d - 2.0 * log(i / s) / sd))
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64,
+              float64, float64, float64), fastmath=True, cache=True)
+def _bsPsi(s, t2, gamma, h, i2, i1, t1, r, b, v):
+    ''' The function psi of Bjerksund and Stensland (2002). '''
+
+    v2 = v * v
+    sd1 = v * sqrt(t1)
+    sd2 = v * sqrt(t2)
+    m = b + (gamma - 0.5) * v2
+
+    e1 = (log(s / i1) + m * t1) / sd1
+    e2 = (log(i2 * i2 / (s * i1)) + m * t1) / sd1
+    e3 = (log(s / i1) - m * t1) / sd1
+    e4 = (log(i2 * i2 / (s * i1)) - m * t1) / sd1
+
+    f1 = (log(s / h) + m * t2) / sd2
+    f2 = (log(i2 * i2 / (s * h)) + m * t2) / sd2
+    f3 = (log(i1 * i1 / (s * h)) + m * t2) / sd2
+    f4 = (log(s * i1 * i1 / (h * i2 * i2)) + m * t2) / sd2
+
+    rho = sqrt(t1 / t2)
+    lam = -r + gamma * b + 0.5 * gamma * (gamma - 1.0) * v2
+    kappa = 2.0 * b / v2 + (2.0 * gamma - 1.0)
+
+    return exp(lam * t2) * s**gamma * \
+        (M(-e1, -f1, rho) - (i2 / s)**kappa * M(-e2, -f2, rho)
+         - (i1 / s)**kappa * M(-e3, -f3, -rho)
+         + (i1 / i2)**kappa * M(-e4, -f4, -rho))
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def _bs2002Call(s, t, k, r, b, v):
+    ''' Bjerksund and Stensland (2002) value of an American call with cost of
+    carry b. '''
+
+    if b >= r:
+        return _europeanValue(s, t, k, r, r - b, v, 1.0)
+
+    v2 = v * v
+    beta = (0.5 - b / v2) + sqrt((b / v2 - 0.5)**2 + 2.0 * r / v2)
+    bInf = beta / (beta - 1.0) * k
+    b0 = max(k, r / (r - b) * k)
+
+    t1 = 0.5 * (sqrt(5.0) - 1.0) * t
+    h1 = -(b * t1 + 2.0 * v * sqrt(t1)) * k * k / ((bInf - b0) * b0)
+    h2 = -(b * t + 2.0 * v * sqrt(t)) * k * k / ((bInf - b0) * b0)
+    i1 = b0 + (bInf - b0) * (1.0 - exp(h1))
+    i2 = b0 + (bInf - b0) * (1.0 - exp(h2))
+    alpha1 = (i1 - k) * i1**(-beta)
+    alpha2 = (i2 - k) * i2**(-beta)
+
+    if s >= i2:
+        return s - k
+
+    value = alpha2 * s**beta \
+        - alpha2 * _bsPhi(s, t1, beta, i2, i2, r, b, v) \
+        + _bsPhi(s, t1, 1.0, i2, i2, r, b, v) \
+        - _bsPhi(s, t1, 1.0, i1, i2, r, b, v) \
+        - k * _bsPhi(s, t1, 0.0, i2, i2, r, b, v) \
+        + k * _bsPhi(s, t1, 0.0, i1, i2, r, b, v) \
+        + alpha1 * _bsPhi(s, t1, beta, i1, i2, r, b, v) \
+        - alpha1 * _bsPsi(s, t, beta, i1, i2, i1, t1, r, b, v) \
+        + _bsPsi(s, t, 1.0, i1, i2, i1, t1, r, b, v) \
+        - _bsPsi(s, t, 1.0, k, i2, i1, t1, r, b, v) \
+        - k * _bsPsi(s, t, 0.0, i1, i2, i1, t1, r, b, v) \
+        + k * _bsPsi(s, t, 0.0, k, i2, i1, t1, r, b, v)
+
+    return value
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def bjerksundStenslandValue(s, t, k, r, q, v, phi):
+    ''' Bjerksund and Stensland (2002) two-step flat boundary approximation
+    for the value of an American call (phi = 1) or put (phi = -1). Puts are
+    valued as calls using the put-call transformation. '''
+
+    if phi > 0.0:
+        return _bs2002Call(s, t, k, r, r - q, v)
+    else:
+        return _bs2002Call(k, t, s, q, q - r, v)
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def _qdPlusFunction(b, tau, k, r, q, v):
+    ''' The function of the exercise boundary b whose root is the QD+
+    approximation of Li (2010) to the boundary of an American put. '''
+
+    v2 = v * v
+    sd = v * sqrt(tau)
+    h = 1.0 - exp(-r * tau)
+    alpha = 2.0 * r / v2
+    beta = 2.0 * (r - q) / v2
+    disc = sqrt((beta - 1.0)**2 + 4.0 * alpha / h)
+    lam = 0.5 * (-(beta - 1.0) - disc)
+    lamPrime = alpha / (h * h * disc)
+
+    dq = exp(-q * tau)
+    dr = exp(-r * tau)
+    d1 = (log(b / k) + (r - q) * tau) / sd + 0.5 * sd
+    d2 = d1 - sd
+    pE = k * dr * _ncdf(-d2) - b * dq * _ncdf(-d1)
+    theta = r * k * dr * _ncdf(-d2) - q * b * dq * _ncdf(-d1) \
+        - 0.5 * v * b * dq * _npdf(d1) / sqrt(tau)
+    excess = k - b - pE
+
+    if excess < 1e-14 * k:
+        excess = 1e-14 * k
+
+    c0 = -(1.0 - h) * alpha / (2.0 * lam + beta - 1.0) * \
+        (1.0 / h - theta / (r * excess) + lamPrime / (2.0 * lam + beta - 1.0))
+
+    return (1.0 - dq * _ncdf(-d1)) * b + (lam + c0) * excess
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def _qdPlusBoundary(tau, k, r, q, v, x):
+    ''' Find the QD+ put exercise boundary at time to expiry tau by
+    bracketing the root below the boundary at expiry x and refining it by
+    false position in the log of the boundary. If no root is found the
+    boundary at expiry is returned. '''
+
+    hi = x * (1.0 - 1e-10)
+    fHi = _qdPlusFunction(hi, tau, k, r, q, v)
+    lo = hi
+
+    found = False
+    for _ in range(0, 400):
+        lo = lo * 0.95
+        fLo = _qdPlusFunction(lo, tau, k, r, q, v)
+        if fLo * fHi <= 0.0:
+            found = True
+            break
+        hi = lo
+        fHi = fLo
+
+    if found is False:
+        return x
+
+    # Illinois false position in the log of the boundary
+    xLo = log(lo)
+    xHi = log(hi)
+    side = 0
+
+    for _ in range(0, 100):
+        xMid = (xLo * fHi - xHi * fLo) / (fHi - fLo)
+        fMid = _qdPlusFunction(exp(xMid), tau, k, r, q, v)
+
+        if fMid * fHi > 0.0:
+            xHi = xMid
+            fHi = fMid
+            if side == -1:
+                fLo *= 0.5
+            side = -1
+        else:
+            xLo = xMid
+            fLo = fMid
+            if side == 1:
+                fHi *= 0.5
+            side = 1
+
+        if abs(xHi - xLo) < 1e-12:
+            break
+
+    return exp(0.5 * (xLo + xHi))
+
+###############################################################################
+
+
+@njit(float64(float64, float64[:]), fastmath=True, cache=True)
+def _chebyshevInterp(z, a):
+    ''' Evaluate the Chebyshev series with coefficients a at z in [-1, 1]
+    using the Clenshaw recurrence. The first and last coefficients are
+    halved. '''
+
+    n = len(a) - 1
+    b1 = 0.0
+    b2 = 0.0
+    c = 0.5 * a[n]
+    for j in range(n, 0, -1):
+        b0 = c + 2.0 * z * b1 - b2
+        b2 = b1
+        b1 = b0
+        c = a[j - 1]
+    return 0.5 * a[0] + z * b1 - b2
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, int64,
+              int64, float64[:], float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True)
+def _qdFixedPointPut(s, t, k, r, q, v, numNodes, numIterations, yB, wB, yP,
+                     wP):
+    ''' Value an American put by the method of Andersen, Lake and
+    Offengenden (2016). The exercise boundary is represented on Chebyshev
+    nodes in the square root of the time to expiry through the function
+    H = log(B / X)^2. It starts from the QD+ boundary and is refined by the
+    FP-B fixed point iteration. The integrals use the Gauss-Legendre nodes
+    yB and weights wB and the final price uses yP and wP. '''
+
+    european = _europeanValue(s, t, k, r, q, v, -1.0)
+
+    # Without positive interest rates a put is not exercised early
+    if r <= 0.0:
+        return european
+
+    if q > r:
+        x = k * r / q
+    else:
+        x = k
+
+    v2 = v * v
+    n = numNodes
+    sqrtT = sqrt(t)
+
+    # Chebyshev nodes in sqrt(tau) with tau = 0 at the first node
+    taus = np.empty(n + 1)
+    bs = np.empty(n + 1)
+    hs = np.empty(n + 1)
+
+    for i in range(0, n + 1):
+        z = cos(i * pi / n)
+        taus[i] = (0.5 * sqrtT * (1.0 - z))**2
+
+    bs[0] = x
+    for i in range(1, n + 1):
+        bs[i] = min(_qdPlusBoundary(taus[i], k, r, q, v, x), x)
+
+    a = np.empty(n + 1)
+
+    for _ in range(0, numIterations):
+
+        # Chebyshev coefficients of H at the nodes
+        for i in range(0, n + 1):
+            hs[i] = log(bs[i] / x)**2
+
+        for j in range(0, n + 1):
+            total = 0.5 * (hs[0] + hs[n] * cos(j * pi))
+            for i in range(1, n):
+                total += hs[i] * cos(i * j * pi / n)
+            a[j] = 2.0 * total / n
+
+        for i in range(1, n + 1):
+            tau = taus[i]
+            sqrtTau = sqrt(tau)
+            b = bs[i]
+            k1 = 0.0
+            k2 = 0.0
+            k3 = 0.0
+
+            for l in range(0, len(yB)):
+                y = yB[l]
+                # Time to expiry u with tau - u = tau (1 + y)^2 / 4
+                z = 0.25 * tau * (1.0 + y)**2
+                u = tau - z
+                sz = sqrt(z)
+                hU = _chebyshevInterp(1.0 - 2.0 * sqrt(u) / sqrtT, a)
+                bU = x * exp(-sqrt(max(hU, 0.0)))
+                dp = (log(b / bU) + (r - q + 0.5 * v2) * z) / (v * sz)
+                dm = dp - v * sz
+                jac = 0.5 * tau * (1.0 + y)
+                k1 += wB[l] * exp(q * u) * _ncdf(dp) * jac
+                k2 += wB[l] * exp(q * u) * _npdf(dp) * sqrtTau / v
+                k3 += wB[l] * exp(r * u) * _npdf(dm) * sqrtTau / v
+
+            sd = v * sqrtTau
+            dpK = (log(b / k) + (r - q) * tau) / sd + 0.5 * sd
+            dmK = dpK - sd
+            nn = _npdf(dmK) / sd + r * k3
+            dd = _npdf(dpK) / sd + _ncdf(dpK) + q * (k1 + k2)
+            bs[i] = min(k * exp(-(r - q) * tau) * nn / dd, x)
+
+    if s <= bs[n]:
+        return k - s
+
+    for i in range(0, n + 1):
+        hs[i] = log(bs[i] / x)**2
+
+    for j in range(0, n + 1):
+        total = 0.5 * (hs[0] + hs[n] * cos(j * pi))
+        for i in range(1, n):
+            total += hs[i] * cos(i * j * pi / n)
+        a[j] = 2.0 * total / n
+
+    # The early exercise premium integrated over the elapsed time z
+    premium = 0.0
+
+    for l in range(0, len(yP)):
+        y = yP[l]
+        z = 0.25 * t * (1.0 + y)**2
+        u = t - z
+        hU = _chebyshevInterp(1.0 - 2.0 * sqrt(u) / sqrtT, a)
+        bU = x * exp(-sqrt(max(hU, 0.0)))
+        sz = v * sqrt(z)
+        dp = (log(s / bU) + (r - q) * z) / sz + 0.5 * sz
+        dm = dp - sz
+        integrand = r * k * exp(-r * z) * _ncdf(-dm) - \
+            q * s * exp(-q * z) * _ncdf(-dp)
+        premium += wP[l] * integrand * 0.5 * t * (1.0 + y)
+
+    return max(european + premium, k - s)
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:], float64[:], int64, int64, int64, float64[:],
+                 float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True, parallel=True)
+def _americanApproxValues(s, t, k, r, q, v, phi, method, numNodes,
+                          numIterations, yB, wB, yP, wP):
+    ''' Parallel loop over the options. '''
+
+    numOptions = len(s)
+    out = np.empty(numOptions)
+
+    for i in prange(0, numOptions):
+
+        tExp = max(t[i], 1e-10)
+        vol = max(v[i], 1e-10)
+
+        if method == FinAmericanApproxMethods.BARONE_ADESI_WHALEY.value:
+            out[i] = bawValue(s[i], tExp, k[i], r[i], q[i], vol, phi[i])
+        elif method == FinAmericanApproxMethods.BJERKSUND_STENSLAND.value:
+            out[i] = bjerksundStenslandValue(s[i], tExp, k[i], r[i], q[i],
+                                             vol, phi[i])
+        elif phi[i] > 0.0:
+            # Calls are valued as puts using the put-call symmetry
+            out[i] = _qdFixedPointPut(k[i], tExp, s[i], q[i], r[i], vol,
+                                      numNodes, numIterations, yB, wB, yP, wP)
+        else:
+            out[i] = _qdFixedPointPut(s[i], tExp, k[i], r[i], q[i], vol,
+                                      numNodes, numIterations, yB, wB, yP, wP)
+
+    return out
+
+###############################################################################
+
+
+def americanApproxValuesVectorised(s, t, k, r, q, v, phi,
+                                   method=FinAmericanApproxMethods.QD_PLUS_FP,
+                                   numNodes=8,
+                                   numIterations=4,
+                                   numQuadNodes=16,
+                                   numPriceNodes=32):
+    ''' Value arrays of American calls (phi = 1) or puts (phi = -1) in
+    parallel using one of the approximations in FinAmericanApproxMethods.
+    All market inputs are arrays of the same length. For the QD+ fixed point
+    method the number of Chebyshev nodes of the boundary, fixed point
+    iterations, Gauss-Legendre nodes of the boundary integrals and of the
+    final premium integral can be set. '''
+
+    s = np.array(s, dtype=np.float64)
+    numOptions = len(s)
+    ones = np.ones(numOptions)
+    t = np.array(t, dtype=np.float64) * ones
+    k = np.array(k, dtype=np.float64) * ones
+    r = np.array(r, dtype=np.float64) * ones
+    q = np.array(q, dtype=np.float64) * ones
+    v = np.array(v, dtype=np.float64) * ones
+    phi = np.array(phi, dtype=np.float64) * ones
+
+    if np.any(s <= 0.0) or np.any(k <= 0.0):
+        raise FinError("Stock prices and strikes must be positive.")
+
+    if not isinstance(method, FinAmericanApproxMethods):
+        raise FinError("Unknown American approximation method.")
+
+    if numNodes < 2:
+        raise FinError("Need at least two Chebyshev nodes.")
+
+    yB, wB = np.polynomial.legendre.leggauss(numQuadNodes)
+    yP, wP = np.polynomial.legendre.leggauss(numPriceNodes)
+
+    return _americanApproxValues(s, t, k, r, q, v, phi, method.value,
+                                 numNodes, numIterations, yB, wB, yP, wP)
+
+###############################################################################
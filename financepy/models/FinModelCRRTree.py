@@ -3,13 +3,25 @@
 ##############################################################################
 
 from ..finutils.FinOptionTypes import FinOptionTypes
+from ..finutils.FinError import FinError
+from .FinModelBlackScholes import bsValueGreeksVectorised, BS_VALUE
 
+from enum import Enum
+from math import exp, log, sqrt
 import numpy as np
-from numba import njit, float64, int64
+from numba import njit, prange, float64, int64
 
 bump = 1e-4
 
 ###############################################################################
+
+
+class FinTreeMethods(Enum):
+    CRR = 1  # Cox-Ross-Rubinstein averaged over an even and odd step count
+    LEISEN_REIMER = 2  # Leisen-Reimer with Richardson extrapolation
+    BBSR = 3  # Black-Scholes smoothed last step with Richardson extrapolation
+
+###############################################################################
 ###############################################################################
 
 @njit(float64[:](float64, float64, float64, float64, int64, float64, int64,
@@ -180,3 +192,148 @@ def crrTreeValAvg(stockPrice,
     return res
 
 ###############################################################################
+
+
+@njit(float64(float64, float64), fastmath=True, cache=True)
+def _peizerPratt(z, n):
+    ''' Peizer-Pratt method 2 inversion of the normal distribution used to
+    set the probabilities of the Leisen-Reimer tree. '''
+
+    y = z / (n + 1.0 / 3.0 + 0.1 / (n + 1.0))
+    h = 0.5 * sqrt(1.0 - exp(-y * y * (n + 1.0 / 6.0)))
+
+    if z < 0.0:
+        return 0.5 - h
+    else:
+        return 0.5 + h
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64,
+              int64, int64, int64, float64[:]), fastmath=True, cache=True)
+def _treeRollback(s, k, t, r, q, v, phi, isAmerican, numSteps, method,
+                  values):
+    ''' Value a vanilla option on a recombining binomial tree by rolling a
+    single vector of option values back in place so memory is O(numSteps).
+    The values vector must have at least numSteps + 1 entries. For the BBSR
+    method the values one step before expiry are Black-Scholes prices. '''
+
+    dt = t / numSteps
+    growth = exp((r - q) * dt)
+    df = exp(-r * dt)
+
+    if method == FinTreeMethods.LEISEN_REIMER.value:
+        sd = v * sqrt(t)
+        d1 = (log(s / k) + (r - q + 0.5 * v * v) * t) / sd
+        d2 = d1 - sd
+        p = _peizerPratt(d2, numSteps)
+        pStar = _peizerPratt(d1, numSteps)
+        u = growth * pStar / p
+        d = (growth - p * u) / (1.0 - p)
+    else:
+        u = exp(v * sqrt(dt))
+        d = 1.0 / u
+        p = (growth - d) / (u - d)
+
+    pUp = df * p
+    pDn = df * (1.0 - p)
+    ratio = u / d
+
+    lastStep = numSteps
+
+    if method == FinTreeMethods.BBSR.value:
+        # Replace the last step with the Black-Scholes value over dt
+        lastStep = numSteps - 1
+        n = lastStep + 1
+        sNodes = np.empty(n)
+        sNode = s * d ** lastStep
+        for j in range(0, n):
+            sNodes[j] = sNode
+            sNode *= ratio
+        ones = np.ones(n)
+        bs = bsValueGreeksVectorised(sNodes, dt * ones, k * ones, r * ones,
+                                     q * ones, v * ones, phi * ones)
+        for j in range(0, n):
+            values[j] = bs[j, BS_VALUE]
+            if isAmerican == 1:
+                values[j] = max(values[j], phi * (sNodes[j] - k))
+    else:
+        sNode = s * d ** lastStep
+        for j in range(0, lastStep + 1):
+            values[j] = max(phi * (sNode - k), 0.0)
+            sNode *= ratio
+
+    for iStep in range(lastStep - 1, -1, -1):
+        sNode = s * d ** iStep
+        for j in range(0, iStep + 1):
+            hold = pUp * values[j + 1] + pDn * values[j]
+            if isAmerican == 1:
+                hold = max(hold, phi * (sNode - k))
+            values[j] = hold
+            sNode *= ratio
+
+    return values[0]
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:], float64[:], int64, int64, int64),
+      fastmath=True, cache=True, parallel=True)
+def treeValuesVectorised(s, k, t, r, q, v, phi, isAmerican, numSteps, method):
+    ''' Value a vector of vanilla calls (phi = 1) or puts (phi = -1) with
+    their own spot, strike, expiry, rate, dividend yield and volatility on
+    binomial trees in parallel. Each option uses one vector of numSteps + 1
+    values. The Leisen-Reimer tree uses an odd number of steps and is
+    extrapolated from numSteps and about numSteps / 2 steps and the BBSR
+    tree from numSteps and numSteps / 2 steps. Both assume that the error of
+    the early exercise value is linear in the step size. The CRR tree averages an
+    even and an odd number of steps. '''
+
+    numOptions = len(s)
+    out = np.empty(numOptions)
+
+    if numSteps < 4:
+        raise FinError("Number of tree steps must be at least 4.")
+
+    if method < FinTreeMethods.CRR.value or method > FinTreeMethods.BBSR.value:
+        raise FinError("Unknown tree method.")
+
+    for i in prange(0, numOptions):
+
+        values = np.empty(numSteps + 2)
+        tExp = max(t[i], 1e-10)
+        vol = max(v[i], 1e-10)
+
+        if method == FinTreeMethods.CRR.value:
+            nEven = numSteps + numSteps % 2
+            v1 = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol, phi[i],
+                               isAmerican, nEven, method, values)
+            v2 = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol, phi[i],
+                               isAmerican, nEven + 1, method, values)
+            out[i] = 0.5 * (v1 + v2)
+
+        elif method == FinTreeMethods.LEISEN_REIMER.value:
+            nFine = numSteps + 1 - numSteps % 2
+            nCoarse = nFine // 2 + 1 - (nFine // 2) % 2
+            vFine = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol, phi[i],
+                                  isAmerican, nFine, method, values)
+            vCoarse = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol,
+                                    phi[i], isAmerican, nCoarse, method,
+                                    values)
+            w = nFine / nCoarse
+            out[i] = (w * vFine - vCoarse) / (w - 1.0)
+
+        else:
+            nFine = numSteps + numSteps % 2
+            vFine = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol, phi[i],
+                                  isAmerican, nFine, method, values)
+            vCoarse = _treeRollback(s[i], k[i], tExp, r[i], q[i], vol,
+                                    phi[i], isAmerican, nFine // 2, method,
+                                    values)
+            out[i] = 2.0 * vFine - vCoarse
+
+    return out
+
+###############################################################################
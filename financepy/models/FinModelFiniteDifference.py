@@ -0,0 +1,554 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' One factor finite difference engine for options on a stock or FX rate
+following dS = (r - q) S dt + sigma(t, S) S dW. The Black-Scholes PDE is
+solved backwards from expiry with the Crank-Nicolson scheme on a non-uniform
+grid in the stock price which is concentrated around the strike, the
+barriers and the spot. Each time the payoff or the value becomes kinked or
+discontinuous (at expiry, at a barrier observation or at a cash dividend)
+the next step is replaced by fully implicit sub-steps (Rannacher smoothing)
+to damp the oscillations that Crank-Nicolson would otherwise leave. Each
+step solves one tridiagonal system with the Thomas algorithm. The engine
+supports early exercise, discrete cash dividends, continuously or discretely
+monitored barriers with a rebate, term structures of interest and dividend
+rates and a local volatility. The value, delta, gamma and theta at the spot
+are read off the grid. '''
+
+import numpy as np
+from numba import njit, float64, int64
+from math import sqrt
+
+from ..finutils.FinError import FinError
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True)
+def _thomasSolve(a, b, c, d):
+    ''' Solve the tridiagonal system with sub-diagonal a, diagonal b and
+    super-diagonal c for the right hand side d. '''
+
+    n = len(d)
+    cp = np.empty(n)
+    dp = np.empty(n)
+    x = np.empty(n)
+
+    cp[0] = c[0] / b[0]
+    dp[0] = d[0] / b[0]
+
+    for i in range(1, n):
+        m = b[i] - a[i] * cp[i-1]
+        cp[i] = c[i] / m
+        dp[i] = (d[i] - a[i] * dp[i-1]) / m
+
+    x[n-1] = dp[n-1]
+
+    for i in range(n-2, -1, -1):
+        x[i] = dp[i] - cp[i] * x[i+1]
+
+    return x
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
+def _fdRollback(s, taus, thetas, rates, divYields, vols, values, exercise,
+                isAmerican, hasLower, lowerBarrier, hasUpper, upperBarrier,
+                rebate, lowerDirichlet, upperDirichlet, monitor, dividends):
+    ''' Step the option values on the grid s from time to expiry zero to the
+    last of the times to expiry taus. Step k uses the implicitness thetas[k],
+    the rates[k], divYields[k] and the volatilities vols[k, :]. At each node
+    the barriers are applied if monitor is set, then the cash dividend and
+    then the early exercise. Returns the values at the last two times. '''
+
+    n = len(s)
+    numSteps = len(taus) - 1
+
+    lo = np.zeros(n)
+    di = np.zeros(n)
+    up = np.zeros(n)
+
+    a = np.zeros(n)
+    b = np.zeros(n)
+    c = np.zeros(n)
+    rhs = np.zeros(n)
+
+    v = values.copy()
+
+    if monitor[0] == 1:
+        for i in range(0, n):
+            if (hasLower == 1 and s[i] <= lowerBarrier) or \
+               (hasUpper == 1 and s[i] >= upperBarrier):
+                v[i] = rebate
+
+    vPrev = v.copy()
+
+    for k in range(0, numSteps):
+
+        dt = taus[k+1] - taus[k]
+        r = rates[k]
+        mu = r - divYields[k]
+        theta = thetas[k]
+
+        # The spatial operator L = 0.5 sigma^2 S^2 d2/dS2 + mu S d/dS - r
+        for i in range(1, n-1):
+            hm = s[i] - s[i-1]
+            hp = s[i+1] - s[i]
+            alpha = 0.5 * vols[k, i] * vols[k, i] * s[i] * s[i]
+            beta = mu * s[i]
+
+            l2 = 2.0 * alpha / hm / (hm + hp)
+            u2 = 2.0 * alpha / hp / (hm + hp)
+            l1 = -beta * hp / hm / (hm + hp)
+            u1 = beta * hm / hp / (hm + hp)
+
+            # Upwind the drift where central differences lose positivity
+            if l2 + l1 < 0.0 or u2 + u1 < 0.0:
+                if beta > 0.0:
+                    l1 = 0.0
+                    u1 = beta / hp
+                else:
+                    l1 = -beta / hm
+                    u1 = 0.0
+
+            lo[i] = l2 + l1
+            up[i] = u2 + u1
+            di[i] = -l2 - u2 - l1 - u1 - r
+
+        # At S = 0 the PDE reduces to dV/dtau = -rV
+        lo[0] = 0.0
+        up[0] = 0.0
+        di[0] = -r
+
+        # Zero gamma at the top of the grid
+        h = s[n-1] - s[n-2]
+        lo[n-1] = -mu * s[n-1] / h
+        up[n-1] = 0.0
+        di[n-1] = mu * s[n-1] / h - r
+
+        for i in range(0, n):
+            ex = di[i] * v[i]
+            if i > 0:
+                ex += lo[i] * v[i-1]
+            if i < n-1:
+                ex += up[i] * v[i+1]
+
+            rhs[i] = v[i] + (1.0 - theta) * dt * ex
+            a[i] = -theta * dt * lo[i]
+            b[i] = 1.0 - theta * dt * di[i]
+            c[i] = -theta * dt * up[i]
+
+        if lowerDirichlet == 1:
+            a[0] = 0.0
+            b[0] = 1.0
+            c[0] = 0.0
+            rhs[0] = rebate
+
+        if upperDirichlet == 1:
+            a[n-1] = 0.0
+            b[n-1] = 1.0
+            c[n-1] = 0.0
+            rhs[n-1] = rebate
+
+        vPrev = v
+        v = _thomasSolve(a, b, c, rhs)
+
+        if monitor[k+1] == 1:
+            for i in range(0, n):
+                if (hasLower == 1 and s[i] <= lowerBarrier) or \
+                   (hasUpper == 1 and s[i] >= upperBarrier):
+                    v[i] = rebate
+
+        if dividends[k+1] > 0.0:
+            sExDiv = np.maximum(s - dividends[k+1], s[0])
+            v = np.interp(sExDiv, s, v)
+
+        if isAmerican == 1:
+            v = np.maximum(v, exercise)
+
+    return v, vPrev
+
+###############################################################################
+
+
+def fdStockGrid(sMin, sMax, numSpaceSteps, centres, widths, exactPoints,
+                midPoints, concentration=5.0):
+    ''' Build a grid of numSpaceSteps + 1 stock prices from sMin to sMax in
+    which the density of points is 1 + concentration / sqrt(1 + x^2) around
+    each centre with x the distance to the centre in units of its width.
+    This is the density of the sinh transformation of Tavella and Randall
+    summed over the centres. The exact points are then moved onto the
+    nearest interior grid point and the grid points either side of each mid
+    point are moved so that it lies half way between them. '''
+
+    centres = np.array(centres, dtype=np.float64)
+    widths = np.array(widths, dtype=np.float64)
+
+    def cumulativeDensity(x):
+        g = x.copy()
+        for c, w in zip(centres, widths):
+            g += concentration * w * np.arcsinh((x - c) / w)
+        return g
+
+    xFine = np.linspace(sMin, sMax, 20 * numSpaceSteps + 1)
+    gFine = cumulativeDensity(xFine)
+    gTarget = np.linspace(gFine[0], gFine[-1], numSpaceSteps + 1)
+    s = np.interp(gTarget, gFine, xFine)
+    s[0] = sMin
+    s[-1] = sMax
+
+    moved = []
+
+    for x in exactPoints:
+        if x <= s[0] or x >= s[-1]:
+            continue
+        i = int(np.argmin(np.abs(s - x)))
+        if i == 0 or i == numSpaceSteps or i in moved:
+            continue
+        s[i] = x
+        moved.append(i)
+
+    for x in midPoints:
+        i = int(np.searchsorted(s, x))
+        if i < 2 or i > numSpaceSteps - 1 or i in moved or i - 1 in moved:
+            continue
+        h = 0.5 * (s[i] - s[i-1])
+        s[i-1] = x - h
+        s[i] = x + h
+        moved += [i - 1, i]
+
+    return s
+
+###############################################################################
+
+
+def fdTimeGrid(t, numTimeSteps, eventTimes, numRannacherSteps=2):
+    ''' Return the times to expiry of the time grid and the implicitness of
+    each step. The event times are times to expiry that are put exactly on
+    the grid. The step after expiry and after each event is split into
+    numRannacherSteps fully implicit sub-steps. '''
+
+    dt = t / numTimeSteps
+    base = np.linspace(0.0, t, numTimeSteps + 1)
+    events = np.unique(np.array(eventTimes, dtype=np.float64))
+    events = events[(events > 0.0) & (events < t)]
+
+    # Drop grid points that are too close to an event time
+    keep = np.ones(len(base), dtype=bool)
+    for e in events:
+        keep[1:-1] &= np.abs(base[1:-1] - e) > 0.25 * dt
+
+    taus = np.unique(np.concatenate((base[keep], events)))
+
+    restarts = np.zeros(len(taus), dtype=bool)
+    restarts[0] = True
+    restarts[np.searchsorted(taus, events)] = True
+
+    gridTaus = [0.0]
+    thetas = []
+
+    for k in range(0, len(taus) - 1):
+        if restarts[k] and numRannacherSteps > 0:
+            h = (taus[k+1] - taus[k]) / numRannacherSteps
+            for j in range(1, numRannacherSteps):
+                gridTaus.append(taus[k] + j * h)
+                thetas.append(1.0)
+            thetas.append(1.0)
+        else:
+            thetas.append(0.5)
+        gridTaus.append(taus[k+1])
+
+    return np.array(gridTaus), np.array(thetas)
+
+###############################################################################
+
+
+def _stepRates(rate, t, taus):
+    ''' Convert a flat rate or a curve with a _df(t) function into the
+    forward rate over each step of the grid of times to expiry. '''
+
+    if hasattr(rate, "_df"):
+        times = t - taus
+        dfs = np.array([rate._df(x) for x in times])
+        return np.log(dfs[1:] / dfs[:-1]) / (taus[1:] - taus[:-1])
+    else:
+        return np.full(len(taus) - 1, float(rate))
+
+###############################################################################
+
+
+def fdValueGreeks(stockPrice,
+                  timeToExpiry,
+                  payoff,
+                  interestRate,
+                  dividendRate,
+                  volatility,
+                  exercise=None,
+                  lowerBarrier=None,
+                  upperBarrier=None,
+                  rebate=0.0,
+                  monitoringTimes=None,
+                  dividendTimes=None,
+                  dividendAmounts=None,
+                  strikePrice=None,
+                  numSpaceSteps=200,
+                  numTimeSteps=200,
+                  numRannacherSteps=2,
+                  numStdDevs=5.0):
+    ''' Value an option on one stock or FX rate by Crank-Nicolson and return
+    a dictionary of the value, delta, gamma and theta at each stock price.
+    The payoff and the early exercise value are functions of an array of
+    stock prices. The interest and dividend rates can be flat or curves with
+    a _df(t) function. The volatility can be a number or a local volatility
+    function sigma(t, S) of the time from now and an array of stock prices.
+    Barriers pay the rebate as soon as they are hit. They are monitored
+    continuously unless the monitoring times are given. Cash dividends are
+    paid at the dividend times. All times are in years from today. '''
+
+    spots = np.atleast_1d(np.array(stockPrice, dtype=np.float64))
+    t = float(timeToExpiry)
+
+    if t <= 0.0:
+        raise FinError("Time to expiry must be positive.")
+
+    if np.any(spots <= 0.0):
+        raise FinError("Stock price must be greater than zero.")
+
+    if numSpaceSteps < 4 or numTimeSteps < 1:
+        raise FinError("Too few grid steps.")
+
+    hasLower = lowerBarrier is not None
+    hasUpper = upperBarrier is not None
+    isContinuous = monitoringTimes is None
+
+    if hasLower and np.any(spots <= lowerBarrier) and isContinuous:
+        raise FinError("Stock price is on or below the lower barrier.")
+
+    if hasUpper and np.any(spots >= upperBarrier) and isContinuous:
+        raise FinError("Stock price is on or above the upper barrier.")
+
+    if hasLower and hasUpper and lowerBarrier >= upperBarrier:
+        raise FinError("Lower barrier must be below the upper barrier.")
+
+    # The volatility used to size the grid
+    if callable(volatility):
+        sigma = np.max(volatility(0.0, spots))
+    else:
+        sigma = float(volatility)
+        if sigma < 0.0:
+            raise FinError("Volatility should not be negative.")
+
+    sigmaRootT = max(sigma, 0.05) * sqrt(t)
+
+    # Time grid with the barrier observations and dividends on it
+    eventTimes = []
+
+    if not isContinuous:
+        monitoringTimes = np.array(monitoringTimes, dtype=np.float64)
+        keep = (monitoringTimes > 0.0) & (monitoringTimes <= t)
+        monitoringTimes = monitoringTimes[keep]
+        eventTimes += list(t - monitoringTimes)
+
+    if dividendTimes is not None:
+        dividendTimes = np.array(dividendTimes, dtype=np.float64)
+        dividendAmounts = np.array(dividendAmounts, dtype=np.float64)
+        if len(dividendTimes) != len(dividendAmounts):
+            raise FinError("Dividend times and amounts differ in length.")
+        keep = (dividendTimes > 0.0) & (dividendTimes < t)
+        dividendTimes = dividendTimes[keep]
+        dividendAmounts = dividendAmounts[keep]
+        eventTimes += list(t - dividendTimes)
+
+    taus, thetas = fdTimeGrid(t, numTimeSteps, eventTimes,
+                              numRannacherSteps)
+
+    numNodes = len(taus)
+    monitor = np.zeros(numNodes, dtype=np.int64)
+    dividends = np.zeros(numNodes)
+
+    if not isContinuous:
+        for tObs in monitoringTimes:
+            idx = int(np.argmin(np.abs(taus - (t - tObs))))
+            monitor[idx] = 1
+
+    if dividendTimes is not None:
+        for tDiv, amount in zip(dividendTimes, dividendAmounts):
+            idx = int(np.argmin(np.abs(taus - (t - tDiv))))
+            dividends[idx] += amount
+
+    # Stock price grid bounded by any continuous barriers
+    centres = list(spots) if len(spots) == 1 else [np.mean(spots)]
+    exactPoints = []
+    midPoints = []
+
+    if strikePrice is not None:
+        centres.append(strikePrice)
+        exactPoints.append(strikePrice)
+
+    sRef = max(np.max(spots), strikePrice or 0.0)
+    sMax = sRef * np.exp(numStdDevs * sigmaRootT)
+    sMin = 0.0
+
+    for barrier in [lowerBarrier, upperBarrier]:
+        if barrier is not None:
+            centres.append(barrier)
+            midPoints.append(barrier)
+
+    if hasLower and isContinuous:
+        sMin = lowerBarrier
+
+    if hasUpper and isContinuous:
+        sMax = upperBarrier
+    elif hasUpper:
+        sMax = max(sMax, upperBarrier * np.exp(numStdDevs * sigmaRootT))
+
+    widths = [0.2 * c * sigmaRootT for c in centres]
+    s = fdStockGrid(sMin, sMax, numSpaceSteps, centres, widths, exactPoints,
+                    midPoints)
+
+    if np.any(spots < s[1]) or np.any(spots > s[-2]):
+        raise FinError("Stock price is outside the grid.")
+
+    # Rates and volatilities over each step
+    rates = _stepRates(interestRate, t, taus)
+    divYields = _stepRates(dividendRate, t, taus)
+
+    numSteps = numNodes - 1
+
+    if callable(volatility):
+        vols = np.empty((numSteps, len(s)))
+        for k in range(0, numSteps):
+            tMid = t - 0.5 * (taus[k] + taus[k+1])
+            vols[k, :] = volatility(tMid, s)
+    else:
+        vols = np.full((numSteps, len(s)), sigma)
+
+    values = np.array(payoff(s), dtype=np.float64)
+
+    if exercise is None:
+        isAmerican = 0
+        exerciseValues = np.zeros(len(s))
+    else:
+        isAmerican = 1
+        exerciseValues = np.array(exercise(s), dtype=np.float64)
+
+    v, vPrev = _fdRollback(s, taus, thetas, rates, divYields, vols, values,
+                           exerciseValues, isAmerican,
+                           int(hasLower), float(lowerBarrier or 0.0),
+                           int(hasUpper), float(upperBarrier or 0.0),
+                           float(rebate),
+                           int(hasLower and isContinuous),
+                           int(hasUpper and isContinuous),
+                           monitor, dividends)
+
+    value, delta, gamma = fdGridGreeks(s, v, spots)
+    valuePrev, _, _ = fdGridGreeks(s, vPrev, spots)
+    theta = (valuePrev - value) / (taus[-1] - taus[-2])
+
+    return {'value': value, 'delta': delta, 'gamma': gamma, 'theta': theta}
+
+###############################################################################
+
+
+def fdGridGreeks(s, v, spots):
+    ''' Fit a quadratic through the three grid points around each spot and
+    return its value, first and second derivative at the spot. '''
+
+    i = np.searchsorted(s, spots)
+    i = np.clip(i, 1, len(s) - 2)
+
+    # Centre on the nearest grid point
+    left = (spots - s[i-1]) < (s[i] - spots)
+    i = np.where(left, i - 1, i)
+    i = np.clip(i, 1, len(s) - 2)
+
+    x0, x1, x2 = s[i-1], s[i], s[i+1]
+    y0, y1, y2 = v[i-1], v[i], v[i+1]
+    x = spots
+
+    d01 = (y1 - y0) / (x1 - x0)
+    d12 = (y2 - y1) / (x2 - x1)
+    gamma = 2.0 * (d12 - d01) / (x2 - x0)
+    delta = d01 + 0.5 * gamma * (2.0 * x - x0 - x1)
+    value = y0 + d01 * (x - x0) + 0.5 * gamma * (x - x0) * (x - x1)
+
+    return value, delta, gamma
+
+###############################################################################
+
+
+def fdBarrierValueGreeks(stockPrice,
+                         timeToExpiry,
+                         payoff,
+                         interestRate,
+                         dividendRate,
+                         volatility,
+                         barrier,
+                         isDown,
+                         isKnockIn,
+                         rebate=0.0,
+                         monitoringTimes=None,
+                         strikePrice=None,
+                         numSpaceSteps=200,
+                         numTimeSteps=200):
+    ''' Value a single barrier option by finite differences and return a
+    dictionary of arrays of the value, delta, gamma and theta at each stock
+    price. A knock-out pays the rebate when the barrier is hit. A knock-in
+    is valued as the option without the barrier less the knock-out. Stock
+    prices already beyond the barrier are treated as having crossed it. '''
+
+    spots = np.atleast_1d(np.array(stockPrice, dtype=np.float64))
+
+    if isDown:
+        crossed = spots <= barrier
+    else:
+        crossed = spots >= barrier
+
+    keys = ['value', 'delta', 'gamma', 'theta']
+    results = {key: np.zeros(len(spots)) for key in keys}
+
+    if isKnockIn:
+        rebate = 0.0
+    else:
+        results['value'][crossed] = rebate
+
+    alive = ~crossed
+
+    if isKnockIn:
+        vanilla = fdValueGreeks(spots, timeToExpiry, payoff, interestRate,
+                                dividendRate, volatility,
+                                strikePrice=strikePrice,
+                                numSpaceSteps=numSpaceSteps,
+                                numTimeSteps=numTimeSteps)
+        for key in keys:
+            results[key][crossed] = vanilla[key][crossed]
+
+    if np.any(alive):
+
+        if isDown:
+            lowerBarrier, upperBarrier = barrier, None
+        else:
+            lowerBarrier, upperBarrier = None, barrier
+
+        knockOut = fdValueGreeks(spots[alive], timeToExpiry, payoff,
+                                 interestRate, dividendRate, volatility,
+                                 lowerBarrier=lowerBarrier,
+                                 upperBarrier=upperBarrier,
+                                 rebate=rebate,
+                                 monitoringTimes=monitoringTimes,
+                                 strikePrice=strikePrice,
+                                 numSpaceSteps=numSpaceSteps,
+                                 numTimeSteps=numTimeSteps)
+
+        for key in keys:
+            if isKnockIn:
+                results[key][alive] = vanilla[key][alive] - knockOut[key]
+            else:
+                results[key][alive] = knockOut[key]
+
+    return results
+
+###############################################################################
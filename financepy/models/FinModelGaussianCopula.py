@@ -8,6 +8,7 @@ import numpy as np
 
 from ..finutils.FinMath import N
 from ..finutils.FinHelperFunctions import uniformToDefaultTime
+from ..finutils.FinRandom import getCounterNormals
 
 ###############################################################################
 # TODO:
@@ -21,9 +22,8 @@ def defaultTimesGC(issuerCurves,
     ''' Generate a matrix of default times by credit and trial using a
     Gaussian copula model using a full rank correlation matrix. '''
 
-    np.random.seed(seed)
     numCredits = len(issuerCurves)
-    x = np.random.normal(0.0, 1.0, size=(numCredits, numTrials))
+    x = getCounterNormals(seed, numTrials, numCredits).T
     c = np.linalg.cholesky(correlationMatrix)
     y = np.dot(c, x)
 
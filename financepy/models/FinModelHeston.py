@@ -2,15 +2,16 @@
 # Copyright (C) 2018, 2019, 2020 Dominic O'Kane
 ##############################################################################
 
-from numba import njit, float64, int64
+from numba import njit, prange, float64, int64, complex128
 from scipy import integrate
 from math import exp, log, pi
 import numpy as np  # I USE NUMPY FOR EXP, LOG AND SQRT AS THEY HANDLE IMAGINARY PARTS
 
 from ..finutils.FinGlobalVariables import gDaysInYear
 from ..finutils.FinOptionTypes import FinOptionTypes
-from ..finutils.FinMath import norminvcdf
 from ..finutils.FinError import FinError
+from .FinModelBlackScholes import bsValueGreeksVectorised, BS_VALUE, BS_VEGA
+from .FinProcessSimulator import FinHestonNumericalScheme, getHestonPathsGrid
 
 ##########################################################################
 # Heston Process
@@ -26,122 +27,205 @@ from ..finutils.FinError import FinError
 # TODO - NEEDS CHECKING FOR MC CONVERGENCE
 ###############################################################################
 
-from enum import Enum
+@njit(complex128[:](float64[:], float64, float64, float64, float64, float64,
+                    float64), cache=True, fastmath=True)
+def lewisCharFn(u, tau, v0, kappa, theta, sigma, rho):
+    ''' Heston characteristic function of the log forward return evaluated
+    at u + i/2 along the Lewis contour. This is the same formulation as in
+    value_Lewis which avoids the branch cut of the complex logarithm. '''
+
+    V = sigma * sigma
+    n = len(u)
+    phi = np.empty(n, dtype=np.complex128)
+
+    for i in range(0, n):
+        k = u[i] + 0.5j
+        b = kappa + 1j * rho * sigma * k
+        d = np.sqrt(b * b + V * k * (k - 1j))
+        g = (b - d) / (b + d)
+        T_m = (b - d) / V
+        Q = np.exp(-d * tau)
+        T = T_m * (1.0 - Q) / (1.0 - g * Q)
+        W = kappa * theta * (tau * T_m - 2.0 *
+                             np.log((1.0 - g * Q) / (1.0 - g)) / V)
+        phi[i] = np.exp(W + v0 * T)
+
+    return phi
+
+###############################################################################
+
+
+@njit(float64[:](float64, float64, float64[:], float64[:], float64[:],
+                 complex128[:]), cache=True, fastmath=True, parallel=True)
+def lewisCallPrices(F, df, strikes, nodes, weights, phi):
+    ''' Price calls on a set of strikes using the Lewis formula given the
+    characteristic function phi evaluated at the quadrature nodes. The same
+    values of phi are shared by all of the strikes. '''
+
+    numStrikes = len(strikes)
+    numNodes = len(nodes)
+    prices = np.empty(numStrikes)
+
+    # The strike independent part of the integrand
+    a = np.empty(numNodes)
+    b = np.empty(numNodes)
+    for j in range(0, numNodes):
+        w = weights[j] / (nodes[j] * nodes[j] + 0.25)
+        a[j] = w * phi[j].real
+        b[j] = w * phi[j].imag
+
+    for i in prange(0, numStrikes):
+        K = strikes[i]
+        x = log(F / K)
+        integral = 0.0
+        for j in range(0, numNodes):
+            ux = nodes[j] * x
+            integral += a[j] * np.cos(ux) + b[j] * np.sin(ux)
+        prices[i] = df * (F - np.sqrt(K * F) * integral / pi)
+
+    return prices
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def lewisCharFnGradient(u, tau, v0, kappa, theta, sigma, rho):
+    ''' Return the Heston characteristic function on the Lewis contour, as in
+    lewisCharFn, together with the analytic derivatives of its logarithm with
+    respect to the parameters (v0, kappa, theta, sigma, rho). These are found
+    by differentiating each of the intermediate terms with the chain rule. '''
+
+    V = sigma * sigma
+    n = len(u)
+    phi = np.empty(n, dtype=np.complex128)
+    dLogPhi = np.empty((n, 5), dtype=np.complex128)
+
+    # Derivatives of kappa * theta and of V with respect to each parameter
+    dKT = np.array([0.0, theta, kappa, 0.0, 0.0])
+    dV = np.array([0.0, 0.0, 0.0, 2.0 * sigma, 0.0])
+
+    for i in range(0, n):
+
+        k = u[i] + 0.5j
+        kk = k * (k - 1j)
+        b = kappa + 1j * rho * sigma * k
+        d = np.sqrt(b * b + V * kk)
+        g = (b - d) / (b + d)
+        T_m = (b - d) / V
+        Q = np.exp(-d * tau)
+        oneMinusGQ = 1.0 - g * Q
+        T = T_m * (1.0 - Q) / oneMinusGQ
+        L = np.log(oneMinusGQ / (1.0 - g))
+        W = kappa * theta * (tau * T_m - 2.0 * L / V)
+        phi[i] = np.exp(W + v0 * T)
+
+        dbs = np.array([0.0, 1.0, 0.0, 1j * rho * k, 1j * sigma * k])
+
+        for j in range(0, 5):
+            db = dbs[j]
+            dd = (b * db + 0.5 * dV[j] * kk) / d
+            dg = 2.0 * (d * db - b * dd) / (b + d)**2
+            dT_m = (db - dd) / V - (b - d) * dV[j] / V / V
+            dQ = -tau * Q * dd
+            dGQ = dg * Q + g * dQ
+            dT = dT_m * (1.0 - Q) / oneMinusGQ + \
+                T_m * (-dQ * oneMinusGQ + (1.0 - Q) * dGQ) / oneMinusGQ**2
+            dL = -dGQ / oneMinusGQ + dg / (1.0 - g)
+            dW = dKT[j] * (tau * T_m - 2.0 * L / V) + \
+                kappa * theta * (tau * dT_m - 2.0 * dL / V +
+                                 2.0 * L * dV[j] / V / V)
+            dLogPhi[i, j] = dW + v0 * dT
+
+        dLogPhi[i, 0] += T
+
+    return phi, dLogPhi
+
+###############################################################################
 
 
-class FinHestonNumericalScheme(Enum):
-    EULER = 1
-    EULERLOG = 2
-    QUADEXP = 3
+@njit(cache=True, fastmath=True, parallel=True)
+def lewisCallPricesGradient(F, df, strikes, nodes, weights, phi, dLogPhi):
+    ''' Price calls on a set of strikes using the Lewis formula and return
+    the prices and their derivatives with respect to the five Heston
+    parameters. The characteristic function and its gradient at the nodes
+    are shared by all of the strikes. '''
+
+    numStrikes = len(strikes)
+    numNodes = len(nodes)
+    prices = np.empty(numStrikes)
+    jac = np.empty((numStrikes, 5))
+
+    # The strike independent part of the integrand and of its gradient
+    a = np.empty((numNodes, 6))
+    b = np.empty((numNodes, 6))
+    for j in range(0, numNodes):
+        w = weights[j] / (nodes[j] * nodes[j] + 0.25)
+        a[j, 0] = w * phi[j].real
+        b[j, 0] = w * phi[j].imag
+        for p in range(0, 5):
+            z = phi[j] * dLogPhi[j, p]
+            a[j, p+1] = w * z.real
+            b[j, p+1] = w * z.imag
+
+    for i in prange(0, numStrikes):
+        K = strikes[i]
+        x = log(F / K)
+        scale = df * np.sqrt(K * F) / pi
+        sums = np.zeros(6)
+        for j in range(0, numNodes):
+            ux = nodes[j] * x
+            c = np.cos(ux)
+            s = np.sin(ux)
+            for p in range(0, 6):
+                sums[p] += a[j, p] * c + b[j, p] * s
+        prices[i] = df * F - scale * sums[0]
+        for p in range(0, 5):
+            jac[i, p] = -scale * sums[p+1]
+
+    return prices, jac
 
 ###############################################################################
 
 
-@njit(float64[:, :](float64, float64, float64, float64, float64, float64,
-                    float64, float64, float64, float64, int64, int64, int64),
-      cache=True, fastmath=True)
-def getPaths(s0, r, q, v0, kappa, theta, sigma, rho, t, dt, numPaths,
-             seed, scheme):
-
-    np.random.seed(seed)
-    numSteps = int(t / dt)
-    sPaths = np.zeros(shape=(numPaths, numSteps))
-    sPaths[:, 0] = s0
-    sdt = np.sqrt(dt)
-    rhohat = np.sqrt(1.0 - rho * rho)
-    sigma2 = sigma * sigma
-
-    if scheme == FinHestonNumericalScheme.EULER.value:
-        # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
-            s = s0
-            v = v0
-            for iStep in range(1, numSteps):
-                z1 = np.random.normal(0.0, 1.0) * sdt
-                z2 = np.random.normal(0.0, 1.0) * sdt
-                zV = z1
-                zS = rho * z1 + rhohat * z2
-                vplus = max(v, 0.0)
-                rtvplus = np.sqrt(vplus)
-                v += kappa * (theta - vplus) * dt + sigma * \
-                    rtvplus * zV + 0.25 * sigma2 * (zV * zV - dt)
-                s += (r - q) * s * dt + rtvplus * s * \
-                    zS + 0.5 * s * vplus * (zV * zV - dt)
-                sPaths[iPath, iStep] = s
-
-    elif scheme == FinHestonNumericalScheme.EULERLOG.value:
-        # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
-            x = log(s0)
-            v = v0
-            for iStep in range(1, numSteps):
-                zV = np.random.normal(0.0, 1.0) * sdt
-                zS = rho * zV + rhohat * np.random.normal(0.0, 1.0) * sdt
-                vplus = max(v, 0.0)
-                rtvplus = np.sqrt(vplus)
-                x += (r - q - 0.5 * vplus) * dt + rtvplus * zS
-                v += kappa * (theta - vplus) * dt + sigma * \
-                    rtvplus * zV + sigma2 * (zV * zV - dt) / 4.0
-                sPaths[iPath, iStep] = exp(x)
-
-    elif scheme == FinHestonNumericalScheme.QUADEXP.value:
-        # Due to Leif Andersen(2006)
-        Q = exp(-kappa * dt)
-        psic = 1.50
-        gamma1 = 0.50
-        gamma2 = 0.50
-        K0 = -rho * kappa * theta * dt / sigma
-        K1 = gamma1 * dt * (kappa * rho / sigma - 0.5) - rho / sigma
-        K2 = gamma2 * dt * (kappa * rho / sigma - 0.5) + rho / sigma
-        K3 = gamma1 * dt * (1.0 - rho * rho)
-        K4 = gamma2 * dt * (1.0 - rho * rho)
-        A = K2 + 0.5 * K4
-        mu = (r - q)
-        c1 = sigma2 * Q * (1.0 - Q) / kappa
-        c2 = theta * sigma2 * ((1.0 - Q)**2) / 2.0 / kappa
-
-        for iPath in range(0, numPaths):
-            x = log(s0)
-            vn = v0
-            for iStep in range(1, numSteps):
-                zV = np.random.normal(0, 1)
-                zS = rho * zV + rhohat * np.random.normal(0, 1)
-                m = theta + (vn - theta) * Q
-                m2 = m * m
-                s2 = c1 * vn + c2
-                psi = s2 / m2
-                u = np.random.uniform(0.0, 1.0)
-
-                if psi <= psic:
-                    b2 = 2.0 / psi - 1.0 + \
-                        np.sqrt((2.0 / psi) * (2.0 / psi - 1.0))
-                    a = m / (1.0 + b2)
-                    b = np.sqrt(b2)
-                    zV = norminvcdf(u)
-                    vnp = a * ((b + zV)**2)
-                    d = (1.0 - 2.0 * A * a)
-                    M = exp((A * b2 * a) / d) / np.sqrt(d)
-                    K0 = -log(M) - (K1 + 0.5 * K3) * vn
-                else:
-                    p = (psi - 1.0) / (psi + 1.0)
-                    beta = (1.0 - p) / m
-
-                    if u <= p:
-                        vnp = 0.0
-                    else:
-                        vnp = log((1.0 - p) / (1.0 - u)) / beta
-
-                    M = p + beta * (1.0 - p) / (beta - A)
-                    K0 = -log(M) - (K1 + 0.5 * K3) * vn
-
-                x += mu * dt + K0 + (K1 * vn + K2 * vnp) + \
-                    np.sqrt(K3 * vn + K4 * vnp) * zS
-                sPaths[iPath, iStep] = exp(x)
-                vn = vnp
-    else:
-        raise FinError("Unknown FinHestonNumericalSchme")
-
-    return sPaths
+def lewisQuadratureGrid(tau, v0, kappa, theta, sigma, rho, tol=1e-12,
+                        panelWidth=10.0, numNodesPerPanel=16):
+    ''' Return the nodes and weights of a composite Gauss-Legendre rule for
+    the Lewis integral. The range is truncated once the modulus of the
+    integrand falls below tol and is then split into panels each with the
+    same number of nodes. The grid depends on the expiry but not on the
+    strike so it can be shared by all of the options with that expiry. '''
+
+    uMax = panelWidth
+
+    while uMax < 1e5:
+        u = np.array([uMax, 1.5 * uMax])
+        phi = np.abs(lewisCharFn(u, tau, v0, kappa, theta, sigma, rho))
+        if np.max(phi / (u * u + 0.25)) < tol:
+            break
+        uMax *= 2.0
+
+    # The factor 1/(u*u+1/4) has poles at +/- i/2 so the panels are refined
+    # close to the origin
+    numPanels = int(np.ceil(uMax / panelWidth))
+    firstPanel = np.array([0.0, 0.05, 0.1, 0.2, 0.4, 0.7])
+    edges = panelWidth * np.concatenate((firstPanel,
+                                         np.arange(1, numPanels + 1)))
+    numPanels = len(edges) - 1
+
+    x, w = np.polynomial.legendre.leggauss(numNodesPerPanel)
+
+    nodes = np.empty(numPanels * numNodesPerPanel)
+    weights = np.empty(numPanels * numNodesPerPanel)
+
+    for i in range(0, numPanels):
+        mid = 0.5 * (edges[i] + edges[i+1])
+        halfWidth = 0.5 * (edges[i+1] - edges[i])
+        start = i * numNodesPerPanel
+        end = start + numNodesPerPanel
+        nodes[start:end] = mid + halfWidth * x
+        weights[start:end] = halfWidth * w
+
+    return nodes, weights
 
 ###############################################################################
 
@@ -161,6 +245,53 @@ class FinModelHeston():
         self._sigma = sigma
         self._rho = rho
 
+###############################################################################
+
+    def getPaths(self,
+                 obsTimes,
+                 stockPrice,
+                 interestRate,
+                 dividendYield,
+                 numPaths,
+                 numStepsPerYear,
+                 seed,
+                 scheme=FinHestonNumericalScheme.QUADEXP):
+        ''' Simulate the stock price and return its value on each path at
+        the observation times only, as a matrix of shape numPaths by number of
+        observation times. Each interval between observation times is split
+        into equal steps of at most 1/numStepsPerYear years. '''
+
+        obsTimes = np.atleast_1d(np.array(obsTimes, dtype=np.float64))
+
+        if np.any(obsTimes <= 0.0) or np.any(np.diff(obsTimes) <= 0.0):
+            raise FinError("Observation times must be positive and increasing")
+
+        times = [0.0]
+        obsIndices = np.empty(len(obsTimes), dtype=np.int64)
+
+        for i in range(0, len(obsTimes)):
+            t0 = times[-1]
+            numSteps = max(int(np.ceil((obsTimes[i] - t0) * numStepsPerYear
+                                       - 1e-9)), 1)
+            steps = t0 + (obsTimes[i] - t0) * np.arange(1, numSteps + 1) / \
+                numSteps
+            times += list(steps)
+            obsIndices[i] = len(times) - 1
+
+        sPaths = getHestonPathsGrid(numPaths,
+                                    np.array(times),
+                                    obsIndices,
+                                    interestRate - dividendYield,
+                                    stockPrice,
+                                    self._v0,
+                                    self._kappa,
+                                    self._theta,
+                                    self._sigma,
+                                    self._rho,
+                                    scheme.value,
+                                    seed)
+        return sPaths
+
 ###############################################################################
 
     def value_MC(self,
@@ -173,26 +304,15 @@ class FinModelHeston():
                  numStepsPerYear,
                  seed,
                  scheme=FinHestonNumericalScheme.EULERLOG):
+        ''' Value a European option by Monte-Carlo. Only the terminal stock
+        price of each path is kept. '''
 
         tau = (option._expiryDate - valueDate) / gDaysInYear
 
         K = option._strikePrice
-        dt = 1.0 / numStepsPerYear
-        schemeValue = float(scheme.value)
 
-        sPaths = getPaths(stockPrice,
-                          interestRate,
-                          dividendYield,
-                          self._v0,
-                          self._kappa,
-                          self._theta,
-                          self._sigma,
-                          self._rho,
-                          tau,
-                          dt,
-                          numPaths,
-                          seed,
-                          schemeValue)
+        sPaths = self.getPaths(tau, stockPrice, interestRate, dividendYield,
+                               numPaths, numStepsPerYear, seed, scheme)
 
         if option._optionType == FinOptionTypes.EUROPEAN_CALL:
             path_payoff = np.maximum(sPaths[:, -1] - K, 0)
@@ -253,6 +373,213 @@ class FinModelHeston():
 #        v2 = S0 * exp(-q*tau) - K * exp(-r*tau) * I1
         return(v1)
 
+###############################################################################
+
+    def value_Lewis_Vectorised(self,
+                               valueDate,
+                               expiryDate,
+                               strikes,
+                               optionTypes,
+                               stockPrice,
+                               interestRate,
+                               dividendYield,
+                               tol=1e-12):
+        ''' Value an array of calls and puts with the same expiry date using
+        the Lewis formula. The characteristic function is evaluated once on a
+        fixed quadrature grid and shared by all of the strikes so the cost per
+        extra strike is a single weighted sum. The option types can be one
+        type for all strikes or a list. Puts are valued by put-call parity. '''
+
+        tau = (expiryDate - valueDate) / gDaysInYear
+
+        if tau <= 0.0:
+            raise FinError("Time to expiry must be positive.")
+
+        strikes = np.atleast_1d(np.array(strikes, dtype=np.float64))
+
+        if isinstance(optionTypes, FinOptionTypes):
+            optionTypes = [optionTypes] * len(strikes)
+
+        if len(optionTypes) != len(strikes):
+            raise FinError("Option types and strikes differ in length.")
+
+        r = interestRate
+        q = dividendYield
+        F = stockPrice * exp((r - q) * tau)
+        df = exp(-r * tau)
+
+        nodes, weights = lewisQuadratureGrid(tau, self._v0, self._kappa,
+                                             self._theta, self._sigma,
+                                             self._rho, tol)
+
+        phi = lewisCharFn(nodes, tau, self._v0, self._kappa, self._theta,
+                          self._sigma, self._rho)
+
+        values = lewisCallPrices(F, df, strikes, nodes, weights, phi)
+
+        for i in range(0, len(strikes)):
+            if optionTypes[i] == FinOptionTypes.EUROPEAN_PUT:
+                values[i] = values[i] - df * (F - strikes[i])
+            elif optionTypes[i] != FinOptionTypes.EUROPEAN_CALL:
+                raise FinError("Unknown option type.")
+
+        return values
+
+###############################################################################
+
+    def _surfaceValuesJacobian(self, expiries, params):
+        ''' Return the Lewis call prices of all of the calibration options and
+        their derivatives with respect to the five parameters. The grid of
+        each expiry is shared by its strikes and is truncated for the current
+        parameters as the decay of the characteristic function depends on
+        them. '''
+
+        v0, kappa, theta, sigma, rho = params
+        values = []
+        jacs = []
+
+        for (tau, F, df, strikes) in expiries:
+            nodes, weights = lewisQuadratureGrid(tau, v0, kappa, theta, sigma,
+                                                 rho)
+            phi, dLogPhi = lewisCharFnGradient(nodes, tau, v0, kappa, theta,
+                                               sigma, rho)
+            v, jac = lewisCallPricesGradient(F, df, strikes, nodes, weights,
+                                             phi, dLogPhi)
+            values.append(v)
+            jacs.append(jac)
+
+        return np.concatenate(values), np.vstack(jacs)
+
+###############################################################################
+
+    def calibrate(self,
+                  valueDate,
+                  expiryDates,
+                  strikes,
+                  marketQuotes,
+                  stockPrice,
+                  interestRate,
+                  dividendYield,
+                  quotesAreVols=True,
+                  maxIterations=100,
+                  tol=1e-6):
+        ''' Fit v0, kappa, theta, sigma and rho to a surface of European
+        option quotes using Levenberg-Marquardt. Each option is given by an
+        expiry date, a strike and a quote which is a Black-Scholes implied
+        volatility or, if quotesAreVols is False, a call price. Vol quotes are
+        fitted in price divided by vega which is close to a fit in volatility.
+        The characteristic function is evaluated once per expiry on a
+        quadrature grid shared by all of its strikes and the Jacobian uses its
+        analytic derivatives. The current parameters are the starting point so
+        a model calibrated on the previous day gives a warm start. The
+        parameters are updated in place and a dictionary with the
+        root-mean-square error and the number of iterations is returned. '''
+
+        strikes = np.array(strikes, dtype=np.float64)
+        marketQuotes = np.array(marketQuotes, dtype=np.float64)
+
+        if len(expiryDates) != len(strikes) or \
+           len(marketQuotes) != len(strikes):
+            raise FinError("Expiry dates, strikes and quotes differ in length")
+
+        r = interestRate
+        q = dividendYield
+        params = np.array([self._v0, self._kappa, self._theta, self._sigma,
+                           self._rho])
+
+        # Group the options by expiry and build one grid for each expiry
+        excelDates = np.array([dt._excelDate for dt in expiryDates])
+        expiries = []
+        order = []
+
+        for excelDate in np.unique(excelDates):
+            index = np.where(excelDates == excelDate)[0]
+            tau = (expiryDates[index[0]] - valueDate) / gDaysInYear
+
+            if tau <= 0.0:
+                raise FinError("Time to expiry must be positive.")
+
+            F = stockPrice * exp((r - q) * tau)
+            df = exp(-r * tau)
+            expiries.append((tau, F, df, strikes[index]))
+            order.append(index)
+
+        order = np.concatenate(order)
+        strikes = strikes[order]
+        marketQuotes = marketQuotes[order]
+        numOptions = len(strikes)
+
+        if quotesAreVols:
+            taus = np.concatenate([np.full(len(e[3]), e[0]) for e in expiries])
+            ones = np.ones(numOptions)
+            bs = bsValueGreeksVectorised(stockPrice * ones, taus, strikes,
+                                         r * ones, q * ones, marketQuotes,
+                                         ones)
+            targets = bs[:, BS_VALUE]
+            # Floor the vega so far out of the money quotes are not dominant
+            vegas = bs[:, BS_VEGA]
+            scale = 1.0 / np.maximum(vegas, 0.01 * np.max(vegas))
+        else:
+            targets = marketQuotes
+            scale = np.ones(numOptions)
+
+        lower = np.array([1e-6, 1e-4, 1e-6, 1e-4, -0.999])
+        upper = np.array([5.0, 50.0, 5.0, 10.0, 0.999])
+        params = np.clip(params, lower, upper)
+
+        values, jac = self._surfaceValuesJacobian(expiries, params)
+        res = (values - targets) * scale
+        jac = jac * scale[:, np.newaxis]
+        cost = np.dot(res, res)
+
+        # The damping is updated using the rule of Nielsen (1999)
+        mu = 1e-3 * np.max(np.diag(jac.T @ jac))
+        nu = 2.0
+        iteration = 0
+
+        for iteration in range(1, maxIterations + 1):
+
+            A = jac.T @ jac
+            g = jac.T @ res
+            D = np.diag(np.diag(A) + 1e-12)
+            step = np.linalg.solve(A + mu * D, -g)
+
+            # Stop when even the unconstrained step cannot reduce the error
+            if np.dot(step, mu * D @ step - g) < tol * cost:
+                break
+
+            newParams = np.clip(params + step, lower, upper)
+            step = newParams - params
+
+            newValues, newJac = self._surfaceValuesJacobian(expiries,
+                                                            newParams)
+            newRes = (newValues - targets) * scale
+            newCost = np.dot(newRes, newRes)
+
+            predicted = -2.0 * np.dot(step, g) - np.dot(step, A @ step)
+            gain = (cost - newCost) / max(predicted, 1e-300)
+
+            if newCost < cost:
+                converged = (cost - newCost) < tol * cost
+                params = newParams
+                res = newRes
+                jac = newJac * scale[:, np.newaxis]
+                cost = newCost
+                mu = mu * max(1.0 / 3.0, 1.0 - (2.0 * gain - 1.0)**3)
+                nu = 2.0
+                if converged:
+                    break
+            else:
+                mu = mu * nu
+                nu = 2.0 * nu
+                if mu > 1e16:
+                    break
+
+        self._v0, self._kappa, self._theta, self._sigma, self._rho = params
+
+        return {'rmse': np.sqrt(cost / numOptions),
+                'iterations': iteration}
+
 ###############################################################################
 
     def value_Lewis_Rouah(self,
@@ -0,0 +1,401 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' Local volatility model in which the stock follows
+
+    dS = (r(t) - q) S dt + sigma(t, S) S dW
+
+with the local volatility sigma(t, S) given by the formula of Dupire so that
+the model reprices every European option on an implied volatility surface.
+The local volatility is computed once from the surface on a uniform grid of
+times and log stock prices and is then looked up by bilinear interpolation
+which takes a fixed number of operations as no search is needed. The lookup
+is compiled so it can be called inside the Numba Monte-Carlo path loop. The
+model can also be passed as the volatility function of the finite
+difference engine. '''
+
+import numpy as np
+from numba import njit, prange, float64, int64
+
+from ..finutils.FinError import FinError
+from ..finutils.FinRandom import counterNormals
+from ..finutils.FinHelperFunctions import labelToString
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64[:, :]),
+      cache=True, fastmath=True)
+def localVolLookup(t, x, dtGrid, x0, dxGrid, vols):
+    ''' Bilinear interpolation of the local volatility at time t and log
+    stock price x on a uniform grid which starts at time zero and log stock
+    price x0. The volatility is flat outside the grid. '''
+
+    nT = vols.shape[0]
+    nX = vols.shape[1]
+
+    u = t / dtGrid
+    i = min(max(int(u), 0), nT - 2)
+    wt = min(max(u - i, 0.0), 1.0)
+
+    y = (x - x0) / dxGrid
+    j = min(max(int(y), 0), nX - 2)
+    wx = min(max(y - j, 0.0), 1.0)
+
+    v0 = vols[i, j] + wx * (vols[i, j+1] - vols[i, j])
+    v1 = vols[i+1, j] + wx * (vols[i+1, j+1] - vols[i+1, j])
+    return v0 + wt * (v1 - v0)
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64, float64, float64,
+                 float64[:, :]), cache=True, fastmath=True, parallel=True)
+def localVolLookupVectorised(times, logSpots, dtGrid, x0, dxGrid, vols):
+    ''' Local volatility at each pair of time and log stock price. '''
+
+    numPoints = len(times)
+    out = np.empty(numPoints)
+
+    for k in prange(numPoints):
+        out[k] = localVolLookup(times[k], logSpots[k], dtGrid, x0, dxGrid,
+                                vols)
+
+    return out
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def localVolGridSteps(times, dtGrid, nT):
+    ''' Return the length and its square root of each step of a time grid
+    that starts at zero together with the row and weight on the time axis of
+    the local volatility grid at the start of each step. These are the same
+    for all paths so they are found once. Entry zero of each array is not
+    used so that step iStep runs from times[iStep-1] to times[iStep]. '''
+
+    numSteps = len(times) - 1
+
+    dts = np.empty(numSteps + 1)
+    dts[0] = 0.0
+    for iStep in range(1, numSteps + 1):
+        dts[iStep] = times[iStep] - times[iStep - 1]
+        if dts[iStep] <= 0.0:
+            raise FinError("Time grid must be increasing")
+
+    sdts = np.sqrt(dts)
+
+    rows = np.zeros(numSteps + 1, dtype=np.int64)
+    wts = np.zeros(numSteps + 1)
+    for iStep in range(1, numSteps + 1):
+        u = times[iStep - 1] / dtGrid
+        rows[iStep] = min(max(int(u), 0), nT - 2)
+        wts[iStep] = min(max(u - rows[iStep], 0.0), 1.0)
+
+    return dts, sdts, rows, wts
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, int64, float64,
+              float64, float64, float64[:, :]), cache=True, fastmath=True)
+def localVolEulerStep(x, z, drift, dt, sdt, row, wt, x0, invDx, vols):
+    ''' Step the log stock price x over one time step with the normal z.
+    The local volatility is frozen at the start of the step and found by the
+    bilinear lookup of localVolLookup using the precomputed row and weight on
+    the time axis so each step is exactly a martingale after discounting. '''
+
+    nX = vols.shape[1]
+    y = (x - x0) * invDx
+    j = min(max(int(y), 0), nX - 2)
+    wx = min(max(y - j, 0.0), 1.0)
+    v0 = vols[row, j] + wx * (vols[row, j+1] - vols[row, j])
+    v1 = vols[row+1, j] + wx * (vols[row+1, j+1] - vols[row+1, j])
+    sigma = v0 + wt * (v1 - v0)
+
+    return x + (drift - 0.5 * sigma * sigma) * dt + sigma * sdt * z
+
+###############################################################################
+
+
+@njit(float64[:, :](int64, float64[:], int64[:], float64[:], float64,
+                    float64, float64, float64, float64[:, :], int64),
+      cache=True, fastmath=True, parallel=True)
+def getLocalVolPathsGrid(numPaths,
+                         times,
+                         obsIndices,
+                         drifts,
+                         s0,
+                         dtGrid,
+                         x0,
+                         dxGrid,
+                         vols,
+                         seed):
+    ''' Simulate local volatility stock prices on a time grid that starts at
+    zero and can have uneven steps. The drift of each step is given. The log
+    stock price is stepped with the local volatility frozen at the start of
+    each step so each step is exactly a martingale after discounting. Only
+    the prices at the sorted observation indices are stored. The random
+    numbers for each path come from a counter-based generator, four steps at
+    a time, so the paths do not depend on the number of threads. '''
+
+    numSteps = len(times) - 1
+    numObs = len(obsIndices)
+    sPaths = np.empty(shape=(numPaths, numObs))
+
+    if numObs > 0 and (obsIndices[0] < 0 or obsIndices[-1] > numSteps):
+        raise FinError("Observation index outside the time grid")
+
+    dts, sdts, rows, wts = localVolGridSteps(times, dtGrid, vols.shape[0])
+    invDx = 1.0 / dxGrid
+
+    for iPath in prange(0, numPaths):
+        x = np.log(s0)
+        z = np.empty(4)
+        iObs = 0
+        if numObs > 0 and obsIndices[0] == 0:
+            sPaths[iPath, 0] = s0
+            iObs = 1
+        for iStep in range(1, numSteps + 1):
+            # Each call to the generator gives the normals of four steps
+            iz = (iStep - 1) % 4
+            if iz == 0:
+                counterNormals(seed, iPath, (iStep - 1) // 4, z)
+
+            x = localVolEulerStep(x, z[iz], drifts[iStep - 1], dts[iStep],
+                                  sdts[iStep], rows[iStep], wts[iStep], x0,
+                                  invDx, vols)
+
+            if iObs < numObs and obsIndices[iObs] == iStep:
+                sPaths[iPath, iObs] = np.exp(x)
+                iObs += 1
+
+    return sPaths
+
+###############################################################################
+
+
+@njit(float64[:, :](int64, float64[:], float64[:], float64, float64, float64,
+                    float64, float64[:, :], int64),
+      cache=True, fastmath=True, parallel=True)
+def getLocalVolExtremaGrid(numPaths,
+                           times,
+                           drifts,
+                           s0,
+                           dtGrid,
+                           x0,
+                           dxGrid,
+                           vols,
+                           seed):
+    ''' Simulate local volatility paths exactly as getLocalVolPathsGrid but
+    only keep the running maximum and minimum of each path. Returns a matrix
+    with one row per path holding the final stock price and the maximum and
+    minimum over the path including the start, so the memory is O(paths)
+    whatever the number of time steps. '''
+
+    numSteps = len(times) - 1
+    out = np.empty(shape=(numPaths, 3))
+
+    dts, sdts, rows, wts = localVolGridSteps(times, dtGrid, vols.shape[0])
+    invDx = 1.0 / dxGrid
+
+    for iPath in prange(0, numPaths):
+        x = np.log(s0)
+        xMax = x
+        xMin = x
+        z = np.empty(4)
+        for iStep in range(1, numSteps + 1):
+            iz = (iStep - 1) % 4
+            if iz == 0:
+                counterNormals(seed, iPath, (iStep - 1) // 4, z)
+
+            x = localVolEulerStep(x, z[iz], drifts[iStep - 1], dts[iStep],
+                                  sdts[iStep], rows[iStep], wts[iStep], x0,
+                                  invDx, vols)
+            xMax = max(xMax, x)
+            xMin = min(xMin, x)
+
+        out[iPath, 0] = np.exp(x)
+        out[iPath, 1] = np.exp(xMax)
+        out[iPath, 2] = np.exp(xMin)
+
+    return out
+
+###############################################################################
+
+
+class FinModelLocalVol():
+    ''' Dupire local volatility model built from an implied volatility
+    surface such as FinEquityVolSurface. The surface supplies the stock
+    price, discount curve and dividend yield as well as the local volatility
+    which is stored on a uniform grid of times and log stock prices. '''
+
+    def __init__(self,
+                 volSurface,
+                 maxTime: float = None,
+                 numTimeSteps: int = 200,
+                 numSpotSteps: int = 200,
+                 numStdDevs: float = 5.0):
+        ''' Build the local volatility grid from time zero to the maximum
+        time, which defaults to the last expiry of the surface. The log stock
+        price grid covers a number of ATM standard deviations around the spot
+        and the forward at the maximum time. '''
+
+        if maxTime is None:
+            maxTime = volSurface._times[-1]
+
+        if maxTime <= 0.0:
+            raise FinError("Maximum time must be positive.")
+
+        if numTimeSteps < 1 or numSpotSteps < 1:
+            raise FinError("Local volatility grid needs at least one step.")
+
+        s0 = volSurface._stockPrice
+        q = volSurface._dividendYield
+        df = volSurface._discountCurve._df(maxTime)
+        logS0 = np.log(s0)
+        logF = logS0 - q * maxTime - np.log(df)
+
+        atmVol = volSurface.volatility(np.exp(logF), maxTime)
+        width = numStdDevs * atmVol * np.sqrt(maxTime)
+        xMin = min(logS0, logF) - width
+        xMax = max(logS0, logF) + width
+
+        times = np.linspace(0.0, maxTime, numTimeSteps + 1)
+        logSpots = np.linspace(xMin, xMax, numSpotSteps + 1)
+
+        vols = volSurface.localVolatility(np.exp(logSpots)[np.newaxis, :],
+                                          times[:, np.newaxis])
+
+        self._volSurface = volSurface
+        self._stockPrice = s0
+        self._discountCurve = volSurface._discountCurve
+        self._dividendYield = q
+        self._times = times
+        self._logSpots = logSpots
+        self._dtGrid = times[1] - times[0]
+        self._x0 = xMin
+        self._dxGrid = logSpots[1] - logSpots[0]
+        self._vols = np.ascontiguousarray(vols)
+
+###############################################################################
+
+    def localVolatility(self,
+                        spots: (float, np.ndarray),
+                        times: (float, np.ndarray)):
+        ''' Return the local volatility at the stock prices and times in
+        years by bilinear interpolation on the grid. These broadcast against
+        each other. '''
+
+        s, t = np.broadcast_arrays(np.array(spots, dtype=np.float64),
+                                   np.array(times, dtype=np.float64))
+
+        # The volatility is flat below the grid so a zero price is allowed
+        logS = np.log(np.maximum(s, 1e-300))
+
+        vols = localVolLookupVectorised(np.ascontiguousarray(t).ravel(),
+                                        np.ascontiguousarray(logS).ravel(),
+                                        self._dtGrid,
+                                        self._x0,
+                                        self._dxGrid,
+                                        self._vols)
+
+        if s.ndim == 0:
+            return vols[0]
+
+        return vols.reshape(s.shape)
+
+###############################################################################
+
+    def __call__(self, t, spots):
+        ''' The local volatility as a function of time and an array of stock
+        prices so the model can be used by the finite difference engine. '''
+
+        return self.localVolatility(spots, t)
+
+###############################################################################
+
+    def _drifts(self, times):
+        ''' The risk-neutral drift of each step of the time grid. '''
+
+        dfs = np.array(self._discountCurve._df(times), dtype=np.float64)
+        return -np.diff(np.log(dfs)) / np.diff(times) - self._dividendYield
+
+###############################################################################
+
+    def getPathsGrid(self,
+                     numPaths: int,
+                     times: np.ndarray,
+                     obsIndices: np.ndarray,
+                     stockPrice: float,
+                     seed: int = 4242):
+        ''' Return the stock prices at the observation indices of a time grid
+        which starts at zero as an array of shape numPaths x numObs. '''
+
+        times = np.array(times, dtype=np.float64)
+        obsIndices = np.array(obsIndices, dtype=np.int64)
+
+        if times[0] != 0.0:
+            raise FinError("Time grid must start at zero.")
+
+        return getLocalVolPathsGrid(numPaths, times, obsIndices,
+                                    self._drifts(times), stockPrice,
+                                    self._dtGrid, self._x0, self._dxGrid,
+                                    self._vols, seed)
+
+###############################################################################
+
+    def getPaths(self,
+                 numPaths: int,
+                 numAnnSteps: int,
+                 t: float,
+                 stockPrice: float,
+                 seed: int = 4242):
+        ''' Return paths of shape numPaths x (numSteps + 1) on a uniform grid
+        from zero to t with close to numAnnSteps steps a year. '''
+
+        numSteps = max(int(t * numAnnSteps + 0.5), 1)
+        times = np.linspace(0.0, t, numSteps + 1)
+        obsIndices = np.arange(0, numSteps + 1)
+        return self.getPathsGrid(numPaths, times, obsIndices, stockPrice,
+                                 seed)
+
+###############################################################################
+
+    def getPathsExtrema(self,
+                        numPaths: int,
+                        numAnnSteps: int,
+                        t: float,
+                        stockPrice: float,
+                        seed: int = 4242):
+        ''' Return the final stock price and the maximum and minimum over
+        each path, in columns, on the same time grid as getPaths without
+        storing the paths. '''
+
+        numSteps = max(int(t * numAnnSteps + 0.5), 1)
+        times = np.linspace(0.0, t, numSteps + 1)
+        return getLocalVolExtremaGrid(numPaths, times, self._drifts(times),
+                                      stockPrice, self._dtGrid, self._x0,
+                                      self._dxGrid, self._vols, seed)
+
+###############################################################################
+
+    def __repr__(self):
+        s = labelToString("OBJECT TYPE", type(self).__name__)
+        s += labelToString("STOCK PRICE", self._stockPrice)
+        s += labelToString("DIVIDEND YIELD", self._dividendYield)
+        s += labelToString("MAX TIME", self._times[-1])
+        s += labelToString("NUM TIME STEPS", len(self._times) - 1)
+        s += labelToString("MIN STOCK PRICE", np.exp(self._logSpots[0]))
+        s += labelToString("MAX STOCK PRICE", np.exp(self._logSpots[-1]))
+        s += labelToString("NUM SPOT STEPS", len(self._logSpots) - 1, "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        ''' Simple print function for backward compatibility. '''
+        print(self)
+
+###############################################################################
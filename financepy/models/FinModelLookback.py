@@ -0,0 +1,291 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' Closed form Black-Scholes prices of fixed and floating strike lookback
+options which are compiled and vectorised so that ladders of stock prices,
+strikes and expiries are valued in one call. Discrete monitoring is handled
+by the continuity correction of Broadie, Glasserman and Kou (1999) which
+shifts the extremum by exp(+/- beta sigma sqrt(dt)). There is also a
+Monte-Carlo kernel that only keeps the running maximum and minimum of each
+path so that its memory does not grow with the number of time steps. '''
+
+import numpy as np
+from numba import njit, prange, float64, int64
+
+from ..finutils.FinMath import N
+from ..finutils.FinGlobalVariables import gSmall
+from ..finutils.FinRandom import counterNormals
+
+# This is -zeta(1/2) / sqrt(2 pi) as in Broadie, Glasserman and Kou (1999)
+BGK_BETA = 0.5825971579390106
+
+# Columns of the matrix returned by getGBMExtrema
+LOOKBACK_FINAL = 0
+LOOKBACK_MAX = 1
+LOOKBACK_MIN = 2
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64,
+              float64), fastmath=True, cache=True)
+def fixedLookbackValue(s0, t, k, stockMinMax, r, q, v, phi):
+    ''' Value of a continuously monitored fixed strike lookback option which
+    pays max(Smax - K, 0) if phi is 1 and max(K - Smin, 0) if phi is -1 using
+    the formulae of Conze and Viswanathan (1991). The stockMinMax is the
+    maximum for a call and the minimum for a put of the stock price so far.
+    Taken from Hull Page 536 (6th edition) and Haug Page 143. '''
+
+    # There is a risk of an overflow in the limit of q=r which
+    # we remove by adjusting the value of the dividend
+    if abs(r - q) < gSmall:
+        q = r + gSmall
+
+    df = np.exp(-r * t)
+    dq = np.exp(-q * t)
+    b = r - q
+    u = v * v / 2.0 / b
+    w = 2.0 * b / (v * v)
+    expbt = np.exp(b * t)
+    sqrtT = np.sqrt(t)
+
+    if phi > 0.0:
+
+        smax = stockMinMax
+
+        if k > smax:
+
+            d1 = (np.log(s0 / k) + (b + v * v/2.0) * t) / v / sqrtT
+            d2 = d1 - v * sqrtT
+
+            if s0 == k:
+                term = -N(d1-2.0 * b * sqrtT / v) + expbt * N(d1)
+            elif s0 < k and w > 100.0:
+                term = expbt * N(d1)
+            else:
+                term = -np.power(s0 / k, -w) * N(d1 - 2 * b * sqrtT / v) \
+                    + expbt * N(d1)
+
+            return s0 * dq * N(d1) - k * df * N(d2) + s0 * df * u * term
+
+        else:
+
+            e1 = (np.log(s0/smax) + (r - q + v*v/2) * t) / v / sqrtT
+            e2 = e1 - v * sqrtT
+
+            if s0 == smax:
+                term = -N(e1 - 2.0 * b * sqrtT / v) + expbt * N(e1)
+            elif s0 < smax and w > 100.0:
+                term = expbt * N(e1)
+            else:
+                term = (-(s0 / smax)**(-w)) * \
+                    N(e1 - 2.0 * b * sqrtT / v) + expbt * N(e1)
+
+            return df * (smax - k) + s0 * dq * N(e1) - \
+                smax * df * N(e2) + s0 * df * u * term
+
+    else:
+
+        smin = stockMinMax
+
+        if k >= smin:
+
+            f1 = (np.log(s0/smin) + (b + v * v / 2.0) * t) / v / sqrtT
+            f2 = f1 - v * sqrtT
+
+            if s0 == smin:
+                term = N(-f1 + 2.0 * b * sqrtT / v) - expbt * N(-f1)
+            elif s0 > smin and w < -100.0:
+                term = -expbt * N(-f1)
+            else:
+                term = ((s0 / smin)**(-w)) * N(-f1 + 2.0 * b * sqrtT / v) \
+                    - expbt * N(-f1)
+
+            return df * (k - smin) - s0 * dq * N(-f1) + \
+                smin * df * N(-f2) + s0 * df * u * term
+
+        else:
+
+            d1 = (np.log(s0 / k) + (b + v * v / 2) * t) / v / sqrtT
+            d2 = d1 - v * sqrtT
+
+            if s0 == k:
+                term = N(-d1 + 2.0 * b * sqrtT / v) - expbt * N(-d1)
+            elif s0 > k and w < -100.0:
+                term = -expbt * N(-d1)
+            else:
+                term = ((s0 / k)**(-w)) * N(-d1 + 2.0 * b * sqrtT / v) \
+                    - expbt * N(-d1)
+
+            return k * df * N(-d2) - s0 * dq * N(-d1) + s0 * df * u * term
+
+###############################################################################
+
+
+@njit(float64(float64, float64, float64, float64, float64, float64, float64),
+      fastmath=True, cache=True)
+def floatLookbackValue(s0, t, stockMinMax, r, q, v, phi):
+    ''' Value of a continuously monitored floating strike lookback option
+    which pays max(S(T) - Smin, 0) if phi is 1 and max(Smax - S(T), 0) if
+    phi is -1 using the formulae of Goldman, Sosin and Gatto (1979). The
+    stockMinMax is the minimum for a call and the maximum for a put of the
+    stock price so far. Taken from Haug Page 142. '''
+
+    if abs(r - q) < gSmall:
+        q = r + gSmall
+
+    dq = np.exp(-q * t)
+    df = np.exp(-r * t)
+    b = r - q
+    u = v * v / 2.0 / b
+    w = 2.0 * b / v / v
+    expbt = np.exp(b * t)
+    sqrtT = np.sqrt(t)
+
+    if phi > 0.0:
+
+        smin = stockMinMax
+
+        a1 = (np.log(s0 / smin) + (b + (v**2) / 2.0) * t) / v / sqrtT
+        a2 = a1 - v * sqrtT
+
+        if smin == s0:
+            term = N(-a1 + 2.0 * b * sqrtT / v) - expbt * N(-a1)
+        elif s0 < smin and w < -100:
+            term = - expbt * N(-a1)
+        else:
+            term = ((s0 / smin)**(-w))\
+                * N(-a1 + 2.0 * b * sqrtT / v) - expbt * N(-a1)
+
+        return s0 * dq * N(a1) - smin * df * N(a2) + s0 * df * u * term
+
+    else:
+
+        smax = stockMinMax
+
+        b1 = (np.log(s0 / smax) + (b + (v**2) / 2.0) * t) / v / sqrtT
+        b2 = b1 - v * sqrtT
+
+        if smax == s0:
+            term = -N(b1 - 2.0 * b * sqrtT / v) + expbt * N(b1)
+        elif s0 < smax and w > 100:
+            term = expbt * N(b1)
+        else:
+            term = (-(s0 / smax)**(-w)) * \
+                N(b1 - 2.0 * b * sqrtT / v) + expbt * N(b1)
+
+        return smax * df * N(-b2) - s0 * dq * N(-b1) + s0 * df * u * term
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:], float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True, parallel=True)
+def fixedLookbackValuesVectorised(s, t, k, stockMinMax, r, q, v, phi, dt):
+    ''' Value arrays of fixed strike lookback options which all have the
+    same length. If the monitoring interval dt in years is positive then the
+    maximum of a call is shifted up and the minimum of a put is shifted down
+    by exp(beta v sqrt(dt)) so the continuous formula gives the value of the
+    discretely monitored option. A zero dt means continuous monitoring. '''
+
+    n = len(s)
+    values = np.empty(n)
+
+    for i in prange(0, n):
+
+        a = phi[i] * BGK_BETA * v[i] * np.sqrt(max(dt[i], 0.0))
+        shift = np.exp(a)
+
+        values[i] = fixedLookbackValue(s[i], t[i], k[i] * shift,
+                                       stockMinMax[i] * shift,
+                                       r[i], q[i], v[i], phi[i]) / shift
+
+    return values
+
+###############################################################################
+
+
+@njit(float64[:](float64[:], float64[:], float64[:], float64[:], float64[:],
+                 float64[:], float64[:], float64[:]),
+      fastmath=True, cache=True, parallel=True)
+def floatLookbackValuesVectorised(s, t, stockMinMax, r, q, v, phi, dt):
+    ''' Value arrays of floating strike lookback options which all have the
+    same length. If the monitoring interval dt in years is positive then the
+    minimum of a call is shifted down and the maximum of a put is shifted up
+    by exp(beta v sqrt(dt)) and the part of the payoff linear in the stock
+    price is corrected so the continuous formula gives the value of the
+    discretely monitored option. A zero dt means continuous monitoring. '''
+
+    n = len(s)
+    values = np.empty(n)
+
+    for i in prange(0, n):
+
+        a = -phi[i] * BGK_BETA * v[i] * np.sqrt(max(dt[i], 0.0))
+        shift = np.exp(a)
+
+        value = floatLookbackValue(s[i], t[i], stockMinMax[i] * shift,
+                                   r[i], q[i], v[i], phi[i]) / shift
+
+        values[i] = value + phi[i] * (1.0 - 1.0 / shift) * s[i] * \
+            np.exp(-q[i] * t[i])
+
+    return values
+
+###############################################################################
+
+
+@njit(float64[:, :](int64, int64, float64, float64, float64, float64, int64),
+      fastmath=True, cache=True, parallel=True)
+def getGBMExtrema(numPaths, numSteps, t, mu, s0, sigma, seed):
+    ''' Simulate numPaths antithetic pairs of GBM paths with numSteps equal
+    time steps and return a matrix with one row per path which holds the
+    final stock price and the maximum and minimum over the path including
+    the start. Only the running values of each path are kept so the memory
+    is O(paths). The normals come from the counter-based generator four
+    steps at a time so that the results do not depend on the threads. '''
+
+    dt = t / numSteps
+    m = (mu - 0.5 * sigma * sigma) * dt
+    sdt = sigma * np.sqrt(dt)
+    x0 = np.log(s0)
+
+    out = np.empty((2 * numPaths, 3))
+
+    for iPair in prange(0, numPaths):
+
+        z = np.empty(4)
+
+        x1 = x0
+        x2 = x0
+        max1 = x0
+        min1 = x0
+        max2 = x0
+        min2 = x0
+
+        for iStep in range(0, numSteps):
+
+            iz = iStep % 4
+            if iz == 0:
+                counterNormals(seed, iPair, iStep // 4, z)
+
+            x1 += m + sdt * z[iz]
+            x2 += m - sdt * z[iz]
+
+            max1 = max(max1, x1)
+            min1 = min(min1, x1)
+            max2 = max(max2, x2)
+            min2 = min(min2, x2)
+
+        out[2 * iPair, LOOKBACK_FINAL] = np.exp(x1)
+        out[2 * iPair, LOOKBACK_MAX] = np.exp(max1)
+        out[2 * iPair, LOOKBACK_MIN] = np.exp(min1)
+        out[2 * iPair + 1, LOOKBACK_FINAL] = np.exp(x2)
+        out[2 * iPair + 1, LOOKBACK_MAX] = np.exp(max2)
+        out[2 * iPair + 1, LOOKBACK_MIN] = np.exp(min2)
+
+    return out
+
+###############################################################################
@@ -5,6 +5,7 @@
 import numpy as np
 from numba import njit, float64, int64
 from math import ceil
+import time
 
 from ..finutils.FinError import FinError
 from ..finutils.FinMath import accruedInterpolator
@@ -41,104 +42,6 @@ def optionExerciseTypesToInt(optionExerciseType):
 ###############################################################################
 
 
-@njit(float64(float64, int64, float64[:], float64, float64, float64, int64),
-      fastmath=True, cache=True)
-def f(alpha, nm, Q, P, dX, dt, N):
-
-    sumQZ = 0.0
-    for j in range(-nm, nm+1):
-        x = alpha + j*dX
-        rdt = np.exp(x)*dt
-        sumQZ += Q[j+N] * np.exp(-rdt)
-
-    objFn = sumQZ - P
-    return objFn
-
-###############################################################################
-
-
-@njit(float64(float64, int64, float64[:], float64, float64, float64, int64),
-      fastmath=True, cache=True)
-def fprime(alpha, nm, Q, P, dX, dt, N):
-
-    sumQZdZ = 0.0
-    for j in range(-nm, nm+1):
-        x = alpha + j*dX
-        rdt = np.exp(x)*dt
-        sumQZdZ += Q[j+N] * np.exp(-rdt) * np.exp(x)
-
-    deriv = -sumQZdZ*dt
-    return deriv
-
-###############################################################################
-# This is the secant method which is not used as I computed the derivative of
-# objective function with respect to the drift term
-###############################################################################
-
-
-@njit(float64(float64, int64, float64[:], float64, float64, float64, int64),
-      fastmath=True, cache=True)
-def searchRoot(x0, nm, Q, P, dX, dt, N):
-
-    #    print("Searching for root", x0)
-    max_iter = 50
-    max_error = 1e-8
-
-    x1 = x0 * 1.0001
-    f0 = f(x0, nm, Q, P, dX, dt, N)
-    f1 = f(x1, nm, Q, P, dX, dt, N)
-
-    for _ in range(0, max_iter):
-
-        df = f1 - f0
-
-        if df == 0.0:
-            raise FinError("Search for alpha fails due to zero derivative")
-
-        x = x1 - f1 * (x1 - x0) / df
-        x0, f0 = x1, f1
-        x1 = x
-        f1 = f(x1, nm, Q, P, dX, dt, N)
-
-        if (abs(f1) <= max_error):
-            return x1
-
-    raise FinError("Search root deriv FAILED to find alpha.")
-
-###############################################################################
-# This is Newton Raphson which is faster than the secant measure as it has the
-# analytical derivative  that is easy to calculate.
-###############################################################################
-
-
-@njit(float64(float64, int64, float64[:], float64, float64, float64, int64),
-      fastmath=True, cache=True)
-def searchRootDeriv(x0, nm, Q, P, dX, dt, N):
-
-    max_iter = 50
-    max_error = 1e-8
-
-    for _ in range(0, max_iter):
-
-        fval = f(x0, nm, Q, P, dX, dt, N)
-
-        if abs(fval) <= max_error:
-            return x0
-
-        fderiv = fprime(x0, nm, Q, P, dX, dt, N)
-
-        if abs(fderiv) == 0.0:
-            print(x0, fval, fderiv)
-            raise FinError("Function derivative is zero.")
-
-        step = fval/fderiv
-        x0 = x0 - step
-
-    raise FinError("Search root deriv FAILED to find alpha.")
-
-###############################################################################
-
-
 @njit(fastmath=True, cache=True)
 def bermudanSwaption_Tree_Fast(texp, tmat,
                                strikePrice, faceAmount,
@@ -726,7 +629,60 @@ def callablePuttableBond_Tree_Fast(couponTimes, couponFlows,
 ###############################################################################
 
 
-@njit(fastmath=True)
+@njit(float64(float64, int64, float64[:], float64, float64[:], float64,
+              int64), fastmath=True, cache=True)
+def solveAlpha(x0, nm, Q, P, expjdX, dt, N):
+    ''' Newton-Raphson search for the drift alpha at one time slice. The
+    objective function and its derivative are evaluated in the same loop and
+    the node rates are factored as exp(alpha) * exp(j*dX) so that only one
+    exponential per node is needed per iteration. The initial guess x0 is
+    refined by matching the first order expansion of the discount factors
+    across the slice which is usually within a few basis points of the root.
+    '''
+
+    max_iter = 50
+    max_error = 1e-8
+
+    # Analytic starting guess from P ~ sum_j Q_j exp(-exp(alpha) c_j dt)
+    sumQ = 0.0
+    sumQC = 0.0
+    for j in range(-nm, nm+1):
+        sumQ += Q[j+N]
+        sumQC += Q[j+N] * expjdX[j+N]
+
+    if P > 0.0 and sumQ > P and sumQC > 0.0:
+        x0 = np.log(np.log(sumQ / P) * sumQ / sumQC / dt)
+
+    for _ in range(0, max_iter):
+
+        ealpha = np.exp(x0)
+        sumQZ = 0.0
+        sumQZdZ = 0.0
+
+        for j in range(-nm, nm+1):
+            rjdt = ealpha * expjdX[j+N]
+            qz = Q[j+N] * np.exp(-rjdt * dt)
+            sumQZ += qz
+            sumQZdZ += qz * rjdt
+
+        fval = sumQZ - P
+
+        if abs(fval) <= max_error:
+            return x0
+
+        fderiv = -sumQZdZ * dt
+
+        if fderiv == 0.0:
+            raise FinError("Function derivative is zero.")
+
+        x0 = x0 - fval / fderiv
+
+    raise FinError("Search root deriv FAILED to find alpha.")
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True)
 def buildTreeFast(a, sigma, treeTimes, numTimeSteps, discountFactors):
 
     treeMaturity = treeTimes[-1]
@@ -743,10 +699,11 @@ def buildTreeFast(a, sigma, treeTimes, numTimeSteps, discountFactors):
     pd = np.zeros(shape=(2*jmax+1))
 
     # The short rate goes out one step extra to have the final short rate
-    # This is the BK model so x = log(r)
-    X = np.zeros(shape=(numTimeSteps+2, 2*jmax+1))
     rt = np.zeros(shape=(numTimeSteps+2, 2*jmax+1))
 
+    # The node spacing in log(r) does not change so precompute exp(j*dX)
+    expjdX = np.zeros(shape=(2*jmax+1))
+
     # probabilities start at time 0 and go out to one step before T
     # Branching is simple trinomial out to time step m=1 after which
     # the top node and bottom node connect internally to two lower nodes
@@ -755,6 +712,7 @@ def buildTreeFast(a, sigma, treeTimes, numTimeSteps, discountFactors):
     for j in range(-jmax, jmax+1):
         ajdt = a*j*dt
         jN = j + jmax
+        expjdX[jN] = np.exp(j*dX)
         if j == jmax:
             pu[jN] = 7.0/6.0 + 0.50*(ajdt*ajdt - 3.0*ajdt)
             pm[jN] = -1.0/3.0 - ajdt*ajdt + 2.0*ajdt
@@ -789,22 +747,23 @@ def buildTreeFast(a, sigma, treeTimes, numTimeSteps, discountFactors):
         nm = min(m, jmax)
 
         # Need to do drift adjustment which is non-linear and so requires
-        # a root search algorithm to find value of x0.
+        # a root search algorithm to find value of x0. The search starts
+        # from an analytic guess built from the previous slice.
 
-        alpha[m] = searchRootDeriv(x0, nm, Q[m], discountFactors[m+1],
-                                   dX, dt, jmax)
+        alpha[m] = solveAlpha(x0, nm, Q[m], discountFactors[m+1],
+                              expjdX, dt, jmax)
 
         x0 = alpha[m]
+        ealpha = np.exp(alpha[m])
 
         for j in range(-nm, nm+1):
             jN = j + jmax
-            X[m, jN] = alpha[m] + j*dX
-            rt[m, jN] = np.exp(X[m, jN])
+            rt[m, jN] = ealpha * expjdX[jN]
 
         # Loop over all nodes at time m to calculate next values of Q
         for j in range(-nm, nm+1):
             jN = j + jmax
-            rdt = np.exp(X[m, jN]) * dt
+            rdt = rt[m, jN] * dt
             z = np.exp(-rdt)
 
             if j == jmax:
@@ -859,6 +818,7 @@ class FinModelRatesBK():
         self._pm = None
         self._pd = None
         self._discountCurve = None
+        self._treeBuildTime = None
 
 ###############################################################################
 
@@ -885,11 +845,16 @@ class FinModelRatesBK():
 
         self._dfTimes = dfTimes
         self._dfValues = dfValues
-        
+
+        start = time.time()
+
         self._Q, self._pu, self._pm, self._pd, self._rt, self._dt \
             = buildTreeFast(self._a, self._sigma,
                             treeTimes, self._numTimeSteps, dfTree)
 
+        # Wall clock time in seconds of the last tree build
+        self._treeBuildTime = time.time() - start
+
         return
 
 ###############################################################################
@@ -2,8 +2,9 @@
 # Copyright (C) 2018, 2019, 2020 Dominic O'Kane
 ##############################################################################
 
-from numba import njit, float64, int64
+from numba import njit, prange, float64, int64
 import numpy as np
+from ..finutils.FinRandom import counterNormals
 from ..finutils.FinHelperFunctions import labelToString
 
 ###############################################################################
@@ -125,7 +126,6 @@ def draw(rt, a, b, sigma, dt):
 def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
     ''' Generate a path of CIR rates using a number of numerical schemes. '''
 
-    np.random.seed(seed)
     numSteps = int(t / dt)
     ratePath = np.zeros(numSteps)
     ratePath[0] = r0
@@ -138,7 +138,8 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
         for iPath in range(0, numPaths):
 
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 r = r + a * (b - r) * dt + \
@@ -153,7 +154,8 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
         for iPath in range(0, numPaths):
 
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 mean = x * r + b * y
@@ -170,7 +172,8 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
         for iPath in range(0, numPaths):
 
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 r = r + a * (b - r) * dt + \
@@ -186,7 +189,8 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
         for iPath in range(0, numPaths):
 
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 beta = z[iStep - 1] / sqrtdt
@@ -197,6 +201,9 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
 
     elif scheme == FinCIRNumericalScheme.EXACT.value:
 
+        # The chi-squared draws need the numpy generator
+        np.random.seed(seed)
+
         for iPath in range(0, numPaths):
 
             r = r0
@@ -220,15 +227,14 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed, scheme):
         float64,
         int64,
         int64,
-        int64))
+        int64),
+    parallel=True)
 def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
     ' Determine the CIR zero price using Monte Carlo. '''
 
     if t == 0.0:
         return 1.0
 
-    np.random.seed(seed)
-
     numSteps = int(t / dt)
     zcb = 0.0
 
@@ -236,11 +242,12 @@ def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
 
         sigmasqrtdt = sigma * np.sqrt(dt)
 
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
 
             r = r0
             rsum = r
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 r_prev = r
@@ -255,12 +262,13 @@ def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
         x = np.exp(-a * dt)
         y = 1.0 - x
 
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
 
             r = r0
             rsum = r0
 
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
 
@@ -278,11 +286,12 @@ def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
         sigmasqrtdt = sigma * np.sqrt(dt)
         sigma2dt = sigma * sigma * dt / 4.0
 
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
 
             r = r0
             rsum = r
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 r_prev = r
@@ -298,11 +307,12 @@ def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
         bhat = b - sigma * sigma / 4.0 / a
         sqrtdt = np.sqrt(dt)
 
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
 
             r = r0
             rsum = r
-            z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+            z = np.empty(numSteps - 1)
+            counterNormals(seed, iPath, 0, z)
 
             for iStep in range(1, numSteps):
                 beta = z[iStep - 1] / sqrtdt
@@ -316,6 +326,9 @@ def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed, scheme):
 
     elif scheme == FinCIRNumericalScheme.EXACT.value:
 
+        # The chi-squared draws need the numpy generator
+        np.random.seed(seed)
+
         for iPath in range(0, numPaths):
 
             r = r0
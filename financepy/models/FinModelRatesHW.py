@@ -4,13 +4,14 @@
 
 import numpy as np
 from scipy import optimize
-from numba import njit
+from numba import njit, prange, float64
 from math import ceil
 
 from ..finutils.FinError import FinError
 from ..finutils.FinMath import N, accruedInterpolator
+from ..finutils.FinRandom import counterNormals
 from ..market.curves.FinInterpolate import FinInterpTypes, _uinterpolate
-from ..finutils.FinHelperFunctions import labelToString
+from ..finutils.FinHelperFunctions import labelToString, timesFromDates
 from ..finutils.FinOptionTypes import FinOptionExerciseTypes
 from ..finutils.FinGlobalVariables import gSmall
 
@@ -840,6 +841,121 @@ def fwdFullBondPrice(rt, *args):
 ###############################################################################
 
 
+@njit(fastmath=True, cache=True)
+def hwStepMoments(a, sigma, dt):
+    ''' Moments of the Gaussian factor x(t) = r(t) - phi(t) and of its time
+    integral over a step of length dt starting from x = 0. Returns the decay
+    factor exp(-a dt), the integral weight B = (1-exp(-a dt))/a, the standard
+    deviations of x and of the integral and the correlation between them. For
+    very small mean reversion a Taylor expansion avoids cancellation. '''
+
+    ead = np.exp(-a * dt)
+
+    if a < 1e-6:
+        B = dt
+        varX = sigma * sigma * dt
+        varI = sigma * sigma * dt * dt * dt / 3.0
+        covXI = sigma * sigma * dt * dt / 2.0
+    else:
+        B = (1.0 - ead) / a
+        varX = sigma * sigma * (1.0 - ead * ead) / (2.0 * a)
+        varI = (sigma / a)**2 * (dt - 2.0 * B + (1.0 - ead * ead) / (2.0 * a))
+        covXI = 0.5 * (sigma * B)**2
+
+    sdX = np.sqrt(max(varX, 0.0))
+    sdI = np.sqrt(max(varI, 0.0))
+
+    if sdX > 0.0 and sdI > 0.0:
+        rho = min(covXI / sdX / sdI, 1.0)
+    else:
+        rho = 0.0
+
+    return ead, B, sdX, sdI, rho, varI
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True, parallel=True)
+def getHWNormals(seed, firstPath, numPaths, numSteps):
+    ''' Return the two numPaths x numSteps arrays of independent standard
+    normals used by getHWPaths_Fast for the paths numbered from firstPath.
+    They come from a counter-based generator keyed on the seed and the path
+    number so a path does not depend on how the paths are chunked. '''
+
+    g1 = np.empty((numPaths, numSteps))
+    g2 = np.empty((numPaths, numSteps))
+
+    for p in prange(0, numPaths):
+        g = np.empty(2 * numSteps)
+        counterNormals(seed, firstPath + p, 0, g)
+        g1[p, :] = g[0:numSteps]
+        g2[p, :] = g[numSteps:]
+
+    return g1, g2
+
+###############################################################################
+
+
+@njit(fastmath=True, cache=True, parallel=True)
+def getHWPaths_Fast(a, sigma, gridTimes, fwdRates, gridDfs, g1, g2):
+    ''' Exact simulation of the Hull-White short rate and of the pathwise
+    discount factor exp(-int_0^t r(u) du) on an arbitrary time grid. The
+    rate is written as r(t) = x(t) + phi(t) where x is an Ornstein-Uhlenbeck
+    process started at zero and phi(t) fits the initial discount curve. The
+    pair (x, int x du) is jointly Gaussian over each step and is sampled
+    from its exact distribution using the correlated normals g1 and g2 which
+    have shape numPaths x numSteps. The grid includes time zero. '''
+
+    numPaths = g1.shape[0]
+    numTimes = len(gridTimes)
+
+    ead = np.zeros(numTimes)
+    B = np.zeros(numTimes)
+    sdX = np.zeros(numTimes)
+    sdI = np.zeros(numTimes)
+    rho = np.zeros(numTimes)
+    rhohat = np.zeros(numTimes)
+
+    # Deterministic part of the rate and of the pathwise discount factor
+    phi = np.zeros(numTimes)
+    dfDet = np.zeros(numTimes)
+
+    for i in range(0, numTimes):
+
+        t = gridTimes[i]
+        ead0, B0, _, _, _, V0 = hwStepMoments(a, sigma, t)
+        phi[i] = fwdRates[i] + 0.5 * (sigma * B0)**2
+        dfDet[i] = gridDfs[i] * np.exp(-0.5 * V0)
+
+        if i > 0:
+            dt = gridTimes[i] - gridTimes[i-1]
+            ead[i], B[i], sdX[i], sdI[i], rho[i], _ \
+                = hwStepMoments(a, sigma, dt)
+            rhohat[i] = np.sqrt(1.0 - rho[i] * rho[i])
+
+    rates = np.empty((numPaths, numTimes))
+    dfs = np.empty((numPaths, numTimes))
+
+    for p in prange(0, numPaths):
+
+        x = 0.0
+        intx = 0.0
+        rates[p, 0] = phi[0]
+        dfs[p, 0] = dfDet[0]
+
+        for i in range(1, numTimes):
+            z1 = g1[p, i-1]
+            z2 = rho[i] * z1 + rhohat[i] * g2[p, i-1]
+            intx += x * B[i] + sdI[i] * z2
+            x = x * ead[i] + sdX[i] * z1
+            rates[p, i] = x + phi[i]
+            dfs[p, i] = dfDet[i] * np.exp(-intx)
+
+    return rates, dfs
+
+###############################################################################
+
+
 class FinModelRatesHW():
 
     def __init__(self,
@@ -1296,6 +1412,112 @@ class FinModelRatesHW():
 
         return
 
+###############################################################################
+
+    def _gridFromDates(self, discountCurve, gridDates):
+        ''' Convert the simulation dates into a time grid that starts at the
+        curve valuation date and extract the curve discount factors and
+        instantaneous forward rates on this grid. '''
+
+        valuationDate = discountCurve._valuationDate
+
+        for i in range(1, len(gridDates)):
+            if gridDates[i] <= gridDates[i-1]:
+                raise FinError("Simulation dates must be increasing.")
+
+        if gridDates[0] <= valuationDate:
+            raise FinError("Simulation dates must be after valuation date.")
+
+        dates = [valuationDate] + list(gridDates)
+        bumpDates = [dt.addDays(1) for dt in dates]
+
+        gridTimes = timesFromDates(dates, valuationDate)
+        bumpTimes = timesFromDates(bumpDates, valuationDate)
+
+        gridDfs = np.array(discountCurve.df(dates), dtype=np.float64)
+        bumpDfs = np.array(discountCurve.df(bumpDates), dtype=np.float64)
+
+        fwdRates = -np.log(bumpDfs / gridDfs) / (bumpTimes - gridTimes)
+
+        return gridTimes, fwdRates, gridDfs
+
+###############################################################################
+
+    def getPaths(self,
+                 discountCurve,
+                 gridDates,
+                 numPaths: int = 10000,
+                 seed: int = 4242):
+        ''' Simulate Hull-White short rates and pathwise discount factors on
+        the dates provided using the exact joint distribution of the short
+        rate and its integral. The model is fitted to any discount curve. The
+        returned arrays have shape numPaths x (numDates+1) with the first
+        column corresponding to the curve valuation date. '''
+
+        gridTimes, fwdRates, gridDfs = self._gridFromDates(discountCurve,
+                                                           gridDates)
+
+        numSteps = len(gridTimes) - 1
+        g1, g2 = getHWNormals(seed, 0, numPaths, numSteps)
+
+        rates, dfs = getHWPaths_Fast(self._a, self._sigma, gridTimes,
+                                     fwdRates, gridDfs, g1, g2)
+
+        return gridTimes, rates, dfs
+
+###############################################################################
+
+    def valueMC(self,
+                discountCurve,
+                gridDates,
+                payoffFunction,
+                numPaths: int = 10000,
+                seed: int = 4242,
+                numPathsPerChunk: int = 10000):
+        ''' Value a path-dependent payoff by Monte Carlo simulation of the
+        Hull-White model. The paths are generated in chunks so that memory is
+        bounded by the chunk size. For each chunk the user payoff function is
+        called as payoffFunction(gridTimes, rates, dfs) where rates and dfs
+        are numPathsInChunk x (numDates+1) arrays of short rates and pathwise
+        discount factors. It must return the discounted payoff per path as a
+        vector or as a numPathsInChunk x K array for an exposure profile.
+        Returns the mean and the standard error of the estimate. '''
+
+        if numPathsPerChunk < 1:
+            raise FinError("Number of paths per chunk must be positive.")
+
+        gridTimes, fwdRates, gridDfs = self._gridFromDates(discountCurve,
+                                                           gridDates)
+
+        numSteps = len(gridTimes) - 1
+
+        sumV = 0.0
+        sumV2 = 0.0
+        numPathsDone = 0
+
+        while numPathsDone < numPaths:
+
+            n = min(numPathsPerChunk, numPaths - numPathsDone)
+            g1, g2 = getHWNormals(seed, numPathsDone, n, numSteps)
+
+            rates, dfs = getHWPaths_Fast(self._a, self._sigma, gridTimes,
+                                         fwdRates, gridDfs, g1, g2)
+
+            v = np.asarray(payoffFunction(gridTimes, rates, dfs))
+
+            if v.shape[0] != n:
+                raise FinError("Payoff must return one row per path.")
+
+            sumV = sumV + np.sum(v, axis=0)
+            sumV2 = sumV2 + np.sum(v * v, axis=0)
+            numPathsDone += n
+
+        value = sumV / numPaths
+        variance = np.maximum(sumV2 / numPaths - value * value, 0.0)
+        stdErr = np.sqrt(variance / numPaths)
+
+        return {'value': value, 'stderr': stdErr}
+
 ###############################################################################
 
     def __repr__(self):
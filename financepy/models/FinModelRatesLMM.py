@@ -7,8 +7,9 @@ import numpy as np
 from financepy.finutils.FinError import FinError
 from financepy.finutils.FinMath import N
 from numba import jit, njit, float64, int64, prange
-from financepy.finutils.FinSobol import getUniformSobol
-from financepy.finutils.FinMath import norminvcdf
+from financepy.finutils.FinSobol import getSobolGaussianPaths
+from financepy.finutils.FinSobol import FinSobolPathTypes
+from financepy.finutils.FinRandom import counterNormal, counterNormals
 
 # TO DO: SHITED LOGNORMAL
 # TO DO: TERMINAL MEASURE
@@ -298,25 +299,26 @@ def CholeskyNP(rho):
 
 
 @jit(float64[:, :, :](int64, int64, float64[:], float64[:], float64[:, :],
-                      float64[:], int64),
+                      float64[:], int64, int64),
      cache=True, fastmath=True, parallel=True)
-def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed):
+def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed,
+                      pathOffset=0):
     ''' Full N-Factor Arbitrage-free simulation of forward Libor curves in the
     spot measure given an initial forward curve, volatility term structure and
     full rank correlation structure. Cholesky decomposition is used to extract
     the factor weights. The number of forwards at time 0 is given. The 3D
-    matrix of forward rates by path, time and forward point is returned.
+    matrix of forward rates by path, time and forward point is returned. The
+    random numbers of each antithetic pair are keyed by the seed, the pair
+    number plus pathOffset and the time step so that successive blocks of
+    paths continue the same set of pairs.
     WARNING: NEED TO CHECK THAT CORRECT VOLATILITY IS BEING USED (OFF BY ONE
     BUG NEEDS TO BE RULED OUT) '''
 
-    np.random.seed(seed)
-
     # Even number of paths for antithetics
     numPaths = 2 * int(numPaths/2)
     halfNumPaths = int(numPaths/2)
 
     fwd = np.empty((numPaths, numForwards, numForwards))
-    fwdB = np.zeros(numForwards)
 
     discFwd = np.zeros(numForwards)
 
@@ -334,25 +336,18 @@ def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed):
         chol = CholeskyNP(matrix)
         factors.append(chol)
 
-    ###########################################################################
-    # I HAVE PROBLEMS AS THE PARALLELISATION CHANGES THE OUTPUT IF RANDS ARE
-    # CALCULATED INSIDE THE MAIN LOOP SO I CALCULATE THEM NOW
-    ###########################################################################
-
-    if 1 == 1:
-        gMatrix = np.empty((numPaths, numForwards, numForwards))
-        for iPath in range(0, halfNumPaths):
-            for j in range(1, numForwards):
-                for k in range(0, numForwards-j):
-                    g = np.random.normal()
-                    # ANTITHETICS
-                    gMatrix[iPath, j, k] = g
-                    gMatrix[iPath + halfNumPaths, j, k] = -g
+    # The randoms are drawn inside the parallel loop from a counter-based
+    # generator keyed by the path and time step so that the output does not
+    # depend on the number of threads. Antithetic paths share their randoms.
+    for iPath in prange(0, numPaths):
 
-    avgg = 0.0
-    stdg = 0.0
+        fwdB = np.zeros(numForwards)
+        g = np.zeros(numForwards)
 
-    for iPath in prange(0, numPaths):
+        basePath = pathOffset + iPath % halfNumPaths
+        sign = 1.0
+        if iPath >= halfNumPaths:
+            sign = -1.0
 
         # Initial value of forward curve at time 0
         for iFwd in range(0, numForwards):
@@ -363,6 +358,8 @@ def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed):
             dt = taus[j]
             sqrtdt = np.sqrt(dt)
 
+            counterNormals(seed, basePath, j, g[0:numForwards-j])
+
             for i in range(j, numForwards):  # FORWARDS LOOP
 
                 zi = zetas[i]
@@ -378,10 +375,8 @@ def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed):
                 w = 0.0
                 for k in range(0, numForwards-j):
                     f = factors[j][i-j, k]
-                    w = w + f * gMatrix[iPath, j, k]
-
-                avgg += w
-                stdg += w*w
+                    w = w + f * g[k]
+                w = sign * w
 
                 fwdB[i] = fwd[iPath, j-1, i] \
                     * np.exp(muA * dt - 0.5 * (zi**2) * dt + zi * w * sqrtdt)
@@ -403,10 +398,9 @@ def LMMSimulateFwdsNF(numForwards, numPaths, fwd0, zetas, correl, taus, seed):
 ###############################################################################
 
 
-@njit(float64[:, :, :](int64, int64, int64, float64[:], float64[:], float64[:],
-                       int64, int64), cache=True, fastmath=True, parallel=True)
+@njit(cache=True, fastmath=True, parallel=True)
 def LMMSimulateFwds1F(numForwards, numPaths, numeraireIndex, fwd0, gammas,
-                      taus, useSobol, seed):
+                      taus, useSobol, seed, pathOffset=0):
     ''' One factor Arbitrage-free simulation of forward Libor curves in the
     spot measure following Hull Page 768. Given an initial forward curve,
     volatility term structure. The 3D matrix of forward rates by path, time
@@ -424,7 +418,15 @@ def LMMSimulateFwds1F(numForwards, numPaths, numeraireIndex, fwd0, gammas,
     40 forwards BUT the last forward to reset occurs at 9.75 years. You should
     not simulate beyond this time. If you give the model 10 years as in the
     Hull examples, you need to simulate 41 (or in this case 11) forwards as the
-    final cap or ratchet has its reset in 10 years. '''
+    final cap or ratchet has its reset in 10 years.
+
+    The pathOffset is the number of antithetic pairs simulated in earlier
+    blocks. If useSobol is 1 the shocks are scrambled Sobol numbers assigned
+    to the time steps by a Brownian bridge. The seed sets the scrambling and
+    the Sobol sequence starts at point pathOffset. Otherwise the shocks of
+    each pair are keyed by the seed, the pair number plus pathOffset and the
+    time step. In both cases successive blocks of paths continue the same
+    sequence as a single simulation of all of the paths. '''
 
     if len(gammas) != numForwards:
         raise FinError("Gamma vector does not have right number of forwards")
@@ -435,36 +437,40 @@ def LMMSimulateFwds1F(numForwards, numPaths, numeraireIndex, fwd0, gammas,
     if len(taus) != numForwards:
         raise FinError("The length of Taus is not equal to numForwards")
 
-    np.random.seed(seed)
     # Even number of paths for antithetics
     numPaths = 2 * int(numPaths/2)
     halfNumPaths = int(numPaths/2)
     fwd = np.empty((numPaths, numForwards, numForwards))
-    fwdB = np.zeros(numForwards)
 
     numTimes = numForwards
 
     if useSobol == 1:
-        numDimensions = numTimes
-        rands = getUniformSobol(halfNumPaths, numDimensions)
-        gMatrix = np.empty((numPaths, numTimes))
-        for iPath in range(0, halfNumPaths):
-            for j in range(0, numTimes):
-                u = rands[iPath, j]
-                g = norminvcdf(u)
-                gMatrix[iPath, j] = g
-                gMatrix[iPath + halfNumPaths, j] = -g
+        gMatrix = np.zeros((numPaths, numTimes))
+        if numTimes > 1:
+            stepTimes = np.cumsum(taus[0:numTimes-1])
+            pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+            gSobol = getSobolGaussianPaths(halfNumPaths, stepTimes, 1,
+                                           pathType, seed, pathOffset)
+            for iPath in range(0, halfNumPaths):
+                for j in range(0, numTimes-1):
+                    g = gSobol[iPath, j, 0]
+                    gMatrix[iPath, j] = g
+                    gMatrix[iPath + halfNumPaths, j] = -g
     elif useSobol == 0:
-        gMatrix = np.empty((numPaths, numTimes))
-        for iPath in range(0, halfNumPaths):
-            for j in range(0, numTimes):
-                g = np.random.normal()
-                gMatrix[iPath, j] = g
-                gMatrix[iPath + halfNumPaths, j] = -g
+        # Pseudo-randoms are drawn per path and step inside the parallel loop
+        gMatrix = np.empty((0, 0))
     else:
         raise FinError("Use Sobol must be 0 or 1")
 
     for iPath in prange(0, numPaths):
+
+        fwdB = np.zeros(numForwards)
+
+        basePath = pathOffset + iPath % halfNumPaths
+        sign = 1.0
+        if iPath >= halfNumPaths:
+            sign = -1.0
+
         # Initial value of forward curve at time 0
         for iFwd in range(0, numForwards):
             fwd[iPath, 0, iFwd] = fwd0[iFwd]
@@ -472,7 +478,11 @@ def LMMSimulateFwds1F(numForwards, numPaths, numeraireIndex, fwd0, gammas,
         for j in range(0, numForwards-1):  # TIME LOOP
             dtj = taus[j]
             sqrtdtj = np.sqrt(dtj)
-            w = gMatrix[iPath, j]
+
+            if useSobol == 1:
+                w = gMatrix[iPath, j]
+            else:
+                w = sign * counterNormal(seed, basePath, j)
 
             for k in range(j, numForwards):  # FORWARDS LOOP
                 zkj = gammas[k-j]
@@ -505,17 +515,19 @@ def LMMSimulateFwds1F(numForwards, numPaths, numeraireIndex, fwd0, gammas,
 ###############################################################################
 
 
-@jit(float64[:, :, :](int64, int64, int64, int64, float64[:], float64[:, :],
-                      float64[:], int64, int64),
-     cache=True, fastmath=True, parallel=True)
+@njit(cache=True, fastmath=True, parallel=True)
 def LMMSimulateFwdsMF(numForwards, numFactors, numPaths, numeraireIndex, fwd0,
-                      lambdas, taus, useSobol, seed):
+                      lambdas, taus, useSobol, seed, pathOffset=0):
     ''' Multi-Factor Arbitrage-free simulation of forward Libor curves in the
     spot measure following Hull Page 768. Given an initial forward curve,
     volatility factor term structure. The 3D matrix of forward rates by path,
-    time and forward point is returned. '''
-
-    np.random.seed(seed)
+    time and forward point is returned. If useSobol is 1 the shocks are
+    scrambled Sobol numbers with each factor built by a Brownian bridge over
+    the time steps. The seed sets the scrambling and pathOffset is the first
+    point of the Sobol sequence used. Otherwise the shocks of each antithetic
+    pair are keyed by the seed, the pair number plus pathOffset and the time
+    step. The pathOffset is the number of pairs simulated in earlier blocks.
+    '''
 
     if len(lambdas) != numFactors:
         raise FinError("Lambda does not have the right number of factors")
@@ -527,34 +539,39 @@ def LMMSimulateFwdsMF(numForwards, numFactors, numPaths, numeraireIndex, fwd0,
     numPaths = 2 * int(numPaths/2)
     halfNumPaths = int(numPaths/2)
     fwd = np.empty((numPaths, numForwards, numForwards))
-    fwdB = np.zeros(numForwards)
 
     numTimes = numForwards
 
     if useSobol == 1:
-        numDimensions = numTimes * numFactors
-        rands = getUniformSobol(halfNumPaths, numDimensions)
-        gMatrix = np.empty((numPaths, numTimes, numFactors))
-        for iPath in range(0, halfNumPaths):
-            for j in range(0, numTimes):
-                for q in range(0, numFactors):
-                    col = j*numFactors + q
-                    u = rands[iPath, col]
-                    g = norminvcdf(u)
-                    gMatrix[iPath, j, q] = g
-                    gMatrix[iPath + halfNumPaths, j, q] = -g
+        gMatrix = np.zeros((numPaths, numTimes, numFactors))
+        if numTimes > 1:
+            stepTimes = np.cumsum(taus[0:numTimes-1])
+            pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+            gSobol = getSobolGaussianPaths(halfNumPaths, stepTimes,
+                                           numFactors, pathType, seed,
+                                           pathOffset)
+            for iPath in range(0, halfNumPaths):
+                for j in range(0, numTimes-1):
+                    for q in range(0, numFactors):
+                        g = gSobol[iPath, j, q]
+                        gMatrix[iPath, j, q] = g
+                        gMatrix[iPath + halfNumPaths, j, q] = -g
     elif useSobol == 0:
-        gMatrix = np.empty((numPaths, numTimes, numFactors))
-        for iPath in range(0, halfNumPaths):
-            for j in range(0, numTimes):
-                for q in range(0, numFactors):
-                    g = np.random.normal()
-                    gMatrix[iPath, j, q] = g
-                    gMatrix[iPath + halfNumPaths, j, q] = -g
+        # Pseudo-randoms are drawn per path and step inside the parallel loop
+        gMatrix = np.empty((0, 0, 0))
     else:
         raise FinError("Use Sobol must be 0 or 1.")
 
-    for iPath in range(0, numPaths):
+    for iPath in prange(0, numPaths):
+
+        fwdB = np.zeros(numForwards)
+        g = np.zeros(numFactors)
+
+        basePath = pathOffset + iPath % halfNumPaths
+        sign = 1.0
+        if iPath >= halfNumPaths:
+            sign = -1.0
+
         # Initial value of forward curve at time 0
         for iFwd in range(0, numForwards):
             fwd[iPath, 0, iFwd] = fwd0[iFwd]
@@ -563,6 +580,14 @@ def LMMSimulateFwdsMF(numForwards, numFactors, numPaths, numeraireIndex, fwd0,
             dtj = taus[j]
             sqrtdtj = np.sqrt(dtj)
 
+            if useSobol == 1:
+                for q in range(0, numFactors):
+                    g[q] = gMatrix[iPath, j, q]
+            else:
+                counterNormals(seed, basePath, j, g)
+                for q in range(0, numFactors):
+                    g[q] = sign * g[q]
+
             for k in range(j, numForwards):  # FORWARDS LOOP
 
                 muA = 0.0
@@ -582,7 +607,7 @@ def LMMSimulateFwdsMF(numForwards, numFactors, numPaths, numeraireIndex, fwd0,
 
                 randomTerm = 0.0
                 for q in range(0, numFactors):
-                    wq = gMatrix[iPath, j, q]
+                    wq = g[q]
                     randomTerm += lambdas[q][k-j] * wq
                 randomTerm *= sqrtdtj
 
@@ -627,10 +652,15 @@ def LMMCapFlrPricer(numForwards, numPaths, K, fwd0, fwds, taus, isCap):
         raise FinError("NumPaths > MaxPaths")
 
     discFactor = np.zeros(numForwards)
-    capFlrLets = np.zeros(numForwards-1)
-    capFlrLetValues = np.zeros(numForwards-1)
+    capFlrLets = np.zeros(numForwards)
+    capFlrLetValues = np.zeros(numForwards)
     numeraire = np.zeros(numForwards)
 
+    # Set up initial term structure
+    discFactor[0] = 1.0 / (1.0 + fwd0[0] * taus[0])
+    for ix in range(1, numForwards):
+        discFactor[ix] = discFactor[ix-1] / (1.0 + fwd0[ix] * taus[ix])
+
     for iPath in range(0, numPaths):
 
         periodRoll = 1.0
@@ -739,63 +769,151 @@ def LMMSwapPricer(cpn, numPeriods, numPaths, fwd0, fwds, taus):
 ###############################################################################
 
 
-@njit(float64(float64, int64, int64, int64, float64[:], float64[:, :, :],
-              float64[:], int64), cache=True, fastmath=True, parallel=False)
-def LMMSwaptionPricer(strike, a, b, numPaths, fwd0, fwds, taus, isPayer):
-    ''' Function to price a European swaption using the simulated forward
-    curves. '''
+# Paths are split into this fixed number of chunks for parallel sums so that
+# the order of floating point additions does not depend on the thread count
+LMM_NUM_CHUNKS = 64
 
-    maxPaths = len(fwds)
-    maxForwards = len(fwds[0])
+###############################################################################
 
-    if a > maxForwards:
-        raise FinError("NumPeriods > numForwards")
 
-    if a >= b:
-        raise FinError("Swap maturity is before expiry date")
+@njit(float64[:](int64, float64[:, :, :], float64[:], int64[:], int64[:],
+                 float64[:], int64[:], int64[:], int64[:], int64[:],
+                 float64[:]), cache=True, fastmath=True, parallel=True)
+def LMMSwaptionPricerMulti(numPaths, fwds, taus, aVec, bVec, strikes,
+                           isPayers, fixedStart, fixedEnd, fixedIndices,
+                           fixedAccruals):
+    ''' Price a list of European swaptions in a single sweep over the
+    simulated forward curves. Swaption s expires at grid index aVec[s] and
+    the underlying swap matures at grid index bVec[s]. Its fixed leg pays on
+    the grid indices fixedIndices[fixedStart[s]:fixedEnd[s]] with accrual
+    factors taken from fixedAccruals. The numeraire and the discount factors
+    from each distinct expiry are computed once per path and shared by all
+    swaptions. Prices are per unit notional. '''
+
+    maxPaths = len(fwds)
+    numForwards = len(fwds[0])
+    numSwaptions = len(aVec)
 
     if numPaths > maxPaths:
         raise FinError("NumPaths > MaxPaths")
 
-    discFactor = np.zeros(maxForwards)
-#    pv01 = np.zeros(maxForwards)
+    for s in range(0, numSwaptions):
 
-    # Set up initial term structure
-    discFactor[0] = 1.0 / (1.0 + fwd0[0] * taus[0])
-    for ix in range(1, b):
-        discFactor[ix] = discFactor[ix-1] / (1.0 + fwd0[ix] * taus[ix])
+        if aVec[s] >= bVec[s]:
+            raise FinError("Swap maturity is before expiry date")
 
-    sumPayRecSwaption = 0.0
+        if bVec[s] > numForwards:
+            raise FinError("Swap maturity beyond numForwards.")
 
-    for iPath in range(0, numPaths):
+        if isPayers[s] != 0 and isPayers[s] != 1:
+            raise FinError("Unknown payRecSwaption value - must be 0 or 1")
 
-        numeraire = 1.0
-        for k in range(0, a):
-            numeraire *= (1.0 + taus[k] * fwds[iPath, k, k])
+    # Map each swaption onto the list of distinct expiry indices
+    expiryIndex = np.zeros(numSwaptions, dtype=np.int64)
+    uniqueExpiries = np.unique(aVec)
+    numExpiries = len(uniqueExpiries)
 
-        pv01 = 0.0
-        df = 1.0
+    for s in range(0, numSwaptions):
+        for u in range(0, numExpiries):
+            if uniqueExpiries[u] == aVec[s]:
+                expiryIndex[s] = u
 
-        # Value the swap as if we were at time a with forward curve known
-        for k in range(a, b):
-            f = fwds[iPath, a, k]
-            tau = taus[k]
-            df = df / (1.0 + tau * f)
-            pv01 = pv01 + tau * df
+    numChunks = min(LMM_NUM_CHUNKS, numPaths)
+    chunkSums = np.zeros((numChunks, numSwaptions))
 
-        fwdSwapRate = (1.0 - df) / pv01
+    for iChunk in prange(0, numChunks):
 
-        if isPayer == 1:
-            payRecSwaption = max(fwdSwapRate - strike, 0.0) * pv01
-        elif isPayer == 0:
-            payRecSwaption = max(strike - fwdSwapRate, 0.0) * pv01
-        else:
-            raise FinError("Unknown payRecSwaption value - must be 0 or 1")
+        startPath = (iChunk * numPaths) // numChunks
+        endPath = ((iChunk + 1) * numPaths) // numChunks
+
+        numeraire = np.zeros(numForwards + 1)
+        dfs = np.zeros((numExpiries, numForwards + 1))
+
+        for iPath in range(startPath, endPath):
+
+            # Spot measure numeraire rolled over the grid up to each index
+            numeraire[0] = 1.0
+            for k in range(0, numForwards):
+                numeraire[k+1] = numeraire[k] \
+                    * (1.0 + taus[k] * fwds[iPath, k, k])
+
+            # Discount factors from each expiry to the later grid dates
+            for u in range(0, numExpiries):
+                a = uniqueExpiries[u]
+                df = 1.0
+                dfs[u, a] = 1.0
+                for k in range(a, numForwards):
+                    df = df / (1.0 + taus[k] * fwds[iPath, a, k])
+                    dfs[u, k+1] = df
+
+            for s in range(0, numSwaptions):
+
+                u = expiryIndex[s]
+                a = aVec[s]
+                b = bVec[s]
+
+                pv01 = 0.0
+                for i in range(fixedStart[s], fixedEnd[s]):
+                    pv01 += fixedAccruals[i] * dfs[u, fixedIndices[i]]
+
+                floatLeg = 1.0 - dfs[u, b]
+                fixedLeg = strikes[s] * pv01
+
+                if isPayers[s] == 1:
+                    payoff = max(floatLeg - fixedLeg, 0.0)
+                else:
+                    payoff = max(fixedLeg - floatLeg, 0.0)
+
+                chunkSums[iChunk, s] += payoff / (abs(numeraire[a]) + 1e-10)
+
+    prices = np.zeros(numSwaptions)
+    for iChunk in range(0, numChunks):
+        for s in range(0, numSwaptions):
+            prices[s] += chunkSums[iChunk, s]
+
+    for s in range(0, numSwaptions):
+        prices[s] /= numPaths
+
+    return prices
+
+###############################################################################
+
+
+@njit(float64(float64, int64, int64, int64, float64[:], float64[:, :, :],
+              float64[:], int64), cache=True, fastmath=True)
+def LMMSwaptionPricer(strike, a, b, numPaths, fwd0, fwds, taus, isPayer):
+    ''' Function to price a European swaption using the simulated forward
+    curves. The fixed leg pays on every grid date between the expiry and the
+    swap maturity. '''
+
+    maxForwards = len(fwds[0])
+
+    if a > maxForwards:
+        raise FinError("NumPeriods > numForwards")
+
+    if a >= b:
+        raise FinError("Swap maturity is before expiry date")
+
+    numFixed = b - a
+    fixedIndices = np.zeros(numFixed, dtype=np.int64)
+    fixedAccruals = np.zeros(numFixed)
+
+    for k in range(a, b):
+        fixedIndices[k-a] = k + 1
+        fixedAccruals[k-a] = taus[k]
 
-        sumPayRecSwaption += payRecSwaption / (abs(numeraire) + 1e-10)
+    aVec = np.array([a], dtype=np.int64)
+    bVec = np.array([b], dtype=np.int64)
+    strikes = np.array([strike])
+    isPayers = np.array([isPayer], dtype=np.int64)
+    fixedStart = np.array([0], dtype=np.int64)
+    fixedEnd = np.array([numFixed], dtype=np.int64)
 
-    payRecPrice = sumPayRecSwaption / numPaths
-    return payRecPrice
+    prices = LMMSwaptionPricerMulti(numPaths, fwds, taus, aVec, bVec,
+                                    strikes, isPayers, fixedStart, fixedEnd,
+                                    fixedIndices, fixedAccruals)
+
+    return prices[0]
 
 ###############################################################################
 
@@ -974,3 +1092,160 @@ def LMMStickyCapletPricer(spread, numPeriods, numPaths, fwd0, fwds, taus):
     return stickyCapletValues
 
 ###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def LMMBermudanExerciseData(numPaths, fwds, taus, exerciseIndices, b, strike,
+                            isPayer, fixedIndices, fixedAccruals):
+    ''' Calculate on each path and at each exercise date of a Bermudan the
+    value of exercising into the remaining swap which matures at grid index
+    b. The fixed leg pays on the grid indices fixedIndices with accrual
+    factors fixedAccruals and exercise is allowed at the grid indices in
+    exerciseIndices. Returns the undeflated exercise values together with the
+    forward swap rate, the annuity and the spot measure numeraire at each
+    exercise date. These are the only path data needed by the Longstaff-
+    Schwartz regression so the memory is numPaths x numExercises. '''
+
+    maxPaths = len(fwds)
+    numForwards = len(fwds[0])
+    numExercises = len(exerciseIndices)
+    numFixed = len(fixedIndices)
+
+    if numPaths > maxPaths:
+        raise FinError("NumPaths > MaxPaths")
+
+    if b > numForwards:
+        raise FinError("Swap maturity beyond numForwards.")
+
+    for e in range(0, numExercises):
+        if exerciseIndices[e] >= b:
+            raise FinError("Exercise date after swap maturity.")
+
+    exerciseValues = np.zeros((numPaths, numExercises))
+    swapRates = np.zeros((numPaths, numExercises))
+    annuities = np.zeros((numPaths, numExercises))
+    numeraires = np.zeros((numPaths, numExercises))
+
+    for iPath in prange(0, numPaths):
+
+        numeraire = np.zeros(numForwards + 1)
+        dfs = np.zeros(numForwards + 1)
+
+        numeraire[0] = 1.0
+        for k in range(0, numForwards):
+            numeraire[k+1] = numeraire[k] \
+                * (1.0 + taus[k] * fwds[iPath, k, k])
+
+        for e in range(0, numExercises):
+
+            a = exerciseIndices[e]
+
+            df = 1.0
+            dfs[a] = 1.0
+            for k in range(a, b):
+                df = df / (1.0 + taus[k] * fwds[iPath, a, k])
+                dfs[k+1] = df
+
+            annuity = 0.0
+            for j in range(0, numFixed):
+                if fixedIndices[j] > a:
+                    annuity += fixedAccruals[j] * dfs[fixedIndices[j]]
+
+            floatLeg = 1.0 - dfs[b]
+
+            if isPayer == 1:
+                exerciseValues[iPath, e] = floatLeg - strike * annuity
+            else:
+                exerciseValues[iPath, e] = strike * annuity - floatLeg
+
+            swapRates[iPath, e] = floatLeg / annuity
+            annuities[iPath, e] = annuity
+            numeraires[iPath, e] = numeraire[a]
+
+    return exerciseValues, swapRates, annuities, numeraires
+
+###############################################################################
+
+
+def LMMRegressionBasis(swapRates, annuities):
+    ''' Basis functions of the Longstaff-Schwartz regression of continuation
+    values. These are a cubic in the forward swap rate, the annuity and the
+    cross term. '''
+
+    return np.column_stack((np.ones(len(swapRates)),
+                            swapRates,
+                            swapRates * swapRates,
+                            swapRates * swapRates * swapRates,
+                            annuities,
+                            annuities * swapRates))
+
+###############################################################################
+
+
+def LMMBermudanLSMC(exerciseValues, swapRates, annuities, numeraires,
+                    regressionCoeffs=None):
+    ''' Value a Bermudan per unit notional by Longstaff-Schwartz. If no
+    regression coefficients are provided then the continuation value at each
+    exercise date except the last is regressed on the in-the-money paths,
+    working backwards, and the coefficients are returned with the value.
+    Only the coefficients are kept per exercise date. A date with no paths in
+    the money is not fitted and its row of coefficients is set to NaN. If
+    coefficients from an earlier fit are passed in then the exercise rule they
+    define is applied to the paths without any regression, and there is no
+    exercise on a date with a NaN row. On an independent set of paths this
+    gives a low-biased estimate. '''
+
+    numPaths, numExercises = exerciseValues.shape
+    payoffs = np.maximum(exerciseValues, 0.0) / numeraires
+
+    if regressionCoeffs is None:
+
+        numBasis = LMMRegressionBasis(swapRates[:1, 0],
+                                      annuities[:1, 0]).shape[1]
+
+        regressionCoeffs = np.full((numExercises - 1, numBasis), np.nan)
+
+        # Deflated cash flows from following the exercise rule from the end
+        cashFlows = payoffs[:, numExercises - 1].copy()
+
+        for e in range(numExercises - 2, -1, -1):
+
+            itm = exerciseValues[:, e] > 0.0
+
+            if not np.any(itm):
+                continue
+
+            basis = LMMRegressionBasis(swapRates[itm, e], annuities[itm, e])
+            y = cashFlows[itm] * numeraires[itm, e]
+            coeffs = np.linalg.lstsq(basis, y, rcond=None)[0]
+            regressionCoeffs[e] = coeffs
+
+            exercise = exerciseValues[itm, e] > basis @ coeffs
+            cashFlows[np.where(itm)[0][exercise]] = payoffs[itm, e][exercise]
+
+        return np.mean(cashFlows), regressionCoeffs
+
+    if len(regressionCoeffs) != numExercises - 1:
+        raise FinError("Regression coefficients do not match exercise dates")
+
+    cashFlows = np.zeros(numPaths)
+    alive = np.ones(numPaths, dtype=bool)
+
+    for e in range(0, numExercises - 1):
+
+        # No paths were in the money on this date when the rule was fitted
+        if np.any(np.isnan(regressionCoeffs[e])):
+            continue
+
+        itm = alive & (exerciseValues[:, e] > 0.0)
+        basis = LMMRegressionBasis(swapRates[itm, e], annuities[itm, e])
+        exercise = exerciseValues[itm, e] > basis @ regressionCoeffs[e]
+        exerciseIndices = np.where(itm)[0][exercise]
+        cashFlows[exerciseIndices] = payoffs[exerciseIndices, e]
+        alive[exerciseIndices] = False
+
+    cashFlows[alive] = payoffs[alive, numExercises - 1]
+
+    return np.mean(cashFlows), regressionCoeffs
+
+###############################################################################
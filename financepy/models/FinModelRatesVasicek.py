@@ -3,8 +3,9 @@
 ##############################################################################
 
 from math import sqrt, exp
-from numba import njit, float64, int64
+from numba import njit, prange, float64, int64
 import numpy as np
+from ..finutils.FinRandom import counterNormals
 from ..finutils.FinHelperFunctions import labelToString
 
 ##########################################################################
@@ -62,7 +63,6 @@ def zeroPrice(r0, a, b, sigma, t):
 @njit(float64[:](float64, float64, float64, float64, float64, float64, int64))
 def ratePath_MC(r0, a, b, sigma, t, dt, seed):
 
-    np.random.seed(seed)
     numSteps = int(t / dt)
     ratePath = np.zeros(numSteps)
     ratePath[0] = r0
@@ -73,7 +73,8 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed):
     for iPath in range(0, numPaths):
 
         r = r0
-        z = np.random.normal(0.0, 1.0, size=(numSteps - 1))
+        z = np.empty(numSteps - 1)
+        counterNormals(seed, iPath, 0, z)
 
         for iStep in range(1, numSteps):
             r = r + a * (b - r) * dt + z[iStep - 1] * sigmasqrtdt
@@ -85,15 +86,15 @@ def ratePath_MC(r0, a, b, sigma, t, dt, seed):
 
 
 @njit(float64(float64, float64, float64, float64, float64,
-      float64, int64, int64), fastmath=True, cache=True)
+      float64, int64, int64), fastmath=True, cache=True, parallel=True)
 def zeroPrice_MC(r0, a, b, sigma, t, dt, numPaths, seed):
 
-    np.random.seed(seed)
     numSteps = int(t / dt)
     sigmasqrtdt = sigma * sqrt(dt)
     zcb = 0.0
-    for iPath in range(0, numPaths):
-        z = np.random.normal(0.0, 1.0, size=(numSteps))
+    for iPath in prange(0, numPaths):
+        z = np.empty(numSteps)
+        counterNormals(seed, iPath, 0, z)
         rsum = 0.0
         r = r0
         for iStep in range(0, numSteps):
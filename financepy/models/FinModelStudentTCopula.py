@@ -5,8 +5,11 @@
 from math import sqrt
 import numpy as np
 from scipy.stats import t as student
+from scipy.stats import chi2 as chiSquared
+from scipy.stats import norm
 
 from ..finutils.FinHelperFunctions import uniformToDefaultTime
+from ..finutils.FinRandom import getCounterNormals
 
 ###############################################################################
 
@@ -19,17 +22,23 @@ class FinModelStudentTCopula():
                      degreesOfFreedom,
                      numTrials,
                      seed):
+        ''' Generate a matrix of default times by credit and trial using a
+        Student-t copula with a full rank correlation matrix. The normals of
+        each trial come from the counter-based generator and one more normal
+        per trial is mapped to the chi-squared draw by its inverse CDF. '''
 
-        np.random.seed(seed)
         numCredits = len(issuerCurves)
-        x = np.random.normal(0.0, 1.0, size=(numCredits, numTrials))
+        g = getCounterNormals(seed, numTrials, numCredits + 1)
+        x = g[:, 0:numCredits].T
         c = np.linalg.cholesky(correlationMatrix)
         y = np.dot(c, x)
 
+        chi2s = chiSquared.ppf(norm.cdf(g[:, numCredits]), degreesOfFreedom)
+
         corrTimes = np.empty(shape=(numCredits, 2 * numTrials))
 
         for iTrial in range(0, numTrials):
-            chi2 = np.random.chisquare(degreesOfFreedom)
+            chi2 = chi2s[iTrial]
             c = sqrt(chi2 / degreesOfFreedom)
             for iCredit in range(0, numCredits):
                 issuerCurve = issuerCurves[iCredit]
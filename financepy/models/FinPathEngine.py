@@ -0,0 +1,595 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+''' A single Monte-Carlo path engine for correlated multi-asset processes.
+The engine is set up with a time grid, a model type with one row of model
+parameters per asset and a correlation matrix between the asset Brownian
+motions. Paths are generated in parallel in fixed-size blocks and each block
+is passed to any number of payoff functions so that many products can be
+valued from one set of paths in a single pass. Memory is bounded by the
+block size. The random numbers are keyed by the path number so the results
+do not depend on the block size or on the number of threads. '''
+
+import numpy as np
+from numba import njit, prange
+from enum import Enum
+
+from ..finutils.FinError import FinError
+from ..finutils.FinMath import cholesky
+from ..finutils.FinRandom import counterNormals
+from ..finutils.FinSobol import getSobolGaussianPaths, FinSobolPathTypes
+from ..finutils.FinHelperFunctions import labelToString
+
+###############################################################################
+
+
+class FinPathModelTypes(Enum):
+    ''' The model followed by each asset. The columns of the model parameter
+    array for each model are:
+
+    GBM         - [s0, mu, sigma]
+    HESTON      - [s0, mu, v0, kappa, theta, sigma, rho]
+    LOCAL_VOL   - [s0, mu]
+    VASICEK     - [r0, kappa, theta, sigma]
+    CIR         - [r0, kappa, theta, sigma]
+    HULL_WHITE  - [a, sigma]
+
+    Here mu is the risk-neutral drift. For HESTON rho is the correlation
+    between the asset and its own variance. The local volatility is set by a
+    surface of volatilities on a grid of times and asset levels. Hull-White
+    is fitted to a discount curve. '''
+
+    GBM = 1
+    HESTON = 2
+    LOCAL_VOL = 3
+    VASICEK = 4
+    CIR = 5
+    HULL_WHITE = 6
+
+
+MODEL_NUM_PARAMS = {FinPathModelTypes.GBM: 3,
+                    FinPathModelTypes.HESTON: 7,
+                    FinPathModelTypes.LOCAL_VOL: 2,
+                    FinPathModelTypes.VASICEK: 4,
+                    FinPathModelTypes.CIR: 4,
+                    FinPathModelTypes.HULL_WHITE: 2}
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True)
+def interpolateLocalVol(lvTimes, lvSpots, lvVols, t, s):
+    ''' Bilinear interpolation of a local volatility surface given on a grid
+    of times and asset levels. The surface is flat outside the grid. '''
+
+    nT = len(lvTimes)
+    nS = len(lvSpots)
+
+    if t <= lvTimes[0]:
+        i = 0
+        wt = 0.0
+    elif t >= lvTimes[nT-1]:
+        i = nT - 2
+        wt = 1.0
+    else:
+        i = np.searchsorted(lvTimes, t) - 1
+        wt = (t - lvTimes[i]) / (lvTimes[i+1] - lvTimes[i])
+
+    if s <= lvSpots[0]:
+        j = 0
+        ws = 0.0
+    elif s >= lvSpots[nS-1]:
+        j = nS - 2
+        ws = 1.0
+    else:
+        j = np.searchsorted(lvSpots, s) - 1
+        ws = (s - lvSpots[j]) / (lvSpots[j+1] - lvSpots[j])
+
+    if nT == 1:
+        i = 0
+        wt = 0.0
+        i1 = 0
+    else:
+        i1 = i + 1
+
+    if nS == 1:
+        j = 0
+        ws = 0.0
+        j1 = 0
+    else:
+        j1 = j + 1
+
+    v0 = lvVols[i, j] * (1.0 - ws) + lvVols[i, j1] * ws
+    v1 = lvVols[i1, j] * (1.0 - ws) + lvVols[i1, j1] * ws
+    return v0 * (1.0 - wt) + v1 * wt
+
+###############################################################################
+
+
+@njit(cache=True, fastmath=True, parallel=True)
+def simulatePathBlock(modelType, gridTimes, params, shifts, corrChol,
+                      lvTimes, lvSpots, lvVols, firstPath, numPaths, seed,
+                      antithetic, gSobol):
+    ''' Simulate a block of numPaths paths starting at global path number
+    firstPath. Returns an array of shape numPaths x numTimes x numAssets. The
+    first column of the time grid must be zero. If gSobol has any rows then
+    it holds the independent normals by path, step and factor. Otherwise the
+    normals are drawn from the counter-based generator keyed by the global
+    path number. With antithetic set the paths come in pairs with shocks of
+    opposite sign. '''
+
+    numAssets = params.shape[0]
+    numTimes = len(gridTimes)
+
+    if modelType == FinPathModelTypes.HESTON.value:
+        numFactors = 2 * numAssets
+    else:
+        numFactors = numAssets
+
+    useSobol = gSobol.shape[0] > 0
+
+    paths = np.empty((numPaths, numTimes, numAssets))
+
+    for p in prange(0, numPaths):
+
+        iPath = firstPath + p
+        sign = 1.0
+        if antithetic:
+            basePath = iPath // 2
+            if iPath % 2 == 1:
+                sign = -1.0
+        else:
+            basePath = iPath
+
+        z = np.empty(numFactors)
+        w = np.empty(numAssets)
+        x = np.empty(numAssets)
+        v = np.empty(numAssets)
+
+        # The state is the log asset level or the short rate factor
+        for a in range(0, numAssets):
+
+            if modelType == FinPathModelTypes.HULL_WHITE.value:
+                x[a] = 0.0
+                paths[p, 0, a] = shifts[a, 0]
+            elif modelType == FinPathModelTypes.VASICEK.value or \
+                    modelType == FinPathModelTypes.CIR.value:
+                x[a] = params[a, 0]
+                paths[p, 0, a] = x[a]
+            else:
+                x[a] = np.log(params[a, 0])
+                paths[p, 0, a] = params[a, 0]
+
+            if modelType == FinPathModelTypes.HESTON.value:
+                v[a] = params[a, 2]
+
+        for i in range(1, numTimes):
+
+            t = gridTimes[i-1]
+            dt = gridTimes[i] - t
+            sdt = np.sqrt(dt)
+
+            if useSobol:
+                for k in range(0, numFactors):
+                    z[k] = sign * gSobol[p, i-1, k]
+            else:
+                counterNormals(seed, basePath, i, z)
+                for k in range(0, numFactors):
+                    z[k] = sign * z[k]
+
+            for a in range(0, numAssets):
+                wa = 0.0
+                for b in range(0, a + 1):
+                    wa += corrChol[a, b] * z[b]
+                w[a] = wa
+
+            for a in range(0, numAssets):
+
+                if modelType == FinPathModelTypes.GBM.value:
+                    mu = params[a, 1]
+                    sigma = params[a, 2]
+                    x[a] += (mu - 0.5 * sigma * sigma) * dt + \
+                        sigma * sdt * w[a]
+                    paths[p, i, a] = np.exp(x[a])
+
+                elif modelType == FinPathModelTypes.HESTON.value:
+                    # Log-Euler with full truncation of the variance
+                    mu = params[a, 1]
+                    kappa = params[a, 3]
+                    theta = params[a, 4]
+                    sigma = params[a, 5]
+                    rho = params[a, 6]
+                    vplus = max(v[a], 0.0)
+                    rtv = np.sqrt(vplus)
+                    zV = rho * w[a] + np.sqrt(1.0 - rho * rho) * \
+                        z[numAssets + a]
+                    x[a] += (mu - 0.5 * vplus) * dt + rtv * sdt * w[a]
+                    v[a] += kappa * (theta - vplus) * dt + \
+                        sigma * rtv * sdt * zV
+                    paths[p, i, a] = np.exp(x[a])
+
+                elif modelType == FinPathModelTypes.LOCAL_VOL.value:
+                    mu = params[a, 1]
+                    sigma = interpolateLocalVol(lvTimes, lvSpots, lvVols[a],
+                                                t, np.exp(x[a]))
+                    x[a] += (mu - 0.5 * sigma * sigma) * dt + \
+                        sigma * sdt * w[a]
+                    paths[p, i, a] = np.exp(x[a])
+
+                elif modelType == FinPathModelTypes.VASICEK.value:
+                    # Exact Gaussian transition
+                    kappa = params[a, 1]
+                    theta = params[a, 2]
+                    sigma = params[a, 3]
+                    ekt = np.exp(-kappa * dt)
+                    sd = sigma * np.sqrt((1.0 - ekt * ekt) / 2.0 / kappa)
+                    x[a] = x[a] * ekt + theta * (1.0 - ekt) + sd * w[a]
+                    paths[p, i, a] = x[a]
+
+                elif modelType == FinPathModelTypes.CIR.value:
+                    # Euler with full truncation
+                    kappa = params[a, 1]
+                    theta = params[a, 2]
+                    sigma = params[a, 3]
+                    rplus = max(x[a], 0.0)
+                    x[a] += kappa * (theta - rplus) * dt + \
+                        sigma * np.sqrt(rplus) * sdt * w[a]
+                    paths[p, i, a] = x[a]
+
+                elif modelType == FinPathModelTypes.HULL_WHITE.value:
+                    # Exact transition of the factor x = r - phi(t)
+                    aHW = params[a, 0]
+                    sigma = params[a, 1]
+                    ead = np.exp(-aHW * dt)
+                    sd = sigma * np.sqrt((1.0 - ead * ead) / 2.0 / aHW)
+                    x[a] = x[a] * ead + sd * w[a]
+                    paths[p, i, a] = x[a] + shifts[a, i]
+
+    return paths
+
+###############################################################################
+
+
+class FinPathEngine():
+    ''' Monte-Carlo engine which simulates correlated paths for a number of
+    assets that follow the same type of model on a common time grid. The
+    paths are delivered in blocks to payoff functions so that many payoffs
+    can be valued over one set of paths. '''
+
+    def __init__(self,
+                 gridTimes: (list, np.ndarray),
+                 modelType: FinPathModelTypes,
+                 modelParams: np.ndarray,
+                 corrMatrix: np.ndarray = None,
+                 discountCurve=None,
+                 localVolTimes: np.ndarray = None,
+                 localVolSpots: np.ndarray = None,
+                 localVolSurfaces: np.ndarray = None):
+        ''' Create the engine from the simulation times in years, which must
+        be positive and increasing, the model type and a 2D array of model
+        parameters with one row per asset. See FinPathModelTypes for the
+        columns. The correlation matrix is between the asset Brownian motions
+        and defaults to the identity. The Hull-White model needs the discount
+        curve it fits. The local volatility model needs a surface for each
+        asset on a common grid of times and asset levels. '''
+
+        if isinstance(modelType, FinPathModelTypes) is False:
+            raise FinError("Model type must be a FinPathModelTypes.")
+
+        gridTimes = np.array(gridTimes, dtype=np.float64)
+
+        if len(gridTimes) == 0 or gridTimes[0] <= 0.0:
+            raise FinError("Grid times must be positive.")
+
+        if np.any(np.diff(gridTimes) <= 0.0):
+            raise FinError("Grid times must be increasing.")
+
+        modelParams = np.atleast_2d(np.array(modelParams, dtype=np.float64))
+
+        if modelParams.shape[1] != MODEL_NUM_PARAMS[modelType]:
+            raise FinError("Model parameters need " +
+                           str(MODEL_NUM_PARAMS[modelType]) + " columns.")
+
+        numAssets = modelParams.shape[0]
+
+        if corrMatrix is None:
+            corrMatrix = np.eye(numAssets)
+
+        corrMatrix = np.array(corrMatrix, dtype=np.float64)
+
+        if corrMatrix.shape != (numAssets, numAssets):
+            raise FinError("Correlation matrix must be numAssets squared.")
+
+        self._modelType = modelType
+        self._gridTimes = np.concatenate((np.zeros(1), gridTimes))
+        self._modelParams = modelParams
+        self._numAssets = numAssets
+        self._corrMatrix = corrMatrix
+        self._corrChol = cholesky(corrMatrix)
+
+        numTimes = len(self._gridTimes)
+        self._shifts = np.zeros((numAssets, numTimes))
+
+        if modelType == FinPathModelTypes.HULL_WHITE:
+
+            if discountCurve is None:
+                raise FinError("Hull-White needs a discount curve.")
+
+            if np.any(modelParams[:, 0] <= 0.0):
+                raise FinError("Hull-White mean reversion must be positive.")
+
+            # The shift phi(t) fits the initial curve
+            h = 1.0 / 365.0
+            t = self._gridTimes
+            dfs = np.array(discountCurve._df(t), dtype=np.float64)
+            dfsBump = np.array(discountCurve._df(t + h), dtype=np.float64)
+            fwds = -np.log(dfsBump / dfs) / h
+
+            for a in range(0, numAssets):
+                aHW = modelParams[a, 0]
+                sigma = modelParams[a, 1]
+                B = (1.0 - np.exp(-aHW * t)) / aHW
+                self._shifts[a] = fwds + 0.5 * (sigma * B)**2
+
+        if modelType == FinPathModelTypes.LOCAL_VOL:
+
+            if localVolTimes is None or localVolSpots is None or \
+               localVolSurfaces is None:
+                raise FinError("Local volatility needs a surface grid.")
+
+            lvTimes = np.array(localVolTimes, dtype=np.float64)
+            lvSpots = np.array(localVolSpots, dtype=np.float64)
+            lvVols = np.array(localVolSurfaces, dtype=np.float64)
+
+            if lvVols.ndim == 2:
+                lvVols = np.array([lvVols] * numAssets)
+
+            if lvVols.shape != (numAssets, len(lvTimes), len(lvSpots)):
+                raise FinError("Local volatility surface has wrong shape.")
+
+        else:
+            lvTimes = np.zeros(1)
+            lvSpots = np.zeros(1)
+            lvVols = np.zeros((1, 1, 1))
+
+        self._lvTimes = lvTimes
+        self._lvSpots = lvSpots
+        self._lvVols = lvVols
+
+###############################################################################
+
+    def _numFactors(self):
+        ''' Number of independent Brownian motions per path. '''
+
+        if self._modelType == FinPathModelTypes.HESTON:
+            return 2 * self._numAssets
+        else:
+            return self._numAssets
+
+###############################################################################
+
+    def _simulateBlock(self, firstPath, numPaths, seed, antithetic, useSobol):
+        ''' Simulate one block of paths. With Sobol the block continues the
+        scrambled sequence from the point reached by the earlier blocks. '''
+
+        if useSobol:
+            numPoints = numPaths
+            skip = firstPath
+            if antithetic:
+                numPoints = (numPaths + 1) // 2
+                skip = firstPath // 2
+
+            stepTimes = self._gridTimes[1:]
+            pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+            gSobol = getSobolGaussianPaths(numPoints, stepTimes,
+                                           self._numFactors(), pathType,
+                                           seed, skip)
+            if antithetic:
+                # Both paths of a pair read the same Sobol point
+                gSobol = np.repeat(gSobol, 2, axis=0)[0:numPaths]
+        else:
+            gSobol = np.zeros((0, 0, 0))
+
+        return simulatePathBlock(self._modelType.value,
+                                 self._gridTimes,
+                                 self._modelParams,
+                                 self._shifts,
+                                 self._corrChol,
+                                 self._lvTimes,
+                                 self._lvSpots,
+                                 self._lvVols,
+                                 firstPath,
+                                 numPaths,
+                                 seed,
+                                 antithetic,
+                                 gSobol)
+
+###############################################################################
+
+    def getPaths(self,
+                 numPaths: int = 10000,
+                 seed: int = 4242,
+                 antithetic: bool = False,
+                 useSobol: bool = False):
+        ''' Return the simulated paths as an array of shape numPaths x
+        (numTimes + 1) x numAssets. The first time is zero. For the rate
+        models the paths are short rates. '''
+
+        if numPaths < 1:
+            raise FinError("Number of paths must be positive.")
+
+        return self._simulateBlock(0, numPaths, seed, antithetic, useSobol)
+
+###############################################################################
+
+    def valueMC(self,
+                payoffFunctions: list,
+                numPaths: int = 10000,
+                seed: int = 4242,
+                numPathsPerBlock: int = 10000,
+                antithetic: bool = False,
+                useSobol: bool = False):
+        ''' Value a list of payoffs over one set of simulated paths. For each
+        block each payoff function is called as payoffFunction(gridTimes,
+        paths) with paths of shape numPathsInBlock x (numTimes + 1) x
+        numAssets. It must return the discounted payoff per path as a vector
+        or as a numPathsInBlock x K array. Returns the mean and the standard
+        error of each payoff as lists in the same order as the payoffs. With
+        antithetic set the paths come in pairs with opposite shocks and the
+        standard error is computed from the pair averages. '''
+
+        if numPathsPerBlock < 1:
+            raise FinError("Number of paths per block must be positive.")
+
+        if callable(payoffFunctions):
+            payoffFunctions = [payoffFunctions]
+
+        if antithetic:
+            # Keep the pairs together in a block
+            numPaths = 2 * max(int(numPaths / 2), 1)
+            numPathsPerBlock = 2 * max(int(numPathsPerBlock / 2), 1)
+
+        numPayoffs = len(payoffFunctions)
+        sumV = [0.0] * numPayoffs
+        sumV2 = [0.0] * numPayoffs
+        numPathsDone = 0
+
+        while numPathsDone < numPaths:
+
+            n = min(numPathsPerBlock, numPaths - numPathsDone)
+            paths = self._simulateBlock(numPathsDone, n, seed, antithetic,
+                                        useSobol)
+
+            for i in range(0, numPayoffs):
+
+                v = np.asarray(payoffFunctions[i](self._gridTimes, paths))
+
+                if v.shape[0] != n:
+                    raise FinError("Payoff must return one row per path.")
+
+                if antithetic:
+                    v = 0.5 * (v[0::2] + v[1::2])
+
+                sumV[i] = sumV[i] + np.sum(v, axis=0)
+                sumV2[i] = sumV2[i] + np.sum(v * v, axis=0)
+
+            numPathsDone += n
+
+        numSamples = numPaths
+        if antithetic:
+            numSamples = numPaths // 2
+
+        values = []
+        stdErrs = []
+
+        for i in range(0, numPayoffs):
+            value = sumV[i] / numSamples
+            variance = np.maximum(sumV2[i] / numSamples - value * value, 0.0)
+            values.append(value)
+            stdErrs.append(np.sqrt(variance / numSamples))
+
+        return {'value': values, 'stderr': stdErrs}
+
+###############################################################################
+
+    def valueMCControlVariates(self,
+                               payoffFunction,
+                               controlFunction,
+                               controlMeans: (list, np.ndarray),
+                               numPaths: int = 10000,
+                               seed: int = 4242,
+                               numPathsPerBlock: int = 10000,
+                               antithetic: bool = False,
+                               useSobol: bool = False):
+        ''' Value one payoff with a set of control variates whose means are
+        known. Both functions are called as function(gridTimes, paths) for
+        each block. The payoff function returns the discounted payoff per
+        path and the control function returns a numPathsInBlock x K array of
+        discounted control payoffs with the K known means. Only the sums of
+        the payoffs, the controls and their cross products are kept from one
+        block to the next so the memory is set by the block size. The
+        control coefficients are found by regression at the end. Returns the
+        controlled value and standard error, the plain Monte-Carlo value and
+        standard error and the coefficients. '''
+
+        if numPathsPerBlock < 1:
+            raise FinError("Number of paths per block must be positive.")
+
+        controlMeans = np.atleast_1d(np.array(controlMeans, dtype=np.float64))
+        numControls = len(controlMeans)
+
+        if antithetic:
+            numPaths = 2 * max(int(numPaths / 2), 1)
+            numPathsPerBlock = 2 * max(int(numPathsPerBlock / 2), 1)
+
+        sumV = 0.0
+        sumV2 = 0.0
+        sumC = np.zeros(numControls)
+        sumCC = np.zeros((numControls, numControls))
+        sumVC = np.zeros(numControls)
+        numPathsDone = 0
+
+        while numPathsDone < numPaths:
+
+            n = min(numPathsPerBlock, numPaths - numPathsDone)
+            paths = self._simulateBlock(numPathsDone, n, seed, antithetic,
+                                        useSobol)
+
+            v = np.asarray(payoffFunction(self._gridTimes, paths))
+            c = np.asarray(controlFunction(self._gridTimes, paths))
+            c = c.reshape(n, numControls)
+
+            if v.shape[0] != n:
+                raise FinError("Payoff must return one value per path.")
+
+            if antithetic:
+                v = 0.5 * (v[0::2] + v[1::2])
+                c = 0.5 * (c[0::2] + c[1::2])
+
+            sumV += np.sum(v)
+            sumV2 += np.sum(v * v)
+            sumC += np.sum(c, axis=0)
+            sumCC += c.T @ c
+            sumVC += c.T @ v
+
+            numPathsDone += n
+
+        numSamples = numPaths
+        if antithetic:
+            numSamples = numPaths // 2
+
+        meanV = sumV / numSamples
+        meanC = sumC / numSamples
+        varV = max(sumV2 / numSamples - meanV * meanV, 0.0)
+        covCC = sumCC / numSamples - np.outer(meanC, meanC)
+        covVC = sumVC / numSamples - meanV * meanC
+
+        beta = np.linalg.lstsq(covCC, covVC, rcond=None)[0]
+
+        value = meanV - np.dot(beta, meanC - controlMeans)
+        varCV = max(varV - np.dot(beta, covVC), 0.0)
+
+        return {'value': value,
+                'stderr': np.sqrt(varCV / numSamples),
+                'valueMC': meanV,
+                'stderrMC': np.sqrt(varV / numSamples),
+                'beta': beta}
+
+###############################################################################
+
+    def __repr__(self):
+        s = labelToString("OBJECT TYPE", type(self).__name__)
+        s += labelToString("MODEL TYPE", self._modelType)
+        s += labelToString("NUM ASSETS", self._numAssets)
+        s += labelToString("NUM TIMES", len(self._gridTimes) - 1)
+        s += labelToString("MODEL PARAMS", self._modelParams)
+        s += labelToString("CORRELATION", self._corrMatrix, "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        print(self)
+
+###############################################################################
@@ -5,11 +5,14 @@
 from math import sqrt, exp, log
 from enum import Enum
 
-from numba import njit, float64, int64
+from numba import njit, float64, int64, prange
 import numpy as np
 
 from ..finutils.FinError import FinError
 from ..finutils.FinMath import norminvcdf
+from ..finutils.FinRandom import counterNormal, counterNormals
+from ..finutils.FinRandom import counterUniforms
+from ..finutils.FinSobol import getSobolGaussianPaths, FinSobolPathTypes
 from ..finutils.FinHelperFunctions import labelToString
 
 ###############################################################################
@@ -22,6 +25,7 @@ class FinProcessTypes(Enum):
     VASICEK = 4
     CEV = 5
     JUMP_DIFFUSION = 6
+    LOCAL_VOL = 7
 
 ###############################################################################
 
@@ -82,6 +86,12 @@ class FinProcessSimulator():
                                 r0, kappa, theta, sigma, scheme.value, seed)
             return paths
 
+        elif processType == FinProcessTypes.LOCAL_VOL:
+            (stockPrice, localVolModel) = modelParams
+            paths = localVolModel.getPaths(numPaths, numAnnSteps, t,
+                                           stockPrice, seed)
+            return paths
+
         else:
             raise FinError("Unknown process" + str(processType))
 
@@ -96,39 +106,63 @@ class FinHestonNumericalScheme(Enum):
 ###############################################################################
 
 
-@njit(float64[:, :](int64, int64, float64, float64, float64, float64, float64,
-                    float64, float64, float64, int64, int64),
-      cache=True, fastmath=True)
-def getHestonPaths(numPaths,
-                   numAnnSteps,
-                   t,
-                   drift,
-                   s0,
-                   v0,
-                   kappa,
-                   theta,
-                   sigma,
-                   rho,
-                   scheme,
-                   seed):
-
-    np.random.seed(seed)
-    dt = 1.0 / numAnnSteps
-    numSteps = int(t / dt)
-    sPaths = np.empty(shape=(numPaths, numSteps + 1))
-    sPaths[:, 0] = s0
-    sdt = sqrt(dt)
+@njit(float64[:, :](int64, float64[:], int64[:], float64, float64, float64,
+                    float64, float64, float64, float64, int64, int64),
+      cache=True, fastmath=True, parallel=True)
+def getHestonPathsGrid(numPaths,
+                       times,
+                       obsIndices,
+                       drift,
+                       s0,
+                       v0,
+                       kappa,
+                       theta,
+                       sigma,
+                       rho,
+                       scheme,
+                       seed):
+    ''' Simulate Heston stock prices on a time grid that starts at zero and
+    can have uneven steps. Only the prices at the grid points given by the
+    sorted observation indices are stored so a pricer that needs terminal
+    values only passes the last index and the memory used is one number per
+    path. The paths are simulated in parallel and the random numbers for each
+    path and step come from a counter-based generator so the paths do not
+    depend on the number of threads. The QE scheme of Andersen (2006) uses
+    the martingale correction so the discounted stock price is exact in
+    expectation on every step. '''
+
+    numSteps = len(times) - 1
+    numObs = len(obsIndices)
+    sPaths = np.empty(shape=(numPaths, numObs))
     rhohat = sqrt(1.0 - rho * rho)
     sigma2 = sigma * sigma
 
+    if numObs > 0 and (obsIndices[0] < 0 or obsIndices[-1] > numSteps):
+        raise FinError("Observation index outside the time grid")
+
+    dts = np.empty(numSteps + 1)
+    dts[0] = 0.0
+    for iStep in range(1, numSteps + 1):
+        dts[iStep] = times[iStep] - times[iStep - 1]
+        if dts[iStep] <= 0.0:
+            raise FinError("Time grid must be increasing")
+
     if scheme == FinHestonNumericalScheme.EULER.value:
         # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             s = s0
             v = v0
+            z = np.empty(2)
+            iObs = 0
+            if numObs > 0 and obsIndices[0] == 0:
+                sPaths[iPath, 0] = s
+                iObs = 1
             for iStep in range(1, numSteps + 1):
-                z1 = np.random.normal(0.0, 1.0) * sdt
-                z2 = np.random.normal(0.0, 1.0) * sdt
+                dt = dts[iStep]
+                sdt = sqrt(dt)
+                counterNormals(seed, iPath, iStep, z)
+                z1 = z[0] * sdt
+                z2 = z[1] * sdt
                 zV = z1
                 zS = rho * z1 + rhohat * z2
                 vplus = max(v, 0.0)
@@ -137,50 +171,84 @@ def getHestonPaths(numPaths,
                     rtvplus * zV + 0.25 * sigma2 * (zV * zV - dt)
                 s += drift * s * dt + rtvplus * s * \
                     zS + 0.5 * s * vplus * (zV * zV - dt)
-                sPaths[iPath, iStep] = s
+                if iObs < numObs and obsIndices[iObs] == iStep:
+                    sPaths[iPath, iObs] = s
+                    iObs += 1
 
     elif scheme == FinHestonNumericalScheme.EULERLOG.value:
         # Basic scheme to first order with truncation on variance
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             x = log(s0)
             v = v0
+            z = np.empty(2)
+            iObs = 0
+            if numObs > 0 and obsIndices[0] == 0:
+                sPaths[iPath, 0] = s0
+                iObs = 1
             for iStep in range(1, numSteps + 1):
-                zV = np.random.normal(0.0, 1.0) * sdt
-                zS = rho * zV + rhohat * np.random.normal(0.0, 1.0) * sdt
+                dt = dts[iStep]
+                sdt = sqrt(dt)
+                counterNormals(seed, iPath, iStep, z)
+                zV = z[0] * sdt
+                zS = rho * zV + rhohat * z[1] * sdt
                 vplus = max(v, 0.0)
                 rtvplus = sqrt(vplus)
                 x += (drift - 0.5 * vplus) * dt + rtvplus * zS
                 v += kappa * (theta - vplus) * dt + sigma * \
                     rtvplus * zV + sigma2 * (zV * zV - dt) / 4.0
-                sPaths[iPath, iStep] = exp(x)
+                if iObs < numObs and obsIndices[iObs] == iStep:
+                    sPaths[iPath, iObs] = exp(x)
+                    iObs += 1
 
     elif scheme == FinHestonNumericalScheme.QUADEXP.value:
-        # Due to Leif Andersen(2006)
-        Q = exp(-kappa * dt)
+        # Due to Leif Andersen(2006). The constants depend on the step size
+        # so they are computed once per step before the paths are simulated
         psic = 1.50
         gamma1 = 0.50
         gamma2 = 0.50
-        K0 = -rho * kappa * theta * dt / sigma
-        K1 = gamma1 * dt * (kappa * rho / sigma - 0.5) - rho / sigma
-        K2 = gamma2 * dt * (kappa * rho / sigma - 0.5) + rho / sigma
-        K3 = gamma1 * dt * (1.0 - rho * rho)
-        K4 = gamma2 * dt * (1.0 - rho * rho)
-        A = K2 + 0.5 * K4
-        mu = drift
-        c1 = sigma2 * Q * (1.0 - Q) / kappa
-        c2 = theta * sigma2 * ((1.0 - Q)**2) / 2.0 / kappa
-
-        for iPath in range(0, numPaths):
+        Qs = np.empty(numSteps + 1)
+        K1s = np.empty(numSteps + 1)
+        K2s = np.empty(numSteps + 1)
+        K3s = np.empty(numSteps + 1)
+        K4s = np.empty(numSteps + 1)
+        c1s = np.empty(numSteps + 1)
+        c2s = np.empty(numSteps + 1)
+
+        for iStep in range(1, numSteps + 1):
+            dt = dts[iStep]
+            Q = exp(-kappa * dt)
+            Qs[iStep] = Q
+            k = kappa * rho / sigma - 0.5
+            K1s[iStep] = gamma1 * dt * k - rho / sigma
+            K2s[iStep] = gamma2 * dt * k + rho / sigma
+            K3s[iStep] = gamma1 * dt * (1.0 - rho * rho)
+            K4s[iStep] = gamma2 * dt * (1.0 - rho * rho)
+            c1s[iStep] = sigma2 * Q * (1.0 - Q) / kappa
+            c2s[iStep] = theta * sigma2 * ((1.0 - Q)**2) / 2.0 / kappa
+
+        for iPath in prange(0, numPaths):
             x = log(s0)
             vn = v0
+            rands = np.empty(3)
+            iObs = 0
+            if numObs > 0 and obsIndices[0] == 0:
+                sPaths[iPath, 0] = s0
+                iObs = 1
             for iStep in range(1, numSteps + 1):
-                zV = np.random.normal(0, 1)
-                zS = rho * zV + rhohat * np.random.normal(0, 1)
-                m = theta + (vn - theta) * Q
+                dt = dts[iStep]
+                K1 = K1s[iStep]
+                K2 = K2s[iStep]
+                K3 = K3s[iStep]
+                K4 = K4s[iStep]
+                A = K2 + 0.5 * K4
+                counterUniforms(seed, iPath, iStep, rands)
+                zV = norminvcdf(rands[0])
+                zS = rho * zV + rhohat * norminvcdf(rands[1])
+                m = theta + (vn - theta) * Qs[iStep]
                 m2 = m * m
-                s2 = c1 * vn + c2
+                s2 = c1s[iStep] * vn + c2s[iStep]
                 psi = s2 / m2
-                u = np.random.uniform(0.0, 1.0)
+                u = rands[2]
 
                 if psi <= psic:
                     b2 = 2.0 / psi - 1.0 + \
@@ -204,10 +272,12 @@ def getHestonPaths(numPaths,
                     M = p + beta * (1.0 - p) / (beta - A)
                     K0 = -log(M) - (K1 + 0.5 * K3) * vn
 
-                x += mu * dt + K0 + (K1 * vn + K2 * vnp) + \
+                x += drift * dt + K0 + (K1 * vn + K2 * vnp) + \
                     sqrt(K3 * vn + K4 * vnp) * zS
-                sPaths[iPath, iStep] = exp(x)
                 vn = vnp
+                if iObs < numObs and obsIndices[iObs] == iStep:
+                    sPaths[iPath, iObs] = exp(x)
+                    iObs += 1
     else:
         raise FinError("Unknown FinHestonNumericalSchme")
 
@@ -216,17 +286,54 @@ def getHestonPaths(numPaths,
 ###############################################################################
 
 
+@njit(float64[:, :](int64, int64, float64, float64, float64, float64, float64,
+                    float64, float64, float64, int64, int64),
+      cache=True, fastmath=True)
+def getHestonPaths(numPaths,
+                   numAnnSteps,
+                   t,
+                   drift,
+                   s0,
+                   v0,
+                   kappa,
+                   theta,
+                   sigma,
+                   rho,
+                   scheme,
+                   seed):
+    ''' Simulate Heston stock price paths with a fixed number of steps per
+    year and return the price at every step including time zero. '''
+
+    dt = 1.0 / numAnnSteps
+    numSteps = int(t / dt)
+    times = np.arange(0, numSteps + 1) * dt
+    obsIndices = np.arange(0, numSteps + 1)
+
+    sPaths = getHestonPathsGrid(numPaths, times, obsIndices, drift, s0, v0,
+                                kappa, theta, sigma, rho, scheme, seed)
+    return sPaths
+
+###############################################################################
+
+
 class FinGBMNumericalScheme(Enum):
     NORMAL = 1
     ANTITHETIC = 2
+    SOBOL_BRIDGE = 3  # Scrambled Sobol with a Brownian bridge
+    SOBOL_PCA = 4  # Scrambled Sobol with principal components
 
 ###############################################################################
 
 @njit(float64[:, :](int64, int64, float64, float64, float64,
-                    float64, int64, int64), cache=True, fastmath=True)
+                    float64, int64, int64), cache=True, fastmath=True,
+      parallel=True)
 def getGBMPaths(numPaths, numAnnSteps, t, mu, stockPrice, sigma, scheme, seed):
+    ''' Simulate GBM paths in parallel. The random numbers for each path and
+    time step are drawn from a counter-based generator so the paths do not
+    depend on the number of threads. The Sobol schemes instead use scrambled
+    Sobol numbers, with the seed setting the scrambling, which are assigned
+    to the time steps using a Brownian bridge or principal components. '''
 
-    np.random.seed(seed)
     dt = 1.0 / numAnnSteps
     numTimeSteps = int(t / dt + 0.50)
     vsqrtdt = sigma * sqrt(dt)
@@ -236,23 +343,39 @@ def getGBMPaths(numPaths, numAnnSteps, t, mu, stockPrice, sigma, scheme, seed):
 
         Sall = np.empty((numPaths, numTimeSteps + 1))
         Sall[:, 0] = stockPrice
-        for it in range(1, numTimeSteps + 1):
-            g1D = np.random.standard_normal((numPaths))
-            for ip in range(0, numPaths):
-                w = np.exp(g1D[ip] * vsqrtdt)
+        for ip in prange(0, numPaths):
+            for it in range(1, numTimeSteps + 1):
+                w = np.exp(counterNormal(seed, ip, it) * vsqrtdt)
                 Sall[ip, it] = Sall[ip, it - 1] * m * w
 
     elif scheme == FinGBMNumericalScheme.ANTITHETIC.value:
 
         Sall = np.empty((2 * numPaths, numTimeSteps + 1))
         Sall[:, 0] = stockPrice
-        for it in range(1, numTimeSteps + 1):
-            g1D = np.random.standard_normal((numPaths))
-            for ip in range(0, numPaths):
-                w = np.exp(g1D[ip] * vsqrtdt)
+        for ip in prange(0, numPaths):
+            for it in range(1, numTimeSteps + 1):
+                w = np.exp(counterNormal(seed, ip, it) * vsqrtdt)
                 Sall[ip, it] = Sall[ip, it - 1] * m * w
                 Sall[ip + numPaths, it] = Sall[ip + numPaths, it - 1] * m / w
 
+    elif scheme == FinGBMNumericalScheme.SOBOL_BRIDGE.value or \
+            scheme == FinGBMNumericalScheme.SOBOL_PCA.value:
+
+        if scheme == FinGBMNumericalScheme.SOBOL_BRIDGE.value:
+            pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+        else:
+            pathType = FinSobolPathTypes.PCA.value
+
+        stepTimes = dt * np.arange(1, numTimeSteps + 1)
+        g = getSobolGaussianPaths(numPaths, stepTimes, 1, pathType, seed)
+
+        Sall = np.empty((numPaths, numTimeSteps + 1))
+        Sall[:, 0] = stockPrice
+        for ip in prange(0, numPaths):
+            for it in range(1, numTimeSteps + 1):
+                w = np.exp(g[ip, it - 1, 0] * vsqrtdt)
+                Sall[ip, it] = Sall[ip, it - 1] * m * w
+
     else:
 
         raise FinError("Unknown FinGBMNumericalScheme")
@@ -273,7 +396,8 @@ class FinVasicekNumericalScheme(Enum):
 ###############################################################################
 
 @njit(float64[:, :](int64, int64, float64, float64, float64,
-                    float64, float64, int64, int64), cache=True, fastmath=True)
+                    float64, float64, int64, int64), cache=True, fastmath=True,
+      parallel=True)
 def getVasicekPaths(numPaths,
                     numAnnSteps,
                     t,
@@ -283,8 +407,11 @@ def getVasicekPaths(numPaths,
                     sigma,
                     scheme,
                     seed):
+    ''' Simulate Vasicek short rate paths by an Euler scheme. The paths are
+    simulated in parallel and the normals of each path come from a counter-
+    based generator keyed on the seed and the path number so the paths do
+    not depend on the number of threads. '''
 
-    np.random.seed(seed)
     dt = 1.0 / numAnnSteps
     numSteps = int(t / dt)
     sigmasqrtdt = sigma * sqrt(dt)
@@ -292,19 +419,21 @@ def getVasicekPaths(numPaths,
     if scheme == FinVasicekNumericalScheme.NORMAL.value:
         ratePath = np.empty((numPaths, numSteps + 1))
         ratePath[:, 0] = r0
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 r += kappa * (theta - r) * dt + z[iStep - 1] * sigmasqrtdt
                 ratePath[iPath, iStep] = r
     elif scheme == FinVasicekNumericalScheme.ANTITHETIC.value:
         ratePath = np.empty((2 * numPaths, numSteps + 1))
         ratePath[:, 0] = r0
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r1 = r0
             r2 = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 r1 = r1 + kappa * (theta - r1) * dt + \
                     z[iStep - 1] * sigmasqrtdt
@@ -327,7 +456,8 @@ class FinCIRNumericalScheme(Enum):
 ###############################################################################
 
 @njit(float64[:, :](int64, int64, float64, float64, float64,
-                    float64, float64, int64, int64), cache=True, fastmath=True)
+                    float64, float64, int64, int64), cache=True, fastmath=True,
+      parallel=True)
 def getCIRPaths(numPaths,
                 numAnnSteps,
                 t,
@@ -337,8 +467,11 @@ def getCIRPaths(numPaths,
                 sigma,
                 scheme,
                 seed):
+    ''' Simulate CIR short rate paths using the chosen discretisation. The
+    paths are simulated in parallel and the normals of each path come from a
+    counter-based generator keyed on the seed and the path number so the
+    paths do not depend on the number of threads. '''
 
-    np.random.seed(seed)
     dt = 1.0 / numAnnSteps
     numSteps = int(t / dt)
     ratePath = np.empty(shape=(numPaths, numSteps + 1))
@@ -346,9 +479,10 @@ def getCIRPaths(numPaths,
 
     if scheme == FinCIRNumericalScheme.EULER.value:
         sigmasqrtdt = sigma * sqrt(dt)
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 rplus = max(r, 0.0)
                 sqrtrplus = sqrt(rplus)
@@ -359,9 +493,10 @@ def getCIRPaths(numPaths,
     elif scheme == FinCIRNumericalScheme.LOGNORMAL.value:
         x = exp(-kappa * dt)
         y = 1.0 - x
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 mean = x * r + theta * y
                 var = sigma * sigma * y * (x * r + 0.50 * theta * y) / kappa
@@ -372,9 +507,10 @@ def getCIRPaths(numPaths,
     elif scheme == FinCIRNumericalScheme.MILSTEIN.value:
         sigmasqrtdt = sigma * sqrt(dt)
         sigma2dt = sigma * sigma * dt / 4.0
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 sqrtrplus = sqrt(max(r, 0.0))
                 r = r + kappa * (theta - r) * dt + \
@@ -385,9 +521,10 @@ def getCIRPaths(numPaths,
     elif scheme == FinCIRNumericalScheme.KAHLJACKEL.value:
         bhat = theta - sigma * sigma / 4.0 / kappa
         sqrtdt = sqrt(dt)
-        for iPath in range(0, numPaths):
+        for iPath in prange(0, numPaths):
             r = r0
-            z = np.random.normal(0.0, 1.0, size=(numSteps))
+            z = np.empty(numSteps)
+            counterNormals(seed, iPath, 0, z)
             for iStep in range(1, numSteps + 1):
                 beta = z[iStep - 1] / sqrtdt
                 sqrtrplus = sqrt(max(r, 0.0))
@@ -10,7 +10,11 @@ from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
 from ...products.equity.FinEquityModelTypes import FinEquityModel
 from ...products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
-from ...models.FinModelCRRTree import crrTreeValAvg
+from ...models.FinModelCRRTree import treeValuesVectorised
+from ...models.FinModelBlackScholes import bsValue
+from ...models.FinModelFiniteDifference import fdValueGreeks
+from ...models.FinModelBlackScholesAnalytical import \
+    americanApproxValuesVectorised
 from ...finutils.FinOptionTypes import FinOptionTypes
 from ...finutils.FinHelperFunctions import checkArgumentTypes, labelToString
 from ...market.curves.FinDiscountCurve import FinDiscountCurve
@@ -20,7 +24,6 @@ from scipy.stats import norm
 N = norm.cdf
 
 ###############################################################################
-# TODO: Implement some analytical approximations
 # TODO: Tree with discrete dividends
 # TODO: Other dynamics such as SABR
 ###############################################################################
@@ -60,8 +63,11 @@ class FinEquityAmericanOption(FinEquityOption):
               discountCurve: FinDiscountCurve,
               dividendYield: float,
               model):
-        ''' Valuation of an American option using a CRR tree to take into
-        account the value of early exercise. '''
+        ''' Valuation of an American option using a binomial tree to take
+        into account the value of early exercise or, if the model sets an
+        American method, an analytical approximation. The tree method and
+        number of steps are also set on the model. The stock price can be a
+        vector. '''
 
         if type(valueDate) == FinDate:
             texp = (self._expiryDate - valueDate) / gDaysInYear
@@ -97,18 +103,35 @@ class FinEquityAmericanOption(FinEquityOption):
 
             numStepsPerYear = model._numStepsPerYear
 
-            if isinstance(S0, float):
-                sArray = [S0]
-            else:
-                sArray = S0
+            # All of the stock prices are valued in one parallel call with
+            # each tree rolled back in a single vector of option values
+            sArray = np.atleast_1d(np.array(S0, dtype=np.float64))
+            ones = np.ones(len(sArray))
 
-            values = []
-            for s in sArray:
-                v = crrTreeValAvg(s, r, q, volatility, numStepsPerYear,
-                                  texp, self._optionType.value, K)['value']
-                values.append(v)
+            if self._optionType == FinOptionTypes.EUROPEAN_CALL or \
+               self._optionType == FinOptionTypes.AMERICAN_CALL:
+                phi = 1.0
+            else:
+                phi = -1.0
 
-            values = np.array(values)
+            if self._optionType == FinOptionTypes.AMERICAN_CALL or \
+               self._optionType == FinOptionTypes.AMERICAN_PUT:
+                isAmerican = 1
+            else:
+                isAmerican = 0
+
+            if model._americanMethod is None:
+                values = treeValuesVectorised(sArray, K * ones, texp * ones,
+                                              r * ones, q * ones,
+                                              volatility * ones, phi * ones,
+                                              isAmerican, numStepsPerYear,
+                                              model._treeMethod.value)
+            elif isAmerican == 1:
+                values = americanApproxValuesVectorised(sArray, texp, K, r, q,
+                                                        volatility, phi,
+                                                        model._americanMethod)
+            else:
+                values = bsValue(sArray, texp, K, r, q, volatility, phi)
         else:
             raise FinError("Unknown Model Type")
 
@@ -119,6 +142,72 @@ class FinEquityAmericanOption(FinEquityOption):
         else:
             return values
 
+###############################################################################
+
+    def valueGreeksPDE(self,
+                       valueDate: FinDate,
+                       stockPrice: (np.ndarray, float),
+                       discountCurve: FinDiscountCurve,
+                       dividendYield: float,
+                       model,
+                       dividendDates: list = None,
+                       dividendAmounts: list = None,
+                       numSpaceSteps: int = 200,
+                       numTimeSteps: int = 200):
+        ''' Value the option by Crank-Nicolson finite differences with early
+        exercise checked at every time step. Cash dividends can be paid on the
+        dividend dates as well as the continuous dividend yield. The model
+        volatility can be a number or a local volatility function of time and
+        an array of stock prices. All of the stock prices are read off one
+        grid. Returns a dictionary of the value, delta, gamma and theta. '''
+
+        if model._parentType != FinEquityModel:
+            raise FinError("Model is not inherited off type FinEquityModel.")
+
+        texp = (self._expiryDate - valueDate) / gDaysInYear
+
+        if texp <= 0.0:
+            raise FinError("Time to expiry must be positive.")
+
+        K = self._strikePrice
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL or \
+           self._optionType == FinOptionTypes.AMERICAN_CALL:
+            phi = 1.0
+        else:
+            phi = -1.0
+
+        def payoff(s):
+            return np.maximum(phi * (s - K), 0.0)
+
+        if self._optionType == FinOptionTypes.AMERICAN_CALL or \
+           self._optionType == FinOptionTypes.AMERICAN_PUT:
+            exercise = payoff
+        else:
+            exercise = None
+
+        dividendTimes = None
+
+        if dividendDates is not None:
+            dividendTimes = [(dt - valueDate) / gDaysInYear
+                             for dt in dividendDates]
+
+        greeks = fdValueGreeks(stockPrice, texp, payoff, discountCurve,
+                               dividendYield, model._volatility,
+                               exercise=exercise,
+                               dividendTimes=dividendTimes,
+                               dividendAmounts=dividendAmounts,
+                               strikePrice=K,
+                               numSpaceSteps=numSpaceSteps,
+                               numTimeSteps=numTimeSteps)
+
+        for key in greeks:
+            greeks[key] = greeks[key] * self._numOptions
+            if isinstance(stockPrice, (float, int)):
+                greeks[key] = greeks[key][0]
+
+        return greeks
+
 ###############################################################################
 
     def __repr__(self):
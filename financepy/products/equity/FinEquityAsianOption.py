@@ -4,14 +4,16 @@
 
 
 import numpy as np
-from numba import njit
+from numba import njit, prange
 
 # TODO: Add perturbatory risk using the analytical methods !!
-# TODO: Add Sobol to Monte Carlo
 
-from ...finutils.FinMath import N, covar
+from ...finutils.FinMath import N
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
+from ...finutils.FinSobol import getSobolGaussianPaths, FinSobolPathTypes
+from ...finutils.FinRandom import counterNormals
+from ...models.FinMCGreeks import valueGreeksGBM, FinMCGreekMethods
 
 from ...finutils.FinOptionTypes import FinOptionTypes
 from ...finutils.FinHelperFunctions import checkArgumentTypes, labelToString
@@ -21,6 +23,7 @@ from ...market.curves.FinDiscountCurve import FinDiscountCurve
 ###############################################################################
 
 from enum import Enum
+from typing import List, Optional
 
 
 class FinAsianOptionValuationMethods(Enum):
@@ -62,275 +65,152 @@ errorStr = "In averaging period so need to enter accrued average."
 ###############################################################################
 
 
-@njit(cache=True, fastmath=True)
-def _valueMC_NUMBA(t0,
-                   t,
-                   tau,
-                   K,
-                   n,
-                   optionType,
-                   stockPrice,
-                   interestRate,
-                   dividendYield,
-                   volatility,
-                   numPaths,
-                   seed,
-                   accruedAverage):
-
-    # Start pricing here
-    np.random.seed(seed)
-    multiplier = 1.0
-
-    if t0 < 0.0:  # we are in the averaging period
-
-        if accruedAverage is None:
-            raise FinError(errorStr)
-
-        # we adjust the strike to account for the accrued coupon
-        K = (K * tau + accruedAverage * t0) / t
-        # the number of options is rescaled also
-        multiplier = t / tau
-        # there is no pre-averaging time
-        t0 = 0.0
-        # the number of observations is scaled and floored at 1
-        n = int(n * t / tau + 0.5) + 1
+@njit(cache=True, fastmath=True, parallel=True)
+def _valueMC_CV_parallel_NUMBA(obsTimes, t, K, phi, stockPrice,
+                               interestRate, dividendYield, volatility,
+                               numPairs, seed, pastSum, pastLogSum, numTotal,
+                               v_g_exact, gSobol):
+    ''' Parallel Monte Carlo value of an arithmetic average option with the
+    geometric average option as a control variate. The observation times are
+    those still to come and the past fixings enter through their sum and the
+    sum of their logs. Paths are simulated in antithetic pairs and each pair
+    keeps only its running sums so memory does not grow with the number of
+    observations. The normals come from the counter-based generator four
+    observations at a time keyed by the pair so the result does not depend
+    on the number of threads. If gSobol has rows these normals are used
+    instead. Returns the value and its standard error. '''
+
+    numObs = len(obsTimes)
+    useSobol = gSobol.shape[0] > 0
 
     mu = interestRate - dividendYield
     v2 = volatility**2
-    dt = (t - t0) / n
+    lnS0 = np.log(stockPrice)
 
-    payoff_a = 0.0
+    sumA = 0.0
+    sumG = 0.0
+    sumAA = 0.0
+    sumAG = 0.0
+    sumGG = 0.0
 
-    for _ in range(0, numPaths):
+    for ip in prange(0, numPairs):
 
-        # evolve stock price to start of averaging period
-        g = np.random.standard_normal(1)
-        s_1 = stockPrice * np.exp((mu - v2 / 2.0) * t0 +
-                                  g[0] * np.sqrt(t0) * volatility)
-        s_2 = stockPrice * np.exp((mu - v2 / 2.0) * t0 -
-                                  g[0] * np.sqrt(t0) * volatility)
+        z = np.empty(4)
 
-        # enter averaging period
+        lnS_1 = lnS0
+        lnS_2 = lnS0
         s_1_arithmetic = 0.0
         s_2_arithmetic = 0.0
+        ln_s_1_geometric = 0.0
+        ln_s_2_geometric = 0.0
+        tPrev = 0.0
+
+        for obs in range(0, numObs):
+
+            dt = obsTimes[obs] - tPrev
+            tPrev = obsTimes[obs]
+
+            if useSobol:
+                g = gSobol[ip, obs]
+            else:
+                iz = obs % 4
+                if iz == 0:
+                    counterNormals(seed, ip, obs // 4, z)
+                g = z[iz]
+
+            drift = (mu - v2 / 2.0) * dt
+            shock = g * np.sqrt(dt) * volatility
+
+            lnS_1 += drift + shock
+            lnS_2 += drift - shock
+
+            s_1_arithmetic += np.exp(lnS_1)
+            s_2_arithmetic += np.exp(lnS_2)
+            ln_s_1_geometric += lnS_1
+            ln_s_2_geometric += lnS_2
+
+        a_1 = (pastSum + s_1_arithmetic) / numTotal
+        a_2 = (pastSum + s_2_arithmetic) / numTotal
+        g_1 = np.exp((pastLogSum + ln_s_1_geometric) / numTotal)
+        g_2 = np.exp((pastLogSum + ln_s_2_geometric) / numTotal)
+
+        payoff_a = 0.5 * (max(phi * (a_1 - K), 0.0) +
+                          max(phi * (a_2 - K), 0.0))
+        payoff_g = 0.5 * (max(phi * (g_1 - K), 0.0) +
+                          max(phi * (g_2 - K), 0.0))
+
+        sumA += payoff_a
+        sumG += payoff_g
+        sumAA += payoff_a * payoff_a
+        sumAG += payoff_a * payoff_g
+        sumGG += payoff_g * payoff_g
+
+    meanA = sumA / numPairs
+    meanG = sumG / numPairs
+    varA = max(sumAA / numPairs - meanA * meanA, 0.0)
+    varG = max(sumGG / numPairs - meanG * meanG, 0.0)
+    covAG = sumAG / numPairs - meanA * meanG
 
-        g = np.random.standard_normal(n)
-
-        for obs in range(0, n):
-
-            s_1 = s_1 * np.exp((mu - v2 / 2.0) * dt +
-                               g[obs] * np.sqrt(dt) * volatility)
-            s_2 = s_2 * np.exp((mu - v2 / 2.0) * dt -
-                               g[obs] * np.sqrt(dt) * volatility)
-
-            s_1_arithmetic += s_1
-            s_2_arithmetic += s_2
-
-        s_1_arithmetic /= n
-        s_2_arithmetic /= n
-
-        if optionType == FinOptionTypes.EUROPEAN_CALL:
-            payoff_a += max(s_1_arithmetic - K, 0)
-            payoff_a += max(s_2_arithmetic - K, 0)
-        elif optionType == FinOptionTypes.EUROPEAN_PUT:
-            payoff_a += max(K - s_1_arithmetic, 0)
-            payoff_a += max(K - s_2_arithmetic, 0)
-        else:
-            return None
-
-    v_a = payoff_a * np.exp(-interestRate * t) / numPaths / 2.0
-    v_a = v_a * multiplier
-    return v_a
-
-###############################################################################
-
-
-@njit(cache=True, fastmath=True)
-def _valueMC_fast_NUMBA(t0: float,
-                        t: float,
-                        tau: float,
-                        K: float,
-                        n: int,
-                        optionType: FinOptionTypes,
-                        stockPrice: float,
-                        interestRate: float,
-                        dividendYield: float,
-                        volatility: float,
-                        numPaths: int,
-                        seed: int,
-                        accruedAverage: float):
-
-    np.random.seed(seed)
-    mu = interestRate - dividendYield
-    v2 = volatility**2
-    dt = (t - t0) / n
-    r = interestRate
-    numPaths = int(numPaths)
-
-    multiplier = 1.0
-
-    if t0 < 0.0:  # we are in the averaging period
-
-        if accruedAverage is None:
-            raise FinError(errorStr)
-
-        # we adjust the strike to account for the accrued coupon
-        K = (K * tau + accruedAverage * t0) / t
-        # the number of options is rescaled also
-        multiplier = t / tau
-        # there is no pre-averaging time
-        t0 = 0.0
-        # the number of observations is scaled and floored at 1
-        n = int(n * t / tau + 0.5) + 1
-
-    # evolve stock price to start of averaging period
-    # g = np.random.normal(0.0, 1.0, size=(numPaths))
-
-    gg = np.empty(numPaths, np.float64)
-    for iPath in range(0, numPaths):
-        rv = np.random.normal()
-        gg[iPath] = rv
-
-    s_1 = np.empty(numPaths)
-    s_2 = np.empty(numPaths)
-
-    for ip in range(0, numPaths):
-        s_1[ip] = stockPrice * \
-            np.exp((mu - v2 / 2.0) * t0 + gg[ip] * np.sqrt(t0) * volatility)
-        s_2[ip] = stockPrice * \
-            np.exp((mu - v2 / 2.0) * t0 - gg[ip] * np.sqrt(t0) * volatility)
-
-    s_1_arithmetic = np.zeros(numPaths)
-    s_2_arithmetic = np.zeros(numPaths)
-
-    for _ in range(0, n):
-
-        g = np.random.normal(0.0, 1.0, size=(numPaths))
+    # Now we do the control variate adjustment
+    lam = 0.0
+    if varG > 0.0:
+        lam = covAG / varG
 
-        for ip in range(0, numPaths):
-            s_1[ip] = s_1[ip] * np.exp((mu - v2 / 2.0) *
-                                       dt + g[ip] * np.sqrt(dt) * volatility)
-            s_2[ip] = s_2[ip] * np.exp((mu - v2 / 2.0) *
-                                       dt - g[ip] * np.sqrt(dt) * volatility)
+    df = np.exp(-interestRate * t)
+    v_a = meanA * df
+    v_g = meanG * df
 
-        for ip in range(0, numPaths):
-            s_1_arithmetic[ip] += s_1[ip] / n
-            s_2_arithmetic[ip] += s_2[ip] / n
+    epsilon = v_g_exact - v_g
+    v_a_cv = v_a + lam * epsilon
 
-    if optionType == FinOptionTypes.EUROPEAN_CALL:
-        payoff_a_1 = np.maximum(s_1_arithmetic - K, 0)
-        payoff_a_2 = np.maximum(s_2_arithmetic - K, 0)
-    elif optionType == FinOptionTypes.EUROPEAN_PUT:
-        payoff_a_1 = np.maximum(K - s_1_arithmetic, 0)
-        payoff_a_2 = np.maximum(K - s_2_arithmetic, 0)
-    else:
-        raise FinError("Unknown option type.")
+    varCV = max(varA - 2.0 * lam * covAG + lam * lam * varG, 0.0)
+    stdErr = df * np.sqrt(varCV / numPairs)
 
-    payoff_a = np.mean(payoff_a_1) + np.mean(payoff_a_2)
-    v_a = multiplier * payoff_a * np.exp(- r * t) / 2.0
-    return v_a
+    return v_a_cv, stdErr
 
 ###############################################################################
 
 
-@njit(cache=True, fastmath=True)
-def _valueMC_fast_CV_NUMBA(t0, t, tau, K, n, optionType, stockPrice,
-                           interestRate, dividendYield, volatility, numPaths,
-                           seed, accruedAverage, v_g_exact):
+def _valueGeometricDiscrete(obsTimes, t, K, optionType, stockPrice,
+                            interestRate, dividendYield, volatility,
+                            pastLogSum, numTotal):
+    ''' Exact value of an option on the discrete geometric average of the
+    past fixings and of the stock price at the future observation times. The
+    log of the average is Gaussian and its variance uses the covariance
+    min(ti, tj) of the Brownian motion at the observation times. '''
 
-    np.random.seed(seed)
-    mu = interestRate - dividendYield
-    v2 = volatility**2
-    dt = (t - t0) / n
+    numObs = len(obsTimes)
     r = interestRate
+    mu = interestRate - dividendYield
 
-    multiplier = 1.0
-
-    if t0 < 0:  # we are in the averaging period
-
-        if accruedAverage is None:
-            raise FinError(errorStr)
-
-        # we adjust the strike to account for the accrued coupon
-        K = (K * tau + accruedAverage * t0) / t
-        # the number of options is rescaled also
-        multiplier = t / tau
-        # there is no pre-averaging time
-        t0 = 0.0
-        # the number of observations is scaled and floored at 1
-        n = int(n * t / tau + 0.5) + 1
-
-    # evolve stock price to start of averaging period
-    g = np.random.normal(0.0, 1.0, size=(numPaths))
-
-    s_1 = np.empty(numPaths)
-    s_2 = np.empty(numPaths)
-
-    for ip in range(0, numPaths):
-        s_1[ip] = stockPrice * \
-            np.exp((mu - v2 / 2.0) * t0 + g[ip] * np.sqrt(t0) * volatility)
-        s_2[ip] = stockPrice * \
-            np.exp((mu - v2 / 2.0) * t0 - g[ip] * np.sqrt(t0) * volatility)
-
-    s_1_arithmetic = np.zeros(numPaths)
-    s_2_arithmetic = np.zeros(numPaths)
-    ln_s_1_geometric = np.zeros(numPaths)
-    ln_s_2_geometric = np.zeros(numPaths)
-
-    for _ in range(0, n):
-
-        g = np.random.normal(0.0, 1.0, size=(numPaths))
-        for ip in range(0, numPaths):
-            s_1[ip] = s_1[ip] * np.exp((mu - v2 / 2.0) *
-                                       dt + g[ip] * np.sqrt(dt) * volatility)
-            s_2[ip] = s_2[ip] * np.exp((mu - v2 / 2.0) *
-                                       dt - g[ip] * np.sqrt(dt) * volatility)
-
-        for ip in range(0, numPaths):
-            s_1_arithmetic[ip] += s_1[ip]
-            s_2_arithmetic[ip] += s_2[ip]
-            ln_s_1_geometric[ip] += np.log(s_1[ip])
-            ln_s_2_geometric[ip] += np.log(s_2[ip])
+    if numObs > 0:
+        ranks = np.arange(numObs, 0, -1)
+        sumMin = np.sum(obsTimes * (2 * ranks - 1))
+    else:
+        sumMin = 0.0
 
-    s_1_geometric = np.empty(numPaths)
-    s_2_geometric = np.empty(numPaths)
+    meanGeo = (pastLogSum + numObs * np.log(stockPrice) +
+               (mu - volatility**2 / 2.0) * np.sum(obsTimes)) / numTotal
+    varGeo = volatility**2 * sumMin / numTotal / numTotal
 
-    for ip in range(0, numPaths):
-        s_1_arithmetic[ip] /= n
-        s_1_geometric[ip] = np.exp(ln_s_1_geometric[ip] / n)
-        s_2_arithmetic[ip] /= n
-        s_2_geometric[ip] = np.exp(ln_s_2_geometric[ip] / n)
+    df = np.exp(-r * t)
+    EG = np.exp(meanGeo + varGeo / 2.0)
 
     if optionType == FinOptionTypes.EUROPEAN_CALL:
-        payoff_a_1 = np.maximum(s_1_arithmetic - K, 0.0)
-        payoff_g_1 = np.maximum(s_1_geometric - K, 0.0)
-        payoff_a_2 = np.maximum(s_2_arithmetic - K, 0.0)
-        payoff_g_2 = np.maximum(s_2_geometric - K, 0.0)
+        phi = 1.0
     elif optionType == FinOptionTypes.EUROPEAN_PUT:
-        payoff_a_1 = np.maximum(K - s_1_arithmetic, 0.0)
-        payoff_g_1 = np.maximum(K - s_1_geometric, 0.0)
-        payoff_a_2 = np.maximum(K - s_2_arithmetic, 0.0)
-        payoff_g_2 = np.maximum(K - s_2_geometric, 0.0)
+        phi = -1.0
     else:
-        raise FinError("Unknown Option Type")
+        raise FinError("Unknown option type " + str(optionType))
 
-    payoff_a = np.concatenate((payoff_a_1, payoff_a_2), axis=0)
-    payoff_g = np.concatenate((payoff_g_1, payoff_g_2), axis=0)
+    if varGeo <= 0.0:
+        return df * max(phi * (EG - K), 0.0)
 
-    # Now we do the control variate adjustment
-    m = covar(payoff_a, payoff_a)
-    lam = m[0][1] / m[1][1]
-
-    payoff_a_mean = np.mean(payoff_a)
-    payoff_g_mean = np.mean(payoff_g)
+    d1 = (meanGeo - np.log(K) + varGeo) / np.sqrt(varGeo)
+    d2 = d1 - np.sqrt(varGeo)
 
-    v_a = payoff_a_mean * np.exp(-r * t) * multiplier
-    v_g = payoff_g_mean * np.exp(-r * t) * multiplier
-
-    epsilon = v_g_exact - v_g
-    v_a_cv = v_a + lam * epsilon
-
-    return v_a_cv
+    v = df * phi * (EG * N(phi * d1) - K * N(phi * d2))
+    return v
 
 ###############################################################################
 
@@ -348,10 +228,14 @@ class FinEquityAsianOption():
                  expiryDate: FinDate,
                  strikePrice: float,
                  optionType: FinOptionTypes,
-                 numberOfObservations: int = 100):
+                 numberOfObservations: int = 100,
+                 observationDates: Optional[List[FinDate]] = None):
         ''' Create an FinEquityAsian option object which takes a start date for
         the averaging, an expiry date, a strike price, an option type and a
-        number of observations. '''
+        number of observations. The observations are equally spaced from the
+        start of averaging to expiry unless a list of observation dates is
+        given, in which case the Monte Carlo and geometric pricers average
+        over these. '''
 
         checkArgumentTypes(self.__init__, locals())
 
@@ -363,6 +247,20 @@ class FinEquityAsianOption():
         self._strikePrice = float(strikePrice)
         self._optionType = optionType
         self._numObservations = numberOfObservations
+        self._observationDates = None
+
+        if observationDates is not None:
+
+            if len(observationDates) == 0:
+                raise FinError("Observation date list is empty")
+
+            observationDates = sorted(observationDates)
+
+            if observationDates[-1] > expiryDate:
+                raise FinError("Observation date after expiry date")
+
+            self._observationDates = observationDates
+            self._numObservations = len(observationDates)
 
 ###############################################################################
 
@@ -386,11 +284,31 @@ class FinEquityAsianOption():
         different approaches.
 
         Note that the accrued average is only required if the value date is
-        inside the averaging period for the option. '''
+        inside the averaging period for the option. If the option has a list
+        of observation dates then only the GEOMETRIC method is available and
+        it is exact on these dates. '''
 
         if valueDate > self._expiryDate:
             raise FinError("Value date after expiry date.")
 
+        if self._observationDates is not None:
+
+            if method != FinAsianOptionValuationMethods.GEOMETRIC:
+                raise FinError("Only the GEOMETRIC method or valueMC can be "
+                               "used with observation dates")
+
+            t = (self._expiryDate - valueDate) / gDaysInYear
+            r = discountCurve.zeroRate(self._expiryDate)
+
+            obsTimes, numTotal, _, pastLogSum = \
+                self._observationSchedule(valueDate, accruedAverage)
+
+            v = _valueGeometricDiscrete(obsTimes, t, self._strikePrice,
+                                        self._optionType, stockPrice, r,
+                                        dividendYield, model._volatility,
+                                        pastLogSum, numTotal)
+            return v
+
         if method == FinAsianOptionValuationMethods.GEOMETRIC:
             v = self._valueGeometric(valueDate,
                                      stockPrice,
@@ -633,39 +551,12 @@ class FinEquityAsianOption():
                  numPaths: int,
                  seed: int,
                  accruedAverage: float):
-        ''' Monte Carlo valuation of the Asian Average option using standard
-        Monte Carlo code enhanced by Numba. I have discontinued the use of this
-        as it is both slow and has limited variance reduction. '''
-
-        # Basic validation
-        if valueDate > self._expiryDate:
-            raise FinError("Value date after option expiry date.")
-
-        if valueDate > self._startAveragingDate and accruedAverage is None:
-            raise FinError(errorStr)
+        ''' Monte Carlo valuation of the Asian Average option. This is kept
+        for backward compatibility and now simply calls valueMC. '''
 
-        # the years to the start of the averaging period
-        t0 = (self._startAveragingDate - valueDate) / gDaysInYear
-        t = (self._expiryDate - valueDate) / gDaysInYear
-        tau = (self._expiryDate - self._startAveragingDate) / gDaysInYear
-
-        r = discountCurve.zeroRate(self._expiryDate)
-
-        volatility = model._volatility
-
-        K = self._strikePrice
-        n = self._numObservations
-
-        v = _valueMC_NUMBA(t0, t, tau, K, n, self._optionType,
-                           stockPrice,
-                           r,
-                           dividendYield,
-                           volatility,
-                           numPaths,
-                           seed,
-                           accruedAverage)
-
-        return v
+        return self.valueMC(valueDate, stockPrice, discountCurve,
+                            dividendYield, model, numPaths, seed,
+                            accruedAverage)
 
 ##############################################################################
 
@@ -678,32 +569,59 @@ class FinEquityAsianOption():
                       numPaths,       # Numpaths integer
                       seed,
                       accruedAverage):
-        ''' Monte Carlo valuation of the Asian Average option. This method uses
-        a lot of Numpy vectorisation. It is also helped by Numba. '''
+        ''' Monte Carlo valuation of the Asian Average option. This is kept
+        for backward compatibility and now simply calls valueMC. '''
 
-        # the years to the start of the averaging period
-        t0 = (self._startAveragingDate - valueDate) / gDaysInYear
-        t = (self._expiryDate - valueDate) / gDaysInYear
-        tau = (self._expiryDate - self._startAveragingDate) / gDaysInYear
+        return self.valueMC(valueDate, stockPrice, discountCurve,
+                            dividendYield, model, numPaths, seed,
+                            accruedAverage)
 
-        K = self._strikePrice
-        n = self._numObservations
+###############################################################################
 
-        r = discountCurve.zeroRate(self._expiryDate)
+    def _observationSchedule(self,
+                             valueDate: FinDate,
+                             accruedAverage: float = None,
+                             pastFixings: list = None):
+        ''' Return the times of the observations after the value date and the
+        total number of observations together with the sum and the sum of the
+        logs of the fixings already made. The past fixings can be given one by
+        one or through their average. '''
+
+        if self._observationDates is None:
+            t0 = (self._startAveragingDate - valueDate) / gDaysInYear
+            tau = (self._expiryDate - self._startAveragingDate) / gDaysInYear
+            n = self._numObservations
+            times = t0 + tau * np.arange(1, n + 1) / n
+        else:
+            times = np.array([(d - valueDate) / gDaysInYear
+                              for d in self._observationDates])
 
-        volatility = model._volatility
+        numTotal = len(times)
+        obsTimes = times[times > 0.0]
+        numPast = numTotal - len(obsTimes)
 
-        v = _valueMC_fast_NUMBA(t0, t, tau,
-                                K, n, self._optionType,
-                                stockPrice,
-                                r,
-                                dividendYield,
-                                volatility,
-                                numPaths,
-                                seed,
-                                accruedAverage)
+        pastSum = 0.0
+        pastLogSum = 0.0
 
-        return v
+        if numPast > 0:
+
+            if pastFixings is not None:
+
+                if len(pastFixings) != numPast:
+                    raise FinError("Expected " + str(numPast) + " fixings")
+
+                pastFixings = np.array(pastFixings, dtype=np.float64)
+                pastSum = np.sum(pastFixings)
+                pastLogSum = np.sum(np.log(pastFixings))
+
+            elif accruedAverage is None:
+                raise FinError(errorStr)
+
+            else:
+                pastSum = accruedAverage * numPast
+                pastLogSum = np.log(accruedAverage) * numPast
+
+        return obsTimes, numTotal, pastSum, pastLogSum
 
 ###############################################################################
 
@@ -715,47 +633,128 @@ class FinEquityAsianOption():
                 model,
                 numPaths: int,
                 seed: int,
-                accruedAverage: float):
-        ''' Monte Carlo valuation of the Asian Average option using a control
-        variate method that improves accuracy and reduces the variance of the
-        price. This uses Numpy and Numba. This is the standard MC pricer. '''
+                accruedAverage: float,
+                useSobol: bool = False,
+                pastFixings: Optional[List[float]] = None):
+        ''' Monte Carlo valuation of the Asian Average option using the exact
+        discrete geometric average option as a control variate. The paths are
+        run in parallel and only keep running sums so memory does not grow with
+        the number of observations. If the averaging has started then the past
+        fixings are given as a list or through their average. The numPaths is
+        the number of antithetic pairs so 2 x numPaths paths are simulated. If
+        useSobol is True then numPaths scrambled Sobol points with a Brownian
+        bridge are used in place of pseudo-random numbers and the seed sets
+        the scrambling. '''
 
-        # the years to the start of the averaging period
-        t0 = (self._startAveragingDate - valueDate) / gDaysInYear
         t = (self._expiryDate - valueDate) / gDaysInYear
-        tau = (self._expiryDate - self._startAveragingDate) / gDaysInYear
-
         K = self._strikePrice
-        n = self._numObservations
 
         r = discountCurve.zeroRate(self._expiryDate)
         volatility = model._volatility
 
+        obsTimes, numTotal, pastSum, pastLogSum = \
+            self._observationSchedule(valueDate, accruedAverage, pastFixings)
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
+            phi = 1.0
+        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
+            phi = -1.0
+        else:
+            raise FinError("Unknown option type.")
+
+        # All fixings are known so the payoff is certain
+        if len(obsTimes) == 0:
+            payoff = max(phi * (pastSum / numTotal - K), 0.0)
+            return payoff * np.exp(-r * t)
+
         # For control variate we price a Geometric average option exactly
-        v_g_exact = self._valueGeometric(valueDate,
-                                         stockPrice,
-                                         discountCurve,
-                                         dividendYield,
-                                         model,
-                                         accruedAverage)
-
-        v = _valueMC_fast_CV_NUMBA(t0,
-                                   t,
-                                   tau,
-                                   K,
-                                   n,
-                                   self._optionType,
-                                   stockPrice,
-                                   r,
-                                   dividendYield,
-                                   volatility,
-                                   numPaths,
-                                   seed,
-                                   accruedAverage,
-                                   v_g_exact)
+        v_g_exact = _valueGeometricDiscrete(obsTimes, t, K, self._optionType,
+                                            stockPrice, r, dividendYield,
+                                            volatility, pastLogSum, numTotal)
+
+        numPairs = max(int(numPaths), 1)
+
+        if useSobol:
+            pathType = FinSobolPathTypes.BROWNIAN_BRIDGE.value
+            gSobol = getSobolGaussianPaths(numPairs, obsTimes, 1, pathType,
+                                           seed)[:, :, 0]
+        else:
+            gSobol = np.zeros((0, 0))
+
+        v, _ = _valueMC_CV_parallel_NUMBA(obsTimes, t, K, phi, stockPrice,
+                                          r, dividendYield, volatility,
+                                          numPairs, seed, pastSum,
+                                          pastLogSum, numTotal, v_g_exact,
+                                          gSobol)
 
         return v
 
+###############################################################################
+
+    def valueGreeksMC(self,
+                      valueDate: FinDate,
+                      stockPrice: float,
+                      discountCurve: FinDiscountCurve,
+                      dividendYield: float,
+                      model,
+                      numPaths: int,
+                      seed: int,
+                      accruedAverage: float,
+                      method: FinMCGreekMethods = FinMCGreekMethods.PATHWISE,
+                      pastFixings: Optional[List[float]] = None):
+        ''' Monte Carlo value of the Asian Average option together with its
+        delta, gamma and vega computed in the same simulation using pathwise
+        or likelihood ratio estimators. The averaging schedule and past
+        fixings are handled as in valueMC. Returns a dictionary with the
+        value, the Greeks and their standard errors. '''
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+        K = self._strikePrice
+
+        r = discountCurve.zeroRate(self._expiryDate)
+        mu = r - dividendYield
+        volatility = model._volatility
+
+        obsTimes, numTotal, pastSum, _ = \
+            self._observationSchedule(valueDate, accruedAverage, pastFixings)
+
+        if len(obsTimes) == 0:
+            raise FinError("No observations remain to be simulated")
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
+            phi = 1.0
+        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
+            phi = -1.0
+        else:
+            raise FinError("Unknown option type.")
+
+        scale = np.exp(-r * t)
+
+        def payoff(paths):
+            average = (pastSum + np.sum(paths[:, 1:, 0], axis=1)) / numTotal
+            v = np.maximum(phi * (average - K), 0.0) * scale
+            inTheMoney = phi * (average - K) > 0.0
+            grad = np.zeros(paths.shape)
+            grad[:, 1:, 0] = (phi * scale / numTotal) * \
+                inTheMoney[:, np.newaxis]
+            return v, grad
+
+        greeks = valueGreeksGBM(obsTimes,
+                                [stockPrice],
+                                [mu],
+                                [volatility],
+                                None,
+                                payoff,
+                                method,
+                                numPaths,
+                                seed)
+
+        for key in ['delta', 'gamma', 'vega']:
+            greeks[key] = greeks[key][0]
+            greeks['stderr'][key] = greeks['stderr'][key][0]
+
+        return greeks
+
 ###############################################################################
 
     def __repr__(self):
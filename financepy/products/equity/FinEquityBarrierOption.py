@@ -9,6 +9,12 @@ from ...finutils.FinError import FinError
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...products.equity.FinEquityOption import FinEquityOption
 from ...models.FinProcessSimulator import FinProcessSimulator
+from ...models.FinProcessSimulator import FinProcessTypes
+from ...models.FinProcessSimulator import FinGBMNumericalScheme
+from ...models.FinPathEngine import FinPathEngine, FinPathModelTypes
+from ...models.FinGBMProcess import barrierSurvivalProbabilities
+from ...models.FinMCGreeks import valueGreeksGBM, FinMCGreekMethods
+from ...models.FinModelFiniteDifference import fdBarrierValueGreeks
 from ...market.curves.FinDiscountCurve import FinDiscountCurve
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 from ...finutils.FinDate import FinDate
@@ -283,22 +289,32 @@ class FinEquityBarrierOption(FinEquityOption):
                 modelParams,
                 numAnnObs: int = 252,
                 numPaths: int = 10000,
-                seed: int = 4242):
+                seed: int = 4242,
+                useBrownianBridge: bool = False,
+                numPathsPerBlock: int = 10000):
         ''' A Monte-Carlo based valuation of the barrier option which simulates
         the evolution of the stock price of at a specified number of annual
         observation times until expiry to examine if the barrier has been
-        crossed and the corresponding value of the final payoff, if any. It
-        assumes a GBM model for the stock price. '''
+        crossed and the corresponding value of the final payoff, if any. If
+        useBrownianBridge is True the barrier is continuous and each GBM path
+        is weighted by the probability that the Brownian bridge between its
+        simulated prices does not cross the barrier. This removes the bias
+        from only observing the barrier at the simulated times so far fewer
+        steps are needed. GBM paths come from the common path engine in
+        blocks of numPathsPerBlock, except for the Sobol PCA scheme, and as
+        before the antithetic scheme simulates 2 x numPaths paths. For a local
+        volatility process the model parameters are the stock price and a
+        FinModelLocalVol and only the final price and extrema of each path
+        are kept. The time taken falls with the number of cores as the paths
+        are simulated in parallel. '''
 
         t = (self._expiryDate - valueDate) / gDaysInYear
-        numTimeSteps = int(t * numAnnObs)
         K = self._strikePrice
         B = self._barrierLevel
         optionType = self._optionType
 
-        process = FinProcessSimulator()
-
         r = discountCurve.zeroRate(self._expiryDate)
+        df = np.exp(-r * t)
 
         #######################################################################
 
@@ -325,75 +341,265 @@ class FinEquityBarrierOption(FinEquityOption):
         elif optionType == FinEquityBarrierTypes.DOWN_AND_IN_PUT and stockPrice <= B:
             simplePut = True
 
-        if simplePut or simpleCall:
-            Sall = process.getProcess(
-                processType, t, modelParams, 1, numPaths, seed)
+        if optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                          FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                          FinEquityBarrierTypes.UP_AND_OUT_CALL,
+                          FinEquityBarrierTypes.UP_AND_IN_CALL):
+            phi = 1.0
+        else:
+            phi = -1.0
+
+        isDown = optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_OUT_PUT,
+                                FinEquityBarrierTypes.DOWN_AND_IN_PUT)
+
+        isOut = optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                               FinEquityBarrierTypes.UP_AND_OUT_CALL,
+                               FinEquityBarrierTypes.DOWN_AND_OUT_PUT,
+                               FinEquityBarrierTypes.UP_AND_OUT_PUT)
+
+        if useBrownianBridge:
+            if processType != FinProcessTypes.GBM:
+                raise FinError("The Brownian bridge needs GBM paths.")
+            volatility = modelParams[2]
+        else:
+            volatility = 0.0
+
+        dt = 1.0 / numAnnObs
+        numSteps = max(int(t / dt + 0.50), 1)
+        scale = df * self._notional
 
-        if simpleCall:
-            c = (np.maximum(Sall[:, -1] - K, 0)).mean()
-            c = c * np.exp(-r * t)
-            return c
+        def payoff(times, paths):
 
-        if simplePut:
-            p = (np.maximum(K - Sall[:, -1], 0)).mean()
-            p = p * np.exp(-r * t)
-            return p
+            s = paths[:, :, 0]
+            v = np.maximum(phi * (s[:, -1] - K), 0.0) * scale
+
+            # The barrier has already been hit
+            if simpleCall or simplePut:
+                return v
+
+            # Probability that each path is never on or beyond the barrier
+            survival = barrierSurvivalProbabilities(s, B, int(isDown),
+                                                    volatility, dt)
+            if isOut:
+                return v * survival
+            else:
+                return v * (1.0 - survival)
+
+        if processType == FinProcessTypes.GBM:
+
+            (s0, drift, sigma, scheme) = modelParams
+
+            if scheme != FinGBMNumericalScheme.SOBOL_PCA:
+
+                if simpleCall or simplePut:
+                    gridTimes = [t]
+                else:
+                    gridTimes = dt * np.arange(1, numSteps + 1)
+
+                antithetic = scheme == FinGBMNumericalScheme.ANTITHETIC
+                useSobol = scheme == FinGBMNumericalScheme.SOBOL_BRIDGE
 
-        # Get full set of paths
-        Sall = process.getProcess(processType, t, modelParams, numTimeSteps,
+                if antithetic:
+                    numPaths = 2 * numPaths
+
+                engine = FinPathEngine(gridTimes,
+                                       FinPathModelTypes.GBM,
+                                       [[s0, drift, sigma]])
+
+                results = engine.valueMC([payoff],
+                                         numPaths,
+                                         seed,
+                                         numPathsPerBlock,
+                                         antithetic,
+                                         useSobol)
+
+                return results['value'][0]
+
+        if processType == FinProcessTypes.LOCAL_VOL and \
+                not (simpleCall or simplePut):
+
+            # A discretely observed barrier only needs the path extrema so
+            # the paths are not stored
+            (s0, localVolModel) = modelParams
+            extrema = localVolModel.getPathsExtrema(numPaths, numAnnObs, t,
+                                                    s0, seed)
+            if isDown:
+                alive = extrema[:, 2] > B
+            else:
+                alive = extrema[:, 1] < B
+
+            if isOut is False:
+                alive = ~alive
+
+            v = np.maximum(phi * (extrema[:, 0] - K), 0.0) * alive * scale
+            return np.mean(v)
+
+        # Only GBM can jump to expiry in one step
+        numAnnSteps = numAnnObs
+        if (simplePut or simpleCall) and processType == FinProcessTypes.GBM:
+            numAnnSteps = 1
+
+        process = FinProcessSimulator()
+        Sall = process.getProcess(processType, t, modelParams, numAnnSteps,
                                   numPaths, seed)
 
-        (numPaths, numTimeSteps) = Sall.shape
-
-        if optionType == FinEquityBarrierTypes.DOWN_AND_IN_CALL or \
-           optionType == FinEquityBarrierTypes.DOWN_AND_OUT_CALL or \
-           optionType == FinEquityBarrierTypes.DOWN_AND_IN_PUT or \
-           optionType == FinEquityBarrierTypes.DOWN_AND_OUT_PUT:
-
-            barrierCrossedFromAbove = [False] * numPaths
-
-            for p in range(0, numPaths):
-                barrierCrossedFromAbove[p] = np.any(Sall[p] <= B)
-
-        if optionType == FinEquityBarrierTypes.UP_AND_IN_CALL or \
-           optionType == FinEquityBarrierTypes.UP_AND_OUT_CALL or \
-           optionType == FinEquityBarrierTypes.UP_AND_IN_PUT or \
-           optionType == FinEquityBarrierTypes.UP_AND_OUT_PUT:
-
-            barrierCrossedFromBelow = [False] * numPaths
-            for p in range(0, numPaths):
-                barrierCrossedFromBelow[p] = np.any(Sall[p] >= B)
-
-        payoff = np.zeros(numPaths)
-        ones = np.ones(numPaths)
-
-        if optionType == FinEquityBarrierTypes.DOWN_AND_OUT_CALL:
-            payoff = np.maximum(Sall[:, -1] - K, 0) * \
-                (ones - barrierCrossedFromAbove)
-        elif optionType == FinEquityBarrierTypes.DOWN_AND_IN_CALL:
-            payoff = np.maximum(Sall[:, -1] - K, 0) * barrierCrossedFromAbove
-        elif optionType == FinEquityBarrierTypes.UP_AND_IN_CALL:
-            payoff = np.maximum(Sall[:, -1] - K, 0) * barrierCrossedFromBelow
-        elif optionType == FinEquityBarrierTypes.UP_AND_OUT_CALL:
-            payoff = np.maximum(Sall[:, -1] - K, 0) * \
-                (ones - barrierCrossedFromBelow)
-        elif optionType == FinEquityBarrierTypes.UP_AND_IN_PUT:
-            payoff = np.maximum(K - Sall[:, -1], 0) * barrierCrossedFromBelow
-        elif optionType == FinEquityBarrierTypes.UP_AND_OUT_PUT:
-            payoff = np.maximum(K - Sall[:, -1], 0) * \
-                (ones - barrierCrossedFromBelow)
-        elif optionType == FinEquityBarrierTypes.DOWN_AND_OUT_PUT:
-            payoff = np.maximum(K - Sall[:, -1], 0) * \
-                (ones - barrierCrossedFromAbove)
-        elif optionType == FinEquityBarrierTypes.DOWN_AND_IN_PUT:
-            payoff = np.maximum(K - Sall[:, -1], 0) * barrierCrossedFromAbove
+        v = np.mean(payoff(None, Sall[:, :, np.newaxis]))
+        return v
+
+###############################################################################
+
+    def valueGreeksMC(self,
+                      valueDate: FinDate,
+                      stockPrice: float,
+                      discountCurve: FinDiscountCurve,
+                      dividendYield: float,
+                      model,
+                      numPaths: int = 10000,
+                      seed: int = 4242,
+                      method: FinMCGreekMethods =
+                      FinMCGreekMethods.LIKELIHOOD_RATIO):
+        ''' Monte-Carlo value, delta, gamma and vega of the barrier option
+        computed from one GBM simulation with the barrier observed at the
+        number of observations per year of the option. As the payoff jumps
+        when the barrier is crossed the pathwise estimator is biased so only
+        the likelihood ratio method is allowed. Returns a dictionary with the
+        value, the Greeks and their standard errors. '''
+
+        if method != FinMCGreekMethods.LIKELIHOOD_RATIO:
+            raise FinError("Barrier MC Greeks need the likelihood ratio.")
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+
+        if t <= 0.0:
+            raise FinError("Value date after expiry date.")
+
+        numTimeSteps = max(int(t * self._numObservationsPerYear), 1)
+        gridTimes = t * np.arange(1, numTimeSteps + 1) / numTimeSteps
+
+        df = discountCurve.df(self._expiryDate)
+        r = -np.log(df) / t
+        mu = r - dividendYield
+        volatility = model._volatility
+
+        K = self._strikePrice
+        B = self._barrierLevel
+        optionType = self._optionType
+        scale = df * self._notional
+
+        if optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                          FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                          FinEquityBarrierTypes.UP_AND_OUT_CALL,
+                          FinEquityBarrierTypes.UP_AND_IN_CALL):
+            phi = 1.0
         else:
-            raise FinError("Unknown barrier option type." +
-                           str(self._optionType))
+            phi = -1.0
+
+        isDown = optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_OUT_PUT,
+                                FinEquityBarrierTypes.DOWN_AND_IN_PUT)
+
+        isOut = optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                               FinEquityBarrierTypes.UP_AND_OUT_CALL,
+                               FinEquityBarrierTypes.DOWN_AND_OUT_PUT,
+                               FinEquityBarrierTypes.UP_AND_OUT_PUT)
+
+        def payoff(paths):
+            s = paths[:, :, 0]
+            if isDown:
+                crossed = np.any(s <= B, axis=1)
+            else:
+                crossed = np.any(s >= B, axis=1)
 
-        v = payoff.mean() * np.exp(- r * t)
+            if isOut:
+                alive = ~crossed
+            else:
+                alive = crossed
 
-        return v * self._notional
+            v = np.maximum(phi * (s[:, -1] - K), 0.0) * alive * scale
+            return v, None
+
+        greeks = valueGreeksGBM(gridTimes,
+                                [stockPrice],
+                                [mu],
+                                [volatility],
+                                None,
+                                payoff,
+                                method,
+                                numPaths,
+                                seed)
+
+        for key in ['delta', 'gamma', 'vega']:
+            greeks[key] = greeks[key][0]
+            greeks['stderr'][key] = greeks['stderr'][key][0]
+
+        return greeks
+
+###############################################################################
+
+    def valueGreeksPDE(self,
+                       valueDate: FinDate,
+                       stockPrice: (float, np.ndarray),
+                       discountCurve: FinDiscountCurve,
+                       dividendYield: float,
+                       model,
+                       numSpaceSteps: int = 200,
+                       numTimeSteps: int = 200):
+        ''' Value the barrier option by Crank-Nicolson finite differences with
+        the barrier observed exactly at the number of observations per year of
+        the option. The model volatility can be a number or a local volatility
+        function of time and an array of stock prices. Returns a dictionary of
+        the value, delta, gamma and theta. '''
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+
+        if t <= 0.0:
+            raise FinError("Value date after expiry date.")
+
+        numObservations = max(int(t * self._numObservationsPerYear), 1)
+        monitoringTimes = t * np.arange(1, numObservations + 1) / \
+            numObservations
+
+        K = self._strikePrice
+        optionType = self._optionType
+
+        if optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                          FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                          FinEquityBarrierTypes.UP_AND_OUT_CALL,
+                          FinEquityBarrierTypes.UP_AND_IN_CALL):
+            phi = 1.0
+        else:
+            phi = -1.0
+
+        isDown = optionType in (FinEquityBarrierTypes.DOWN_AND_OUT_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                                FinEquityBarrierTypes.DOWN_AND_OUT_PUT,
+                                FinEquityBarrierTypes.DOWN_AND_IN_PUT)
+
+        isKnockIn = optionType in (FinEquityBarrierTypes.DOWN_AND_IN_CALL,
+                                   FinEquityBarrierTypes.UP_AND_IN_CALL,
+                                   FinEquityBarrierTypes.DOWN_AND_IN_PUT,
+                                   FinEquityBarrierTypes.UP_AND_IN_PUT)
+
+        def payoff(s):
+            return np.maximum(phi * (s - K), 0.0)
+
+        greeks = fdBarrierValueGreeks(stockPrice, t, payoff, discountCurve,
+                                      dividendYield, model._volatility,
+                                      self._barrierLevel, isDown, isKnockIn,
+                                      monitoringTimes=monitoringTimes,
+                                      strikePrice=K,
+                                      numSpaceSteps=numSpaceSteps,
+                                      numTimeSteps=numTimeSteps)
+
+        for key in greeks:
+            greeks[key] = greeks[key] * self._notional
+            if isinstance(stockPrice, (float, int)):
+                greeks[key] = greeks[key][0]
+
+        return greeks
 
 ###############################################################################
 
@@ -3,14 +3,14 @@
 ##############################################################################
 
 # TODO: Consider risk management
-# TODO: Consider using Sobol
 # TODO: Consider allowing weights on the individual basket assets
 # TODO: Extend monte carlo to handle American options
 
 import numpy as np
 
 from ...finutils.FinGlobalVariables import gDaysInYear
-from ...models.FinGBMProcess import FinGBMProcess
+from ...models.FinPathEngine import FinPathEngine, FinPathModelTypes
+from ...models.FinMCGreeks import valueGreeksGBM, FinMCGreekMethods
 
 from ...finutils.FinError import FinError
 from ...finutils.FinOptionTypes import FinOptionTypes
@@ -93,6 +93,37 @@ class FinEquityBasketOption():
                 if correlations[i, j] != correlations[j, i]:
                     raise FinError("Correlation matrix must be symmetric")
 
+###############################################################################
+
+    def _momentMatch(self,
+                     t,
+                     stockPrices,
+                     dividendYields,
+                     volatilities,
+                     correlations):
+        ''' Return the basket price today together with the dividend yield
+        and variance of the lognormal that has the same first two moments as
+        the basket at the expiry time t. '''
+
+        a = np.ones(self._numAssets) * (1.0 / self._numAssets)
+        s = np.array(stockPrices, dtype=np.float64)
+        q = np.array(dividendYields, dtype=np.float64)
+        v = np.array(volatilities, dtype=np.float64)
+
+        smean = np.sum(a * s)
+
+        # Moment matching - starting with dividend
+        x = a * s * np.exp(-q * t)
+        qnum = np.sum(x)
+        qhat = -np.log(qnum / smean) / t
+
+        # Moment matching - matching volatility
+        rhoSigmaSigma = correlations * np.outer(v, v)
+        vnum = x @ np.exp(rhoSigmaSigma * t) @ x
+        vhat2 = np.log(vnum / qnum / qnum) / t
+
+        return smean, qhat, vhat2
+
 ###############################################################################
 
     def value(self,
@@ -117,47 +148,16 @@ class FinEquityBasketOption():
                        volatilities,
                        correlations)
 
-        q = dividendYields
-        v = volatilities
-        s = stockPrices
-
-        a = np.ones(self._numAssets) * (1.0 / self._numAssets)
         t = (self._expiryDate - valueDate) / gDaysInYear
         df = discountCurve.df(self._expiryDate)
         r = -np.log(df) / t
 
-        smean = 0.0
-        for ia in range(0, self._numAssets):
-            smean = smean + s[ia] * a[ia]
+        smean, qhat, vhat2 = self._momentMatch(t, stockPrices, dividendYields,
+                                               volatilities, correlations)
 
         lnS0k = np.log(smean / self._strikePrice)
         sqrtT = np.sqrt(t)
 
-        # Moment matching - starting with dividend
-        qnum = 0.0
-        qden = 0.0
-        for ia in range(0, self._numAssets):
-            qnum = qnum + a[ia] * s[ia] * np.exp(-q[ia] * t)
-            qden = qden + a[ia] * s[ia]
-        qhat = -np.log(qnum / qden) / t
-
-        # Moment matching - matching volatility
-        vnum = 0.0
-        for ia in range(0, self._numAssets):
-            for ja in range(0, ia):
-                rhoSigmaSigma = v[ia] * v[ja] * correlations[ia, ja]
-                expTerm = (q[ia] + q[ja] - rhoSigmaSigma) * t
-                vnum = vnum + a[ia] * a[ja] * s[ia] * s[ja] * np.exp(-expTerm)
-
-        vnum *= 2.0
-
-        for ia in range(0, self._numAssets):
-            rhoSigmaSigma = v[ia] ** 2
-            expTerm = (2.0 * q[ia] - rhoSigmaSigma) * t
-            vnum = vnum + ((a[ia] * s[ia]) ** 2) * np.exp(-expTerm)
-
-        vhat2 = np.log(vnum / qnum / qnum) / t
-
         den = np.sqrt(vhat2) * sqrtT
         mu = r - qhat
         d1 = (lnS0k + (mu + vhat2 / 2.0) * t) / den
@@ -184,12 +184,26 @@ class FinEquityBasketOption():
                 volatilities: np.ndarray,
                 corrMatrix: np.ndarray,
                 numPaths:int = 10000,
-                seed:int = 4242):
+                seed:int = 4242,
+                useSobol: bool = False,
+                numPathsPerBlock: int = 10000,
+                useControlVariates: bool = True):
         ''' Valuation of the EquityBasketOption using a Monte-Carlo simulation
-        of stock prices assuming a GBM distribution. Cholesky decomposition is
-        used to handle a full rank correlation structure between the individual
-        assets. The numPaths and seed are pre-set to default values but can be
-        overwritten. '''
+        of stock prices assuming a GBM distribution. The paths come from the
+        common path engine using antithetic pairs and are streamed in blocks so
+        the memory does not grow with the number of paths. Cholesky
+        decomposition is used to handle a full rank correlation structure
+        between the individual assets. The numPaths is the number of antithetic
+        pairs so 2 x numPaths paths are simulated. The numPaths and seed are
+        pre-set to default values but can be overwritten. If useSobol is True
+        then scrambled Sobol numbers are used with one dimension per asset and
+        the seed sets the scrambling.
+
+        With control variates the moment matching value is used as a control
+        by pricing the same option on a lognormal with the matched moments
+        which is driven on each path by the normalised log of the geometric
+        average of the basket. Its expected value is exactly the analytical
+        value. The basket forward is a second control. '''
 
         checkArgumentTypes(getattr(self, _funcName(), None), locals())
 
@@ -209,31 +223,132 @@ class FinEquityBasketOption():
         mus = r - dividendYields
         k = self._strikePrice
 
-        numTimeSteps = 2
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
+            phi = 1.0
+        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
+            phi = -1.0
+        else:
+            raise FinError("Unknown option type.")
+
+        modelParams = np.column_stack((stockPrices,
+                                       mus * np.ones(numAssets),
+                                       volatilities))
+
+        engine = FinPathEngine([t],
+                               FinPathModelTypes.GBM,
+                               modelParams,
+                               corrMatrix)
+
+        def payoff(times, paths):
+            basket = np.mean(paths[:, -1, :], axis=1)
+            return np.maximum(phi * (basket - k), 0.0) * df
+
+        if useControlVariates is False:
+
+            results = engine.valueMC([payoff],
+                                     2 * numPaths,
+                                     seed,
+                                     numPathsPerBlock,
+                                     True,
+                                     useSobol)
+
+            return results['value'][0]
+
+        smean, qhat, vhat2 = self._momentMatch(t, stockPrices, dividendYields,
+                                               volatilities, corrMatrix)
+        fwd = smean * np.exp((r - qhat) * t)
+
+        # The log of the geometric average is normal with this mean and
+        # standard deviation
+        logG0 = np.log(stockPrices) + (mus - 0.5 * volatilities**2) * t
+        logG0 = np.mean(logG0)
+        sigmaG = np.sqrt(volatilities @ (corrMatrix * t) @ volatilities)
+        sigmaG = sigmaG / numAssets
+        sigmaL = np.sqrt(vhat2 * t)
+
+        def controls(times, paths):
+            sT = paths[:, -1, :]
+            z = (np.mean(np.log(sT), axis=1) - logG0) / sigmaG
+            lognormal = fwd * np.exp(sigmaL * z - 0.5 * sigmaL * sigmaL)
+            c = np.empty((len(z), 2))
+            c[:, 0] = np.maximum(phi * (lognormal - k), 0.0) * df
+            c[:, 1] = np.mean(sT, axis=1) * df
+            return c
+
+        controlMeans = [self.value(valueDate, stockPrices, discountCurve,
+                                   dividendYields, volatilities, corrMatrix),
+                        fwd * df]
+
+        results = engine.valueMCControlVariates(payoff,
+                                                controls,
+                                                controlMeans,
+                                                2 * numPaths,
+                                                seed,
+                                                numPathsPerBlock,
+                                                True,
+                                                useSobol)
+
+        return results['value']
+
+###############################################################################
+
+    def valueGreeksMC(self,
+                      valueDate: FinDate,
+                      stockPrices: np.ndarray,
+                      discountCurve: FinDiscountCurve,
+                      dividendYields: np.ndarray,
+                      volatilities: np.ndarray,
+                      corrMatrix: np.ndarray,
+                      numPaths: int = 10000,
+                      seed: int = 4242,
+                      method: FinMCGreekMethods = FinMCGreekMethods.PATHWISE):
+        ''' Value the basket option by Monte-Carlo and compute the delta,
+        gamma and vega with respect to each asset in the same simulation
+        using pathwise or likelihood ratio estimators. Returns a dictionary
+        with the value, the vectors of Greeks and their standard errors. '''
 
-        model = FinGBMProcess()
-        np.random.seed(seed)
+        checkArgumentTypes(getattr(self, _funcName(), None), locals())
 
-        Sall = model.getPathsAssets(numAssets,
-                                    numPaths,
-                                    numTimeSteps,
-                                    t,
-                                    mus,
-                                    stockPrices,
-                                    volatilities,
-                                    corrMatrix,
-                                    seed)
+        if valueDate > self._expiryDate:
+            raise FinError("Value date after expiry date.")
+
+        self._validate(stockPrices,
+                       dividendYields,
+                       volatilities,
+                       corrMatrix)
+
+        numAssets = len(stockPrices)
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+        df = discountCurve.df(self._expiryDate)
+        r = -np.log(df)/t
+        mus = r - dividendYields
+        k = self._strikePrice
 
         if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-            payoff = np.maximum(np.mean(Sall, axis=1) - k, 0)
+            phi = 1.0
         elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-            payoff = np.maximum(k - np.mean(Sall, axis=1), 0)
+            phi = -1.0
         else:
             raise FinError("Unknown option type.")
 
-        payoff = np.mean(payoff)
-        v = payoff * np.exp(-r * t)
-        return v
+        def payoff(paths):
+            basket = np.mean(paths[:, -1, :], axis=1)
+            v = np.maximum(phi * (basket - k), 0.0) * df
+            grad = np.zeros(paths.shape)
+            inTheMoney = phi * (basket - k) > 0.0
+            grad[:, -1, :] = (phi * df / numAssets) * inTheMoney[:, np.newaxis]
+            return v, grad
+
+        return valueGreeksGBM([t],
+                              stockPrices,
+                              mus,
+                              volatilities,
+                              corrMatrix,
+                              payoff,
+                              method,
+                              numPaths,
+                              seed)
 
 ###############################################################################
 
@@ -117,15 +117,13 @@ def _valueOnce(stockPrice,
     dt = timeToExpiry / numSteps
     q = dividendYield
 
-    # the number of nodes on the tree
-    numNodes = int(0.5 * (numSteps + 1) * (numSteps + 2))
-    stockValues = np.zeros(numNodes)
-    stockValues[0] = stockPrice
-
-    optionValues = np.zeros(numNodes)
+    # The option values are rolled back in place in a single vector so that
+    # memory is O(numSteps). The nodes of the first two steps are kept for
+    # the Greeks.
+    optionValues = np.zeros(numSteps + 1)
     u = exp(volatility * sqrt(dt))
     d = 1.0 / u
-    sLow = stockPrice
+    uu = u * u
 
     probs = np.zeros(numSteps)
     periodDiscountFactors = np.zeros(numSteps)
@@ -136,44 +134,42 @@ def _valueOnce(stockPrice,
         probs[iTime] = (a - d) / (u - d)
         periodDiscountFactors[iTime] = exp(-r * dt)
 
-    for iTime in range(1, numSteps + 1):
-        sLow *= d
-        s = sLow
-        for iNode in range(0, iTime + 1):
-            index = 0.5 * iTime * (iTime + 1)
-            stockValues[int(index + iNode)] = s
-            s = s * (u * u)
-
     # work backwards by first setting values at expiry date
-    index = int(0.5 * numSteps * (numSteps + 1))
+    s = stockPrice * d ** numSteps
+    for iNode in range(0, numSteps + 1):
+        optionValues[iNode] = _payoffValue(s, payoffTypeValue, payoffParams)
+        s = s * uu
 
-    for iNode in range(0, iTime + 1):
-        s = stockValues[index + iNode]
-        optionValues[index +
-                     iNode] = _payoffValue(s, payoffTypeValue, payoffParams)
+    stockValues = np.zeros(6)
+    treeValues = np.zeros(6)
 
     # begin backward steps from expiry
     for iTime in range(numSteps - 1, -1, -1):
 
-        index = int(0.5 * iTime * (iTime + 1))
+        s = stockPrice * d ** iTime
 
         for iNode in range(0, iTime + 1):
 
-            nextIndex = int(0.5 * (iTime + 1) * (iTime + 2))
-            nextNodeDn = nextIndex + iNode
-            nextNodeUp = nextNodeDn + 1
-            vUp = optionValues[nextNodeUp]
-            vDn = optionValues[nextNodeDn]
+            vUp = optionValues[iNode + 1]
+            vDn = optionValues[iNode]
             futureExpectedValue = probs[iTime] * vUp
             futureExpectedValue += (1.0 - probs[iTime]) * vDn
             holdValue = periodDiscountFactors[iTime] * futureExpectedValue
 
             if exerciseType == FinEquityTreeExerciseTypes.EUROPEAN:
-                optionValues[index + iNode] = holdValue
+                optionValues[iNode] = holdValue
             elif exerciseType == FinEquityTreeExerciseTypes.AMERICAN:
-                s = stockValues[index + iNode]
                 exerciseValue = _payoffValue(s, payoffTypeValue, payoffParams)
-                optionValues[index + iNode] = max(exerciseValue, holdValue)
+                optionValues[iNode] = max(exerciseValue, holdValue)
+
+            if iTime <= 2:
+                index = int(0.5 * iTime * (iTime + 1)) + iNode
+                stockValues[index] = s
+                treeValues[index] = optionValues[iNode]
+
+            s = s * uu
+
+    optionValues = treeValues
 
     price = optionValues[0]
     delta = (optionValues[2] - optionValues[1]) / \
@@ -9,6 +9,7 @@ from scipy import optimize
 from ...finutils.FinMath import M
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
+from ...finutils.FinRandom import getCounterNormals
 
 from ...products.equity.FinEquityOption import FinEquityOption
 from ...market.curves.FinDiscountCurveFlat import FinDiscountCurve
@@ -195,11 +196,10 @@ class FinEquityChooserOption(FinEquityOption):
         kc = self._callStrike
         kp = self._putStrike
 
-        np.random.seed(seed)
         sqrtdt = np.sqrt(t)
 
         # Use Antithetic variables
-        g = np.random.normal(0.0, 1.0, size=(1, numPaths))
+        g = getCounterNormals(seed, numPaths, 1).T
         s = stockPrice * np.exp((rt - q - v*v / 2.0) * t)
         m = np.exp(g * sqrtdt * v)
 
@@ -15,6 +15,8 @@ from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 from ...finutils.FinDate import FinDate
 from ...finutils.FinDayCount import FinDayCount, FinDayCountTypes
 from ...models.FinModelBlackScholes import bsValue
+from ...models.FinModelLocalVol import FinModelLocalVol
+from ...finutils.FinRandom import getCounterNormals
 from ...finutils.FinCalendar import FinBusDayAdjustTypes
 from ...finutils.FinCalendar import FinCalendarTypes,  FinDateGenRuleTypes
 from ...finutils.FinSchedule import FinSchedule
@@ -26,7 +28,6 @@ N = norm.cdf
 
 ###############################################################################
 # TODO: Do we need to day count adjust option payoffs ?
-# TODO: Monte Carlo pricer
 ###############################################################################
 
 
@@ -117,7 +118,7 @@ class FinEquityCliquetOption(FinEquityOption):
                         v = s0 * dq * bsValue(1.0, texp, 1.0, r, q, vol, 1.0)
                         v_cliquet += v
                     elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-                        v = s0 * dq * bsValue(1.0, texp, 1.0, r, q, vol, 1.0)
+                        v = s0 * dq * bsValue(1.0, texp, 1.0, r, q, vol, -1.0)
                         v_cliquet += v
                     else:
                         raise FinError("Unknown option type")
@@ -132,6 +133,71 @@ class FinEquityCliquetOption(FinEquityOption):
 
         return v_cliquet
 
+###############################################################################
+
+    def valueMC(self,
+                valueDate: FinDate,
+                stockPrice: float,
+                discountCurve: FinDiscountCurve,
+                dividendYield: float,
+                model,
+                numPaths: int = 10000,
+                numStepsPerYear: int = 52,
+                seed: int = 4242):
+        ''' Value the cliquet option by Monte-Carlo simulation of the stock
+        price on each of the remaining reset dates. Each option pays the rise
+        (call) or fall (put) of the stock price over its period at the end of
+        the period. With the Black-Scholes model the stock price is simulated
+        exactly from one reset date to the next. With a FinModelLocalVol the
+        stock price is simulated with about numStepsPerYear steps a year and
+        observed on the reset dates. '''
+
+        if valueDate > self._finalExpiryDate:
+            raise FinError("Value date after final expiry date.")
+
+        expiryDates = [dt for dt in self._expiryDates if dt > valueDate]
+        resetTimes = np.array([(dt - valueDate) / gDaysInYear
+                               for dt in expiryDates])
+        dfs = np.atleast_1d(discountCurve.df(expiryDates))
+        numResets = len(resetTimes)
+
+        if type(model) == FinEquityModelBlackScholes:
+
+            vol = max(model._volatility, 1e-6)
+            dts = np.diff(np.concatenate(([0.0], resetTimes)))
+            fwdRates = -np.diff(np.log(np.concatenate(([1.0], dfs)))) / dts
+            mu = fwdRates - dividendYield
+            g = getCounterNormals(seed, numPaths, numResets)
+            logReturns = (mu - 0.5 * vol * vol) * dts + vol * np.sqrt(dts) * g
+            sPaths = stockPrice * np.exp(np.cumsum(logReturns, axis=1))
+
+        elif type(model) == FinModelLocalVol:
+
+            tMax = resetTimes[-1]
+            numSteps = max(int(tMax * numStepsPerYear), 1)
+            times = np.union1d(np.linspace(0.0, tMax, numSteps + 1),
+                               resetTimes)
+            obsIndices = np.searchsorted(times, resetTimes)
+            sPaths = model.getPathsGrid(numPaths, times, obsIndices,
+                                        stockPrice, seed)
+
+        else:
+            raise FinError("Unknown Model Type")
+
+        sStart = np.empty((numPaths, numResets))
+        sStart[:, 0] = stockPrice
+        sStart[:, 1:] = sPaths[:, :-1]
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
+            payoffs = np.maximum(sPaths - sStart, 0.0)
+        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
+            payoffs = np.maximum(sStart - sPaths, 0.0)
+        else:
+            raise FinError("Unknown option type")
+
+        v = np.sum(np.mean(payoffs, axis=0) * dfs)
+        return v
+
 ###############################################################################
 
     def printFlows(self):
@@ -9,6 +9,7 @@ from enum import Enum
 
 from ...finutils.FinGlobalVariables import gDaysInYear, gSmall
 from ...finutils.FinError import FinError
+from ...finutils.FinRandom import getCounterNormals
 from ...finutils.FinOptionTypes import FinOptionTypes
 from ...products.equity.FinEquityOption import FinEquityOption
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
@@ -122,7 +123,6 @@ class FinEquityDigitalOption(FinEquityOption):
         Carlo simulation. Product assumes a barrier only at expiry. Monte Carlo
         handles both a cash-or-nothing and an asset-or-nothing option.'''
 
-        np.random.seed(seed)
         t = (self._expiryDate - valueDate) / gDaysInYear
         df = discountCurve.df(self._expiryDate)
         r = -np.log(df)/t
@@ -133,7 +133,7 @@ class FinEquityDigitalOption(FinEquityOption):
         sqrtdt = np.sqrt(t)
 
         # Use Antithetic variables
-        g = np.random.normal(0.0, 1.0, size=(1, numPaths))
+        g = getCounterNormals(seed, numPaths, 1).T
         s = stockPrice * np.exp((r - q - volatility * volatility / 2.0) * t)
         m = np.exp(g * sqrtdt * volatility)
 
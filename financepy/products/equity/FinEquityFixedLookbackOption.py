@@ -5,12 +5,14 @@
 import numpy as np
 
 
-from ...finutils.FinMath import N
-from ...finutils.FinGlobalVariables import gDaysInYear, gSmall
+from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
 from ...finutils.FinDate import FinDate
 
-from ...models.FinGBMProcess import FinGBMProcess
+from ...models.FinModelLookback import fixedLookbackValuesVectorised
+from ...models.FinModelLookback import getGBMExtrema
+from ...models.FinModelLookback import LOOKBACK_MAX, LOOKBACK_MIN
+from ...models.FinModelLocalVol import FinModelLocalVol
 from ...products.equity.FinEquityOption import FinEquityOption
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 from ...market.curves.FinDiscountCurve import FinDiscountCurve
@@ -20,7 +22,6 @@ from ...finutils.FinOptionTypes import FinOptionTypes
 # TODO: Attempt control variate adjustment to monte carlo
 # TODO: Sobol for Monte Carlo
 # TODO: TIGHTEN UP LIMIT FOR W FROM 100
-# TODO: Vectorise the analytical pricing formula
 ##########################################################################
 
 
@@ -55,118 +56,60 @@ class FinEquityFixedLookbackOption(FinEquityOption):
 
     def value(self,
               valueDate: FinDate,
-              stockPrice: float,
+              stockPrice: (float, np.ndarray),
               discountCurve: FinDiscountCurve,
               dividendYield: float,
               volatility: float,
-              stockMinMax: float):
+              stockMinMax: (float, np.ndarray),
+              numObservationsPerYear: int = 0):
         ''' Valuation of the Fixed Lookback option using Black-Scholes using
         the formulae derived by Conze and Viswanathan (1991). One of the inputs
         is the minimum of maximum of the stock price since the start of the
-        option depending on whether the option is a call or a put. '''
+        option depending on whether the option is a call or a put. The stock
+        price and this extremum can be arrays, such as a ladder of stock
+        prices, which are valued in one vectorised call. If the number of
+        observations per year is positive then the extremum is observed
+        discretely and the Broadie, Glasserman and Kou (1999) correction is
+        applied. '''
 
         t = (self._expiryDate - valueDate) / gDaysInYear
         df = discountCurve.df(self._expiryDate)
         r = -np.log(df)/t
 
-        v = volatility
-        s0 = stockPrice
-        q = dividendYield
-        k = self._strikePrice
-        smin = 0.0
-        smax = 0.0
+        s0, smm = np.broadcast_arrays(np.array(stockPrice, dtype=np.float64),
+                                      np.array(stockMinMax, dtype=np.float64))
 
         if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-            smax = stockMinMax
-            if smax < s0:
+            phi = 1.0
+            if np.any(smm < s0):
                 raise FinError("The Smax value must be >= the stock price.")
         elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-            smin = stockMinMax
-            if smin > s0:
+            phi = -1.0
+            if np.any(smm > s0):
                 raise FinError("The Smin value must be <= the stock price.")
-
-        # There is a risk of an overflow in the limit of q=r which
-        # we remove by adjusting the value of the dividend
-        if abs(r - q) < gSmall:
-            q = r + gSmall
-
-        df = np.exp(-r * t)
-        dq = np.exp(-q * t)
-        b = r - q
-        u = v * v / 2.0 / b
-        w = 2.0 * b / (v * v)
-        expbt = np.exp(b * t)
-        sqrtT = np.sqrt(t)
-
-        # Taken from Hull Page 536 (6th edition) and Haug Page 143
-        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-
-            if k > smax:
-
-                d1 = (np.log(s0 / k) + (b + v * v/2.0) * t) / v / sqrtT
-                d2 = d1 - v * sqrtT
-
-                if s0 == k:
-                    term = -N(d1-2.0 * b * sqrtT / v) + expbt * N(d1)
-                elif s0 < k and w > 100.0:
-                    term = expbt * N(d1)
-                else:
-                    term = -np.power(s0 / k, -w) * N(d1 - 2 * b * sqrtT / v) \
-                        + expbt * N(d1)
-
-                v = s0 * dq * N(d1) - k * df * N(d2) + s0 * df * u * term
-
-            else:
-                e1 = (np.log(s0/smax) + (r - q + v*v/2) * t) / v / sqrtT
-                e2 = e1 - v * sqrtT
-
-                if s0 == smax:
-                    term = -N(e1 - 2.0 * b * sqrtT / v) + expbt * N(e1)
-                elif s0 < smax and w > 100.0:
-                    term = expbt * N(e1)
-                else:
-                    term = (-(s0 / smax)**(-w)) * \
-                        N(e1 - 2.0 * b * sqrtT / v) + expbt * N(e1)
-
-                v = df * (smax - k) + s0 * dq * N(e1) - \
-                    smax * df * N(e2) + s0 * df * u * term
-
-        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-
-            if k >= smin:
-                f1 = (np.log(s0/smin) + (b + v * v / 2.0) * t) / v / sqrtT
-                f2 = f1 - v * sqrtT
-
-                if s0 == smin:
-                    term = N(-f1 + 2.0 * b * sqrtT / v) - expbt * N(-f1)
-                elif s0 > smin and w < -100.0:
-                    term = -expbt * N(-f1)
-                else:
-                    term = ((s0 / smin)**(-w)) * N(-f1 + 2.0 * b * sqrtT / v) \
-                        - expbt * N(-f1)
-
-                v = df * (k - smin) - s0 * dq * N(-f1) + \
-                    smin * df * N(-f2) + s0 * df * u * term
-
-            else:
-                d1 = (np.log(s0 / k) + (b + v * v / 2) * t) / v / sqrtT
-                d2 = d1 - v * sqrtT
-
-                if s0 == k:
-                    term = N(-d1 + 2.0 * b * sqrtT / v) - expbt * N(-d1)
-                elif s0 > k and w < -100.0:
-                    term = -expbt * N(-d1)
-                else:
-                    term = ((s0 / k)**(-w)) * N(-d1 + 2.0 * b * sqrtT / v) \
-                        - expbt * N(-d1)
-
-                v = k * df * N(-d2) - s0 * dq * N(-d1) + s0 * df * u * term
-
         else:
             raise FinError("Unknown lookback option type:" +
                            str(self._optionType))
 
-        return v
+        dt = 0.0
+        if numObservationsPerYear > 0:
+            dt = 1.0 / numObservationsPerYear
+
+        n = s0.size
+        values = fixedLookbackValuesVectorised(np.array(s0).ravel(),
+                                               np.full(n, t),
+                                               np.full(n, self._strikePrice),
+                                               np.array(smm).ravel(),
+                                               np.full(n, r),
+                                               np.full(n, dividendYield),
+                                               np.full(n, volatility),
+                                               np.full(n, phi),
+                                               np.full(n, dt))
+
+        if s0.ndim == 0:
+            return values[0]
+
+        return values.reshape(s0.shape)
 
 ###############################################################################
 
@@ -175,56 +118,50 @@ class FinEquityFixedLookbackOption(FinEquityOption):
                 stockPrice: float,
                 discountCurve: FinDiscountCurve,
                 dividendYield: float,
-                volatility: float,
+                volatility: (float, FinModelLocalVol),
                 stockMinMax: float,
                 numPaths: int = 10000,
                 numStepsPerYear: int = 252,
                 seed: int = 4242):
         ''' Monte Carlo valuation of a fixed strike lookback option using a
-        Black-Scholes model that assumes the stock follows a GBM process. '''
+        Black-Scholes model that assumes the stock follows a GBM process. The
+        volatility can also be a FinModelLocalVol in which case the stock
+        follows the local volatility model. Only the running maximum and
+        minimum of each path are kept so the memory does not grow with the
+        number of steps. '''
 
         t = (self._expiryDate - valueDate) / gDaysInYear
         df = discountCurve.df(self._expiryDate)
         r = -np.log(df)/t
 
         mu = r - dividendYield
-        numTimeSteps = int(t * numStepsPerYear)
+        numTimeSteps = max(int(t * numStepsPerYear), 1)
 
         optionType = self._optionType
         k = self._strikePrice
 
-        smin = 0.0
-        smax = 0.0
-
         if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-            smax = stockMinMax
-            if smax < stockPrice:
+            if stockMinMax < stockPrice:
                 raise FinError(
                     "Smax must be greater than or equal to the stock price.")
         elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-            smin = stockMinMax
-            if smin > stockPrice:
+            if stockMinMax > stockPrice:
                 raise FinError(
                     "Smin must be less than or equal to the stock price.")
 
-        model = FinGBMProcess()
-        Sall = model.getPaths(numPaths, numTimeSteps, t, mu, stockPrice,
-                              volatility, seed)
-
-        # Due to antithetics we have doubled the number of paths
-        numPaths = 2 * numPaths
-        payoff = np.zeros(numPaths)
+        if isinstance(volatility, FinModelLocalVol):
+            extrema = volatility.getPathsExtrema(numPaths, numStepsPerYear, t,
+                                                 stockPrice, seed)
+        else:
+            extrema = getGBMExtrema(numPaths, numTimeSteps, t, mu,
+                                    stockPrice, volatility, seed)
 
         if optionType == FinOptionTypes.EUROPEAN_CALL:
-            SMax = np.max(Sall, axis=1)
-            smaxs = np.ones(numPaths) * smax
-            payoff = np.maximum(SMax - k, 0)
-            payoff = np.maximum(payoff, smaxs - k)
+            SMax = np.maximum(extrema[:, LOOKBACK_MAX], stockMinMax)
+            payoff = np.maximum(SMax - k, 0.0)
         elif optionType == FinOptionTypes.EUROPEAN_PUT:
-            SMin = np.min(Sall, axis=1)
-            smins = np.ones(numPaths) * smin
-            payoff = np.maximum(k - SMin, 0)
-            payoff = np.maximum(payoff, k - smins)
+            SMin = np.minimum(extrema[:, LOOKBACK_MIN], stockMinMax)
+            payoff = np.maximum(k - SMin, 0.0)
         else:
             raise FinError("Unknown lookback option type:" + str(optionType))
 
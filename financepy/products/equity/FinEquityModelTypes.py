@@ -3,6 +3,7 @@
 ##############################################################################
 
 from ...finutils.FinHelperFunctions import labelToString
+from ...models.FinModelCRRTree import FinTreeMethods
 
 ###############################################################################
 
@@ -17,17 +18,25 @@ class FinEquityModel(object):
 
 
 class FinEquityModelBlackScholes(FinEquityModel):
-    def __init__(self, volatility, numStepsPerYear=100, useTree=False):
+    def __init__(self, volatility, numStepsPerYear=100, useTree=False,
+                 treeMethod=FinTreeMethods.BBSR, americanMethod=None):
+        ''' American options are valued on a tree set by treeMethod unless
+        americanMethod is one of FinAmericanApproxMethods in which case the
+        analytical approximation is used. '''
         self._parentType = FinEquityModel
         self._volatility = volatility
         self._numStepsPerYear = numStepsPerYear
         self._useTree = useTree
+        self._treeMethod = treeMethod
+        self._americanMethod = americanMethod
 
     def __repr__(self):
         s = labelToString("OBJECT TYPE", type(self).__name__)
         s += labelToString("VOLATILITY", self._volatility)
         s += labelToString("NUM STEPS PER YEAR", self._numStepsPerYear)
         s += labelToString("USE TREE", self._useTree)
+        s += labelToString("TREE METHOD", self._treeMethod)
+        s += labelToString("AMERICAN METHOD", self._americanMethod)
         return s
 
 ###############################################################################
@@ -14,15 +14,16 @@ from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 from ...finutils.FinDate import FinDate
 from ...market.curves.FinDiscountCurve import FinDiscountCurve
 from ...models.FinGBMProcess import getPaths
-
-from numba import njit
+from ...models.FinGBMProcess import barrierSurvivalProbabilities
+from ...models.FinGBMProcess import barrierHitDiscountFactors
+from ...models.FinModelFiniteDifference import fdBarrierValueGreeks
+from ...models.FinModelLocalVol import FinModelLocalVol
 
 from scipy.stats import norm
 N = norm.cdf
 
 ###############################################################################
 # TODO: Implement Sobol random numbers
-# TODO: Improve convergence
 ###############################################################################
 
 
@@ -43,100 +44,6 @@ class FinTouchOptionPayoffTypes(Enum):
 ###############################################################################
 
 
-@njit(fastmath=True, cache=True)
-def _barrierPayOneAtHitPVDown(s, H, r, dt):
-    ''' Pay $1 if the stock crosses the barrier H from above. PV payment. '''
-    numPaths, numTimeSteps = s.shape
-    pv = 0.0
-
-    for ip in range(0, numPaths):
-        hitFlag = 0
-
-        for it in range(0, numTimeSteps):
-            if s[ip][it] <= H:
-                hitTime = dt * it
-                v = np.exp(-r * hitTime)
-                hitFlag = 1
-                break
-
-        pv = pv + v * hitFlag
-
-    pv = pv / numPaths
-    return pv
-
-###############################################################################
-
-
-@njit(fastmath=True, cache=True)
-def _barrierPayOneAtHitPVUp(s, H, r, dt):
-    ''' Pay $1 if the stock crosses the barrier H from below. PV payment. '''
-
-    numPaths, numTimeSteps = s.shape
-    pv = 0.0
-
-    for ip in range(0, numPaths):
-        hitFlag = 0
-
-        for it in range(0, numTimeSteps):
-            if s[ip][it] >= H:
-                hitTime = dt * it
-                v = np.exp(-r * hitTime)
-                hitFlag = 1
-                break
-
-        pv = pv + v * hitFlag
-
-    pv = pv / numPaths
-    return pv
-
-###############################################################################
-
-
-@njit(fastmath=True, cache=True)
-def _barrierPayAssetAtExpiryDownOut(s, H):
-    ''' Pay $1 if the stock crosses the barrier H from above. PV payment. '''
-    numPaths, numTimeSteps = s.shape
-    pv = 0.0
-
-    for ip in range(0, numPaths):
-        hitFlag = 1
-
-        for it in range(0, numTimeSteps):
-            if s[ip][it] <= H:
-                hitFlag = 0
-                break
-
-        pv = pv + hitFlag * s[ip][numTimeSteps-1]
-
-    pv = pv / numPaths
-    return pv
-
-###############################################################################
-
-
-@njit(fastmath=True, cache=True)
-def _barrierPayAssetAtExpiryUpOut(s, H):
-    ''' Pay $1 if the stock crosses the barrier H from below. PV payment. '''
-
-    numPaths, numTimeSteps = s.shape
-    pv = 0.0
-
-    for ip in range(0, numPaths):
-        hitFlag = 1
-
-        for it in range(0, numTimeSteps):
-            if s[ip][it] >= H:
-                hitFlag = 0
-                break
-
-        pv = pv + hitFlag * s[ip][numTimeSteps-1]
-
-    pv = pv / numPaths
-    return pv
-
-###############################################################################
-
-
 class FinEquityOneTouchOption(FinEquityOption):
     ''' A FinEquityOneTouchOption is an option in which the buyer receives one
     unit of cash OR stock if the stock price touches a barrier at any time
@@ -395,6 +302,100 @@ class FinEquityOneTouchOption(FinEquityOption):
 
         return v
 
+###############################################################################
+
+    def valueGreeksPDE(self,
+                       valueDate: FinDate,
+                       stockPrice: (float, np.ndarray),
+                       discountCurve: FinDiscountCurve,
+                       dividendYield: float,
+                       model,
+                       numSpaceSteps: int = 200,
+                       numTimeSteps: int = 200):
+        ''' Value the one-touch option by Crank-Nicolson finite differences
+        with a continuous barrier which is the edge of the grid. Payments at
+        hit time are the value on the barrier. Payments at expiry if the
+        barrier is touched are the payment without a barrier less the
+        payment if it is never touched. The model volatility can be a number
+        or a local volatility function of time and an array of stock prices.
+        Returns a dictionary of the value, delta, gamma and theta. '''
+
+        if valueDate > self._expiryDate:
+            raise FinError("Value date after expiry date.")
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+        t = max(t, 1e-6)
+
+        H = self._barrierPrice
+        K = self._paymentSize
+        optionType = self._optionType
+
+        isDown = optionType in (
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY,
+            FinTouchOptionPayoffTypes.DOWN_AND_OUT_CASH_OR_NOTHING,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_HIT,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_EXPIRY,
+            FinTouchOptionPayoffTypes.DOWN_AND_OUT_ASSET_OR_NOTHING)
+
+        if isDown and np.any(stockPrice <= H):
+            raise FinError("Stock price is currently below barrier.")
+        elif not isDown and np.any(stockPrice >= H):
+            raise FinError("Stock price is currently above barrier.")
+
+        def cash(s):
+            return np.full(len(s), K)
+
+        def asset(s):
+            return s
+
+        def nothing(s):
+            return np.zeros(len(s))
+
+        isKnockIn = False
+        rebate = 0.0
+
+        if optionType in (FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT,
+                          FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_HIT):
+            payoff = nothing
+            rebate = K
+        elif optionType in (FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_HIT,
+                            FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_HIT):
+            payoff = nothing
+            rebate = H
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY,
+                FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_EXPIRY):
+            payoff = cash
+            isKnockIn = True
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_EXPIRY,
+                FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_EXPIRY):
+            payoff = asset
+            isKnockIn = True
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_OUT_CASH_OR_NOTHING,
+                FinTouchOptionPayoffTypes.UP_AND_OUT_CASH_OR_NOTHING):
+            payoff = cash
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_OUT_ASSET_OR_NOTHING,
+                FinTouchOptionPayoffTypes.UP_AND_OUT_ASSET_OR_NOTHING):
+            payoff = asset
+        else:
+            raise FinError("Unknown option type.")
+
+        greeks = fdBarrierValueGreeks(stockPrice, t, payoff, discountCurve,
+                                      dividendYield, model._volatility,
+                                      H, isDown, isKnockIn, rebate,
+                                      numSpaceSteps=numSpaceSteps,
+                                      numTimeSteps=numTimeSteps)
+
+        if isinstance(stockPrice, (float, int)):
+            for key in greeks:
+                greeks[key] = greeks[key][0]
+
+        return greeks
+
 ###############################################################################
 
     def valueMC(self,
@@ -407,9 +408,15 @@ class FinEquityOneTouchOption(FinEquityOption):
                 numStepsPerYear: int = 252,
                 seed: int = 4242):
         ''' Touch Option valuation using the Black-Scholes model and Monte
-        Carlo simulation. Accuracy is not great when compared to the analytical
-        result as we only observe the barrier a finite number of times. The
-        convergence is slow. '''
+        Carlo simulation. The barrier is continuous so between the simulated
+        prices each path is treated as a Brownian bridge. Options paid at
+        expiry use the probability that the bridge never touches the barrier.
+        Options paid at the hit time also draw the hit time inside the step
+        from its exact distribution. This removes the bias of only observing
+        the barrier at the simulated times so far fewer steps are needed. The
+        model can also be a FinModelLocalVol in which case the bridge uses the
+        root mean square local volatility at the barrier over the life of the
+        option. '''
 
         t = (self._expiryDate - valueDate) / gDaysInYear
         df = discountCurve.df(self._expiryDate)
@@ -417,137 +424,80 @@ class FinEquityOneTouchOption(FinEquityOption):
         numTimeSteps = int(t * numStepsPerYear) + 1
         dt = t / numTimeSteps
 
-        v = model._volatility
         q = dividendYield
         s0 = stockPrice
         mu = r - q
-
-        s = getPaths(numPaths, numTimeSteps, t, mu, s0, v, seed)
-
         H = self._barrierPrice
-        X = self._paymentSize
-
-        v = 0.0
-
-        if self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT:
-            # HAUG 1
-
-            if s0 <= H:
-                raise FinError("Barrier has ALREADY been crossed.")
-
-            v = _barrierPayOneAtHitPVDown(s, H, r, dt)
-            v = v * X
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_HIT:
-            # HAUG 2
-
-            if s0 >= H:
-                raise FinError("Barrier has ALREADY been crossed.")
-
-            v = _barrierPayOneAtHitPVUp(s, H, r, dt)
-            v = v * X
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_HIT:
-            # HAUG 3
-
-            if s0 <= H:
-                raise FinError("Stock price is currently below barrier.")
-
-            v = _barrierPayOneAtHitPVDown(s, H, r, dt) * H
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_HIT:
-            # HAUG 4
-
-            if s0 >= H:
-                raise FinError("Stock price is currently below barrier.")
-
-            v = _barrierPayOneAtHitPVUp(s, H, r, dt) * H
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY:
-            # HAUG 5
-
-            if s0 <= H:
-                raise FinError("Barrier has  ALREADY been crossed.")
-
-            v = _barrierPayOneAtHitPVDown(s, H, 0.0, dt)
-            v = v * X * np.exp(-r*t)
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_EXPIRY:
-            # HAUG 6
-
-            if s0 >= H:
-                raise FinError("Barrier has ALREADY been crossed.")
-
-            v = _barrierPayOneAtHitPVUp(s, H, 0.0, dt)
-            v = v * X * np.exp(-r*t)
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_EXPIRY:
-            # HAUG 7
-
-            if s0 <= H:
-                raise FinError("Stock price is currently below barrier.")
-
-            v = _barrierPayOneAtHitPVDown(s, H, 0.0, dt) * H
-            return v
 
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_EXPIRY:
-            # HAUG 8
-
-            if s0 >= H:
-                raise FinError("Stock price is currently below barrier.")
-
-            v = _barrierPayOneAtHitPVUp(s, H, 0.0, dt) * H
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_OUT_CASH_OR_NOTHING:
-            # HAUG 9
-
-            if s0 <= H:
-                raise FinError("Barrier has ALREADY been crossed.")
-
-            v = 1.0 - _barrierPayOneAtHitPVDown(s, H, 0.0, dt)
-            v = v * X * np.exp(-r*t)
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_OUT_CASH_OR_NOTHING:
-            # HAUG 10
-
-            if s0 >= H:
-                raise FinError("Barrier has ALREADY been crossed.")
-
-            v = 1.0 - _barrierPayOneAtHitPVUp(s, H, 0.0, dt)
-            v = v * X * np.exp(-r*t)
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.DOWN_AND_OUT_ASSET_OR_NOTHING:
-            # HAUG 11
-
-            if s0 <= H:
-                raise FinError("Stock price is currently below barrier.")
-
-            v = _barrierPayAssetAtExpiryDownOut(s, H)
-            v = v * np.exp(-r*t)
-            return v
-
-        elif self._optionType == FinTouchOptionPayoffTypes.UP_AND_OUT_ASSET_OR_NOTHING:
-            # HAUG 12
-
-            if s0 >= H:
-                raise FinError("Stock price is currently below barrier.")
+        if isinstance(model, FinModelLocalVol):
+            times = np.linspace(0.0, t, numTimeSteps + 1)
+            s = model.getPathsGrid(numPaths, times,
+                                   np.arange(0, numTimeSteps + 1), s0, seed)
+            # The bridge uses the local volatility at the barrier
+            volatility = np.sqrt(np.mean(model.localVolatility(H, times)**2))
+        else:
+            volatility = model._volatility
+            s = getPaths(numPaths, numTimeSteps, t, mu, s0, volatility, seed)
 
-            v = _barrierPayAssetAtExpiryUpOut(s, H)
-            v = v * np.exp(-r*t)
-            return v
+        X = self._paymentSize
+        optionType = self._optionType
+
+        isDown = optionType in (
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY,
+            FinTouchOptionPayoffTypes.DOWN_AND_OUT_CASH_OR_NOTHING,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_HIT,
+            FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_EXPIRY,
+            FinTouchOptionPayoffTypes.DOWN_AND_OUT_ASSET_OR_NOTHING)
+
+        if isDown and s0 <= H:
+            raise FinError("Stock price is currently below barrier.")
+        elif not isDown and s0 >= H:
+            raise FinError("Stock price is currently above barrier.")
+
+        if optionType in (FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT,
+                          FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_HIT,
+                          FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_HIT,
+                          FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_HIT):
+            # HAUG 1 to 4
+            pv = barrierHitDiscountFactors(s, H, int(isDown), volatility,
+                                           dt, r, seed).mean()
+
+            if optionType in (
+                    FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT,
+                    FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_HIT):
+                return pv * X
+            else:
+                return pv * H
+
+        survival = barrierSurvivalProbabilities(s, H, int(isDown),
+                                                volatility, dt)
+        sT = s[:, -1]
+
+        if optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY,
+                FinTouchOptionPayoffTypes.UP_AND_IN_CASH_AT_EXPIRY):
+            # HAUG 5 and 6
+            v = X * (1.0 - survival).mean()
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_IN_ASSET_AT_EXPIRY,
+                FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_EXPIRY):
+            # HAUG 7 and 8
+            v = (sT * (1.0 - survival)).mean()
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_OUT_CASH_OR_NOTHING,
+                FinTouchOptionPayoffTypes.UP_AND_OUT_CASH_OR_NOTHING):
+            # HAUG 9 and 10
+            v = X * survival.mean()
+        elif optionType in (
+                FinTouchOptionPayoffTypes.DOWN_AND_OUT_ASSET_OR_NOTHING,
+                FinTouchOptionPayoffTypes.UP_AND_OUT_ASSET_OR_NOTHING):
+            # HAUG 11 and 12
+            v = (sT * survival).mean()
         else:
             raise FinError("Unknown option type.")
 
-        return v
+        return v * df
 
 ###############################################################################
 
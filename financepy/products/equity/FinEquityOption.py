@@ -93,7 +93,11 @@ class FinEquityOption(object):
         v = self.value(valueDate, stockPrice, discountCurve,
                        dividendYield, model)
 
-        model = FinEquityModelBlackScholes(model._volatility + bump)
+        model = FinEquityModelBlackScholes(model._volatility + bump,
+                                           model._numStepsPerYear,
+                                           model._useTree,
+                                           model._treeMethod,
+                                           model._americanMethod)
 
         vBumped = self.value(valueDate, stockPrice, discountCurve,
                              dividendYield, model)
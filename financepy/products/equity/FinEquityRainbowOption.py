@@ -10,7 +10,9 @@ from typing import List
 from ...finutils.FinMath import N, M
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
-from ...models.FinGBMProcess import FinGBMProcess
+from ...models.FinMCGreeks import valueGreeksGBM, FinMCGreekMethods
+from ...models.FinModelBlackScholes import bsValue
+from ...models.FinPathEngine import FinPathEngine, FinPathModelTypes
 from ...products.equity.FinEquityOption import FinEquityOption
 from ...market.curves.FinDiscountCurve import FinDiscountCurve
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
@@ -63,34 +65,48 @@ def payoffValue(s, payoffTypeValue, payoffParams):
 
 ###############################################################################
 
+def payoffGradient(s, payoffTypeValue, payoffParams):
+    ''' Derivative of the payoff with respect to each of the asset prices.
+    Only the asset selected by the payoff, the maximum, the minimum or the
+    nth largest, has a non-zero derivative when the option is in the money.
+    This is used by the pathwise Monte-Carlo Greeks. '''
 
-def valueMCFast(t,
-                stockPrices,
-                discountCurve,
-                dividendYields,
-                volatilities,
-                betas,
-                numAssets,
-                payoffType,
-                payoffParams,
-                numPaths=10000,
-                seed=4242):
+    numPaths = s.shape[0]
 
-    np.random.seed(seed)
-    df = discountCurve._df(t)
-    r = -log(df)/t
-    mus = r - dividendYields
-
-    model = FinGBMProcess()
-
-    numTimeSteps = 2
-    Sall = model.getPathsAssets(numAssets, numPaths, numTimeSteps,
-                                t, mus, stockPrices, volatilities, betas, seed)
+    if payoffTypeValue == FinEquityRainbowOptionTypes.CALL_ON_MINIMUM.value:
+        k = payoffParams[0]
+        phi = 1.0
+        index = np.argmin(s, axis=1)
+    elif payoffTypeValue == FinEquityRainbowOptionTypes.CALL_ON_MAXIMUM.value:
+        k = payoffParams[0]
+        phi = 1.0
+        index = np.argmax(s, axis=1)
+    elif payoffTypeValue == FinEquityRainbowOptionTypes.PUT_ON_MINIMUM.value:
+        k = payoffParams[0]
+        phi = -1.0
+        index = np.argmin(s, axis=1)
+    elif payoffTypeValue == FinEquityRainbowOptionTypes.PUT_ON_MAXIMUM.value:
+        k = payoffParams[0]
+        phi = -1.0
+        index = np.argmax(s, axis=1)
+    elif payoffTypeValue == FinEquityRainbowOptionTypes.CALL_ON_NTH.value:
+        n = payoffParams[0]
+        k = payoffParams[1]
+        phi = 1.0
+        index = np.argsort(s, axis=1)[:, -n]
+    elif payoffTypeValue == FinEquityRainbowOptionTypes.PUT_ON_NTH.value:
+        n = payoffParams[0]
+        k = payoffParams[1]
+        phi = -1.0
+        index = np.argsort(s, axis=1)[:, -n]
+    else:
+        raise FinError("Unknown payoff type")
 
-    payoff = payoffValue(Sall, payoffType.value, payoffParams)
-    payoff = np.mean(payoff)
-    v = payoff * exp(-r * t)
-    return v
+    rows = np.arange(0, numPaths)
+    sSelected = s[rows, index]
+    grad = np.zeros(s.shape)
+    grad[rows, index] = phi * (phi * (sSelected - k) > 0.0)
+    return grad
 
 ###############################################################################
 
@@ -259,7 +275,19 @@ class FinEquityRainbowOption(FinEquityOption):
                 volatilities,
                 corrMatrix,
                 numPaths=10000,
-                seed=4242):
+                seed=4242,
+                useSobol=False,
+                numPathsPerBlock=10000,
+                useControlVariates=True):
+        ''' Value the rainbow option by Monte-Carlo using antithetic paths
+        from the common path engine, or scrambled Sobol points, which are
+        streamed in blocks so that the memory does not grow with the number
+        of paths. As for the other GBM pricers numPaths is the number of
+        antithetic pairs so 2 x numPaths paths are simulated. With control
+        variates the vanilla option on each asset with the same strike and
+        type, the same option on the geometric average of the assets and the
+        average asset price, which all have known values, are used as
+        controls. '''
 
         self._validate(stockPrices,
                        dividendYields,
@@ -270,20 +298,125 @@ class FinEquityRainbowOption(FinEquityOption):
             raise FinError("Value date after expiry date.")
 
         t = (self._expiryDate - valueDate) / gDaysInYear
+        df = discountCurve._df(t)
+        r = -log(df)/t
+        mus = r - dividendYields
+        payoffTypeValue = self._payoffType.value
+        payoffParams = self._payoffParams
+
+        modelParams = np.column_stack((stockPrices,
+                                       mus * np.ones(self._numAssets),
+                                       volatilities))
+
+        engine = FinPathEngine([t],
+                               FinPathModelTypes.GBM,
+                               modelParams,
+                               corrMatrix)
+
+        def payoff(times, paths):
+            return payoffValue(paths[:, -1, :], payoffTypeValue,
+                               payoffParams) * df
+
+        if useControlVariates is False:
+            results = engine.valueMC([payoff], 2 * numPaths, seed,
+                                     numPathsPerBlock, True, useSobol)
+            return results['value'][0]
+
+        if self._payoffType in (FinEquityRainbowOptionTypes.CALL_ON_NTH,
+                                FinEquityRainbowOptionTypes.PUT_ON_NTH):
+            k = payoffParams[1]
+        else:
+            k = payoffParams[0]
 
-        v = valueMCFast(t,
-                        stockPrices,
-                        discountCurve,
-                        dividendYields,
-                        volatilities,
-                        corrMatrix,
-                        self._numAssets,
-                        self._payoffType,
-                        self._payoffParams,
-                        numPaths,
-                        seed)
+        if self._payoffType in (FinEquityRainbowOptionTypes.CALL_ON_MAXIMUM,
+                                FinEquityRainbowOptionTypes.CALL_ON_MINIMUM,
+                                FinEquityRainbowOptionTypes.CALL_ON_NTH):
+            phi = 1.0
+        else:
+            phi = -1.0
+
+        # The option on the geometric average of the assets is lognormal
+        # with a known value and tracks the common moves of the assets
+        stockPrices = np.array(stockPrices, dtype=np.float64)
+        vols = np.array(volatilities, dtype=np.float64)
+        qs = np.array(dividendYields, dtype=np.float64)
+        numAssets = self._numAssets
+        logG0 = np.mean(np.log(stockPrices) + (mus - 0.5 * vols * vols) * t)
+        sigmaG = np.sqrt(vols @ (corrMatrix * t) @ vols) / numAssets
+        fwdG = np.exp(logG0 + 0.5 * sigmaG * sigmaG)
+        d1 = (log(fwdG / k) + 0.5 * sigmaG * sigmaG) / sigmaG
+        d2 = d1 - sigmaG
+        geometricValue = phi * df * (fwdG * N(phi * d1) - k * N(phi * d2))
+
+        def controls(times, paths):
+            sT = paths[:, -1, :]
+            g = np.exp(np.mean(np.log(sT), axis=1))
+            c = np.empty((sT.shape[0], numAssets + 2))
+            c[:, 0:numAssets] = np.maximum(phi * (sT - k), 0.0) * df
+            c[:, numAssets] = np.maximum(phi * (g - k), 0.0) * df
+            c[:, numAssets + 1] = np.mean(sT, axis=1) * df
+            return c
+
+        vanillaValues = bsValue(stockPrices, t, k, r, qs, vols, phi)
+        forwardValue = np.mean(stockPrices * np.exp(-qs * t))
+        controlMeans = np.concatenate((vanillaValues,
+                                       [geometricValue, forwardValue]))
+
+        results = engine.valueMCControlVariates(payoff, controls,
+                                                controlMeans, 2 * numPaths,
+                                                seed, numPathsPerBlock, True,
+                                                useSobol)
+        return results['value']
 
-        return v
+###############################################################################
+
+    def valueGreeksMC(self,
+                      valueDate,
+                      stockPrices,
+                      discountCurve,
+                      dividendYields,
+                      volatilities,
+                      corrMatrix,
+                      numPaths=10000,
+                      seed=4242,
+                      method=FinMCGreekMethods.PATHWISE):
+        ''' Value the rainbow option by Monte-Carlo and compute the delta,
+        gamma and vega with respect to each asset in the same simulation
+        using pathwise or likelihood ratio estimators. Returns a dictionary
+        with the value, the vectors of Greeks and their standard errors. '''
+
+        self._validate(stockPrices,
+                       dividendYields,
+                       volatilities,
+                       corrMatrix)
+
+        if valueDate > self._expiryDate:
+            raise FinError("Value date after expiry date.")
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+        df = discountCurve._df(t)
+        r = -log(df)/t
+        mus = r - dividendYields
+        payoffTypeValue = self._payoffType.value
+        payoffParams = self._payoffParams
+
+        def payoff(paths):
+            sT = paths[:, -1, :]
+            v = payoffValue(sT, payoffTypeValue, payoffParams) * df
+            grad = np.zeros(paths.shape)
+            grad[:, -1, :] = payoffGradient(sT, payoffTypeValue,
+                                            payoffParams) * df
+            return v, grad
+
+        return valueGreeksGBM([t],
+                              stockPrices,
+                              mus,
+                              volatilities,
+                              corrMatrix,
+                              payoff,
+                              method,
+                              numPaths,
+                              seed)
 
 ###############################################################################
 
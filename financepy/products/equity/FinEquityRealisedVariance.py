@@ -0,0 +1,166 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+import numpy as np
+from math import log
+from numba import njit, prange, float64, int64, boolean, void
+
+from ...finutils.FinError import FinError
+from ...finutils.FinHelperFunctions import labelToString
+
+# Annualisation factor used by FinEquityVarianceSwap.realisedVariance
+ANNUALISATION_FACTOR = 252.0
+
+###############################################################################
+
+
+@njit(void(int64[:], float64[:], float64[:], float64[:], int64[:], boolean),
+      fastmath=True, cache=True, parallel=True)
+def _updateRealisedVariance(counts,
+                            sumX2,
+                            lastPrices,
+                            closePrices,
+                            indices,
+                            useLogs):
+    ''' Add one close price to each of the swaps at the given indices. Each
+    update is O(1) and the indices must be distinct. '''
+
+    for i in prange(0, len(indices)):
+
+        j = indices[i]
+        s = closePrices[i]
+
+        if counts[j] > 0:
+            if useLogs:
+                x = log(s / lastPrices[j])
+            else:
+                x = (s - lastPrices[j]) / lastPrices[j]
+            sumX2[j] += x * x
+
+        lastPrices[j] = s
+        counts[j] += 1
+
+###############################################################################
+
+
+class FinEquityRealisedVariance():
+    ''' Class which accumulates the realised variance of a set of variance
+    swaps one close price at a time. Each swap only stores the number of
+    observations, the sum of the squared returns and the last close price so
+    a new close is added in O(1) without the price history. The variance is
+    annualised in the same way as FinEquityVarianceSwap.realisedVariance so
+    the two agree on the same prices. '''
+
+    def __init__(self,
+                 numSwaps: int = 1,
+                 useLogs: bool = True):
+        ''' Create an accumulator for a number of swaps which have no
+        observations yet. The returns are log returns unless useLogs is
+        False in which case they are percentage returns. '''
+
+        if numSwaps < 1:
+            raise FinError("Number of swaps must be at least one.")
+
+        self._useLogs = useLogs
+        self._counts = np.zeros(numSwaps, dtype=np.int64)
+        self._sumX2 = np.zeros(numSwaps)
+        self._lastPrices = np.zeros(numSwaps)
+
+###############################################################################
+
+    def _indices(self, indices, numPrices):
+        ''' Convert the swap indices to an array and check them. If there are
+        none then the prices are for all of the swaps. '''
+
+        numSwaps = len(self._counts)
+
+        if indices is None:
+            if numPrices != numSwaps:
+                raise FinError("Need one close price per swap.")
+            return np.arange(0, numSwaps, dtype=np.int64)
+
+        indices = np.atleast_1d(np.array(indices, dtype=np.int64))
+
+        if len(indices) != numPrices:
+            raise FinError("Need one close price per swap index.")
+
+        if np.any(indices < 0) or np.any(indices >= numSwaps):
+            raise FinError("Swap index out of range.")
+
+        if len(np.unique(indices)) != len(indices):
+            raise FinError("Swap indices must be distinct.")
+
+        return indices
+
+###############################################################################
+
+    def update(self,
+               closePrices: (float, list, np.ndarray),
+               indices: (list, np.ndarray) = None):
+        ''' Add a new close price to each swap. If indices are given then
+        only those swaps are updated, with one close price per index, so
+        swaps on different underlyings or calendars can be updated
+        separately. '''
+
+        closePrices = np.atleast_1d(np.array(closePrices, dtype=np.float64))
+        indices = self._indices(indices, len(closePrices))
+
+        if np.any(closePrices <= 0.0):
+            raise FinError("Stock prices must be greater than zero")
+
+        _updateRealisedVariance(self._counts, self._sumX2, self._lastPrices,
+                                closePrices, indices, self._useLogs)
+
+###############################################################################
+
+    def reset(self,
+              indices: (list, np.ndarray) = None):
+        ''' Clear the state of the swaps at the indices, or of all the swaps,
+        so that the slots can be reused for new swaps. '''
+
+        if indices is None:
+            indices = np.arange(0, len(self._counts), dtype=np.int64)
+        else:
+            indices = self._indices(indices, len(np.atleast_1d(indices)))
+
+        self._counts[indices] = 0
+        self._sumX2[indices] = 0.0
+        self._lastPrices[indices] = 0.0
+
+###############################################################################
+
+    def numObservations(self):
+        ''' The number of close prices seen by each swap. '''
+        return self._counts.copy()
+
+###############################################################################
+
+    def realisedVariance(self):
+        ''' The annualised realised variance of each swap. A swap with fewer
+        than two close prices has a realised variance of zero. '''
+
+        counts = np.maximum(self._counts, 1)
+        return self._sumX2 * ANNUALISATION_FACTOR / counts
+
+###############################################################################
+
+    def realisedVolatility(self):
+        ''' The annualised realised volatility of each swap. '''
+        return np.sqrt(self.realisedVariance())
+
+###############################################################################
+
+    def __repr__(self):
+        s = labelToString("OBJECT TYPE", type(self).__name__)
+        s += labelToString("NUM SWAPS", len(self._counts))
+        s += labelToString("USE LOGS", self._useLogs, "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        ''' Simple print function for backward compatibility. '''
+        print(self)
+
+###############################################################################
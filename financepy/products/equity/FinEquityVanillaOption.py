@@ -5,14 +5,13 @@
 
 import numpy as np
 
-from scipy import optimize
-
-
 from ...finutils.FinDate import FinDate
 from ...finutils.FinMath import nprime
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
+from ...finutils.FinRandom import getCounterNormals
 from ...models.FinModelBlackScholes import bsValue
+from ...models.FinModelBlack import blackImpliedVolatilityVectorised
 from ...products.equity.FinEquityModelTypes import FinEquityModel
 from ...products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
 from ...finutils.FinOptionTypes import FinOptionTypes
@@ -27,51 +26,6 @@ N = norm.cdf
 ###############################################################################
 
 
-def _f(volatility, *args):
-
-    self = args[0]
-    valueDate = args[1]
-    stockPrice = args[2]
-    discountCurve = args[3]
-    dividendYield = args[4]
-    price = args[5]
-
-    model = FinEquityModelBlackScholes(volatility)
-
-    objFn = self.value(valueDate,
-                       stockPrice,
-                       discountCurve,
-                       dividendYield,
-                       model)
-
-    objFn = objFn - price
-
-#    print(volatility, price, objFn)
-    return objFn
-
-###############################################################################
-
-
-def _fvega(volatility, *args):
-
-    self = args[0]
-    valueDate = args[1]
-    stockPrice = args[2]
-    discountCurve = args[3]
-    dividendYield = args[4]
-
-    model = FinEquityModelBlackScholes(volatility)
-    fprime = self.vega(
-        valueDate,
-        stockPrice,
-        discountCurve,
-        dividendYield,
-        model)
-    return fprime
-
-###############################################################################
-
-
 class FinEquityVanillaOption():
     ''' Class for managing plain vanilla European calls and puts on equities.
     For American calls and puts see the FinEquityAmericanOption class. '''
@@ -433,15 +387,46 @@ class FinEquityVanillaOption():
                           stockPrice: (float, list, np.ndarray),
                           discountCurve: FinDiscountCurve,
                           dividendYield: float,
-                          price):
-        ''' Calculate the implied volatility of a European vanilla option. '''
+                          price: (float, list, np.ndarray)):
+        ''' Calculate the implied volatility of a European vanilla option.
+        The price, stock price and strike can be arrays in which case all of
+        the implied volatilities are solved together in a vectorised kernel.
+        NaN is returned for a price outside the no-arbitrage bounds. '''
+
+        texp = (self._expiryDate - valueDate) / gDaysInYear
+
+        if texp <= 0.0:
+            raise FinError("Time to expiry must be positive.")
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
+            phi = 1.0
+        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
+            phi = -1.0
+        else:
+            raise FinError("Unknown option type")
+
+        df = discountCurve.df(self._expiryDate)
+        q = dividendYield
+
+        prices, stockPrices, strikes = \
+            np.broadcast_arrays(np.array(price, dtype=np.float64),
+                                np.array(stockPrice, dtype=np.float64),
+                                np.array(self._strikePrice, dtype=np.float64))
+
+        shape = prices.shape
+        prices = prices.flatten() / self._numOptions
+        forwards = stockPrices.flatten() * np.exp(-q * texp) / df
+        strikes = strikes.flatten()
+        ones = np.ones(len(prices))
+
+        sigma = blackImpliedVolatilityVectorised(prices, forwards, strikes,
+                                                 texp * ones, df * ones,
+                                                 phi * ones)
 
-        argtuple = (self, valueDate, stockPrice,
-                    discountCurve, dividendYield, price)
+        if len(shape) == 0:
+            return sigma[0]
 
-        sigma = optimize.newton(_f, x0=0.2, fprime=_fvega, args=argtuple,
-                                tol=1e-5, maxiter=50, fprime2=None)
-        return sigma
+        return sigma.reshape(shape)
 
 # 
 ###############################################################################
@@ -467,7 +452,6 @@ class FinEquityVanillaOption():
            self._optionType != FinOptionTypes.EUROPEAN_PUT:
             raise FinError("Can only value European call or put.")
 
-        np.random.seed(seed)
         t = (self._expiryDate - valueDate) / gDaysInYear
 
         df = discountCurve.df(self._expiryDate)
@@ -482,7 +466,7 @@ class FinEquityVanillaOption():
         if useSobol is True:
             g = getGaussianSobol(numPaths, 1)
         else:
-            g = np.random.normal(0.0, 1.0, size=(1, numPaths))
+            g = getCounterNormals(seed, numPaths, 1).T
 
         s = stockPrice * np.exp((mu - v2 / 2.0) * t)
         m = np.exp(g * sqrtdt * volatility)
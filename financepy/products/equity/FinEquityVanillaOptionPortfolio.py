@@ -0,0 +1,179 @@
+##############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+##############################################################################
+
+import numpy as np
+from typing import List, Optional
+
+from ...finutils.FinDate import FinDate
+from ...finutils.FinGlobalVariables import gDaysInYear
+from ...finutils.FinError import FinError
+from ...finutils.FinOptionTypes import FinOptionTypes
+from ...finutils.FinHelperFunctions import checkArgumentTypes, labelToString
+from ...models.FinModelBlackScholes import bsValueGreeksVectorised
+from ...models.FinModelBlackScholes import BS_VALUE, BS_DELTA, BS_GAMMA
+from ...models.FinModelBlackScholes import BS_VEGA, BS_THETA, BS_RHO
+from ...models.FinModelBlackScholes import BS_VANNA, BS_VOLGA
+from ...products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
+from ...market.curves.FinDiscountCurve import FinDiscountCurve
+
+###############################################################################
+
+
+class FinEquityVanillaOptionPortfolio():
+    ''' Class for a portfolio of European calls and puts on equities which can
+    each have their own expiry date, strike, type and number of options. The
+    whole portfolio is priced in a single vectorised Black-Scholes kernel that
+    returns the value and the first and second order Greeks of every option
+    at the same time. The stock price, dividend yield and volatility can be
+    a single number or one per option. '''
+
+    def __init__(self,
+                 expiryDates: List[FinDate],
+                 strikePrices: List[float],
+                 optionTypes: List[FinOptionTypes],
+                 numOptions: Optional[List[float]] = None):
+        ''' Create the portfolio from lists of the expiry dates, strikes and
+        option types and optionally the number of each option held. '''
+
+        checkArgumentTypes(self.__init__, locals())
+
+        numOpts = len(expiryDates)
+
+        if len(strikePrices) != numOpts or len(optionTypes) != numOpts:
+            raise FinError("Expiry, strike and type lists differ in length.")
+
+        if numOptions is None:
+            numOptions = np.ones(numOpts)
+        elif len(numOptions) != numOpts:
+            raise FinError("Number of options list has the wrong length.")
+
+        phi = np.empty(numOpts)
+
+        for i in range(0, numOpts):
+            if optionTypes[i] == FinOptionTypes.EUROPEAN_CALL:
+                phi[i] = 1.0
+            elif optionTypes[i] == FinOptionTypes.EUROPEAN_PUT:
+                phi[i] = -1.0
+            else:
+                raise FinError("Unknown Option Type" + str(optionTypes[i]))
+
+        self._expiryDates = list(expiryDates)
+        self._strikePrices = np.array(strikePrices, dtype=np.float64)
+        self._optionTypes = list(optionTypes)
+        self._numOptions = np.array(numOptions, dtype=np.float64)
+        self._phi = phi
+
+###############################################################################
+
+    def _marketInputs(self,
+                      valueDate: FinDate,
+                      stockPrice: (float, list, np.ndarray),
+                      discountCurve: FinDiscountCurve,
+                      dividendYield: (float, list, np.ndarray),
+                      model):
+        ''' Convert the market data into arrays with one entry per option.
+        Each distinct expiry date is only looked up on the discount curve
+        once. '''
+
+        if type(model) != FinEquityModelBlackScholes:
+            raise FinError("Unknown Model Type")
+
+        numOpts = len(self._expiryDates)
+
+        excelDates = np.array([dt._excelDate for dt in self._expiryDates])
+        _, firsts, index = np.unique(excelDates, return_index=True,
+                                     return_inverse=True)
+        uniqueDates = [self._expiryDates[i] for i in firsts]
+
+        uniqueTimes = np.array([(dt - valueDate) / gDaysInYear
+                                for dt in uniqueDates])
+
+        if np.any(uniqueTimes < 0.0):
+            raise FinError("Time to expiry must be positive.")
+
+        uniqueTimes = np.maximum(uniqueTimes, 1e-10)
+        uniqueDfs = np.atleast_1d(discountCurve.df(uniqueDates))
+        uniqueRates = -np.log(uniqueDfs) / uniqueTimes
+
+        t = uniqueTimes[index]
+        r = uniqueRates[index]
+
+        ones = np.ones(numOpts)
+        s = np.array(stockPrice, dtype=np.float64) * ones
+        q = np.array(dividendYield, dtype=np.float64) * ones
+        v = np.array(model._volatility, dtype=np.float64) * ones
+
+        if np.any(s <= 0.0):
+            raise FinError("Stock price must be greater than zero.")
+
+        if np.any(v < 0.0):
+            raise FinError("Volatility should not be negative.")
+
+        return s, t, r, q, v
+
+###############################################################################
+
+    def valueGreeks(self,
+                    valueDate: FinDate,
+                    stockPrice: (float, list, np.ndarray),
+                    discountCurve: FinDiscountCurve,
+                    dividendYield: (float, list, np.ndarray),
+                    model):
+        ''' Return a dictionary of arrays of the value, delta, gamma, vega,
+        theta, rho, vanna and volga of each position in the portfolio. These
+        are scaled by the number of options held. '''
+
+        s, t, r, q, v = self._marketInputs(valueDate, stockPrice,
+                                           discountCurve, dividendYield,
+                                           model)
+
+        out = bsValueGreeksVectorised(s, t, self._strikePrices, r, q, v,
+                                      self._phi)
+
+        out = out * self._numOptions[:, np.newaxis]
+
+        greeks = {'value': out[:, BS_VALUE],
+                  'delta': out[:, BS_DELTA],
+                  'gamma': out[:, BS_GAMMA],
+                  'vega': out[:, BS_VEGA],
+                  'theta': out[:, BS_THETA],
+                  'rho': out[:, BS_RHO],
+                  'vanna': out[:, BS_VANNA],
+                  'volga': out[:, BS_VOLGA]}
+
+        return greeks
+
+###############################################################################
+
+    def value(self,
+              valueDate: FinDate,
+              stockPrice: (float, list, np.ndarray),
+              discountCurve: FinDiscountCurve,
+              dividendYield: (float, list, np.ndarray),
+              model):
+        ''' Return the total value of the portfolio. '''
+
+        greeks = self.valueGreeks(valueDate, stockPrice, discountCurve,
+                                  dividendYield, model)
+
+        return np.sum(greeks['value'])
+
+###############################################################################
+
+    def __repr__(self):
+        s = labelToString("OBJECT TYPE", type(self).__name__)
+        s += labelToString("NUM OPTIONS", len(self._expiryDates))
+        s += labelToString("FIRST EXPIRY", min(self._expiryDates))
+        s += labelToString("LAST EXPIRY", max(self._expiryDates))
+        s += labelToString("MIN STRIKE", np.min(self._strikePrices))
+        s += labelToString("MAX STRIKE", np.max(self._strikePrices), "")
+        return s
+
+###############################################################################
+
+    def _print(self):
+        ''' Simple print function for backward compatibility. '''
+        print(self)
+
+###############################################################################
@@ -10,14 +10,106 @@ from ...finutils.FinError import FinError
 from ...finutils.FinDate import FinDate
 from ...finutils.FinMath import ONE_MILLION
 from ...finutils.FinGlobalVariables import gDaysInYear
-from .FinEquityOption import FinEquityModelBlackScholes
-from ...finutils.FinOptionTypes import FinOptionTypes
-from .FinEquityVanillaOption import FinEquityVanillaOption
+from ...models.FinModelBlack import blackVarianceSwapStrikes
+from ...models.FinModelBlackScholes import bsValue
+from ...market.volatility.FinEquityVolCurve import FinEquityVolCurve
+from .FinEquityRealisedVariance import FinEquityRealisedVariance
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 
 ###############################################################################
 
 
+def _replicationVolatilityFunction(volatility):
+    ''' Return a function of a matrix of strikes and a column of times to
+    expiry which gives the volatilities used in the replication. A constant
+    volatility, a single expiry FinEquityVolCurve, a surface with a method
+    volatility(strikes, times) or a function of strikes and times can be
+    used. The polynomial of a volatility curve is not extrapolated beyond
+    its quoted strikes. '''
+
+    if isinstance(volatility, (float, int)):
+        return lambda k, t: np.full(np.broadcast(k, t).shape,
+                                    float(volatility))
+    elif isinstance(volatility, FinEquityVolCurve):
+        kMin = volatility._strikes[0]
+        kMax = volatility._strikes[-1]
+        return lambda k, t: volatility.volatility(np.clip(k, kMin, kMax))
+    elif hasattr(volatility, "volatility"):
+        return volatility.volatility
+    elif callable(volatility):
+        return volatility
+    else:
+        raise FinError("Unknown volatility type.")
+
+###############################################################################
+
+
+def varianceSwapFairStrikes(valuationDate: FinDate,
+                            maturityDates: list,
+                            stockPrice: float,
+                            dividendYield: float,
+                            discountCurve,
+                            volatility,
+                            numStrikes: int = 201,
+                            numStdDevs: float = 8.0):
+    ''' Return the fair variance strikes of equity variance swaps which
+    start on the valuation date and end on each of the maturity dates. The
+    log contract is replicated by integrating over a continuum of out of the
+    money options as in Carr and Madan, with all strikes of all maturities
+    priced in a single vectorised call. '''
+
+    times = np.array([(d - valuationDate) / gDaysInYear
+                      for d in maturityDates])
+
+    if np.any(times <= 0.0):
+        raise FinError("Maturity dates must be after the valuation date.")
+
+    dfs = np.array(discountCurve._df(times), dtype=np.float64)
+    forwards = stockPrice * np.exp(-dividendYield * times) / dfs
+
+    return blackVarianceSwapStrikes(forwards, times,
+                                    _replicationVolatilityFunction(volatility),
+                                    numStrikes, numStdDevs)
+
+###############################################################################
+
+
+def varianceSwapValues(valuationDate: FinDate,
+                       varianceSwaps: list,
+                       realisedVars: (np.ndarray, FinEquityRealisedVariance),
+                       fairStrikeVars: (float, np.ndarray),
+                       liborCurve):
+    ''' Value a book of variance swaps in one pass. The realised variances
+    can be an array with one entry per swap or a FinEquityRealisedVariance
+    whose swaps are in the same order as the list of variance swaps. The
+    fair strike variances to maturity are a number or one per swap. '''
+
+    if isinstance(realisedVars, FinEquityRealisedVariance):
+        realisedVars = realisedVars.realisedVariance()
+
+    numSwaps = len(varianceSwaps)
+    realisedVars = np.array(realisedVars, dtype=np.float64)
+
+    if len(realisedVars) != numSwaps:
+        raise FinError("Need one realised variance per swap.")
+
+    startDates = [swap._startDate for swap in varianceSwaps]
+    maturityDates = [swap._maturityDate for swap in varianceSwaps]
+
+    t1 = np.array([(valuationDate - d) for d in startDates]) / gDaysInYear
+    t2 = np.array([(m - d) for m, d in zip(maturityDates, startDates)])
+    t2 = t2 / gDaysInYear
+
+    strikeVars = np.array([swap._strikeVariance for swap in varianceSwaps])
+    notionals = np.array([swap._notional for swap in varianceSwaps])
+    dfs = liborCurve.df(maturityDates)
+
+    expectedVars = (t1 * realisedVars + (t2 - t1) * fairStrikeVars) / t2
+    return (expectedVars - strikeVars) * notionals * dfs
+
+###############################################################################
+
+
 class FinEquityVarianceSwap(object):
     ''' Class for managing an equity variance swap contract. '''
 
@@ -62,7 +154,14 @@ class FinEquityVarianceSwap(object):
               liborCurve):
         ''' Calculate the value of the variance swap based on the realised
         volatility to the valuation date, the forward looking implied
-        volatility to the maturity date using the libor discount curve. '''
+        volatility to the maturity date using the libor discount curve. The
+        realised variance can be a number or a FinEquityRealisedVariance
+        that accumulates the closes of this swap. '''
+
+        if isinstance(realisedVar, FinEquityRealisedVariance):
+            if len(realisedVar._counts) != 1:
+                raise FinError("Accumulator must hold a single swap.")
+            realisedVar = realisedVar.realisedVariance()[0]
 
         t1 = (valuationDate - self._startDate) / gDaysInYear
         t2 = (self._maturityDate - self._startDate) / gDaysInYear
@@ -122,9 +221,6 @@ class FinEquityVarianceSwap(object):
         self._numPutOptions = numPutOptions
         self._numCallOptions = numCallOptions
 
-        callType = FinOptionTypes.EUROPEAN_CALL
-        putType = FinOptionTypes.EUROPEAN_PUT
-
         tmat = (self._maturityDate - valuationDate)/gDaysInYear
 
         df = discountCurve._df(tmat)
@@ -191,25 +287,16 @@ class FinEquityVarianceSwap(object):
             self._callWts[n] = (f(kp)-f(k))/(kp-k) - sumWts
             sumWts += self._callWts[n]
 
-        piPut = 0.0
-        for n in range(0, numPutOptions):
-            k = putK[n]
-            vol = volatilityCurve.volatility(k)
-            opt = FinEquityVanillaOption(self._maturityDate, k, putType)
-            model = FinEquityModelBlackScholes(vol)
-            v = opt.value(valuationDate, s0, discountCurve,
-                          dividendYield, model)
-            piPut += v * self._putWts[n]
-
-        piCall = 0.0
-        for n in range(0, numCallOptions):
-            k = callK[n]
-            vol = volatilityCurve.volatility(k)
-            opt = FinEquityVanillaOption(self._maturityDate, k, callType)
-            model = FinEquityModelBlackScholes(vol)
-            v = opt.value(valuationDate, s0, discountCurve,
-                          dividendYield, model)
-            piCall += v * self._callWts[n]
+        # All of the replicating options are priced in one array operation
+        q = dividendYield
+        putK = np.array(putK[0:numPutOptions])
+        callK = np.array(callK[0:numCallOptions])
+        vols = volatilityCurve.volatility(putK)
+        piPut = np.sum(bsValue(s0, tmat, putK, r, q, vols, -1.0) *
+                       self._putWts)
+        vols = volatilityCurve.volatility(callK)
+        piCall = np.sum(bsValue(s0, tmat, callK, r, q, vols, 1.0) *
+                        self._callWts)
 
         pi = piCall + piPut
         optionTotal += g * pi
@@ -217,6 +304,27 @@ class FinEquityVarianceSwap(object):
 
         return var
 
+###############################################################################
+
+    def fairStrikeIntegral(self,
+                           valuationDate,
+                           stockPrice,
+                           dividendYield,
+                           volatility,
+                           discountCurve,
+                           numStrikes=201,
+                           numStdDevs=8.0):
+        ''' Calculate the fair strike variance by integrating the payoff of
+        the log contract over a dense grid of strikes centred on the forward
+        using Simpson's rule. This removes the discretisation error of the
+        finite strip of options used by fairStrike. The volatility can be a
+        constant, a FinEquityVolCurve or a volatility surface. '''
+
+        return varianceSwapFairStrikes(valuationDate, [self._maturityDate],
+                                       stockPrice, dividendYield,
+                                       discountCurve, volatility,
+                                       numStrikes, numStdDevs)[0]
+
 ###############################################################################
 
     def realisedVariance(self, closePrices, useLogs=True):
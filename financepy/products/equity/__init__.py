@@ -12,5 +12,7 @@ from .FinEquityFloatLookbackOption import *
 from .FinEquityModelTypes import *
 from .FinEquityOption import *
 from .FinEquityRainbowOption import *
+from .FinEquityRealisedVariance import *
 from .FinEquityVanillaOption import *
+from .FinEquityVanillaOptionPortfolio import *
 from .FinEquityVarianceSwap import *
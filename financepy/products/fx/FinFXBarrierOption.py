@@ -12,6 +12,7 @@ from ...finutils.FinMath import N
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...products.fx.FinFXOption import FinFXOption
 from ...models.FinProcessSimulator import FinProcessSimulator
+from ...models.FinModelFiniteDifference import fdBarrierValueGreeks
 from ...finutils.FinHelperFunctions import labelToString, checkArgumentTypes
 from ...finutils.FinDate import FinDate
 
@@ -355,4 +356,68 @@ class FinFXBarrierOption(FinFXOption):
 
         return v
 
+##########################################################################
+
+    def valueGreeksPDE(self,
+                       valueDate,
+                       spotFXRate,
+                       domDiscountCurve,
+                       forDiscountCurve,
+                       model,
+                       numSpaceSteps=200,
+                       numTimeSteps=200):
+        ''' Value the FX barrier option by Crank-Nicolson finite differences
+        with the barrier observed exactly at the number of observations per
+        year and the domestic and foreign rates taken from their curves. The
+        model volatility can be a number or a local volatility function of
+        time and an array of FX rates. Returns a dictionary of the value,
+        delta, gamma and theta. '''
+
+        t = (self._expiryDate - valueDate) / gDaysInYear
+
+        if t <= 0.0:
+            raise FinError("Value date after expiry date.")
+
+        numObservations = max(int(t * self._numObservationsPerYear), 1)
+        monitoringTimes = t * np.arange(1, numObservations + 1) / \
+            numObservations
+
+        K = self._strikeFXRate
+        optionType = self._optionType
+
+        if optionType in (FinFXBarrierTypes.DOWN_AND_OUT_CALL,
+                          FinFXBarrierTypes.DOWN_AND_IN_CALL,
+                          FinFXBarrierTypes.UP_AND_OUT_CALL,
+                          FinFXBarrierTypes.UP_AND_IN_CALL):
+            phi = 1.0
+        else:
+            phi = -1.0
+
+        isDown = optionType in (FinFXBarrierTypes.DOWN_AND_OUT_CALL,
+                                FinFXBarrierTypes.DOWN_AND_IN_CALL,
+                                FinFXBarrierTypes.DOWN_AND_OUT_PUT,
+                                FinFXBarrierTypes.DOWN_AND_IN_PUT)
+
+        isKnockIn = optionType in (FinFXBarrierTypes.DOWN_AND_IN_CALL,
+                                   FinFXBarrierTypes.UP_AND_IN_CALL,
+                                   FinFXBarrierTypes.DOWN_AND_IN_PUT,
+                                   FinFXBarrierTypes.UP_AND_IN_PUT)
+
+        def payoff(s):
+            return np.maximum(phi * (s - K), 0.0)
+
+        greeks = fdBarrierValueGreeks(spotFXRate, t, payoff, domDiscountCurve,
+                                      forDiscountCurve, model._volatility,
+                                      self._barrierLevel, isDown, isKnockIn,
+                                      monitoringTimes=monitoringTimes,
+                                      strikePrice=K,
+                                      numSpaceSteps=numSpaceSteps,
+                                      numTimeSteps=numTimeSteps)
+
+        if isinstance(spotFXRate, (float, int)):
+            for key in greeks:
+                greeks[key] = greeks[key][0]
+
+        return greeks
+
 ##########################################################################
@@ -175,7 +175,6 @@ class FinFXBasketOption(FinFXOption):
         numTimeSteps = 2
 
         model = FinGBMProcess()
-        np.random.seed(seed)
 
         Sall = model.getPathsAssets(numAssets,
                                     numPaths,
@@ -5,10 +5,12 @@
 import numpy as np
 from enum import Enum
 
-from ...finutils.FinMath import N
-from ...finutils.FinGlobalVariables import gDaysInYear, gSmall
+from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
-from ...models.FinGBMProcess import FinGBMProcess
+from ...models.FinModelLookback import floatLookbackValuesVectorised
+from ...models.FinModelLookback import getGBMExtrema
+from ...models.FinModelLookback import LOOKBACK_FINAL, LOOKBACK_MAX
+from ...models.FinModelLookback import LOOKBACK_MIN
 from ...products.fx.FinFXOption import FinFXOption
 from ...finutils.FinHelperFunctions import checkArgumentTypes
 from ...finutils.FinDate import FinDate
@@ -19,7 +21,6 @@ from ...market.curves.FinDiscountCurve import FinDiscountCurve
 # TODO: Attempt control variate adjustment to monte carlo
 # TODO: Sobol for Monte Carlo
 # TODO: TIGHTEN UP LIMIT FOR W FROM 100
-# TODO: Vectorise the analytical pricing formula
 ##########################################################################
 
 
@@ -49,13 +50,18 @@ class FinFXFloatLookbackOption(FinFXOption):
 
     def value(self,
               valueDate: FinDate,
-              stockPrice: float,
+              stockPrice: (float, np.ndarray),
               domesticCurve: FinDiscountCurve,
               foreignCurve: FinDiscountCurve,
               volatility: float,
-              stockMinMax: float):
+              stockMinMax: (float, np.ndarray),
+              numObservationsPerYear: int = 0):
         ''' Valuation of the Floating Lookback option using Black-Scholes using
-        the formulae derived by Goldman, Sosin and Gatto (1979). '''
+        the formulae derived by Goldman, Sosin and Gatto (1979). The FX rate
+        and its extremum so far can be arrays which are valued in one
+        vectorised call. If the number of observations per year is positive
+        then the Broadie, Glasserman and Kou (1999) discrete monitoring
+        correction is applied. '''
 
         t = (self._expiryDate - valueDate) / gDaysInYear
 
@@ -65,68 +71,41 @@ class FinFXFloatLookbackOption(FinFXOption):
         dq = foreignCurve._df(t)
         q = -np.log(dq)/t
 
-        v = volatility
-        s0 = stockPrice
-        smin = 0.0
-        smax = 0.0
+        s0, smm = np.broadcast_arrays(np.array(stockPrice, dtype=np.float64),
+                                      np.array(stockMinMax, dtype=np.float64))
 
         if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-            smin = stockMinMax
-            if smin > s0:
+            phi = 1.0
+            if np.any(smm > s0):
                 raise FinError(
                     "Smin must be less than or equal to the stock price.")
         elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-            smax = stockMinMax
-            if smax < s0:
+            phi = -1.0
+            if np.any(smm < s0):
                 raise FinError(
                     "Smax must be greater than or equal to the stock price.")
-
-        if abs(r - q) < gSmall:
-            q = r + gSmall
-
-        dq = np.exp(-q * t)
-        df = np.exp(-r * t)
-        b = r - q
-        u = v * v / 2.0 / b
-        w = 2.0 * b / v / v
-        expbt = np.exp(b * t)
-
-        # Taken from Haug Page 142
-        if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-
-            a1 = (np.log(s0 / smin) + (b + (v**2) / 2.0) * t) / v / np.sqrt(t)
-            a2 = a1 - v * np.sqrt(t)
-
-            if smin == s0:
-                term = N(-a1 + 2.0 * b * np.sqrt(t) / v) - expbt * N(-a1)
-            elif s0 < smin and w < -100:
-                term = - expbt * N(-a1)
-            else:
-                term = ((s0 / smin)**(-w))*N(-a1 + 2.0 *
-                                             b*np.sqrt(t) / v) - expbt * N(-a1)
-
-            v = s0 * dq * N(a1) - smin * df * N(a2) + s0 * df * u * term
-
-        elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-
-            b1 = (np.log(s0 / smax) + (b + (v**2) / 2.0) * t) / v / np.sqrt(t)
-            b2 = b1 - v * np.sqrt(t)
-
-            if smax == s0:
-                term = -N(b1 - 2.0 * b * np.sqrt(t) / v) + expbt * N(b1)
-            elif s0 < smax and w > 100:
-                term = expbt * N(b1)
-            else:
-                term = (-(s0 / smax)**(-w)) * \
-                    N(b1 - 2.0 * b * np.sqrt(t) / v) + expbt * N(b1)
-
-            v = smax * df * N(-b2) - s0 * dq * N(-b1) + s0 * df * u * term
-
         else:
             raise FinError("Unknown lookback option type:" +
                            str(self._optionType))
 
-        return v
+        dt = 0.0
+        if numObservationsPerYear > 0:
+            dt = 1.0 / numObservationsPerYear
+
+        n = s0.size
+        values = floatLookbackValuesVectorised(np.array(s0).ravel(),
+                                               np.full(n, t),
+                                               np.array(smm).ravel(),
+                                               np.full(n, r),
+                                               np.full(n, q),
+                                               np.full(n, volatility),
+                                               np.full(n, phi),
+                                               np.full(n, dt))
+
+        if s0.ndim == 0:
+            return values[0]
+
+        return values.reshape(s0.shape)
 
 ##########################################################################
 
@@ -146,49 +125,34 @@ class FinFXFloatLookbackOption(FinFXOption):
         df = domesticCurve._df(t)
         r = -np.log(df)/t
 
-        dq = domesticCurve._df(t)
+        dq = foreignCurve._df(t)
         q = -np.log(dq)/t
 
-        numTimeSteps = int(t * numStepsPerYear)
+        numTimeSteps = max(int(t * numStepsPerYear), 1)
         mu = r - q
 
         optionType = self._optionType
-        smin = 0.0
-        smax = 0.0
 
         if self._optionType == FinOptionTypes.EUROPEAN_CALL:
-            smin = stockMinMax
-            if smin > stockPrice:
+            if stockMinMax > stockPrice:
                 raise FinError(
                     "Smin must be less than or equal to the stock price.")
         elif self._optionType == FinOptionTypes.EUROPEAN_PUT:
-            smax = stockMinMax
-            if smax < stockPrice:
+            if stockMinMax < stockPrice:
                 raise FinError(
                     "Smax must be greater than or equal to the stock price.")
 
-        model = FinGBMProcess()
-        Sall = model.getPaths(
-            numPaths,
-            numTimeSteps,
-            t,
-            mu,
-            stockPrice,
-            volatility,
-            seed)
+        extrema = getGBMExtrema(numPaths, numTimeSteps, t, mu, stockPrice,
+                                volatility, seed)
 
-        # Due to antithetics we have doubled the number of paths
-        numPaths = 2 * numPaths
-        payoff = np.zeros(numPaths)
+        sT = extrema[:, LOOKBACK_FINAL]
 
         if optionType == FinOptionTypes.EUROPEAN_CALL:
-            SMin = np.min(Sall, axis=1)
-            SMin = np.minimum(SMin, smin)
-            payoff = np.maximum(Sall[:, -1] - SMin, 0)
+            SMin = np.minimum(extrema[:, LOOKBACK_MIN], stockMinMax)
+            payoff = np.maximum(sT - SMin, 0.0)
         elif optionType == FinOptionTypes.EUROPEAN_PUT:
-            SMax = np.max(Sall, axis=1)
-            SMax = np.maximum(SMax, smax)
-            payoff = np.maximum(SMax - Sall[:, -1], 0)
+            SMax = np.maximum(extrema[:, LOOKBACK_MAX], stockMinMax)
+            payoff = np.maximum(SMax - sT, 0.0)
         else:
             raise FinError("Unknown lookback option type:" + str(optionType))
 
@@ -76,7 +76,6 @@ def valueMCFast(t,
                 numPaths=10000,
                 seed=4242):
 
-    np.random.seed(seed)
     df = discountCurve._df(t)
     r = -np.log(df)/t
     mus = r - dividendYields
@@ -11,12 +11,14 @@ from ...finutils.FinDate import FinDate
 from ...finutils.FinMath import nprime
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinError import FinError
+from ...finutils.FinRandom import getCounterNormals
 from ...finutils.FinOptionTypes import FinOptionTypes
 from ...products.fx.FinFXModelTypes import FinFXModel
 from ...products.fx.FinFXModelTypes import FinFXModelBlackScholes
 from ...products.fx.FinFXModelTypes import FinFXModelSABR
 from ...models.FinModelCRRTree import crrTreeValAvg
 from ...models.FinModelSABR import blackVolFromSABR
+from ...models.FinModelBlack import blackImpliedVolatilityVectorised
 from ...finutils.FinHelperFunctions import checkArgumentTypes
 
 N = norm.cdf
@@ -618,8 +620,51 @@ class FinFXVanillaOption():
                           dividendYield,
                           price):
         ''' This function determines the implied volatility of an FX option
-        given a price and the other option details. It uses a one-dimensional
-        Newton root search algorith to determine the implied volatility. '''
+        given a price and the other option details. European options are
+        inverted directly using a vectorised Black implied volatility solver
+        so the price can be an array. American options use a one-dimensional
+        Newton root search algorithm. '''
+
+        if self._optionType == FinOptionTypes.EUROPEAN_CALL or \
+           self._optionType == FinOptionTypes.EUROPEAN_PUT:
+
+            spotDate = valueDate.addWorkDays(self._spotDays)
+            tdel = (self._deliveryDate - spotDate) / gDaysInYear
+            texp = (self._expiryDate - valueDate) / gDaysInYear
+            tdel = np.maximum(tdel, 1e-10)
+
+            if texp <= 0.0:
+                raise FinError("Time to expiry must be positive.")
+
+            rd = discountCurve.zeroRate(self._deliveryDate)
+            rf = dividendYield.zeroRate(self._deliveryDate)
+
+            phi = 1.0
+            if self._optionType == FinOptionTypes.EUROPEAN_PUT:
+                phi = -1.0
+
+            prices, spots = \
+                np.broadcast_arrays(np.array(price, dtype=np.float64),
+                                    np.array(stockPrice, dtype=np.float64))
+
+            shape = prices.shape
+            prices = prices.flatten()
+            ones = np.ones(len(prices))
+
+            # The value is the Black price on the forward to delivery but
+            # with the variance accruing only to the expiry date
+            forwards = spots.flatten() * np.exp((rd - rf) * tdel)
+            strikes = self._strikeFXRate * ones
+            dfs = np.exp(-rd * tdel) * ones
+
+            sigma = blackImpliedVolatilityVectorised(prices, forwards,
+                                                     strikes, texp * ones,
+                                                     dfs, phi * ones)
+
+            if len(shape) == 0:
+                return sigma[0]
+
+            return sigma.reshape(shape)
 
         argtuple = (self, valueDate, stockPrice,
                     discountCurve, dividendYield, price)
@@ -649,7 +694,6 @@ class FinFXVanillaOption():
         else:
             raise FinError("Model Type invalid")
 
-        np.random.seed(seed)
         t = (self._expiryDate - valueDate) / gDaysInYear
 
         domDF = domDiscountCurve.df(self._expiryDate)
@@ -664,7 +708,7 @@ class FinFXVanillaOption():
         sqrtdt = np.sqrt(t)
 
         # Use Antithetic variables
-        g = np.random.normal(0.0, 1.0, size=(1, numPaths))
+        g = getCounterNormals(seed, numPaths, 1).T
         s = spotFXRate * np.exp((mu - v2 / 2.0) * t)
         m = np.exp(g * sqrtdt * volatility)
         s_1 = s * m
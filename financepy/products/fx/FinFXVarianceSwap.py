@@ -11,18 +11,62 @@ from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinOptionTypes import FinOptionTypes
 from .FinFXModelTypes import FinFXModelBlackScholes
 from .FinFXVanillaOption import FinFXVanillaOption
+from ...models.FinModelBlack import blackVarianceSwapStrikes
 
 from ...finutils.FinHelperFunctions import checkArgumentTypes
 
 ###############################################################################
 
 
+def fxVarianceSwapFairStrikes(valuationDate: FinDate,
+                              maturityDates: list,
+                              spotFXRate: float,
+                              domDiscountCurve,
+                              forDiscountCurve,
+                              volatility,
+                              numStrikes: int = 201,
+                              numStdDevs: float = 8.0):
+    ''' Return the fair variance strikes of FX variance swaps which start
+    on the valuation date and end on each of the maturity dates. The FX
+    forward is given by the domestic and foreign discount curves. The log
+    contract is replicated by integrating over a continuum of out of the
+    money options as in Carr and Madan with all strikes of all maturities
+    priced in a single vectorised call. The volatility can be a constant, an
+    object with a method volatility(strikes, times) or a function of strikes
+    and times. '''
+
+    times = np.array([(d - valuationDate) / gDaysInYear
+                      for d in maturityDates])
+
+    if np.any(times <= 0.0):
+        raise FinError("Maturity dates must be after the valuation date.")
+
+    domDfs = np.array(domDiscountCurve._df(times), dtype=np.float64)
+    forDfs = np.array(forDiscountCurve._df(times), dtype=np.float64)
+    forwards = spotFXRate * forDfs / domDfs
+
+    if isinstance(volatility, (float, int)):
+        def volatilityFunction(k, t):
+            return np.full(np.broadcast(k, t).shape, float(volatility))
+    elif hasattr(volatility, "volatility"):
+        volatilityFunction = volatility.volatility
+    elif callable(volatility):
+        volatilityFunction = volatility
+    else:
+        raise FinError("Unknown volatility type.")
+
+    return blackVarianceSwapStrikes(forwards, times, volatilityFunction,
+                                    numStrikes, numStdDevs)
+
+###############################################################################
+
+
 class FinFXVarianceSwap(object):
     ''' Class for managing an FX variance swap contract. '''
 
     def __init__(self,
                  startDate: FinDate,
-                 maturityDateOrTenor: [FinDate, str],
+                 maturityDateOrTenor: (FinDate, str),
                  strikeVariance: float,
                  notional: float = ONE_MILLION,
                  payStrikeFlag: bool = True):
@@ -216,6 +260,25 @@ class FinFXVarianceSwap(object):
 
         return var
 
+###############################################################################
+
+    def fairStrikeIntegral(self,
+                           valuationDate,
+                           spotFXRate,
+                           domDiscountCurve,
+                           forDiscountCurve,
+                           volatility,
+                           numStrikes=201,
+                           numStdDevs=8.0):
+        ''' Calculate the fair strike variance by integrating the payoff of
+        the log contract over a dense grid of strikes centred on the forward
+        using Simpson's rule rather than a finite strip of options. '''
+
+        return fxVarianceSwapFairStrikes(valuationDate, [self._maturityDate],
+                                         spotFXRate, domDiscountCurve,
+                                         forDiscountCurve, volatility,
+                                         numStrikes, numStdDevs)[0]
+
 ###############################################################################
 
     def realisedVariance(self, closePrices, useLogs=True):
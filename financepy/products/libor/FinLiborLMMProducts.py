@@ -30,6 +30,9 @@ from ...models.FinModelRatesLMM import LMMSimulateFwdsMF
 from ...models.FinModelRatesLMM import LMMSimulateFwdsNF
 from ...models.FinModelRatesLMM import FinRateModelLMMModelTypes
 from ...models.FinModelRatesLMM import LMMCapFlrPricer
+from ...models.FinModelRatesLMM import LMMSwaptionPricerMulti
+from ...models.FinModelRatesLMM import LMMBermudanExerciseData
+from ...models.FinModelRatesLMM import LMMBermudanLSMC
 
 from ...finutils.FinGlobalVariables import gDaysInYear
 from ...finutils.FinMath import ONE_MILLION
@@ -95,6 +98,13 @@ class FinLiborLMMProducts():
         self._numForwards = len(self._accrualFactors)
         self._fwds = None
 
+        # Products registered for valuation in the streaming (block) mode
+        self._productRequests = []
+        self._requestValues = None
+
+        # Longstaff-Schwartz coefficients from the last Bermudan valuation
+        self._regressionCoeffs = None
+
 #        print("Num FORWARDS", self._numForwards)
 
 ###############################################################################
@@ -105,9 +115,14 @@ class FinLiborLMMProducts():
                    numPaths: int = 1000,
                    numeraireIndex: int = 0,
                    useSobol: bool = True,
-                   seed: int = 42):
+                   seed: int = 42,
+                   numPathsPerBlock: int = None):
         ''' Run the one-factor simulation of the evolution of the forward
-        Libors to generate and store all of the Libor forward rate paths. '''
+        Libors to generate and store all of the Libor forward rate paths. If
+        numPathsPerBlock is set, the paths are not stored. Instead they are
+        simulated in blocks of this size and the payoffs of the products
+        registered using addCapFloor and addSwaption are accumulated block by
+        block. The values are then returned by requestValues. '''
 
         if numPaths < 2 or numPaths > 1000000:
             raise FinError("NumPaths must be between 2 and 1 million")
@@ -119,34 +134,25 @@ class FinLiborLMMProducts():
         self._numeraireIndex = numeraireIndex
         self._useSobol = useSobol
 
-        numGridPoints = len(self._gridDates)
-
-        self._numForwards = numGridPoints
-        self._forwardCurve = []
+        self._setForwardCurve(discountCurve)
 
-        for i in range(1, numGridPoints):
-            startDate = self._gridDates[i-1]
-            endDate = self._gridDates[i]
-            fwdRate = discountCurve.fwdRate(startDate,
-                                            endDate,
-                                            self._floatDayCountType)
-            self._forwardCurve.append(fwdRate)
-
-        self._forwardCurve = np.array(self._forwardCurve)
-
-        gammas = np.zeros(numGridPoints)
-        for ix in range(1, numGridPoints):
+        gammas = np.zeros(self._numForwards)
+        for ix in range(1, self._numForwards):
             dt = self._gridDates[ix]
             gammas[ix] = volCurve.capletVol(dt)
 
-        self._fwds = LMMSimulateFwds1F(self._numForwards,
-                                       numPaths,
-                                       numeraireIndex,
-                                       self._forwardCurve,
-                                       gammas,
-                                       self._accrualFactors,
-                                       useSobol,
-                                       seed)
+        def simulator(n, pathOffset):
+            return LMMSimulateFwds1F(self._numForwards,
+                                     n,
+                                     numeraireIndex,
+                                     self._forwardCurve,
+                                     gammas,
+                                     self._accrualFactors,
+                                     useSobol,
+                                     seed,
+                                     pathOffset)
+
+        self._simulate(simulator, numPaths, numPathsPerBlock)
 
 ###############################################################################
 
@@ -157,56 +163,49 @@ class FinLiborLMMProducts():
                    numPaths: int = 10000,
                    numeraireIndex: int = 0,
                    useSobol: bool = True,
-                   seed: int = 42):
+                   seed: int = 42,
+                   numPathsPerBlock: int = None):
         ''' Run the simulation to generate and store all of the Libor forward
         rate paths. This is a multi-factorial version so the user must input
-        a numpy array consisting of a column for each factor and the number of
-        rows must equal the number of grid times on the underlying simulation
-        grid. CHECK THIS. '''
+        a numpy array consisting of a row for each factor and the number of
+        columns must equal the number of forwards on the underlying simulation
+        grid. See simulate1F for the meaning of numPathsPerBlock. '''
 
 #        checkArgumentTypes(self.__init__, locals())
 
         if numPaths < 2 or numPaths > 1000000:
             raise FinError("NumPaths must be between 2 and 1 million")
 
-        if discountCurve._curveDate != self._startDate:
+        if discountCurve._valuationDate != self._startDate:
             raise FinError("Curve anchor date not the same as LMM start date.")
 
-        print("LEN LAMBDAS", len(lambdas))
-        print("LEN", len(lambdas[0]))
         # We pass a vector of vol curves, one for each factor
         if numFactors != len(lambdas):
             raise FinError("Lambda doesn't have specified number of factors.")
 
         numRows = len(lambdas[0])
-        if numRows != self._numForwards+1:
+        if numRows != self._numForwards:
             raise FinError("Vol Components needs same number of rows as grid")
 
         self._numPaths = numPaths
         self._numeraireIndex = numeraireIndex
         self._useSobol = useSobol
 
-        self._numForwards = len(self._gridDates) - 1
-        self._forwardCurve = []
-
-        for i in range(1, self._numForwards):
-            startDate = self._gridDates[i-1]
-            endDate = self._gridDates[i]
-            fwdRate = discountCurve.fwdRate(startDate, endDate,
-                                            self._floatDayCountType)
-            self._forwardCurve.append(fwdRate)
+        self._setForwardCurve(discountCurve)
 
-        self._forwardCurve = np.array(self._forwardCurve)
+        def simulator(n, pathOffset):
+            return LMMSimulateFwdsMF(self._numForwards,
+                                     numFactors,
+                                     n,
+                                     numeraireIndex,
+                                     self._forwardCurve,
+                                     lambdas,
+                                     self._accrualFactors,
+                                     useSobol,
+                                     seed,
+                                     pathOffset)
 
-        self._fwds = LMMSimulateFwdsMF(self._numForwards,
-                                       numFactors,
-                                       numPaths,
-                                       numeraireIndex,
-                                       self._forwardCurve,
-                                       lambdas,
-                                       self._accrualFactors,
-                                       useSobol,
-                                       seed)
+        self._simulate(simulator, numPaths, numPathsPerBlock)
 
 ###############################################################################
 
@@ -218,12 +217,14 @@ class FinLiborLMMProducts():
                    numPaths: int = 1000,
                    numeraireIndex: int = 0,
                    useSobol: bool = True,
-                   seed: int = 42):
+                   seed: int = 42,
+                   numPathsPerBlock: int = None):
         ''' Run the simulation to generate and store all of the Libor forward
         rate paths using a full factor reduction of the fwd-fwd correlation
-        matrix using Cholesky decomposition.'''
+        matrix using Cholesky decomposition. See simulate1F for the meaning of
+        numPathsPerBlock. '''
 
-        checkArgumentTypes(self.__init__, locals())
+#        checkArgumentTypes(self.__init__, locals())
 
         if numPaths < 2 or numPaths > 1000000:
             raise FinError("NumPaths must be between 2 and 1 million")
@@ -231,7 +232,7 @@ class FinLiborLMMProducts():
         if isinstance(modelType, FinRateModelLMMModelTypes) is False:
             raise FinError("Model type must be type FinRateModelLMMModelTypes")
 
-        if discountCurve.curveDate != self._startDate:
+        if discountCurve._valuationDate != self._startDate:
             raise FinError("Curve anchor date not the same as LMM start date.")
 
         self._numPaths = numPaths
@@ -239,45 +240,346 @@ class FinLiborLMMProducts():
         self._correlationMatrix = correlationMatrix
         self._modelType = modelType
         self._numeraireIndex = numeraireIndex
-        self._useSobol = useSobol
+        # The full factor simulation does not use Sobol - TODO
+        self._useSobol = False
+
+        self._setForwardCurve(discountCurve)
 
-        numGridPoints = len(self._gridTimes)
+        zetas = np.zeros(self._numForwards)
+        for ix in range(1, self._numForwards):
+            dt = self._gridDates[ix]
+            zetas[ix] = volCurve.capletVol(dt)
+
+        def simulator(n, pathOffset):
+            return LMMSimulateFwdsNF(self._numForwards,
+                                     n,
+                                     self._forwardCurve,
+                                     zetas,
+                                     correlationMatrix,
+                                     self._accrualFactors,
+                                     seed,
+                                     pathOffset)
+
+        self._simulate(simulator, numPaths, numPathsPerBlock)
+
+###############################################################################
 
+    def _setForwardCurve(self, discountCurve):
+        ''' Calculate the initial forward Libors on the simulation grid. '''
+
+        numGridPoints = len(self._gridDates)
         self._numForwards = numGridPoints - 1
         self._forwardCurve = []
 
         for i in range(1, numGridPoints):
             startDate = self._gridDates[i-1]
             endDate = self._gridDates[i]
-            fwdRate = discountCurve.forwardRate(startDate,
-                                                endDate,
-                                                self._floatDayCountType)
+            fwdRate = discountCurve.fwdRate(startDate,
+                                            endDate,
+                                            self._floatDayCountType)
             self._forwardCurve.append(fwdRate)
 
         self._forwardCurve = np.array(self._forwardCurve)
 
-        zetas = np.zeros(numGridPoints)
-        for ix in range(1, numGridPoints):
-            dt = self._gridDates[ix]
-            zetas[ix] = volCurve.capletVol(dt)
+###############################################################################
+
+    def _simulate(self, simulator, numPaths, numPathsPerBlock):
+        ''' Either store the full forward cube or run the simulation in path
+        blocks, accumulating the payoffs of the registered products. All
+        blocks share the seed and each block starts at the antithetic pair
+        where the previous block stopped. The random numbers are keyed by the
+        seed, the global pair number and the time step, and with Sobol the
+        sequence is continued in the same way. So the blocks simulate the
+        same paths as the full cube and the result depends on neither the
+        block size nor the number of threads. The memory used is bounded by
+        the block size. '''
+
+        if numPathsPerBlock is None:
+            self._fwds = simulator(numPaths, 0)
+            self._requestValues = None
+            return
+
+        if numPathsPerBlock < 2:
+            raise FinError("Number of paths per block must be at least 2.")
 
-        # This function does not use Sobol - TODO
-        self._fwds = LMMSimulateFwdsNF(self._numForwards,
-                                       numPaths,
-                                       self._forwardCurve,
-                                       zetas,
-                                       correlationMatrix,
-                                       self._accrualFactors,
-                                       seed)
+        if len(self._productRequests) == 0:
+            raise FinError("No products have been added for valuation.")
+
+        # The simulators use antithetics so each block has an even size
+        numPaths = 2 * int(numPaths/2)
+        numPathsPerBlock = 2 * int(numPathsPerBlock/2)
+
+        self._fwds = None
+        sums = np.zeros(len(self._productRequests))
+        numPathsDone = 0
+
+        while numPathsDone < numPaths:
+
+            n = min(numPathsPerBlock, numPaths - numPathsDone)
+
+            # Each antithetic pair has one set of random numbers
+            fwds = simulator(n, numPathsDone // 2)
+
+            sums += self._blockPayoffSums(fwds)
+            numPathsDone += n
+
+        self._requestValues = sums / numPaths
+
+###############################################################################
+
+    def _blockPayoffSums(self, fwds):
+        ''' Sum of the numeraire-deflated payoffs over the paths of a block
+        for each of the products registered for valuation. All swaptions are
+        valued together in a single sweep over the block. Bermudans follow
+        the exercise rule of their stored regression coefficients. '''
+
+        numPaths = len(fwds)
+        fwd0 = self._forwardCurve
+        taus = self._accrualFactors
+        sums = np.zeros(len(self._productRequests))
+
+        swaptionIndices = []
+
+        for i, request in enumerate(self._productRequests):
+
+            if request['type'] == "CAPFLOOR":
+                v = LMMCapFlrPricer(request['numForwards'], numPaths,
+                                    request['strike'], fwd0, fwds, taus,
+                                    request['isCap'])
+                sums[i] = np.sum(v) * request['notional'] * numPaths
+            elif request['type'] == "SWAPTION":
+                swaptionIndices.append(i)
+            elif request['type'] == "BERMUDAN":
+                v, _ = self._valueBermudan(request, numPaths, fwds,
+                                           request['regressionCoeffs'])
+                v += self._cancellableSwapValue(request)
+                sums[i] = v * request['notional'] * numPaths
+            else:
+                raise FinError("Unknown product request type.")
+
+        if len(swaptionIndices) > 0:
+            details = [self._productRequests[i] for i in swaptionIndices]
+            v = self._priceSwaptions(details, numPaths, fwds)
+            for j, i in enumerate(swaptionIndices):
+                sums[i] = v[j] * details[j]['notional'] * numPaths
+
+        return sums
+
+###############################################################################
+
+    def _checkDatesOnGrid(self, dates, label):
+        ''' Check that all of the product dates lie on the simulation grid.
+        '''
+
+        for dt in dates:
+            foundDt = False
+            for gridDt in self._gridDates:
+                if dt == gridDt:
+                    foundDt = True
+                    break
+            if foundDt is False:
+                raise FinError(label + " not on grid.")
+
+###############################################################################
+
+    def _gridIndex(self, dt):
+        ''' Return the index of a date on the simulation grid. '''
+
+        for i, gridDt in enumerate(self._gridDates):
+            if gridDt == dt:
+                return i
+
+        raise FinError("Date not on grid.")
+
+###############################################################################
+
+    def addCapFloor(self,
+                    settlementDate: FinDate,
+                    maturityDate: FinDate,
+                    capFloorType: FinLiborCapFloorTypes,
+                    capFloorRate: float,
+                    frequencyType: FinFrequencyTypes = FinFrequencyTypes.QUARTERLY,
+                    notional: float = ONE_MILLION,
+                    calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                    busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                    dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD):
+        ''' Register a cap or floor to be valued when the simulation is run
+        in blocks. Returns the index of its value in requestValues. '''
+
+        capFloorDates = FinSchedule(settlementDate,
+                                    maturityDate,
+                                    frequencyType,
+                                    calendarType,
+                                    busDayAdjustType,
+                                    dateGenRuleType)._generate()
+
+        self._checkDatesOnGrid(capFloorDates, "CapFloor date")
+
+        isCap = 0
+        if capFloorType == FinLiborCapFloorTypes.CAP:
+            isCap = 1
+
+        request = {'type': "CAPFLOOR",
+                   'numForwards': len(capFloorDates) - 1,
+                   'strike': capFloorRate,
+                   'isCap': isCap,
+                   'notional': notional}
+
+        self._productRequests.append(request)
+        return len(self._productRequests) - 1
+
+###############################################################################
+
+    def addSwaption(self,
+                    settlementDate: FinDate,
+                    exerciseDate: FinDate,
+                    maturityDate: FinDate,
+                    swaptionType: FinLiborSwapTypes,
+                    fixedCoupon: float,
+                    fixedFrequencyType: FinFrequencyTypes,
+                    notional: float = ONE_MILLION,
+                    calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                    busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                    dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD,
+                    fixedDayCountType: FinDayCountTypes = None):
+        ''' Register a European swaption to be valued when the simulation is
+        run in blocks. The fixed leg accrues with the day count of the
+        simulation grid unless a fixed leg day count is given. Returns the
+        index of its value in requestValues. '''
+
+        if fixedDayCountType is None:
+            fixedDayCountType = self._floatDayCountType
+
+        request = self._swaptionDetails(exerciseDate,
+                                        maturityDate,
+                                        swaptionType,
+                                        fixedCoupon,
+                                        fixedFrequencyType,
+                                        fixedDayCountType,
+                                        calendarType,
+                                        busDayAdjustType,
+                                        dateGenRuleType)
+
+        request['type'] = "SWAPTION"
+        request['notional'] = notional
+
+        self._productRequests.append(request)
+        return len(self._productRequests) - 1
+
+###############################################################################
+
+    def addBermudanSwaption(self,
+                            settlementDate: FinDate,
+                            exerciseDate: FinDate,
+                            maturityDate: FinDate,
+                            swaptionType: FinLiborSwapTypes,
+                            fixedCoupon: float,
+                            fixedFrequencyType: FinFrequencyTypes,
+                            fixedDayCountType: FinDayCountTypes,
+                            regressionCoeffs: np.ndarray,
+                            notional: float = ONE_MILLION,
+                            calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                            busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                            dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD):
+        ''' Register a Bermudan swaption to be valued when the simulation is
+        run in blocks. The underlying swap starts on the settlement date and
+        the exercise dates are as in valueBermudanSwaption. The exercise rule
+        is fixed by regression coefficients fitted earlier by
+        valueBermudanSwaption so that no regression is done per block.
+        Returns the index of its value in requestValues. '''
+
+        request = self._bermudanDetails(settlementDate,
+                                        exerciseDate,
+                                        maturityDate,
+                                        swaptionType,
+                                        fixedCoupon,
+                                        fixedFrequencyType,
+                                        fixedDayCountType,
+                                        calendarType,
+                                        busDayAdjustType,
+                                        dateGenRuleType)
+
+        return self._addBermudanRequest(request, regressionCoeffs, notional)
+
+###############################################################################
+
+    def addCallableSwap(self,
+                        settlementDate: FinDate,
+                        firstCallDate: FinDate,
+                        maturityDate: FinDate,
+                        swapType: FinLiborSwapTypes,
+                        fixedCoupon: float,
+                        fixedFrequencyType: FinFrequencyTypes,
+                        fixedDayCountType: FinDayCountTypes,
+                        regressionCoeffs: np.ndarray,
+                        notional: float = ONE_MILLION,
+                        calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                        busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                        dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD):
+        ''' Register a cancellable swap to be valued when the simulation is
+        run in blocks using regression coefficients fitted earlier by
+        valueCallableSwap. Returns the index of its value in requestValues.
+        '''
+
+        request = self._bermudanDetails(settlementDate,
+                                        firstCallDate,
+                                        maturityDate,
+                                        swapType,
+                                        fixedCoupon,
+                                        fixedFrequencyType,
+                                        fixedDayCountType,
+                                        calendarType,
+                                        busDayAdjustType,
+                                        dateGenRuleType,
+                                        True)
+
+        return self._addBermudanRequest(request, regressionCoeffs, notional)
+
+###############################################################################
+
+    def _addBermudanRequest(self, request, regressionCoeffs, notional):
+        ''' Register a Bermudan with a fixed exercise rule. '''
+
+        numExercises = len(request['exerciseIndices'])
+
+        if regressionCoeffs is None or \
+           len(regressionCoeffs) != numExercises - 1:
+            raise FinError("Regression coefficients do not match exercise dates")
+
+        request['type'] = "BERMUDAN"
+        request['regressionCoeffs'] = regressionCoeffs
+        request['notional'] = notional
+
+        self._productRequests.append(request)
+        return len(self._productRequests) - 1
+
+###############################################################################
+
+    def clearProducts(self):
+        ''' Remove all products registered for block valuation. '''
+
+        self._productRequests = []
+        self._requestValues = None
+
+###############################################################################
+
+    def requestValues(self):
+        ''' Return the values of the registered products calculated by the
+        last simulation run in blocks. '''
+
+        if self._requestValues is None:
+            raise FinError("No block simulation has been run.")
+
+        return self._requestValues
 
 ###############################################################################
 
     def valueSwaption(self,
                       settlementDate: FinDate,
-                      exerciseDate: FinDate,
-                      maturityDate: FinDate,
-                      swaptionType: FinLiborSwapTypes,
-                      fixedCoupon: float,
+                      exerciseDate: (FinDate, list),
+                      maturityDate: (FinDate, list),
+                      swaptionType: (FinLiborSwapTypes, list),
+                      fixedCoupon: (float, list),
                       fixedFrequencyType: FinFrequencyTypes,
                       fixedDayCountType: FinDayCountTypes,
                       notional: float = ONE_MILLION,
@@ -289,72 +591,399 @@ class FinLiborLMMProducts():
         ''' Value a swaption in the LMM model using simulated paths of the
         forward curve. This relies on pricing the fixed leg of the swap and
         assuming that the floating leg will be worth par. As a result we only
-        need simulate Libors with the frequency of the fixed leg. '''
-
-        # Note that the simulation time steps run all the way out to the last
-        # forward rate. However we only really need the forward rates at the
-        # expiry date of the option. It may be worth amending the simulate
-        # code to impose a limit on the time steps in order to speed up the
-        # overall pricing if it requires a new run every time. However once
-        # generated, the speed of pricing is not affected so this is not
-        # strictly an urgent issue.
+        need simulate Libors with the frequency of the fixed leg. The exercise
+        date, maturity date, swaption type and fixed coupon can each be given
+        as a list in order to value a whole grid of swaptions in one parallel
+        sweep over the simulated paths. In that case a numpy array of values
+        is returned. Lists must have the same length and any argument not in
+        a list is applied to all of the swaptions. '''
+
+        if self._fwds is None:
+            raise FinError("Forwards not stored. Use requestValues instead.")
+
+        isList = False
+        n = 1
+        for arg in [exerciseDate, maturityDate, swaptionType, fixedCoupon]:
+            if isinstance(arg, list):
+                if isList is True and len(arg) != n:
+                    raise FinError("Swaption lists must have the same length")
+                isList = True
+                n = len(arg)
+
+        def toList(arg):
+            if isinstance(arg, list):
+                return arg
+            return [arg] * n
+
+        exerciseDates = toList(exerciseDate)
+        maturityDates = toList(maturityDate)
+        swaptionTypes = toList(swaptionType)
+        fixedCoupons = toList(fixedCoupon)
+
+        details = []
+
+        for i in range(0, n):
+
+            swaptionFloatDates = FinSchedule(exerciseDates[i],
+                                             maturityDates[i],
+                                             floatFrequencyType,
+                                             calendarType,
+                                             busDayAdjustType,
+                                             dateGenRuleType)._generate()
+
+            self._checkDatesOnGrid(swaptionFloatDates[1:],
+                                   "Swaption float leg")
+
+            details.append(self._swaptionDetails(exerciseDates[i],
+                                                 maturityDates[i],
+                                                 swaptionTypes[i],
+                                                 fixedCoupons[i],
+                                                 fixedFrequencyType,
+                                                 fixedDayCountType,
+                                                 calendarType,
+                                                 busDayAdjustType,
+                                                 dateGenRuleType))
+
+        v = self._priceSwaptions(details, len(self._fwds), self._fwds)
+        v = v * notional
+
+        if isList is False:
+            return v[0]
 
-        swaptionFloatDates = FinSchedule(settlementDate,
-                                         maturityDate,
-                                         floatFrequencyType,
-                                         calendarType,
-                                         busDayAdjustType,
-                                         dateGenRuleType)._generate()
+        return v
 
-        for swaptionDt in swaptionFloatDates:
-            foundDt = False
-            for gridDt in self._gridDates:
-                if swaptionDt == gridDt:
-                    foundDt = True
-                    break
-            if foundDt is False:
-                raise FinError("Swaption float leg not on grid.")
+###############################################################################
 
-        swaptionFixedDates = FinSchedule(settlementDate,
+    def _swaptionDetails(self,
+                         exerciseDate,
+                         maturityDate,
+                         swaptionType,
+                         fixedCoupon,
+                         fixedFrequencyType,
+                         fixedDayCountType,
+                         calendarType,
+                         busDayAdjustType,
+                         dateGenRuleType):
+        ''' Locate the swaption expiry, swap maturity and fixed leg payment
+        dates on the simulation grid and calculate the fixed leg accrual
+        factors. '''
+
+        swaptionFixedDates = FinSchedule(exerciseDate,
                                          maturityDate,
                                          fixedFrequencyType,
                                          calendarType,
                                          busDayAdjustType,
                                          dateGenRuleType)._generate()
 
-        for swaptionDt in swaptionFixedDates:
-            foundDt = False
-            for gridDt in self._gridDates:
-                if swaptionDt == gridDt:
-                    foundDt = True
-                    break
-            if foundDt is False:
-                raise FinError("Swaption fixed leg not on grid.")
+        # The first schedule date is the exercise date which must be on the
+        # grid but the schedule does not apply business day adjustment to it
+        self._checkDatesOnGrid(swaptionFixedDates[1:], "Swaption fixed leg")
 
-        a = 0
-        b = 0
-
-        for gridDt in self._gridDates:
-            if gridDt == exerciseDate:
-                break
-            else:
-                a += 1
-
-        for gridDt in self._gridDates:
-            if gridDt == maturityDate:
-                break
-            else:
-                b += 1
+        a = self._gridIndex(exerciseDate)
+        b = self._gridIndex(maturityDate)
 
         if b == 0:
             raise FinError("Swaption swap maturity date is today.")
 
-#        numPaths = 1000
-#        v = LMMSwaptionPricer(fixedCoupon, a, b, numPaths,
-#                              fwd0, fwds, taus, isPayer)
-        v = 0.0
+        if a >= b:
+            raise FinError("Swaption exercise date after swap maturity.")
+
+        isPayer = 0
+        if swaptionType == FinLiborSwapTypes.PAYER:
+            isPayer = 1
+
+        basis = FinDayCount(fixedDayCountType)
+        fixedIndices = []
+        fixedAccruals = []
+
+        prevDt = exerciseDate
+        for nextDt in swaptionFixedDates[1:]:
+            fixedIndices.append(self._gridIndex(nextDt))
+            fixedAccruals.append(basis.yearFrac(prevDt, nextDt)[0])
+            prevDt = nextDt
+
+        return {'a': a,
+                'b': b,
+                'strike': fixedCoupon,
+                'isPayer': isPayer,
+                'fixedIndices': fixedIndices,
+                'fixedAccruals': fixedAccruals}
+
+###############################################################################
+
+    def _priceSwaptions(self, details, numPaths, fwds):
+        ''' Pack the swaption details into arrays and value all of them per
+        unit notional in one sweep over the paths. '''
+
+        numSwaptions = len(details)
+        aVec = np.zeros(numSwaptions, dtype=np.int64)
+        bVec = np.zeros(numSwaptions, dtype=np.int64)
+        strikes = np.zeros(numSwaptions)
+        isPayers = np.zeros(numSwaptions, dtype=np.int64)
+        fixedStart = np.zeros(numSwaptions, dtype=np.int64)
+        fixedEnd = np.zeros(numSwaptions, dtype=np.int64)
+        fixedIndices = []
+        fixedAccruals = []
+
+        for i, d in enumerate(details):
+            aVec[i] = d['a']
+            bVec[i] = d['b']
+            strikes[i] = d['strike']
+            isPayers[i] = d['isPayer']
+            fixedStart[i] = len(fixedIndices)
+            fixedIndices += d['fixedIndices']
+            fixedAccruals += d['fixedAccruals']
+            fixedEnd[i] = len(fixedIndices)
+
+        fixedIndices = np.array(fixedIndices, dtype=np.int64)
+        fixedAccruals = np.array(fixedAccruals, dtype=np.float64)
+
+        v = LMMSwaptionPricerMulti(numPaths, fwds, self._accrualFactors,
+                                   aVec, bVec, strikes, isPayers,
+                                   fixedStart, fixedEnd,
+                                   fixedIndices, fixedAccruals)
         return v
 
+###############################################################################
+
+    def valueBermudanSwaption(self,
+                              settlementDate: FinDate,
+                              exerciseDate: FinDate,
+                              maturityDate: FinDate,
+                              swaptionType: FinLiborSwapTypes,
+                              fixedCoupon: float,
+                              fixedFrequencyType: FinFrequencyTypes,
+                              fixedDayCountType: FinDayCountTypes,
+                              notional: float = ONE_MILLION,
+                              floatFrequencyType: FinFrequencyTypes = FinFrequencyTypes.QUARTERLY,
+                              floatDayCountType: FinDayCountTypes = FinDayCountTypes.THIRTY_E_360,
+                              calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                              busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                              dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD,
+                              regressionCoeffs: np.ndarray = None):
+        ''' Value a Bermudan swaption in the LMM using Longstaff-Schwartz
+        regression on the stored paths. The underlying swap starts on the
+        settlement date and the swaption can be exercised on the exercise date
+        if it is the settlement date and on all fixed leg coupon dates on or
+        after the exercise date before the swap maturity. If no regression
+        coefficients are passed in they are fitted on the stored paths and
+        saved in _regressionCoeffs. These can then be passed back in after
+        simulating a new independent set of paths with a different seed in
+        order to obtain a low-biased value without any further regression. '''
+
+        if self._fwds is None:
+            raise FinError("Forwards not stored. Use requestValues instead.")
+
+        self._checkFloatLegOnGrid(settlementDate, maturityDate,
+                                  floatFrequencyType, calendarType,
+                                  busDayAdjustType, dateGenRuleType)
+
+        details = self._bermudanDetails(settlementDate,
+                                        exerciseDate,
+                                        maturityDate,
+                                        swaptionType,
+                                        fixedCoupon,
+                                        fixedFrequencyType,
+                                        fixedDayCountType,
+                                        calendarType,
+                                        busDayAdjustType,
+                                        dateGenRuleType)
+
+        v, self._regressionCoeffs = self._valueBermudan(details,
+                                                        len(self._fwds),
+                                                        self._fwds,
+                                                        regressionCoeffs)
+        return v * notional
+
+###############################################################################
+
+    def valueCallableSwap(self,
+                          settlementDate: FinDate,
+                          firstCallDate: FinDate,
+                          maturityDate: FinDate,
+                          swapType: FinLiborSwapTypes,
+                          fixedCoupon: float,
+                          fixedFrequencyType: FinFrequencyTypes,
+                          fixedDayCountType: FinDayCountTypes,
+                          notional: float = ONE_MILLION,
+                          floatFrequencyType: FinFrequencyTypes = FinFrequencyTypes.QUARTERLY,
+                          floatDayCountType: FinDayCountTypes = FinDayCountTypes.THIRTY_E_360,
+                          calendarType: FinCalendarTypes = FinCalendarTypes.WEEKEND,
+                          busDayAdjustType: FinBusDayAdjustTypes = FinBusDayAdjustTypes.FOLLOWING,
+                          dateGenRuleType: FinDateGenRuleTypes = FinDateGenRuleTypes.BACKWARD,
+                          regressionCoeffs: np.ndarray = None):
+        ''' Value a swap starting on the settlement date which the holder can
+        cancel on any fixed leg coupon date on or after the first call date.
+        Cancelling is the same as entering the opposite swap so this is the
+        swap plus a Bermudan swaption on the opposite side. The swap is
+        valued off the initial forward curve and the Bermudan by Longstaff-
+        Schwartz regression on the stored paths. The regression coefficients
+        are handled as in valueBermudanSwaption. '''
+
+        if self._fwds is None:
+            raise FinError("Forwards not stored. Use requestValues instead.")
+
+        self._checkFloatLegOnGrid(settlementDate, maturityDate,
+                                  floatFrequencyType, calendarType,
+                                  busDayAdjustType, dateGenRuleType)
+
+        details = self._bermudanDetails(settlementDate,
+                                        firstCallDate,
+                                        maturityDate,
+                                        swapType,
+                                        fixedCoupon,
+                                        fixedFrequencyType,
+                                        fixedDayCountType,
+                                        calendarType,
+                                        busDayAdjustType,
+                                        dateGenRuleType,
+                                        True)
+
+        v, self._regressionCoeffs = self._valueBermudan(details,
+                                                        len(self._fwds),
+                                                        self._fwds,
+                                                        regressionCoeffs)
+        return (self._cancellableSwapValue(details) + v) * notional
+
+###############################################################################
+
+    def _checkFloatLegOnGrid(self,
+                             startDate,
+                             maturityDate,
+                             floatFrequencyType,
+                             calendarType,
+                             busDayAdjustType,
+                             dateGenRuleType):
+        ''' Check that the floating leg payment dates are on the grid. '''
+
+        floatDates = FinSchedule(startDate,
+                                 maturityDate,
+                                 floatFrequencyType,
+                                 calendarType,
+                                 busDayAdjustType,
+                                 dateGenRuleType)._generate()
+
+        self._checkDatesOnGrid(floatDates[1:], "Float leg")
+
+###############################################################################
+
+    def _bermudanDetails(self,
+                         startDate,
+                         firstExerciseDate,
+                         maturityDate,
+                         swapType,
+                         fixedCoupon,
+                         fixedFrequencyType,
+                         fixedDayCountType,
+                         calendarType,
+                         busDayAdjustType,
+                         dateGenRuleType,
+                         isCancellable=False):
+        ''' Locate the fixed leg payment dates and the exercise dates of a
+        Bermudan into the swap starting on the start date on the simulation
+        grid. Exercise is allowed on the start date if it is the first
+        exercise date and on all later fixed leg coupon dates before the swap
+        maturity. For a cancellable swap the Bermudan is on the opposite side
+        to the swap. '''
+
+        fixedDates = FinSchedule(startDate,
+                                 maturityDate,
+                                 fixedFrequencyType,
+                                 calendarType,
+                                 busDayAdjustType,
+                                 dateGenRuleType)._generate()
+
+        self._checkDatesOnGrid(fixedDates[1:], "Fixed leg")
+
+        a = self._gridIndex(startDate)
+        b = self._gridIndex(maturityDate)
+
+        if a >= b:
+            raise FinError("Start date after swap maturity.")
+
+        exerciseIndices = []
+
+        if firstExerciseDate == startDate:
+            exerciseIndices.append(a)
+
+        for dt in fixedDates[1:-1]:
+            if dt >= firstExerciseDate:
+                exerciseIndices.append(self._gridIndex(dt))
+
+        if len(exerciseIndices) == 0:
+            raise FinError("No exercise dates before swap maturity.")
+
+        basis = FinDayCount(fixedDayCountType)
+        fixedIndices = []
+        fixedAccruals = []
+
+        prevDt = startDate
+        for nextDt in fixedDates[1:]:
+            fixedIndices.append(self._gridIndex(nextDt))
+            fixedAccruals.append(basis.yearFrac(prevDt, nextDt)[0])
+            prevDt = nextDt
+
+        isPayer = 0
+        if swapType == FinLiborSwapTypes.PAYER:
+            isPayer = 1
+
+        # The holder of a cancellable swap has a Bermudan on the other side
+        if isCancellable is True:
+            isPayer = 1 - isPayer
+
+        return {'exerciseIndices': np.array(exerciseIndices, dtype=np.int64),
+                'b': b,
+                'strike': fixedCoupon,
+                'isPayer': isPayer,
+                'fixedIndices': np.array(fixedIndices, dtype=np.int64),
+                'fixedAccruals': np.array(fixedAccruals, dtype=np.float64),
+                'a': a,
+                'isCancellable': isCancellable}
+
+###############################################################################
+
+    def _cancellableSwapValue(self, details):
+        ''' Value per unit notional off the initial forward curve of the swap
+        underlying a cancellable swap. This is zero for a Bermudan swaption.
+        '''
+
+        if details['isCancellable'] is False:
+            return 0.0
+
+        dfs = np.ones(self._numForwards + 1)
+        for k in range(0, self._numForwards):
+            dfs[k+1] = dfs[k] / (1.0 + self._accrualFactors[k]
+                                 * self._forwardCurve[k])
+
+        pv01 = 0.0
+        for i, accrual in zip(details['fixedIndices'],
+                              details['fixedAccruals']):
+            pv01 += accrual * dfs[i]
+
+        v = dfs[details['a']] - dfs[details['b']] - details['strike'] * pv01
+
+        # The Bermudan is a payer when the swap is a receiver
+        if details['isPayer'] == 1:
+            v = -v
+
+        return v
+
+###############################################################################
+
+    def _valueBermudan(self, details, numPaths, fwds, regressionCoeffs):
+        ''' Value a Bermudan per unit notional by Longstaff-Schwartz using the
+        exercise data calculated in parallel over the paths. '''
+
+        data = LMMBermudanExerciseData(numPaths, fwds, self._accrualFactors,
+                                       details['exerciseIndices'],
+                                       details['b'],
+                                       details['strike'],
+                                       details['isPayer'],
+                                       details['fixedIndices'],
+                                       details['fixedAccruals'])
+
+        return LMMBermudanLSMC(*data, regressionCoeffs)
+
 ###############################################################################
 
     def valueCapFloor(self,
@@ -386,8 +1015,11 @@ class FinLiborLMMProducts():
             if foundDt is False:
                 raise FinError("CapFloor date not on grid.")
 
-        numFowards = len(capFloorDates)
-        numPaths = self._numPaths
+        if self._fwds is None:
+            raise FinError("Forwards not stored. Use requestValues instead.")
+
+        numFowards = len(capFloorDates) - 1
+        numPaths = len(self._fwds)
         K = capFloorRate
         isCap = 0
         if capFloorType == FinLiborCapFloorTypes.CAP:
@@ -3,11 +3,16 @@
 ###############################################################################
 
 import time
+import numpy as np
 
 from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.products.equity.FinEquityAmericanOption import FinEquityAmericanOption
 from financepy.products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
+from financepy.models.FinModelCRRTree import FinTreeMethods
+from financepy.models.FinModelCRRTree import treeValuesVectorised
+from financepy.models.FinModelBlackScholesAnalytical import FinAmericanApproxMethods
+from financepy.models.FinModelBlackScholesAnalytical import americanApproxValuesVectorised
 from financepy.finutils.FinOptionTypes import FinOptionTypes
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 
@@ -209,5 +214,181 @@ def testFinEquityAmericanOption():
 ###############################################################################
 
 
+def testFinEquityAmericanOptionTreeMethods():
+
+    # Compare the smoothed and extrapolated trees against a fine BBSR tree
+    valueDate = FinDate(2016, 1, 1)
+    expiryDate = FinDate(2019, 1, 1)
+    interestRate = 0.08
+    dividendYield = 0.0
+    volatility = 0.25
+    strikePrice = 45.0
+    stockPrice = 40.0
+
+    discountCurve = FinDiscountCurveFlat(valueDate, interestRate)
+
+    option = FinEquityAmericanOption(expiryDate, strikePrice,
+                                     FinOptionTypes.AMERICAN_PUT)
+
+    model = FinEquityModelBlackScholes(volatility, 10000, False,
+                                       FinTreeMethods.BBSR)
+    exact = option.value(valueDate, stockPrice, discountCurve, dividendYield,
+                         model)
+
+    testCases.header("METHOD", "NUMSTEPS", "VALUE", "ERROR", "TIME")
+
+    for treeMethod in FinTreeMethods:
+        for numSteps in [100, 200, 400, 2000]:
+            model = FinEquityModelBlackScholes(volatility, numSteps, False,
+                                               treeMethod)
+            start = time.time()
+            value = option.value(valueDate, stockPrice, discountCurve,
+                                 dividendYield, model)
+            end = time.time()
+            testCases.print(treeMethod.name, numSteps, value, value - exact,
+                            end - start)
+
+    # A vector of stock prices is valued in a single parallel call
+    stockPrices = np.linspace(20.0, 80.0, 1000)
+    model = FinEquityModelBlackScholes(volatility, 400)
+
+    start = time.time()
+    values = option.value(valueDate, stockPrices, discountCurve,
+                          dividendYield, model)
+    end = time.time()
+
+    testCases.header("NUMSPOTS", "MINVALUE", "MAXVALUE", "TIME")
+    testCases.print(len(stockPrices), np.min(values), np.max(values),
+                    end - start)
+
+###############################################################################
+
+
+def testFinEquityAmericanOptionApproximations():
+
+    # Benchmark the analytical approximations against a fine BBSR tree on a
+    # chain of random American calls and puts
+    np.random.seed(1234)
+    numOptions = 100
+    s = np.full(numOptions, 100.0)
+    k = np.random.uniform(70.0, 130.0, numOptions)
+    t = np.random.uniform(0.05, 3.0, numOptions)
+    r = np.random.uniform(0.0, 0.10, numOptions)
+    q = np.random.uniform(0.0, 0.10, numOptions)
+    v = np.random.uniform(0.10, 0.60, numOptions)
+    phi = np.where(np.random.uniform(0.0, 1.0, numOptions) < 0.5, -1.0, 1.0)
+
+    start = time.time()
+    exact = treeValuesVectorised(s, k, t, r, q, v, phi, 1, 4000,
+                                 FinTreeMethods.BBSR.value)
+    end = time.time()
+
+    testCases.header("METHOD", "RMSERROR", "MAXERROR", "TIME")
+    testCases.print("BBSR_TREE_4000", 0.0, 0.0, end - start)
+
+    start = time.time()
+    values = treeValuesVectorised(s, k, t, r, q, v, phi, 1, 400,
+                                  FinTreeMethods.BBSR.value)
+    end = time.time()
+    err = values - exact
+    testCases.print("BBSR_TREE_400", np.sqrt(np.mean(err**2)),
+                    np.max(np.abs(err)), end - start)
+
+    for method in FinAmericanApproxMethods:
+        start = time.time()
+        values = americanApproxValuesVectorised(s, t, k, r, q, v, phi, method)
+        end = time.time()
+        err = values - exact
+        testCases.print(method.name, np.sqrt(np.mean(err**2)),
+                        np.max(np.abs(err)), end - start)
+
+    # The approximations can also be selected on the model
+    valueDate = FinDate(2016, 1, 1)
+    expiryDate = FinDate(2017, 1, 1)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.06)
+    option = FinEquityAmericanOption(expiryDate, 50.0,
+                                     FinOptionTypes.AMERICAN_PUT)
+
+    testCases.header("METHOD", "VALUE", "DELTA")
+
+    for method in FinAmericanApproxMethods:
+        model = FinEquityModelBlackScholes(0.40, americanMethod=method)
+        value = option.value(valueDate, 50.0, discountCurve, 0.04, model)
+        delta = option.delta(valueDate, 50.0, discountCurve, 0.04, model)
+        testCases.print(method.name, value, delta)
+
+###############################################################################
+
+
+def testFinEquityAmericanOptionPDE():
+    ''' Finite difference values and Greeks of American and European
+    options compared to a 2000-step tree, with cash dividends and with a
+    local volatility function. '''
+
+    valueDate = FinDate(2016, 1, 1)
+    expiryDate = FinDate(2017, 1, 1)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+    dividendYield = 0.02
+    stockPrices = np.array([90.0, 100.0, 110.0])
+    model = FinEquityModelBlackScholes(0.20, numStepsPerYear=2000)
+
+    testCases.header("TYPE", "STOCK", "TREE", "PDE", "DELTA", "GAMMA",
+                     "THETA")
+
+    for optionType in [FinOptionTypes.EUROPEAN_PUT,
+                       FinOptionTypes.AMERICAN_PUT,
+                       FinOptionTypes.AMERICAN_CALL]:
+
+        option = FinEquityAmericanOption(expiryDate, 105.0, optionType)
+        tree = option.value(valueDate, stockPrices, discountCurve,
+                            dividendYield, model)
+        greeks = option.valueGreeksPDE(valueDate, stockPrices, discountCurve,
+                                       dividendYield, model)
+
+        for i in range(0, len(stockPrices)):
+            testCases.print(optionType, stockPrices[i], tree[i],
+                            greeks['value'][i], greeks['delta'][i],
+                            greeks['gamma'][i], greeks['theta'][i])
+
+    # Quarterly cash dividends make early exercise of a call worthwhile
+    dividendDates = [FinDate(2016, 3, 1), FinDate(2016, 6, 1),
+                     FinDate(2016, 9, 1), FinDate(2016, 12, 1)]
+    dividendAmounts = [1.5, 1.5, 1.5, 1.5]
+
+    testCases.header("TYPE", "VALUE", "DELTA", "GAMMA", "THETA")
+
+    for optionType in [FinOptionTypes.EUROPEAN_CALL,
+                       FinOptionTypes.AMERICAN_CALL,
+                       FinOptionTypes.EUROPEAN_PUT,
+                       FinOptionTypes.AMERICAN_PUT]:
+
+        option = FinEquityAmericanOption(expiryDate, 100.0, optionType)
+        greeks = option.valueGreeksPDE(valueDate, 100.0, discountCurve, 0.0,
+                                       model, dividendDates, dividendAmounts)
+        testCases.print(optionType, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['theta'])
+
+    # A local volatility with a skew
+    def localVol(t, s):
+        return 0.20 * np.power(s / 100.0, -0.5)
+
+    localVolModel = FinEquityModelBlackScholes(localVol)
+    option = FinEquityAmericanOption(expiryDate, 100.0,
+                                     FinOptionTypes.AMERICAN_PUT)
+
+    testCases.header("MODEL", "VALUE", "DELTA", "GAMMA")
+
+    for name, m in [("FLAT", model), ("LOCAL", localVolModel)]:
+        greeks = option.valueGreeksPDE(valueDate, 100.0, discountCurve,
+                                       dividendYield, m)
+        testCases.print(name, greeks['value'], greeks['delta'],
+                        greeks['gamma'])
+
+###############################################################################
+
+
 testFinEquityAmericanOption()
+testFinEquityAmericanOptionTreeMethods()
+testFinEquityAmericanOptionApproximations()
+testFinEquityAmericanOptionPDE()
 testCases.compareTestCases()
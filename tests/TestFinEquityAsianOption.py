@@ -9,6 +9,7 @@ from FinTestCases import FinTestCases, globalTestCaseMode
 from financepy.finutils.FinOptionTypes import FinOptionTypes
 from financepy.products.equity.FinEquityAsianOption import FinEquityAsianOption
 from financepy.products.equity.FinEquityAsianOption import FinAsianOptionValuationMethods
+from financepy.models.FinMCGreeks import FinMCGreekMethods
 from financepy.products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 
@@ -58,7 +59,8 @@ def testConvergence():
         "Turnbull_Wakeman",
         "Curran",
         "FastMC",
-        "FastMC_CV")
+        "FastMC_CV",
+        "FastMC_CV_Sobol")
 
     valuesTurnbull = []
     valuesCurran = []
@@ -90,6 +92,16 @@ def testConvergence():
                                          seed,
                                          accruedAverage)
 
+        valueMC_CV_Sobol = asianOption.valueMC(valueDate,
+                                               stockPrice,
+                                               discountCurve,
+                                               dividendYield,
+                                               model,
+                                               numPaths,
+                                               seed,
+                                               accruedAverage,
+                                               True)
+
         valueGeometric = asianOption.value(valueDate,
                                            stockPrice,
                                            discountCurve,
@@ -126,7 +138,8 @@ def testConvergence():
             valueTurnbullWakeman,
             valueCurran,
             valueMC_fast,
-            valueMC_CV)
+            valueMC_CV,
+            valueMC_CV_Sobol)
 
 #    import matplotlib.pyplot as plt
 #    x = numPathsList
@@ -379,8 +392,111 @@ def testMCTimings():
 #    plt.xlabel("Number of Paths")
 #    plt.show()
 
+###############################################################################
+
+
+def testMCGreeks():
+
+    valueDate = FinDate(2014, 1, 1)
+    startAveragingDate = FinDate(2014, 6, 1)
+    expiryDate = FinDate(2015, 1, 1)
+    stockPrice = 100.0
+    volatility = 0.20
+    interestRate = 0.05
+    dividendYield = 0.01
+    numObservations = 52
+    accruedAverage = None
+    K = 100
+    seed = 1976
+    numPaths = 50000
+
+    model = FinEquityModelBlackScholes(volatility)
+    discountCurve = FinDiscountCurveFlat(valueDate, interestRate)
+
+    asianOption = FinEquityAsianOption(startAveragingDate,
+                                       expiryDate,
+                                       K,
+                                       FinOptionTypes.EUROPEAN_CALL,
+                                       numObservations)
+
+    testCases.header("METHOD", "VALUE", "DELTA", "GAMMA", "VEGA")
+
+    for method in FinMCGreekMethods:
+        greeks = asianOption.valueGreeksMC(valueDate, stockPrice,
+                                           discountCurve, dividendYield,
+                                           model, numPaths, seed,
+                                           accruedAverage, method)
+
+        testCases.print(method, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['vega'])
+
+###############################################################################
+
+def testObservationDates():
+    ''' Value an option with monthly observation dates once averaging has
+    started using the individual past fixings and their average. '''
+
+    startAveragingDate = FinDate(2014, 1, 1)
+    expiryDate = FinDate(2015, 1, 1)
+    observationDates = [startAveragingDate.addMonths(i) for i in range(1, 13)]
+    stockPrice = 100.0
+    volatility = 0.20
+    interestRate = 0.05
+    dividendYield = 0.01
+    pastFixings = [98.0, 101.0, 104.0]
+    accruedAverage = sum(pastFixings) / len(pastFixings)
+    K = 100
+    seed = 1976
+
+    model = FinEquityModelBlackScholes(volatility)
+    valueDate = FinDate(2014, 4, 15)
+    discountCurve = FinDiscountCurveFlat(valueDate, interestRate)
+
+    testCases.header("TYPE", "PATHS", "FIXINGS", "ACCRUED", "SOBOL",
+                     "GEOMETRIC")
+
+    for optionType in [FinOptionTypes.EUROPEAN_CALL,
+                       FinOptionTypes.EUROPEAN_PUT]:
+
+        asianOption = FinEquityAsianOption(startAveragingDate,
+                                           expiryDate,
+                                           K,
+                                           optionType,
+                                           12,
+                                           observationDates)
+
+        for numPaths in [10000, 100000]:
+
+            vFixings = asianOption.valueMC(valueDate, stockPrice,
+                                           discountCurve, dividendYield,
+                                           model, numPaths, seed, None,
+                                           False, pastFixings)
+
+            vAccrued = asianOption.valueMC(valueDate, stockPrice,
+                                           discountCurve, dividendYield,
+                                           model, numPaths, seed,
+                                           accruedAverage)
+
+            vSobol = asianOption.valueMC(valueDate, stockPrice,
+                                         discountCurve, dividendYield,
+                                         model, numPaths, seed, None,
+                                         True, pastFixings)
+
+            vGeometric = asianOption.value(valueDate, stockPrice,
+                                           discountCurve, dividendYield,
+                                           model,
+                                           FinAsianOptionValuationMethods.GEOMETRIC,
+                                           accruedAverage)
+
+            testCases.print(optionType, numPaths, vFixings, vAccrued, vSobol,
+                            vGeometric)
+
+###############################################################################
+
 
 testConvergence()
 testMCTimings()
+testMCGreeks()
+testObservationDates()
 testTimeEvolution()
 testCases.compareTestCases()
@@ -2,6 +2,9 @@
 # Copyright (C) 2018, 2019, 2020 Dominic O'Kane
 ###############################################################################
 
+import time
+import numpy as np
+
 from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.models.FinProcessSimulator import FinProcessTypes
@@ -9,6 +12,7 @@ from financepy.models.FinProcessSimulator import FinGBMNumericalScheme
 from financepy.products.equity.FinEquityBarrierOption import FinEquityBarrierTypes
 from financepy.products.equity.FinEquityBarrierOption import FinEquityBarrierOption
 from financepy.products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
+from financepy.models.FinModelFiniteDifference import fdBarrierValueGreeks
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 from financepy.finutils.FinDate import FinDate
 import sys
@@ -174,5 +178,145 @@ def test_FinEquityBarrierOption():
                 theta)
 
 
+def test_FinEquityBarrierOptionGreeks():
+    ''' Likelihood ratio Greeks of a knock-out call compared to bumping
+    the Monte-Carlo value with the same random numbers. '''
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+    model = FinEquityModelBlackScholes(0.20)
+    dividendYield = 0.01
+    stockPrice = 100.0
+
+    barrierOption = FinEquityBarrierOption(
+        expiryDate, 100.0, FinEquityBarrierTypes.DOWN_AND_OUT_CALL, 90.0, 52)
+
+    testCases.header("NUMPATHS", "VALUE", "DELTA", "GAMMA", "VEGA",
+                     "DELTA_SE")
+
+    for numPaths in [20000, 100000]:
+        greeks = barrierOption.valueGreeksMC(valueDate, stockPrice,
+                                             discountCurve, dividendYield,
+                                             model, numPaths, 4242)
+
+        testCases.print(numPaths, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['vega'],
+                        greeks['stderr']['delta'])
+
+    v = barrierOption.value(valueDate, stockPrice, discountCurve,
+                            dividendYield, model)
+    delta = barrierOption.delta(valueDate, stockPrice, discountCurve,
+                                dividendYield, model)
+    testCases.print("ANALYTICAL", v, delta, "", "", "")
+
+###############################################################################
+
+def test_FinEquityBarrierOptionPDE():
+    ''' Finite difference values and Greeks of discretely monitored barrier
+    options compared to the analytical values with the barrier shift for
+    discrete monitoring, and the convergence of the grid. '''
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+    model = FinEquityModelBlackScholes(0.20)
+    dividendYield = 0.02
+    stockPrice = 100.0
+
+    testCases.header("TYPE", "B", "ANALYTICAL", "PDE", "DELTA", "GAMMA",
+                     "THETA")
+
+    for optionType in FinEquityBarrierTypes:
+        for B in [90.0, 110.0]:
+            barrierOption = FinEquityBarrierOption(expiryDate, 100.0,
+                                                   optionType, B, 252)
+            v = barrierOption.value(valueDate, stockPrice, discountCurve,
+                                    dividendYield, model)
+            greeks = barrierOption.valueGreeksPDE(valueDate, stockPrice,
+                                                  discountCurve,
+                                                  dividendYield, model)
+            testCases.print(optionType, B, v, greeks['value'],
+                            greeks['delta'], greeks['gamma'], greeks['theta'])
+
+    barrierOption = FinEquityBarrierOption(
+        expiryDate, 100.0, FinEquityBarrierTypes.DOWN_AND_OUT_CALL, 90.0, 12)
+
+    testCases.header("NUMSTEPS", "VALUE", "DELTA", "GAMMA", "TIME")
+
+    for numSteps in [50, 100, 200, 400]:
+        start = time.time()
+        greeks = barrierOption.valueGreeksPDE(valueDate, stockPrice,
+                                              discountCurve, dividendYield,
+                                              model, numSteps, numSteps)
+        end = time.time()
+        testCases.print(numSteps, greeks['value'], greeks['delta'],
+                        greeks['gamma'], end - start)
+
+###############################################################################
+
+
+def test_FinEquityBarrierOptionBrownianBridge():
+    ''' Monte-Carlo values of continuous barrier options with and without
+    the Brownian bridge crossing probability between the simulated prices
+    compared to a fine finite difference grid with a continuous barrier. '''
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+    dividendYield = 0.02
+    volatility = 0.20
+    stockPrice = 100.0
+    K = 100.0
+
+    t = (expiryDate - valueDate) / 365.0
+    r = discountCurve.zeroRate(expiryDate)
+    modelParams = (stockPrice, r - dividendYield, volatility,
+                   FinGBMNumericalScheme.ANTITHETIC)
+
+    testCases.header("TYPE", "B", "PDE", "STEPS", "BRIDGE", "NO_BRIDGE",
+                     "TIME")
+
+    for optionType, B in [(FinEquityBarrierTypes.DOWN_AND_OUT_CALL, 90.0),
+                          (FinEquityBarrierTypes.UP_AND_OUT_CALL, 120.0),
+                          (FinEquityBarrierTypes.UP_AND_IN_PUT, 110.0)]:
+
+        if optionType == FinEquityBarrierTypes.UP_AND_IN_PUT:
+            phi = -1.0
+        else:
+            phi = 1.0
+
+        def payoff(s):
+            return np.maximum(phi * (s - K), 0.0)
+
+        isDown = optionType == FinEquityBarrierTypes.DOWN_AND_OUT_CALL
+        isKnockIn = optionType == FinEquityBarrierTypes.UP_AND_IN_PUT
+
+        exact = fdBarrierValueGreeks(stockPrice, t, payoff, r, dividendYield,
+                                     volatility, B, isDown, isKnockIn,
+                                     numSpaceSteps=800,
+                                     numTimeSteps=800)['value'][0]
+
+        barrierOption = FinEquityBarrierOption(expiryDate, K, optionType, B)
+
+        for numAnnObs in [12, 52, 252]:
+            start = time.time()
+            v = barrierOption.valueMC(valueDate, stockPrice, discountCurve,
+                                      FinProcessTypes.GBM, modelParams,
+                                      numAnnObs, 20000, 42, True)
+            end = time.time()
+            vDiscrete = barrierOption.valueMC(valueDate, stockPrice,
+                                              discountCurve,
+                                              FinProcessTypes.GBM,
+                                              modelParams, numAnnObs, 20000,
+                                              42, False)
+            testCases.print(optionType, B, exact, numAnnObs, v, vDiscrete,
+                            end - start)
+
+###############################################################################
+
 test_FinEquityBarrierOption()
+test_FinEquityBarrierOptionGreeks()
+test_FinEquityBarrierOptionPDE()
+test_FinEquityBarrierOptionBrownianBridge()
 testCases.compareTestCases()
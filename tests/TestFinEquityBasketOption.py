@@ -5,11 +5,13 @@
 from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.products.equity.FinEquityBasketOption import FinEquityBasketOption
+from financepy.models.FinMCGreeks import FinMCGreekMethods
 from financepy.finutils.FinOptionTypes import FinOptionTypes
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 from financepy.finutils.FinHelperFunctions import betaVectorToCorrMatrix
 from financepy.finutils.FinDate import FinDate
 import numpy as np
+import time
 import sys
 sys.path.append("..//..")
 
@@ -41,7 +43,8 @@ def test_FinEquityBasketOption():
 
     betaList = np.linspace(0.0, 0.999999, 11)
 
-    testCases.header("NumPaths", "Beta", "Value", "ValueMC", "TIME")
+    testCases.header("NumPaths", "Beta", "Value", "ValueMC", "ValueMC_Sobol",
+                     "TIME")
 
     for beta in betaList:
         for numPaths in [10000]:
@@ -67,9 +70,20 @@ def test_FinEquityBasketOption():
                 volatilities,
                 corrMatrix,
                 numPaths)
+
+            vMCSobol = callOption.valueMC(
+                valueDate,
+                stockPrices,
+                discountCurve,
+                dividendYields,
+                volatilities,
+                corrMatrix,
+                numPaths,
+                4242,
+                True)
             end = time.time()
             duration = end - start
-            testCases.print(numPaths, beta, v, vMC, duration)
+            testCases.print(numPaths, beta, v, vMC, vMCSobol, duration)
 
     ##########################################################################
     # INHomogeneous Basket
@@ -200,5 +214,111 @@ def test_FinEquityBasketOption():
 ###############################################################################
 
 
+def test_FinEquityBasketOptionGreeks():
+    ''' Delta, gamma and vega of a 5 asset basket from one simulation
+    compared to bumping the analytical value. '''
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+
+    numAssets = 5
+    stockPrices = np.array([100.0, 105.0, 95.0, 100.0, 110.0])
+    volatilities = np.array([0.20, 0.25, 0.30, 0.20, 0.15])
+    dividendYields = np.ones(numAssets) * 0.01
+    corrMatrix = betaVectorToCorrMatrix(np.ones(numAssets) * 0.6)
+
+    callOption = FinEquityBasketOption(expiryDate, 100.0,
+                                       FinOptionTypes.EUROPEAN_CALL,
+                                       numAssets)
+
+    testCases.header("METHOD", "VALUE", "DELTAS", "GAMMAS", "VEGAS")
+
+    for method in FinMCGreekMethods:
+        greeks = callOption.valueGreeksMC(valueDate, stockPrices,
+                                          discountCurve, dividendYields,
+                                          volatilities, corrMatrix,
+                                          50000, 4242, method)
+
+        testCases.print(method, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['vega'])
+
+    bump = 0.01
+    v = callOption.value(valueDate, stockPrices, discountCurve,
+                         dividendYields, volatilities, corrMatrix)
+    deltas = np.zeros(numAssets)
+    gammas = np.zeros(numAssets)
+    vegas = np.zeros(numAssets)
+
+    for i in range(0, numAssets):
+        dS = np.zeros(numAssets)
+        dS[i] = stockPrices[i] * bump
+        vUp = callOption.value(valueDate, stockPrices + dS, discountCurve,
+                               dividendYields, volatilities, corrMatrix)
+        vDn = callOption.value(valueDate, stockPrices - dS, discountCurve,
+                               dividendYields, volatilities, corrMatrix)
+        deltas[i] = (vUp - vDn) / 2.0 / dS[i]
+        gammas[i] = (vUp - 2.0 * v + vDn) / dS[i] / dS[i]
+
+        dV = np.zeros(numAssets)
+        dV[i] = bump
+        vUp = callOption.value(valueDate, stockPrices, discountCurve,
+                               dividendYields, volatilities + dV, corrMatrix)
+        vDn = callOption.value(valueDate, stockPrices, discountCurve,
+                               dividendYields, volatilities - dV, corrMatrix)
+        vegas[i] = (vUp - vDn) / 2.0 / bump
+
+    testCases.print("BUMPED", v, deltas, gammas, vegas)
+
+###############################################################################
+
+
+def test_FinEquityBasketOptionControlVariates():
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+
+    numAssets = 50
+    np.random.seed(1919)
+    stockPrices = np.random.uniform(80.0, 120.0, numAssets)
+    volatilities = np.random.uniform(0.15, 0.40, numAssets)
+    dividendYields = np.ones(numAssets) * 0.01
+    corrMatrix = betaVectorToCorrMatrix(np.ones(numAssets) * np.sqrt(0.5))
+
+    callOption = FinEquityBasketOption(
+        expiryDate, 100.0, FinOptionTypes.EUROPEAN_CALL, numAssets)
+
+    v = callOption.value(valueDate, stockPrices, discountCurve,
+                         dividendYields, volatilities, corrMatrix)
+
+    # The spread of the estimates over seeds at the same number of paths
+    testCases.header("CONTROL", "SOBOL", "VALUE", "MEAN_MC", "STDDEV_MC")
+
+    for useControlVariates in [False, True]:
+        for useSobol in [False, True]:
+            values = [callOption.valueMC(valueDate, stockPrices,
+                                         discountCurve, dividendYields,
+                                         volatilities, corrMatrix, 5000,
+                                         seed, useSobol, 10000,
+                                         useControlVariates)
+                      for seed in range(0, 10)]
+            testCases.print(useControlVariates, useSobol, v,
+                            np.mean(values), np.std(values))
+
+    # One million paths are streamed in blocks of ten thousand
+    start = time.time()
+    vMC = callOption.valueMC(valueDate, stockPrices, discountCurve,
+                             dividendYields, volatilities, corrMatrix,
+                             500000)
+    end = time.time()
+
+    testCases.header("NUMPATHS", "VALUE", "VALUE_MC", "TIME")
+    testCases.print(1000000, v, vMC, end - start)
+
+###############################################################################
+
 test_FinEquityBasketOption()
+test_FinEquityBasketOptionGreeks()
+test_FinEquityBasketOptionControlVariates()
 testCases.compareTestCases()
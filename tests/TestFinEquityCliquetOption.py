@@ -51,5 +51,38 @@ def test_FinEquityCliquetOptionHaug():
 ###############################################################################
 
 
+def test_FinEquityCliquetOptionMC():
+    ''' Compare the Monte-Carlo and analytical values of calls and puts. '''
+
+    startDate = FinDate(1, 1, 2015)
+    finalExpiryDate = FinDate(1, 1, 2018)
+    valueDate = startDate
+    stockPrice = 100.0
+    dividendYield = 0.01
+    model = FinEquityModelBlackScholes(0.25)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.03)
+
+    testCases.header("OPTION_TYPE", "VALUE", "VALUE_MC")
+
+    for optionType in [FinOptionTypes.EUROPEAN_CALL,
+                       FinOptionTypes.EUROPEAN_PUT]:
+
+        cliquetOption = FinEquityCliquetOption(startDate,
+                                               finalExpiryDate,
+                                               optionType,
+                                               FinFrequencyTypes.QUARTERLY)
+
+        v = cliquetOption.value(valueDate, stockPrice, discountCurve,
+                                dividendYield, model)
+
+        vMC = cliquetOption.valueMC(valueDate, stockPrice, discountCurve,
+                                    dividendYield, model, 100000)
+
+        testCases.print(optionType, v, vMC)
+
+###############################################################################
+
+
 test_FinEquityCliquetOptionHaug()
+test_FinEquityCliquetOptionMC()
 testCases.compareTestCases()
@@ -12,6 +12,8 @@ from financepy.finutils.FinOptionTypes import FinOptionTypes
 
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 from financepy.finutils.FinDate import FinDate
+from financepy.models.FinModelLookback import fixedLookbackValuesVectorised
+import numpy as np
 import time
 import sys
 sys.path.append("..//..")
@@ -510,6 +512,70 @@ def test_FinEquityLookBackOption():
 
 ###############################################################################
 
+
+def test_FinEquityLookbackVectorised():
+
+    valueDate = FinDate(2015, 1, 1)
+    expiryDate = FinDate(2016, 1, 1)
+    volatility = 0.3
+    interestRate = 0.05
+    dividendYield = 0.01
+    discountCurve = FinDiscountCurveFlat(valueDate, interestRate)
+
+    # A ladder of stock prices is valued in one call
+    stockPrices = np.linspace(80.0, 120.0, 100001)
+    option = FinEquityFloatLookbackOption(expiryDate,
+                                          FinOptionTypes.EUROPEAN_CALL)
+
+    start = time.time()
+    values = option.value(valueDate, stockPrices, discountCurve,
+                          dividendYield, volatility, stockPrices * 0.95)
+    end = time.time()
+
+    testCases.header("NUM_PRICES", "VALUE_80", "VALUE_120", "TIME")
+    testCases.print(len(values), values[0], values[-1], end - start)
+
+    # Daily monitoring using the Broadie, Glasserman and Kou correction
+    testCases.header("OPTION", "TYPE", "CONTINUOUS", "DISCRETE", "VALUE_MC")
+
+    for optionType in [FinOptionTypes.EUROPEAN_CALL,
+                       FinOptionTypes.EUROPEAN_PUT]:
+
+        options = [FinEquityFixedLookbackOption(expiryDate, optionType,
+                                                100.0),
+                   FinEquityFloatLookbackOption(expiryDate, optionType)]
+
+        for option in options:
+            v = option.value(valueDate, 100.0, discountCurve, dividendYield,
+                             volatility, 100.0)
+            vBGK = option.value(valueDate, 100.0, discountCurve,
+                                dividendYield, volatility, 100.0, 252)
+            vMC = option.valueMC(valueDate, 100.0, discountCurve,
+                                 dividendYield, volatility, 100.0, 50000,
+                                 252)
+            testCases.print(type(option).__name__, optionType, v, vBGK,
+                            vMC)
+
+    # The model function values a grid of strikes and expiries
+    strikes, expiries = np.meshgrid(np.linspace(80.0, 120.0, 5),
+                                    np.array([0.25, 1.0, 5.0]))
+    n = strikes.size
+    values = fixedLookbackValuesVectorised(np.full(n, 100.0),
+                                           expiries.ravel(),
+                                           strikes.ravel(),
+                                           np.full(n, 100.0),
+                                           np.full(n, interestRate),
+                                           np.full(n, dividendYield),
+                                           np.full(n, volatility),
+                                           np.full(n, 1.0),
+                                           np.full(n, 0.0))
+
+    testCases.header("EXPIRY", "STRIKE", "VALUE")
+    for t, k, v in zip(expiries.ravel(), strikes.ravel(), values):
+        testCases.print(t, k, v)
+
+###############################################################################
+
 def test_example():
 
     expiryDate = FinDate(1, 1, 2021)
@@ -537,4 +603,5 @@ def test_example():
 
 test_example()
 #test_FinEquityLookBackOption()
+test_FinEquityLookbackVectorised()
 testCases.compareTestCases()
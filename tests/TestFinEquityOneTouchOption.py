@@ -62,8 +62,8 @@ def test_FinEquityOneTouchOption():
                               discountCurve,
                               dividendYield,
                               model,
-                              numStepsPerYear,
-                              numPaths)
+                              numPaths,
+                              numStepsPerYear)
 
         testCases.print("%60s " % downType,
                         "%9.5f" % v,
@@ -96,8 +96,8 @@ def test_FinEquityOneTouchOption():
                               discountCurve,
                               dividendYield,
                               model,
-                              numStepsPerYear,
-                              numPaths)
+                              numPaths,
+                              numStepsPerYear)
 
         testCases.print("%60s " % upType,
                         "%9.5f" % v,
@@ -131,8 +131,8 @@ def test_FinEquityOneTouchOption():
                               discountCurve,
                               dividendYield,
                               model,
-                              numStepsPerYear,
-                              numPaths)
+                              numPaths,
+                              numStepsPerYear)
 
         testCases.print("%60s " % downType,
                         "%9.5f" % v,
@@ -161,8 +161,8 @@ def test_FinEquityOneTouchOption():
                               discountCurve,
                               dividendYield,
                               model,
-                              numStepsPerYear,
-                              numPaths)
+                              numPaths,
+                              numStepsPerYear)
 
         testCases.print("%60s " % upType,
                         "%9.5f" % v,
@@ -171,5 +171,74 @@ def test_FinEquityOneTouchOption():
 ###############################################################################
 
 
+def test_FinEquityOneTouchOptionPDE():
+    ''' Finite difference values and Greeks of every one-touch payoff
+    compared to the analytical values. '''
+
+    valueDate = FinDate(1, 1, 2016)
+    expiryDate = FinDate(2, 7, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.10)
+    model = FinEquityModelBlackScholes(0.20)
+    stockPrice = 105.0
+    dividendYield = 0.03
+
+    testCases.header("TYPE", "ANALYTICAL", "PDE", "DELTA", "GAMMA", "THETA")
+
+    for payoffType in FinTouchOptionPayoffTypes:
+
+        if "DOWN" in payoffType.name:
+            barrierLevel = 100.0
+        else:
+            barrierLevel = 110.0
+
+        option = FinEquityOneTouchOption(expiryDate, payoffType,
+                                         barrierLevel, 15.0)
+
+        v = option.value(valueDate, stockPrice, discountCurve,
+                         dividendYield, model)
+        greeks = option.valueGreeksPDE(valueDate, stockPrice, discountCurve,
+                                       dividendYield, model)
+
+        testCases.print(payoffType, v, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['theta'])
+
+###############################################################################
+
+
+def test_FinEquityOneTouchOptionMCConvergence():
+    ''' Monte-Carlo values with the Brownian bridge for a falling number of
+    time steps per year compared to the analytical values. '''
+
+    valueDate = FinDate(1, 1, 2016)
+    expiryDate = FinDate(2, 7, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.10)
+    model = FinEquityModelBlackScholes(0.20)
+    stockPrice = 105.0
+    dividendYield = 0.03
+
+    testCases.header("TYPE", "ANALYTICAL", "STEPS", "VALUE_MC")
+
+    for payoffType, barrierLevel in [
+            (FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_HIT, 100.0),
+            (FinTouchOptionPayoffTypes.UP_AND_IN_ASSET_AT_HIT, 110.0),
+            (FinTouchOptionPayoffTypes.UP_AND_OUT_ASSET_OR_NOTHING, 110.0)]:
+
+        option = FinEquityOneTouchOption(expiryDate, payoffType,
+                                         barrierLevel, 15.0)
+
+        v = option.value(valueDate, stockPrice, discountCurve,
+                         dividendYield, model)
+
+        for numStepsPerYear in [12, 52, 252]:
+            v_mc = option.valueMC(valueDate, stockPrice, discountCurve,
+                                  dividendYield, model, 20000,
+                                  numStepsPerYear)
+            testCases.print(payoffType, v, numStepsPerYear, v_mc)
+
+###############################################################################
+
+
 test_FinEquityOneTouchOption()
+test_FinEquityOneTouchOptionPDE()
+test_FinEquityOneTouchOptionMCConvergence()
 testCases.compareTestCases()
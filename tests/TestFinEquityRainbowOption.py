@@ -6,6 +6,7 @@ from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.products.equity.FinEquityRainbowOption import FinEquityRainbowOption
 from financepy.products.equity.FinEquityRainbowOption import FinEquityRainbowOptionTypes
+from financepy.models.FinMCGreeks import FinMCGreekMethods
 from financepy.finutils.FinHelperFunctions import betaVectorToCorrMatrix
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 from financepy.finutils.FinDate import FinDate
@@ -510,5 +511,74 @@ def test_FinEquityRainbowOption():
 ###############################################################################
 
 
+def test_FinEquityRainbowOptionGreeks():
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+
+    numAssets = 2
+    stockPrices = np.array([100.0, 100.0])
+    volatilities = np.array([0.20, 0.25])
+    dividendYields = np.array([0.01, 0.01])
+    corrMatrix = betaVectorToCorrMatrix(np.ones(numAssets) * sqrt(0.5))
+
+    rainbowOption = FinEquityRainbowOption(
+        expiryDate, FinEquityRainbowOptionTypes.CALL_ON_MAXIMUM, [100.0],
+        numAssets)
+
+    testCases.header("METHOD", "VALUE", "DELTAS", "GAMMAS", "VEGAS")
+
+    for method in FinMCGreekMethods:
+        greeks = rainbowOption.valueGreeksMC(valueDate, stockPrices,
+                                             discountCurve, dividendYields,
+                                             volatilities, corrMatrix,
+                                             50000, 4242, method)
+
+        testCases.print(method, greeks['value'], greeks['delta'],
+                        greeks['gamma'], greeks['vega'])
+
+    v = rainbowOption.value(valueDate, stockPrices, discountCurve,
+                            dividendYields, volatilities, corrMatrix)
+    testCases.print("ANALYTICAL", v, "", "", "")
+
+###############################################################################
+
+
+def test_FinEquityRainbowOptionControlVariates():
+
+    valueDate = FinDate(1, 1, 2015)
+    expiryDate = FinDate(1, 1, 2016)
+    discountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+
+    testCases.header("NUMASSETS", "CONTROL", "SOBOL", "MEAN_MC", "STDDEV_MC")
+
+    for numAssets in [2, 20]:
+
+        stockPrices = np.ones(numAssets) * 100.0
+        volatilities = np.ones(numAssets) * 0.30
+        dividendYields = np.ones(numAssets) * 0.01
+        corrMatrix = betaVectorToCorrMatrix(np.ones(numAssets) * sqrt(0.5))
+
+        rainbowOption = FinEquityRainbowOption(
+            expiryDate, FinEquityRainbowOptionTypes.PUT_ON_MINIMUM, [100.0],
+            numAssets)
+
+        for useControlVariates in [False, True]:
+            for useSobol in [False, True]:
+                values = [rainbowOption.valueMC(valueDate, stockPrices,
+                                                discountCurve,
+                                                dividendYields,
+                                                volatilities, corrMatrix,
+                                                10000, seed, useSobol,
+                                                10000, useControlVariates)
+                          for seed in range(0, 10)]
+                testCases.print(numAssets, useControlVariates, useSobol,
+                                np.mean(values), np.std(values))
+
+###############################################################################
+
 test_FinEquityRainbowOption()
+test_FinEquityRainbowOptionGreeks()
+test_FinEquityRainbowOptionControlVariates()
 testCases.compareTestCases()
@@ -3,11 +3,13 @@
 ###############################################################################
 
 import time
+import numpy as np
 
 from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.finutils.FinOptionTypes import FinOptionTypes
 from financepy.products.equity.FinEquityVanillaOption import FinEquityVanillaOption
+from financepy.products.equity.FinEquityVanillaOptionPortfolio import FinEquityVanillaOptionPortfolio
 from financepy.products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 
@@ -232,6 +234,91 @@ def test_FinEquityVanillaOption():
 
 ###############################################################################
 
+def test_FinEquityVanillaOptionPortfolio():
+
+    valueDate = FinDate(2015, 1, 1)
+    stockPrice = 100.0
+    volatility = 0.30
+    interestRate = 0.05
+    dividendYield = 0.01
+    model = FinEquityModelBlackScholes(volatility)
+    discountCurve = FinDiscountCurveFlat(valueDate, interestRate)
+
+    expiryDates = [valueDate.addMonths(m) for m in [1, 3, 6, 12]]
+    strikes = [80.0, 100.0, 120.0]
+    optionTypes = [FinOptionTypes.EUROPEAN_CALL, FinOptionTypes.EUROPEAN_PUT]
+
+    expiries = []
+    strikeList = []
+    typeList = []
+
+    for expiryDate in expiryDates:
+        for strike in strikes:
+            for optionType in optionTypes:
+                expiries.append(expiryDate)
+                strikeList.append(strike)
+                typeList.append(optionType)
+
+    portfolio = FinEquityVanillaOptionPortfolio(expiries, strikeList,
+                                                typeList)
+
+    greeks = portfolio.valueGreeks(valueDate, stockPrice, discountCurve,
+                                   dividendYield, model)
+
+    testCases.header("EXPIRY", "K", "TYPE", "VALUE", "DELTA", "GAMMA",
+                     "VEGA", "THETA", "RHO", "VANNA", "VOLGA", "MAXDIFF")
+
+    for i in range(0, len(expiries)):
+
+        option = FinEquityVanillaOption(expiries[i], strikeList[i],
+                                        typeList[i])
+        args = (valueDate, stockPrice, discountCurve, dividendYield, model)
+
+        single = [option.value(*args), option.delta(*args),
+                  option.gamma(*args), option.vega(*args),
+                  option.theta(*args), option.rho(*args)]
+
+        vectorised = [greeks['value'][i], greeks['delta'][i],
+                      greeks['gamma'][i], greeks['vega'][i],
+                      greeks['theta'][i], greeks['rho'][i]]
+
+        maxDiff = np.max(np.abs(np.array(single) - np.array(vectorised)))
+
+        testCases.print(expiries[i], strikeList[i], typeList[i],
+                        greeks['value'][i], greeks['delta'][i],
+                        greeks['gamma'][i], greeks['vega'][i],
+                        greeks['theta'][i], greeks['rho'][i],
+                        greeks['vanna'][i], greeks['volga'][i], maxDiff)
+
+    # A large book with a different stock price and volatility per option
+    numOptions = 200000
+    np.random.seed(1234)
+    expiries = [expiryDates[i] for i in np.random.randint(0, 4, numOptions)]
+    strikeList = np.random.uniform(50.0, 150.0, numOptions)
+    typeList = [optionTypes[i] for i in np.random.randint(0, 2, numOptions)]
+    stockPrices = np.random.uniform(90.0, 110.0, numOptions)
+    model = FinEquityModelBlackScholes(np.random.uniform(0.1, 0.5,
+                                                         numOptions))
+
+    portfolio = FinEquityVanillaOptionPortfolio(expiries, strikeList,
+                                                typeList)
+
+    # The first call compiles the kernel
+    portfolio.valueGreeks(valueDate, stockPrices, discountCurve,
+                          dividendYield, model)
+
+    start = time.time()
+    greeks = portfolio.valueGreeks(valueDate, stockPrices, discountCurve,
+                                   dividendYield, model)
+    end = time.time()
+
+    testCases.header("NUMOPTIONS", "VALUE", "DELTA", "TIME")
+    testCases.print(numOptions, np.sum(greeks['value']),
+                    np.sum(greeks['delta']), end - start)
+
+###############################################################################
+
 
 test_FinEquityVanillaOption()
+test_FinEquityVanillaOptionPortfolio()
 testCases.compareTestCases()
@@ -2,13 +2,18 @@
 # Copyright (C) 2018, 2019, 2020 Dominic O'Kane
 ###############################################################################
 
+import time
 import numpy as np
 
 from FinTestCases import FinTestCases, globalTestCaseMode
 
 from financepy.finutils.FinDate import FinDate
 from financepy.market.volatility.FinEquityVolCurve import FinEquityVolCurve
+from financepy.market.volatility.FinEquityVolSurface import FinEquityVolSurface
 from financepy.products.equity.FinEquityVarianceSwap import FinEquityVarianceSwap
+from financepy.products.equity.FinEquityVarianceSwap import varianceSwapFairStrikes
+from financepy.products.equity.FinEquityVarianceSwap import varianceSwapValues
+from financepy.products.equity.FinEquityRealisedVariance import FinEquityRealisedVariance
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
 
 import sys
@@ -65,8 +70,118 @@ def test_FinEquityVarianceSwap():
     k2 = volSwap.fairStrikeApprox(valuationDate, stockPrice, strikes, vols)
     testCases.print("DERMAN SKEW APPROX for K:", k2)
 
-##########################################################################
+    k3 = volSwap.fairStrikeIntegral(valuationDate, stockPrice, dividendYield,
+                                    volCurve, discountCurve)
+    testCases.print("INTEGRAL REPLICATION VARIANCE:", k3)
+
+    # With a flat volatility the fair variance is the variance
+    k4 = volSwap.fairStrikeIntegral(valuationDate, stockPrice, dividendYield,
+                                    atmVol, discountCurve)
+    testCases.print("FLAT VOL INTEGRAL VARIANCE:", k4)
+
+###############################################################################
+
+
+def test_FinEquityVarianceSwapTermStructure():
+
+    valuationDate = FinDate(2018, 3, 20)
+    stockPrice = 100.0
+    dividendYield = 0.01
+    discountCurve = FinDiscountCurveFlat(valuationDate, 0.05)
+
+    expiryDates = [valuationDate.addMonths(m) for m in [1, 3, 6, 12, 24]]
+    strikes = np.linspace(60.0, 140.0, 17)
+    vols = np.array([volSkew(strikes, 0.20, 100.0, -0.02/5.0/(i+1)**0.5)
+                     for i in range(0, len(expiryDates))])
+    volSurface = FinEquityVolSurface(valuationDate, stockPrice,
+                                     discountCurve, dividendYield,
+                                     expiryDates, strikes, vols)
+
+    maturityDates = [valuationDate.addMonths(m) for m in range(1, 25)]
+    varianceSwapFairStrikes(valuationDate, maturityDates[0:1], stockPrice,
+                            dividendYield, discountCurve, volSurface)
+
+    start = time.time()
+    fairVars = varianceSwapFairStrikes(valuationDate, maturityDates,
+                                       stockPrice, dividendYield,
+                                       discountCurve, volSurface)
+    end = time.time()
+
+    testCases.header("MATURITY", "FAIR_VOL", "ATM_VOL")
+
+    for maturityDate, fairVar in zip(maturityDates, fairVars):
+        atmVol = volSurface.volatility(stockPrice, maturityDate)
+        testCases.print(maturityDate, np.sqrt(fairVar), atmVol)
+
+    testCases.header("NUM MATURITIES", "TIME")
+    testCases.print(len(maturityDates), end - start)
+
+###############################################################################
+
+
+def test_FinEquityRealisedVariance():
+
+    startDate = FinDate(2018, 3, 20)
+    valuationDate = startDate.addMonths(6)
+    discountCurve = FinDiscountCurveFlat(valuationDate, 0.05)
+
+    # Daily closes for a book of swaps on different stocks
+    numSwaps = 10000
+    numDays = 126
+    np.random.seed(1919)
+    vols = np.random.uniform(0.10, 0.40, numSwaps)
+    z = np.random.standard_normal((numDays, numSwaps))
+    closes = 100.0 * np.exp(np.cumsum(vols * z / np.sqrt(252.0), axis=0))
+
+    accumulator = FinEquityRealisedVariance(numSwaps)
+    accumulator.update(closes[0])
+
+    start = time.time()
+    for i in range(1, numDays):
+        accumulator.update(closes[i])
+    end = time.time()
+
+    varSwap = FinEquityVarianceSwap(startDate, "1Y", 0.04)
+    realisedVars = accumulator.realisedVariance()
+
+    testCases.header("LABEL", "VALUE")
+    testCases.print("ACCUMULATED VARIANCE:", realisedVars[0])
+    testCases.print("FULL HISTORY VARIANCE:",
+                    varSwap.realisedVariance(closes[:, 0]))
+    testCases.print("MAX ABS DIFFERENCE:",
+                    max(abs(realisedVars[i] -
+                            varSwap.realisedVariance(closes[:, i]))
+                        for i in range(0, 100)))
+    testCases.print("TIME PER DAILY UPDATE:", (end - start) / (numDays - 1))
+
+    # Swaps on other calendars can be updated separately
+    accumulator.update([closes[-1, 0] * 1.01, closes[-1, 2] * 0.99], [0, 2])
+    testCases.print("OBSERVATIONS:", accumulator.numObservations()[0:3])
+
+    single = FinEquityRealisedVariance()
+    for close in closes[:, 0]:
+        single.update(close)
+
+    v1 = varSwap.value(valuationDate, single, 0.04, discountCurve)
+    v2 = varSwap.value(valuationDate, realisedVars[0], 0.04, discountCurve)
+    testCases.print("VALUE FROM ACCUMULATOR:", v1)
+    testCases.print("VALUE FROM VARIANCE:", v2)
+
+    varianceSwaps = [FinEquityVarianceSwap(startDate, "1Y", 0.04)
+                     for i in range(0, 1000)]
+    accumulator = FinEquityRealisedVariance(1000)
+    for i in range(0, numDays):
+        accumulator.update(closes[i, 0:1000])
+
+    values = varianceSwapValues(valuationDate, varianceSwaps, accumulator,
+                                0.04, discountCurve)
+    testCases.print("BOOK VALUE:", np.sum(values))
+    testCases.print("FIRST SWAP VALUE:", values[0])
+
+###############################################################################
 
 
 test_FinEquityVarianceSwap()
+test_FinEquityVarianceSwapTermStructure()
+test_FinEquityRealisedVariance()
 testCases.compareTestCases()
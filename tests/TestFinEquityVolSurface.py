@@ -0,0 +1,118 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import time
+import numpy as np
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+from financepy.finutils.FinDate import FinDate
+from financepy.finutils.FinGlobalVariables import gDaysInYear
+from financepy.finutils.FinOptionTypes import FinOptionTypes
+from financepy.models.FinModelBlack import blackImpliedVolatilityVectorised
+from financepy.models.FinModelHeston import FinModelHeston
+from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
+from financepy.market.volatility.FinEquityVolSurface import FinEquityVolSurface
+from financepy.market.volatility.FinEquityVolSurface import FinVolFunctionTypes
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+PLOT_GRAPHS = False
+
+###############################################################################
+
+
+def marketVolGrid(valueDate, expiryDates, strikes, stockPrice, r, q):
+    ''' Implied volatilities of a Heston model which give an arbitrage free
+    market grid with a skew that flattens with expiry. '''
+
+    model = FinModelHeston(0.04, 1.5, 0.05, 0.6, -0.7)
+    vols = []
+
+    for expiryDate in expiryDates:
+        t = (expiryDate - valueDate) / gDaysInYear
+        f = stockPrice * np.exp((r - q) * t)
+        df = np.exp(-r * t)
+        phi = np.where(strikes > f, 1.0, -1.0)
+        optionTypes = [FinOptionTypes.EUROPEAN_CALL if p > 0.0 else
+                       FinOptionTypes.EUROPEAN_PUT for p in phi]
+        prices = model.value_Lewis_Vectorised(valueDate, expiryDate, strikes,
+                                              optionTypes, stockPrice, r, q)
+        n = len(strikes)
+        vols.append(blackImpliedVolatilityVectorised(prices, np.full(n, f),
+                                                     strikes, np.full(n, t),
+                                                     np.full(n, df), phi))
+
+    return np.array(vols)
+
+###############################################################################
+
+
+def test_FinEquityVolSurface():
+
+    valueDate = FinDate(1, 1, 2021)
+    stockPrice = 100.0
+    r = 0.02
+    q = 0.01
+    discountCurve = FinDiscountCurveFlat(valueDate, r)
+
+    expiryDates = [valueDate.addMonths(m) for m in [1, 3, 6, 12, 24, 60]]
+    strikes = np.linspace(70.0, 130.0, 13)
+    vols = marketVolGrid(valueDate, expiryDates, strikes, stockPrice, r, q)
+
+    testCases.header("TYPE", "MAXERROR", "MIN_G", "MAX_CALENDAR")
+
+    for volType in [FinVolFunctionTypes.SVI, FinVolFunctionTypes.SSVI]:
+
+        volSurface = FinEquityVolSurface(valueDate, stockPrice,
+                                         discountCurve, q,
+                                         expiryDates, strikes, vols,
+                                         volType)
+
+        maxError = volSurface.checkCalibration()
+        minG, maxCalendar = volSurface.checkArbitrage()
+        testCases.print(volType, maxError, minG, maxCalendar)
+
+    volSurface = FinEquityVolSurface(valueDate, stockPrice, discountCurve, q,
+                                     expiryDates, strikes, vols,
+                                     FinVolFunctionTypes.SVI)
+
+    # Query on and between the expiry dates
+    testCases.header("EXPIRY", "STRIKE", "VOL")
+
+    for expiryDate in [expiryDates[1], valueDate.addMonths(9),
+                       valueDate.addMonths(84)]:
+        for strike in [80.0, 100.0, 120.0]:
+            vol = volSurface.volatility(strike, expiryDate)
+            testCases.print(expiryDate, strike, vol)
+
+    # Time a large vectorised lookup
+    numPoints = 1000000
+    np.random.seed(1919)
+    queryStrikes = np.random.uniform(50.0, 160.0, numPoints)
+    queryTimes = np.random.uniform(0.0, 6.0, numPoints)
+    volSurface.volatility(queryStrikes[0:10], queryTimes[0:10])
+
+    start = time.time()
+    queryVols = volSurface.volatility(queryStrikes, queryTimes)
+    end = time.time()
+
+    testCases.header("NUMPOINTS", "MINVOL", "MAXVOL", "TIME")
+    testCases.print(numPoints, np.min(queryVols), np.max(queryVols),
+                    end - start)
+
+    if PLOT_GRAPHS:
+        import matplotlib.pyplot as plt
+        plotStrikes = np.linspace(50.0, 160.0, 100)
+        for i in range(0, len(expiryDates)):
+            plt.plot(strikes, vols[i], 'o')
+            plt.plot(plotStrikes,
+                     volSurface.volatility(plotStrikes, expiryDates[i]))
+        plt.show()
+
+###############################################################################
+
+
+test_FinEquityVolSurface()
+testCases.compareTestCases()
@@ -156,5 +156,33 @@ def test_FinFXBarrierOption():
                             theta)
 
 
+def test_FinFXBarrierOptionPDE():
+    ''' Finite difference values of FX barrier options observed daily
+    compared to the analytical values. '''
+
+    valueDate = FinDate(2015, 1, 1)
+    expiryDate = FinDate(2016, 1, 1)
+    domDiscountCurve = FinDiscountCurveFlat(valueDate, 0.05)
+    forDiscountCurve = FinDiscountCurveFlat(valueDate, 0.02)
+    model = FinFXModelBlackScholes(0.10)
+    spotFXRate = 1.32
+    K = 1.30
+
+    testCases.header("TYPE", "B", "ANALYTICAL", "PDE", "DELTA", "GAMMA")
+
+    for optionType in FinFXBarrierTypes:
+        for B in [1.25, 1.40]:
+            barrierOption = FinFXBarrierOption(expiryDate, K, "EURUSD",
+                                               optionType, B, 252, 1.0, "USD")
+            v = barrierOption.value(valueDate, spotFXRate, domDiscountCurve,
+                                    forDiscountCurve, model)
+            greeks = barrierOption.valueGreeksPDE(valueDate, spotFXRate,
+                                                  domDiscountCurve,
+                                                  forDiscountCurve, model)
+            testCases.print(optionType, B, v, greeks['value'],
+                            greeks['delta'], greeks['gamma'])
+
+
 test_FinFXBarrierOption()
+test_FinFXBarrierOptionPDE()
 testCases.compareTestCases()
@@ -0,0 +1,55 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import numpy as np
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+from financepy.finutils.FinDate import FinDate
+from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
+from financepy.products.fx.FinFXVarianceSwap import FinFXVarianceSwap
+from financepy.products.fx.FinFXVarianceSwap import fxVarianceSwapFairStrikes
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+###############################################################################
+
+
+def test_FinFXVarianceSwap():
+
+    valuationDate = FinDate(2020, 1, 1)
+    spotFXRate = 1.30
+    domDiscountCurve = FinDiscountCurveFlat(valuationDate, 0.02)
+    forDiscountCurve = FinDiscountCurveFlat(valuationDate, 0.05)
+
+    varSwap = FinFXVarianceSwap(valuationDate, "1Y", 0.01)
+
+    testCases.header("LABEL", "VALUE")
+
+    # With a flat volatility the fair variance is the variance
+    fairVar = varSwap.fairStrikeIntegral(valuationDate, spotFXRate,
+                                         domDiscountCurve, forDiscountCurve,
+                                         0.10)
+    testCases.print("FLAT VOL FAIR VARIANCE:", fairVar)
+
+    # A smile which is symmetric in log moneyness and flattens with time
+    def smile(k, t):
+        x = np.log(k / spotFXRate)
+        return 0.10 + 0.1 * x * x / t
+
+    maturityDates = [valuationDate.addMonths(m) for m in [1, 3, 6, 12, 24]]
+    fairVars = fxVarianceSwapFairStrikes(valuationDate, maturityDates,
+                                         spotFXRate, domDiscountCurve,
+                                         forDiscountCurve, smile)
+
+    testCases.header("MATURITY", "FAIR_VOL")
+
+    for maturityDate, fairVar in zip(maturityDates, fairVars):
+        testCases.print(maturityDate, np.sqrt(fairVar))
+
+###############################################################################
+
+
+test_FinFXVarianceSwap()
+testCases.compareTestCases()
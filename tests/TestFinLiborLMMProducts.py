@@ -3,6 +3,7 @@
 ###############################################################################
 
 import numpy as np
+import time
 
 from financepy.market.volatility.FinLiborCapVolCurve import FinLiborCapVolCurve
 from financepy.finutils.FinDate import FinDate
@@ -18,6 +19,7 @@ from financepy.products.libor.FinLiborCapFloor import FinLiborCapFloorTypes
 from financepy.products.libor.FinLiborLMMProducts import FinLiborLMMProducts
 
 from financepy.products.libor.FinLiborCapFloor import FinLiborCapFloor
+from financepy.finutils.FinOptionTypes import FinLiborSwapTypes as FinSwapTypes
 
 from FinTestCases import FinTestCases, globalTestCaseMode
 
@@ -236,6 +238,281 @@ testCases = FinTestCases(__file__, globalTestCaseMode)
 ###############################################################################
 
 
+def test_StreamingValuation():
+    ''' Value several products in one pass over paths simulated in blocks so
+    that the full forward cube is never stored. '''
+
+    valuationDate = FinDate(1, 1, 2020)
+    maturityDate = FinDate(1, 1, 2030)
+    frequencyType = FinFrequencyTypes.ANNUAL
+    dayCountType = FinDayCountTypes.ACT_360
+
+    discountCurve = FinDiscountCurveFlat(valuationDate,
+                                         0.04,
+                                         FinFrequencyTypes.ANNUAL)
+
+    lmmProducts = FinLiborLMMProducts(valuationDate,
+                                      maturityDate,
+                                      frequencyType,
+                                      dayCountType)
+
+    capVolDates = [valuationDate]
+    capletDt = valuationDate
+    for i in range(0, 10):
+        capletDt = capletDt.addTenor("1Y")
+        capVolDates.append(capletDt)
+
+    capVolatilities = np.array([0.0] + [0.1554] * 10)
+    volCurve = FinLiborCapVolCurve(valuationDate,
+                                   capVolDates,
+                                   capVolatilities,
+                                   FinDayCountTypes.ACT_ACT_ISDA)
+
+    exerciseDate = lmmProducts._gridDates[3]
+
+    lmmProducts.addCapFloor(valuationDate, maturityDate,
+                            FinLiborCapFloorTypes.CAP, 0.04, frequencyType)
+    lmmProducts.addCapFloor(valuationDate, maturityDate,
+                            FinLiborCapFloorTypes.FLOOR, 0.04, frequencyType)
+    lmmProducts.addSwaption(valuationDate, exerciseDate, maturityDate,
+                            FinSwapTypes.PAYER, 0.04, frequencyType,
+                            fixedDayCountType=dayCountType)
+
+    numPaths = 20000
+    seed = 42
+    useSobol = False
+
+    testCases.header("BLOCKSIZE", "CAP", "FLOOR", "PAYER")
+
+    for numPathsPerBlock in [2000, 5000, 20000]:
+        lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                               useSobol, seed, numPathsPerBlock)
+        v = lmmProducts.requestValues()
+        testCases.print(numPathsPerBlock, v[0], v[1], v[2])
+
+    # The blocks simulate the same paths as the stored simulation
+    lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                           useSobol, seed)
+
+    vCap = lmmProducts.valueCapFloor(valuationDate, maturityDate,
+                                     FinLiborCapFloorTypes.CAP, 0.04,
+                                     frequencyType, dayCountType)
+
+    testCases.header("STORED", "CAP")
+    testCases.print("STORED", vCap)
+
+    # With Sobol the blocks continue the same scrambled sequence
+    useSobol = True
+
+    testCases.header("SOBOL BLOCKSIZE", "CAP", "FLOOR", "PAYER")
+
+    for numPathsPerBlock in [2000, 5000, 20000]:
+        lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                               useSobol, seed, numPathsPerBlock)
+        v = lmmProducts.requestValues()
+        testCases.print(numPathsPerBlock, v[0], v[1], v[2])
+
+###############################################################################
+
+
+def test_SwaptionGrid():
+    ''' Value a grid of swaptions with different expiries and strikes in one
+    sweep over the simulated paths and check against one at a time. '''
+
+    valuationDate = FinDate(1, 1, 2020)
+    maturityDate = FinDate(1, 1, 2030)
+    frequencyType = FinFrequencyTypes.ANNUAL
+    dayCountType = FinDayCountTypes.ACT_360
+
+    discountCurve = FinDiscountCurveFlat(valuationDate,
+                                         0.04,
+                                         FinFrequencyTypes.ANNUAL)
+
+    lmmProducts = FinLiborLMMProducts(valuationDate,
+                                      maturityDate,
+                                      frequencyType,
+                                      dayCountType)
+
+    capVolDates = [valuationDate]
+    capletDt = valuationDate
+    for i in range(0, 10):
+        capletDt = capletDt.addTenor("1Y")
+        capVolDates.append(capletDt)
+
+    capVolatilities = np.array([0.0] + [0.1554] * 10)
+    volCurve = FinLiborCapVolCurve(valuationDate,
+                                   capVolDates,
+                                   capVolatilities,
+                                   FinDayCountTypes.ACT_ACT_ISDA)
+
+    lmmProducts.simulate1F(discountCurve, volCurve, 20000, 0, False, 42)
+
+    exerciseDates = []
+    strikes = []
+    for iExp in range(1, 9):
+        for strike in [0.03, 0.04, 0.05]:
+            exerciseDates.append(lmmProducts._gridDates[iExp])
+            strikes.append(strike)
+
+    start = time.time()
+    vGrid = lmmProducts.valueSwaption(valuationDate, exerciseDates,
+                                      maturityDate, FinSwapTypes.PAYER,
+                                      strikes, frequencyType, dayCountType,
+                                      1.0, frequencyType, dayCountType)
+    end = time.time()
+
+    testCases.header("EXPIRY", "STRIKE", "GRID", "SINGLE")
+
+    for i in range(0, len(exerciseDates)):
+        vSingle = lmmProducts.valueSwaption(valuationDate, exerciseDates[i],
+                                            maturityDate, FinSwapTypes.PAYER,
+                                            strikes[i], frequencyType,
+                                            dayCountType, 1.0, frequencyType,
+                                            dayCountType)
+        testCases.print(exerciseDates[i], strikes[i], vGrid[i], vSingle)
+
+    testCases.header("LABEL", "TIME")
+    testCases.print("GRID PRICING", end - start)
+
+###############################################################################
+
+
+def test_BermudanSwaption():
+    ''' Value a Bermudan swaption and a cancellable swap by Longstaff-
+    Schwartz and reuse the regression coefficients on an independent set of
+    paths to get a low-biased value. '''
+
+    valuationDate = FinDate(1, 1, 2020)
+    maturityDate = FinDate(1, 1, 2030)
+    frequencyType = FinFrequencyTypes.ANNUAL
+    dayCountType = FinDayCountTypes.ACT_360
+
+    discountCurve = FinDiscountCurveFlat(valuationDate,
+                                         0.04,
+                                         FinFrequencyTypes.ANNUAL)
+
+    lmmProducts = FinLiborLMMProducts(valuationDate,
+                                      maturityDate,
+                                      frequencyType,
+                                      dayCountType)
+
+    capVolDates = [valuationDate]
+    capletDt = valuationDate
+    for i in range(0, 10):
+        capletDt = capletDt.addTenor("1Y")
+        capVolDates.append(capletDt)
+
+    capVolatilities = np.array([0.0] + [0.1554] * 10)
+    volCurve = FinLiborCapVolCurve(valuationDate,
+                                   capVolDates,
+                                   capVolatilities,
+                                   FinDayCountTypes.ACT_ACT_ISDA)
+
+    numPaths = 20000
+    exerciseDate = lmmProducts._gridDates[2]
+
+    testCases.header("TYPE", "STRIKE", "EUROPEAN", "BERMUDAN", "LOWER",
+                     "BLOCKS")
+
+    for swaptionType in [FinSwapTypes.PAYER, FinSwapTypes.RECEIVER]:
+        for strike in [0.03, 0.04, 0.05]:
+
+            lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                                   False, 42)
+
+            # The most valuable of the co-terminal Europeans is a lower bound
+            exerciseDates = lmmProducts._gridDates[2:10]
+            vEuropean = lmmProducts.valueSwaption(valuationDate,
+                                                  exerciseDates,
+                                                  maturityDate,
+                                                  swaptionType,
+                                                  strike,
+                                                  frequencyType,
+                                                  dayCountType,
+                                                  1.0,
+                                                  frequencyType,
+                                                  dayCountType)
+
+            vBermudan = lmmProducts.valueBermudanSwaption(valuationDate,
+                                                          exerciseDate,
+                                                          maturityDate,
+                                                          swaptionType,
+                                                          strike,
+                                                          frequencyType,
+                                                          dayCountType,
+                                                          1.0,
+                                                          frequencyType,
+                                                          dayCountType)
+
+            coeffs = lmmProducts._regressionCoeffs
+
+            # Apply the fitted exercise rule to independent paths
+            lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                                   False, 1234)
+
+            vLower = lmmProducts.valueBermudanSwaption(valuationDate,
+                                                       exerciseDate,
+                                                       maturityDate,
+                                                       swaptionType,
+                                                       strike,
+                                                       frequencyType,
+                                                       dayCountType,
+                                                       1.0,
+                                                       frequencyType,
+                                                       dayCountType,
+                                                       regressionCoeffs=coeffs)
+
+            lmmProducts.clearProducts()
+            lmmProducts.addBermudanSwaption(valuationDate, exerciseDate,
+                                            maturityDate, swaptionType,
+                                            strike, frequencyType,
+                                            dayCountType, coeffs, 1.0)
+            lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0,
+                                   False, 1234, numPaths)
+            vBlocks = lmmProducts.requestValues()[0]
+
+            testCases.print(swaptionType, strike, max(vEuropean),
+                            vBermudan, vLower, vBlocks)
+
+    # A cancellable payer swap is the swap plus a Bermudan receiver
+    lmmProducts.simulate1F(discountCurve, volCurve, numPaths, 0, False, 42)
+
+    firstCallDate = lmmProducts._gridDates[2]
+
+    testCases.header("STRIKE", "CALLABLE", "BERMUDAN", "SWAP")
+
+    for strike in [0.03, 0.04, 0.05]:
+
+        vCallable = lmmProducts.valueCallableSwap(valuationDate,
+                                                  firstCallDate,
+                                                  maturityDate,
+                                                  FinSwapTypes.PAYER,
+                                                  strike,
+                                                  frequencyType,
+                                                  dayCountType,
+                                                  1.0,
+                                                  frequencyType,
+                                                  dayCountType)
+
+        vBermudan = lmmProducts.valueBermudanSwaption(valuationDate,
+                                                      firstCallDate,
+                                                      maturityDate,
+                                                      FinSwapTypes.RECEIVER,
+                                                      strike,
+                                                      frequencyType,
+                                                      dayCountType,
+                                                      1.0,
+                                                      frequencyType,
+                                                      dayCountType)
+
+        testCases.print(strike, vCallable, vBermudan, vCallable - vBermudan)
+
+###############################################################################
+
+
 # test_CapsFloors()
 # test_Swaptions()
+test_StreamingValuation()
+test_SwaptionGrid()
+test_BermudanSwaption()
 testCases.compareTestCases()
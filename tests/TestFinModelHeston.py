@@ -9,6 +9,8 @@ from financepy.models.FinModelHeston import FinModelHeston, FinHestonNumericalSc
 from financepy.finutils.FinOptionTypes import FinOptionTypes
 from financepy.products.equity.FinEquityVanillaOption import FinEquityVanillaOption
 from financepy.finutils.FinDate import FinDate
+from financepy.finutils.FinGlobalVariables import gDaysInYear
+from financepy.models.FinModelBlack import blackImpliedVolatilityVectorised
 import time
 import numpy as np
 import sys
@@ -182,7 +184,144 @@ def testMonteCarlo():
 
 ##########################################################################
 
+def testVectorised():
+
+    # All strikes of one expiry priced from a single grid of the
+    # characteristic function and compared with the Lewis quad pricer
+    valueDate = FinDate(2015, 1, 1)
+    expiryDate = FinDate(2015, 4, 1)
+    v0 = 0.05
+    theta = 0.05
+    kappa = 2.0
+    interestRate = 0.05
+    dividendYield = 0.01
+    stockPrice = 100.0
+
+    strikes = np.linspace(80.0, 120.0, 9)
+
+    testCases.header("SIGMA", "RHO", "K", "LEWIS", "VECTORISED", "DIFF")
+
+    for sigma in [0.5, 1.0]:
+        for rho in [-0.9, 0.0]:
+
+            hestonModel = FinModelHeston(v0, kappa, theta, sigma, rho)
+
+            values = hestonModel.value_Lewis_Vectorised(
+                valueDate, expiryDate, strikes, FinOptionTypes.EUROPEAN_CALL,
+                stockPrice, interestRate, dividendYield)
+
+            for i in range(0, len(strikes)):
+                callOption = FinEquityVanillaOption(
+                    expiryDate, strikes[i], FinOptionTypes.EUROPEAN_CALL)
+                valueLewis = hestonModel.value_Lewis(
+                    valueDate, callOption, stockPrice, interestRate,
+                    dividendYield)
+                testCases.print(sigma, rho, strikes[i], valueLewis,
+                                values[i], values[i] - valueLewis)
+
+    strikes = np.linspace(50.0, 150.0, 200)
+    hestonModel = FinModelHeston(v0, kappa, theta, 0.5, -0.9)
+
+    start = time.time()
+    values = hestonModel.value_Lewis_Vectorised(
+        valueDate, expiryDate, strikes, FinOptionTypes.EUROPEAN_PUT,
+        stockPrice, interestRate, dividendYield)
+    end = time.time()
+
+    testCases.header("NUMSTRIKES", "TIME")
+    testCases.print(len(strikes), end - start)
+
+##########################################################################
+
+
+def testCalibration():
+
+    # Recover the parameters from a synthetic surface of implied vols and
+    # then recalibrate from the fitted model after the vols have moved
+    valueDate = FinDate(2015, 1, 1)
+    stockPrice = 100.0
+    interestRate = 0.03
+    dividendYield = 0.01
+
+    trueModel = FinModelHeston(0.04, 1.5, 0.06, 0.7, -0.65)
+    strikes = np.linspace(70.0, 140.0, 40)
+
+    expiryDates = []
+    allStrikes = []
+    vols = []
+
+    for numMonths in [1, 3, 6, 12, 24]:
+        expiryDate = valueDate.addMonths(numMonths)
+        tau = (expiryDate - valueDate) / gDaysInYear
+        n = len(strikes)
+        values = trueModel.value_Lewis_Vectorised(
+            valueDate, expiryDate, strikes, FinOptionTypes.EUROPEAN_CALL,
+            stockPrice, interestRate, dividendYield)
+        F = stockPrice * np.exp((interestRate - dividendYield) * tau)
+        df = np.exp(-interestRate * tau)
+        impliedVols = blackImpliedVolatilityVectorised(
+            values, np.full(n, F), strikes, np.full(n, tau), np.full(n, df),
+            np.ones(n))
+        expiryDates += [expiryDate] * n
+        allStrikes += list(strikes)
+        vols += list(impliedVols)
+
+    testCases.header("START", "V0", "KAPPA", "THETA", "SIGMA", "RHO", "RMSE",
+                     "ITERATIONS", "TIME")
+
+    hestonModel = FinModelHeston(0.1, 3.0, 0.1, 0.3, -0.2)
+
+    start = time.time()
+    result = hestonModel.calibrate(valueDate, expiryDates, allStrikes, vols,
+                                   stockPrice, interestRate, dividendYield)
+    end = time.time()
+
+    testCases.print("COLD", hestonModel._v0, hestonModel._kappa,
+                    hestonModel._theta, hestonModel._sigma, hestonModel._rho,
+                    result['rmse'], result['iterations'], end - start)
+
+    bumpedVols = list(np.array(vols) + 0.002)
+
+    start = time.time()
+    result = hestonModel.calibrate(valueDate, expiryDates, allStrikes,
+                                   bumpedVols, stockPrice, interestRate,
+                                   dividendYield)
+    end = time.time()
+
+    testCases.print("WARM", hestonModel._v0, hestonModel._kappa,
+                    hestonModel._theta, hestonModel._sigma, hestonModel._rho,
+                    result['rmse'], result['iterations'], end - start)
+
+def testPathsAtObservationTimes():
+
+    # The martingale corrected QE scheme should match the forward at each
+    # observation time even with a few large and uneven steps
+    hestonModel = FinModelHeston(0.04, 1.5, 0.06, 0.7, -0.65)
+    stockPrice = 100.0
+    interestRate = 0.05
+    dividendYield = 0.01
+    obsTimes = [0.1, 0.25, 1.0, 3.0]
+
+    testCases.header("SCHEME", "STEPSPERYEAR", "TIME", "MC_FWD", "FORWARD",
+                     "SHAPE")
+
+    for scheme in FinHestonNumericalScheme:
+        for numStepsPerYear in [2, 50]:
+            sPaths = hestonModel.getPaths(obsTimes, stockPrice, interestRate,
+                                          dividendYield, 100000,
+                                          numStepsPerYear, 1234, scheme)
+            for i in range(0, len(obsTimes)):
+                t = obsTimes[i]
+                fwd = stockPrice * np.exp((interestRate - dividendYield) * t)
+                testCases.print(scheme.name, numStepsPerYear, t,
+                                np.mean(sPaths[:, i]), fwd, sPaths.shape)
+
+##########################################################################
+
 
 testAnalyticalModels()
 testMonteCarlo()
+testVectorised()
+testCalibration()
+testPathsAtObservationTimes()
 testCases.compareTestCases()
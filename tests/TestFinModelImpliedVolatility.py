@@ -0,0 +1,100 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import time
+import numpy as np
+from scipy.stats import norm
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+from financepy.models.FinModelBlack import blackImpliedVolatilityVectorised
+from financepy.models.FinModelBachelier import bachelierImpliedVolatilityVectorised
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+###############################################################################
+
+
+def blackPrice(f, k, t, df, v, phi):
+    sd = v * np.sqrt(t)
+    d1 = np.log(f / k) / sd + sd / 2.0
+    d2 = d1 - sd
+    return df * phi * (f * norm.cdf(phi * d1) - k * norm.cdf(phi * d2))
+
+###############################################################################
+
+
+def bachelierPrice(f, k, t, df, v, phi):
+    sd = v * np.sqrt(t)
+    d = (f - k) / sd
+    return df * (phi * (f - k) * norm.cdf(phi * d) + sd * norm.pdf(d))
+
+###############################################################################
+
+
+def test_BlackImpliedVolatility():
+    ''' Invert a grid of Black prices and check the volatility recovered. '''
+
+    testCases.header("T", "K", "VOL", "PHI", "PRICE", "IMPLIED", "ERROR")
+
+    f = 100.0
+
+    for t in [0.1, 1.0, 10.0]:
+        for k in [80.0, 90.0, 100.0, 110.0, 125.0]:
+            for v in [0.10, 0.20, 1.00]:
+                for phi in [-1.0, 1.0]:
+                    df = np.exp(-0.03 * t)
+                    p = blackPrice(f, k, t, df, v, phi)
+                    impliedVol = blackImpliedVolatilityVectorised(
+                        np.array([p]), np.array([f]), np.array([k]),
+                        np.array([t]), np.array([df]), np.array([phi]))[0]
+                    testCases.print(t, k, v, phi, p, impliedVol,
+                                    impliedVol - v)
+
+    # Time a full set of random options
+    numOptions = 100000
+    np.random.seed(1234)
+    f = np.full(numOptions, 100.0)
+    k = 100.0 * np.exp(np.random.uniform(-0.5, 0.5, numOptions))
+    t = np.exp(np.random.uniform(np.log(0.05), np.log(5.0), numOptions))
+    v = np.random.uniform(0.05, 1.0, numOptions)
+    phi = np.where(k > f, 1.0, -1.0)
+    df = np.exp(-0.03 * t)
+    p = blackPrice(f, k, t, df, v, phi)
+
+    start = time.time()
+    impliedVols = blackImpliedVolatilityVectorised(p, f, k, t, df, phi)
+    end = time.time()
+
+    testCases.header("NUMOPTIONS", "MAXERROR", "TIME")
+    testCases.print(numOptions, np.max(np.abs(impliedVols - v)), end - start)
+
+###############################################################################
+
+
+def test_BachelierImpliedVolatility():
+    ''' Invert a grid of Bachelier prices and check the volatility. '''
+
+    testCases.header("T", "K", "VOL", "PHI", "PRICE", "IMPLIED", "ERROR")
+
+    f = 0.02
+
+    for t in [0.25, 1.0, 10.0]:
+        for k in [0.01, 0.015, 0.02, 0.025, 0.03]:
+            for v in [0.005, 0.01]:
+                for phi in [-1.0, 1.0]:
+                    df = np.exp(-0.02 * t)
+                    p = bachelierPrice(f, k, t, df, v, phi)
+                    impliedVol = bachelierImpliedVolatilityVectorised(
+                        np.array([p]), np.array([f]), np.array([k]),
+                        np.array([t]), np.array([df]), np.array([phi]))[0]
+                    testCases.print(t, k, v, phi, p, impliedVol,
+                                    impliedVol - v)
+
+###############################################################################
+
+
+test_BlackImpliedVolatility()
+test_BachelierImpliedVolatility()
+testCases.compareTestCases()
@@ -0,0 +1,186 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import time
+import numpy as np
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+from financepy.finutils.FinDate import FinDate
+from financepy.finutils.FinGlobalVariables import gDaysInYear
+from financepy.finutils.FinOptionTypes import FinOptionTypes
+from financepy.finutils.FinFrequency import FinFrequencyTypes
+from financepy.models.FinModelBlack import blackImpliedVolatilityVectorised
+from financepy.models.FinModelBlackScholes import bsValue
+from financepy.models.FinModelHeston import FinModelHeston
+from financepy.models.FinModelLocalVol import FinModelLocalVol
+from financepy.models.FinProcessSimulator import FinProcessTypes
+from financepy.models.FinProcessSimulator import FinGBMNumericalScheme
+from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
+from financepy.market.volatility.FinEquityVolSurface import FinEquityVolSurface
+from financepy.products.equity.FinEquityModelTypes import FinEquityModelBlackScholes
+from financepy.products.equity.FinEquityBarrierOption import FinEquityBarrierOption
+from financepy.products.equity.FinEquityBarrierOption import FinEquityBarrierTypes
+from financepy.products.equity.FinEquityOneTouchOption import FinEquityOneTouchOption
+from financepy.products.equity.FinEquityOneTouchOption import FinTouchOptionPayoffTypes
+from financepy.products.equity.FinEquityFixedLookbackOption import FinEquityFixedLookbackOption
+from financepy.products.equity.FinEquityFloatLookbackOption import FinEquityFloatLookbackOption
+from financepy.products.equity.FinEquityCliquetOption import FinEquityCliquetOption
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+###############################################################################
+
+
+def hestonVolSurface(valueDate, stockPrice, r, q):
+    ''' An SVI surface fitted to the implied volatilities of a Heston model
+    which has a strong negative skew. '''
+
+    discountCurve = FinDiscountCurveFlat(valueDate, r)
+    expiryDates = [valueDate.addMonths(m) for m in [1, 3, 6, 12, 24, 60]]
+    strikes = np.linspace(70.0, 130.0, 13)
+
+    model = FinModelHeston(0.04, 1.5, 0.05, 0.6, -0.7)
+    vols = []
+
+    for expiryDate in expiryDates:
+        t = (expiryDate - valueDate) / gDaysInYear
+        f = stockPrice * np.exp((r - q) * t)
+        df = np.exp(-r * t)
+        phi = np.where(strikes > f, 1.0, -1.0)
+        optionTypes = [FinOptionTypes.EUROPEAN_CALL if p > 0.0 else
+                       FinOptionTypes.EUROPEAN_PUT for p in phi]
+        prices = model.value_Lewis_Vectorised(valueDate, expiryDate, strikes,
+                                              optionTypes, stockPrice, r, q)
+        n = len(strikes)
+        vols.append(blackImpliedVolatilityVectorised(prices, np.full(n, f),
+                                                     strikes, np.full(n, t),
+                                                     np.full(n, df), phi))
+
+    return FinEquityVolSurface(valueDate, stockPrice, discountCurve, q,
+                               expiryDates, strikes, np.array(vols))
+
+###############################################################################
+
+
+def test_FinModelLocalVol():
+
+    valueDate = FinDate(1, 1, 2021)
+    stockPrice = 100.0
+    r = 0.02
+    q = 0.01
+    discountCurve = FinDiscountCurveFlat(valueDate, r)
+
+    volSurface = hestonVolSurface(valueDate, stockPrice, r, q)
+    localVolModel = FinModelLocalVol(volSurface)
+
+    testCases.header("TIME", "SPOT", "IMPLIED", "LOCAL")
+
+    for t in [0.25, 1.0, 5.0]:
+        for s in [80.0, 100.0, 120.0]:
+            testCases.print(t, s, volSurface.volatility(s, t),
+                            localVolModel.localVolatility(s, t))
+
+    # The local volatility model must reprice the European options
+    t = 1.0
+    df = discountCurve._df(t)
+    paths = localVolModel.getPaths(50000, 100, t, stockPrice, seed=1234)
+
+    testCases.header("STRIKE", "IMPLIED", "BLACK", "LOCAL_VOL_MC")
+
+    for k in [80.0, 90.0, 100.0, 110.0, 120.0]:
+        vol = volSurface.volatility(k, t)
+        v = bsValue(stockPrice, t, k, r, q, vol, 1.0)
+        vMC = df * np.mean(np.maximum(paths[:, -1] - k, 0.0))
+        testCases.print(k, vol, v, vMC)
+
+###############################################################################
+
+
+def test_FinModelLocalVolExotics():
+
+    valueDate = FinDate(1, 1, 2021)
+    expiryDate = FinDate(1, 1, 2026)
+    stockPrice = 100.0
+    r = 0.02
+    q = 0.01
+    discountCurve = FinDiscountCurveFlat(valueDate, r)
+
+    volSurface = hestonVolSurface(valueDate, stockPrice, r, q)
+    localVolModel = FinModelLocalVol(volSurface)
+
+    # Black-Scholes with the ATM volatility shows the effect of the skew
+    atmVol = volSurface.volatility(stockPrice, expiryDate)
+    bsModel = FinEquityModelBlackScholes(atmVol)
+    numPaths = 10000
+
+    # A five year daily monitored down-and-out call
+    barrierOption = FinEquityBarrierOption(
+        expiryDate, 100.0, FinEquityBarrierTypes.DOWN_AND_OUT_CALL, 70.0, 252)
+
+    modelParams = (stockPrice, r - q, atmVol, FinGBMNumericalScheme.NORMAL)
+    vBS = barrierOption.valueMC(valueDate, stockPrice, discountCurve,
+                                FinProcessTypes.GBM, modelParams, 252,
+                                numPaths)
+
+    start = time.time()
+    modelParams = (stockPrice, localVolModel)
+    vLV = barrierOption.valueMC(valueDate, stockPrice, discountCurve,
+                                FinProcessTypes.LOCAL_VOL, modelParams, 252,
+                                numPaths)
+    end = time.time()
+
+    lvModel = FinEquityModelBlackScholes(localVolModel)
+    vPDE = barrierOption.valueGreeksPDE(valueDate, stockPrice, discountCurve,
+                                        q, lvModel)['value']
+
+    testCases.header("PRODUCT", "BS_MC", "LV_MC", "LV_PDE", "TIME")
+    testCases.print("DOWN_AND_OUT_CALL", vBS, vLV, vPDE, end - start)
+
+    oneTouchOption = FinEquityOneTouchOption(
+        expiryDate, FinTouchOptionPayoffTypes.DOWN_AND_IN_CASH_AT_EXPIRY,
+        70.0)
+
+    vBS = oneTouchOption.valueMC(valueDate, stockPrice, discountCurve, q,
+                                 bsModel, numPaths, 52)
+    vLV = oneTouchOption.valueMC(valueDate, stockPrice, discountCurve, q,
+                                 localVolModel, numPaths, 52)
+    vPDE = oneTouchOption.valueGreeksPDE(valueDate, stockPrice,
+                                         discountCurve, q, lvModel)['value']
+    testCases.print("ONE_TOUCH", vBS, vLV, vPDE, 0.0)
+
+    fixedLookback = FinEquityFixedLookbackOption(
+        expiryDate, FinOptionTypes.EUROPEAN_CALL, 100.0)
+
+    vBS = fixedLookback.valueMC(valueDate, stockPrice, discountCurve, q,
+                                atmVol, stockPrice, numPaths // 2, 52)
+    vLV = fixedLookback.valueMC(valueDate, stockPrice, discountCurve, q,
+                                localVolModel, stockPrice, numPaths, 52)
+    testCases.print("FIXED_LOOKBACK", vBS, vLV, 0.0, 0.0)
+
+    floatLookback = FinEquityFloatLookbackOption(
+        expiryDate, FinOptionTypes.EUROPEAN_PUT)
+
+    vBS = floatLookback.valueMC(valueDate, stockPrice, discountCurve, q,
+                                atmVol, stockPrice, numPaths // 2, 52)
+    vLV = floatLookback.valueMC(valueDate, stockPrice, discountCurve, q,
+                                localVolModel, stockPrice, numPaths, 52)
+    testCases.print("FLOAT_LOOKBACK", vBS, vLV, 0.0, 0.0)
+
+    cliquetOption = FinEquityCliquetOption(valueDate, expiryDate,
+                                           FinOptionTypes.EUROPEAN_CALL,
+                                           FinFrequencyTypes.ANNUAL)
+
+    vBS = cliquetOption.valueMC(valueDate, stockPrice, discountCurve, q,
+                                bsModel, numPaths)
+    vLV = cliquetOption.valueMC(valueDate, stockPrice, discountCurve, q,
+                                localVolModel, numPaths)
+    testCases.print("CLIQUET", vBS, vLV, 0.0, 0.0)
+
+###############################################################################
+
+
+test_FinModelLocalVol()
+test_FinModelLocalVolExotics()
+testCases.compareTestCases()
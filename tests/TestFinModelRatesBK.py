@@ -143,6 +143,31 @@ def test_BKExampleTwo():
 ###############################################################################
 
 
+def test_BKLongDatedTree():
+    # Long-dated trees are used for 30Y callables so check the build speed
+
+    testCases.banner("=== LONG DATED BK TREE BUILD ===")
+
+    times = np.linspace(0.0, 31.0, 32)
+    dfs = np.exp(-0.04*times)
+
+    sigma = 0.20
+    a = 0.05
+    tmat = 30.0
+
+    testCases.header("TIMESTEPS", "Q_SUM", "TIME")
+
+    for numTimeSteps in [500, 1000, 2000]:
+        model = FinModelRatesBK(sigma, a, numTimeSteps)
+        model.buildTree(tmat, times, dfs)
+        # Sum of the Arrow-Debreu prices at the maturity equals the df
+        testCases.print(numTimeSteps, model._Q[-2].sum(),
+                        model._treeBuildTime)
+
+###############################################################################
+
+
 test_BKExampleOne()
 test_BKExampleTwo()
+test_BKLongDatedTree()
 testCases.compareTestCases()
@@ -9,6 +9,7 @@ from FinTestCases import FinTestCases, globalTestCaseMode
 from financepy.finutils.FinDate import FinDate
 from financepy.models.FinModelRatesHW import FinModelRatesHW, FinHWEuropeanCalcType
 from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
+from financepy.market.curves.FinDiscountCurve import FinDiscountCurve
 from financepy.products.bonds.FinBond import FinBond
 from financepy.finutils.FinFrequency import FinFrequencyTypes
 from financepy.finutils.FinDayCount import FinDayCountTypes
@@ -320,8 +321,61 @@ def test_HullWhiteCallableBond():
 ###############################################################################
 
 
+def test_HullWhiteMonteCarlo():
+    # Exact simulation of the short rate and its integral on a date grid
+
+    valuationDate = FinDate(1, 12, 2019)
+    times = np.linspace(0.0, 12.0, 25)
+    dfs = np.exp(-(0.02 + 0.002 * times) * times)
+    dates = valuationDate.addYears(times)
+    curve = FinDiscountCurve(valuationDate, dates, dfs)
+
+    sigma = 0.01
+    a = 0.05
+    model = FinModelRatesHW(sigma, a)
+
+    gridDates = [valuationDate.addMonths(3*i) for i in range(1, 41)]
+
+    testCases.banner("HW MC repricing of the zero coupon bonds on the grid")
+    testCases.header("NUMPATHS", "MC DF", "CURVE DF", "STDERR", "TIME")
+
+    def zcbPayoff(gridTimes, rates, dfs):
+        return dfs[:, -1]
+
+    for numPaths in [10000, 100000]:
+        start = time.time()
+        v = model.valueMC(curve, gridDates, zcbPayoff, numPaths,
+                          numPathsPerChunk=20000)
+        end = time.time()
+        testCases.print(numPaths, v['value'], curve.df(gridDates[-1]),
+                        v['stderr'], end - start)
+
+    testCases.banner("HW MC average rate option and discount profile")
+    testCases.header("STRIKE", "VALUE", "STDERR")
+
+    def averageRatePayoff(gridTimes, rates, dfs):
+        avgRate = np.mean(rates[:, 1:], axis=1)
+        return np.maximum(avgRate - strike, 0.0) * dfs[:, -1]
+
+    for strike in [0.02, 0.03, 0.04]:
+        v = model.valueMC(curve, gridDates, averageRatePayoff, 50000)
+        testCases.print(strike, v['value'], v['stderr'])
+
+    def profilePayoff(gridTimes, rates, dfs):
+        return dfs
+
+    v = model.valueMC(curve, gridDates, profilePayoff, 50000)
+    testCases.header("DATE", "MC DF", "CURVE DF")
+    for i in range(0, len(gridDates), 8):
+        testCases.print(gridDates[i], v['value'][i+1],
+                        curve.df(gridDates[i]))
+
+###############################################################################
+
+
 test_HullWhiteExampleOne()
 test_HullWhiteExampleTwo()
 test_HullWhiteBondOption()
 test_HullWhiteCallableBond()
+test_HullWhiteMonteCarlo()
 testCases.compareTestCases()
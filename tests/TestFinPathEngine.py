@@ -0,0 +1,120 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import numpy as np
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+from financepy.finutils.FinDate import FinDate
+from financepy.models.FinPathEngine import FinPathEngine, FinPathModelTypes
+from financepy.market.curves.FinDiscountCurveFlat import FinDiscountCurveFlat
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+###############################################################################
+
+
+def test_FinPathEngineEquity():
+    ''' Value several payoffs over one set of correlated GBM paths and check
+    that the answer does not depend on the block size. '''
+
+    times = np.linspace(0.1, 1.0, 10)
+    r = 0.05
+    corrMatrix = np.array([[1.0, 0.5], [0.5, 1.0]])
+    modelParams = np.array([[100.0, r, 0.20],
+                            [50.0, r, 0.30]])
+
+    engine = FinPathEngine(times,
+                           FinPathModelTypes.GBM,
+                           modelParams,
+                           corrMatrix)
+
+    df = np.exp(-r * times[-1])
+
+    def forwards(gridTimes, paths):
+        return paths[:, -1, :] * df
+
+    def call(gridTimes, paths):
+        return np.maximum(paths[:, -1, 0] - 100.0, 0.0) * df
+
+    def bestOf(gridTimes, paths):
+        return np.max(paths[:, -1, :] / paths[:, 0, :], axis=1) * df
+
+    payoffs = [forwards, call, bestOf]
+
+    testCases.header("BLOCKSIZE", "ANTI", "SOBOL", "FWD1", "FWD2", "CALL",
+                     "CALL_SE", "BESTOF")
+
+    for antithetic in [False, True]:
+        for useSobol in [False, True]:
+            for numPathsPerBlock in [2000, 20000]:
+                results = engine.valueMC(payoffs, 20000, 42, numPathsPerBlock,
+                                         antithetic, useSobol)
+                v = results['value']
+                se = results['stderr']
+                testCases.print(numPathsPerBlock, antithetic, useSobol,
+                                v[0][0], v[0][1], v[1], se[1], v[2])
+
+###############################################################################
+
+
+def test_FinPathEngineModels():
+    ''' Check each model type against a known first moment. '''
+
+    times = np.linspace(0.1, 1.0, 10)
+    numPaths = 20000
+    seed = 42
+
+    def terminal(gridTimes, paths):
+        return paths[:, -1, 0]
+
+    testCases.header("MODEL", "MC", "EXPECTED")
+
+    engine = FinPathEngine(times, FinPathModelTypes.HESTON,
+                           [[100.0, 0.05, 0.04, 2.0, 0.04, 0.3, -0.7]])
+    v = engine.valueMC(terminal, numPaths, seed)['value'][0]
+    testCases.print("HESTON", v, 100.0 * np.exp(0.05))
+
+    lvTimes = [0.0, 1.0]
+    lvSpots = [50.0, 100.0, 150.0]
+    lvVols = np.array([[0.3, 0.2, 0.15], [0.3, 0.2, 0.15]])
+    engine = FinPathEngine(times, FinPathModelTypes.LOCAL_VOL,
+                           [[100.0, 0.05]], None, None,
+                           lvTimes, lvSpots, lvVols)
+    v = engine.valueMC(terminal, numPaths, seed)['value'][0]
+    testCases.print("LOCAL_VOL", v, 100.0 * np.exp(0.05))
+
+    r0, kappa, theta, sigma = 0.03, 0.5, 0.05, 0.01
+    engine = FinPathEngine(times, FinPathModelTypes.VASICEK,
+                           [[r0, kappa, theta, sigma]])
+    v = engine.valueMC(terminal, numPaths, seed)['value'][0]
+    testCases.print("VASICEK", v, theta + (r0 - theta) * np.exp(-kappa))
+
+    engine = FinPathEngine(times, FinPathModelTypes.CIR,
+                           [[r0, kappa, theta, 0.05]])
+    v = engine.valueMC(terminal, numPaths, seed)['value'][0]
+    testCases.print("CIR", v, theta + (r0 - theta) * np.exp(-kappa))
+
+    # Hull-White must reprice the zero coupon bond of the curve it fits
+    valuationDate = FinDate(1, 1, 2020)
+    discountCurve = FinDiscountCurveFlat(valuationDate, 0.04)
+    times = np.linspace(0.02, 2.0, 100)
+    engine = FinPathEngine(times, FinPathModelTypes.HULL_WHITE,
+                           [[0.1, 0.01]], None, discountCurve)
+
+    def zeroCouponBond(gridTimes, paths):
+        rates = paths[:, :, 0]
+        dt = np.diff(gridTimes)
+        intr = np.sum(0.5 * (rates[:, 1:] + rates[:, :-1]) * dt, axis=1)
+        return np.exp(-intr)
+
+    v = engine.valueMC(zeroCouponBond, numPaths, seed)['value'][0]
+    testCases.print("HULL_WHITE", v, discountCurve._df(2.0))
+
+###############################################################################
+
+
+test_FinPathEngineEquity()
+test_FinPathEngineModels()
+testCases.compareTestCases()
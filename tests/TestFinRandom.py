@@ -0,0 +1,66 @@
+###############################################################################
+# Copyright (C) 2018, 2019, 2020 Dominic O'Kane
+###############################################################################
+
+import numpy as np
+import time
+
+from financepy.finutils.FinRandom import philox4x32
+from financepy.finutils.FinRandom import counterUniforms, counterNormals
+from financepy.finutils.FinRandom import counterNormal, getCounterNormals
+
+from FinTestCases import FinTestCases, globalTestCaseMode
+
+testCases = FinTestCases(__file__, globalTestCaseMode)
+
+###############################################################################
+
+
+def test_FinRandom():
+
+    # Known answer tests for Philox4x32-10 from the Random123 distribution
+    zero = np.uint64(0)
+    ones = np.uint64(0xFFFFFFFF)
+
+    r = philox4x32(zero, zero, zero, zero, zero, zero)
+    assert(list(r) == [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8])
+
+    r = philox4x32(ones, ones, ones, ones, ones, ones)
+    assert(list(r) == [0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd])
+
+    # The draws for a path and step do not depend on how many are taken
+    u5 = counterUniforms(42, 7, 3, np.empty(5))
+    u2 = counterUniforms(42, 7, 3, np.empty(2))
+    assert(np.all(u5[0:2] == u2))
+
+    g = counterNormals(42, 7, 3, np.empty(3))
+    assert(g[0] == counterNormal(42, 7, 3))
+
+    seed = 1919
+    numPaths = 100000
+    numDraws = 10
+
+    start = time.time()
+    g = getCounterNormals(seed, numPaths, numDraws)
+    end = time.time()
+
+    testCases.header("DRAW", "MEAN", "STDEV", "KURTOSIS")
+
+    for i in range(0, numDraws):
+        m = np.mean(g[:, i])
+        s = np.std(g[:, i])
+        k = np.mean((g[:, i] - m)**4) / s**4
+        testCases.print(i, m, s, k)
+
+    # Draws for a path do not depend on the other paths
+    g2 = getCounterNormals(seed, 10, numDraws)
+    assert(np.all(g2 == g[0:10]))
+
+    testCases.header("LABEL", "TIME")
+    testCases.print("100000 x 10 NORMALS", end - start)
+
+###############################################################################
+
+
+test_FinRandom()
+testCases.compareTestCases()
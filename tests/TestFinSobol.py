@@ -1,6 +1,10 @@
 from financepy.finutils.FinSobol import getUniformSobol, getGaussianSobol
+from financepy.finutils.FinSobol import getUniformSobolScrambled
+from financepy.finutils.FinSobol import getSobolGaussianPaths
+from financepy.finutils.FinSobol import FinSobolPathTypes
 
 import time
+import numpy as np
 from numba import jit
 
 from FinTestCases import FinTestCases, globalTestCaseMode
@@ -52,6 +56,37 @@ def test_FinSobol():
 
 ###############################################################################
 
+
+def test_FinSobolScrambled():
+    ''' Scrambling must keep each power of two block of points stratified
+    and skipping ahead must continue the same sequence. '''
+
+    numPoints = 1024
+    dimensions = 50
+    seed = 1234
+
+    points = getUniformSobolScrambled(numPoints, dimensions, seed)
+
+    # Each of the 1024 equal intervals holds exactly one point
+    for d in range(dimensions):
+        cells = np.sort(np.floor(points[:, d] * numPoints))
+        assert(np.all(cells == np.arange(numPoints)))
+
+    skipped = getUniformSobolScrambled(numPoints - 100, dimensions, seed, 100)
+    assert(np.max(np.abs(skipped - points[100:])) == 0.0)
+
+    # Estimate the mean of the terminal value of the Brownian motion squared
+    stepTimes = np.linspace(0.1, 1.0, 10)
+    testCases.header("PATH TYPE", "E[W(T)^2]")
+
+    for pathType in FinSobolPathTypes:
+        g = getSobolGaussianPaths(numPoints, stepTimes, 1,
+                                  pathType.value, seed)
+        wT = np.sqrt(0.1) * np.sum(g[:, :, 0], axis=1)
+        testCases.print(pathType, np.mean(wT**2))
+
+###############################################################################
+
 @jit(cache=True, nopython=True)
 def test_FinSobolCache():
     return getUniformSobol(2, 2)
@@ -60,5 +95,6 @@ def test_FinSobolCache():
 
 
 test_FinSobol()
+test_FinSobolScrambled()
 test_FinSobolCache()
 testCases.compareTestCases()